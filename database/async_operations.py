@@ -0,0 +1,243 @@
+# async_operations.py
+# asyncio counterparts of operations.py on the lazily created AsyncGraphDatabase
+# driver (driver.async_driver), for callers that issue many independent
+# statements: each coroutine holds one pooled connection only while its
+# transaction runs, so a fan-out of N writes costs about N / concurrency round
+# trips instead of N.
+#
+# - run_write / run_read: one statement in one managed (retried) transaction.
+# - The single-record helpers below take the same arguments as operations.py.
+# - fan_out / fan_out_writes / fan_out_reads: run many of them concurrently,
+#   at most `concurrency` at a time (default and cap: the pool size, so callers
+#   queue here instead of timing out on connection acquisition).
+# - pool_metrics(): connections in use, peak, and time spent waiting for one.
+#
+# Pool size, acquisition timeout and keep-alive are set in config.py. Await
+# driver.close_async_driver() before the event loop that used the driver ends.
+#
+#   python -m database.async_operations   # stand-in benchmark: sequential vs fan-out
+
+import asyncio
+import contextlib
+import threading
+import time
+
+from . import operations
+from .config import NEO4J_MAX_POOL_SIZE
+from .driver import async_driver
+
+
+class PoolMetrics:
+    """
+    Usage of the connection pool by this module: every session holds one
+    connection while it runs, so sessions in flight are connections in use.
+    """
+
+    def __init__(self, max_pool_size: int = NEO4J_MAX_POOL_SIZE):
+        self.max_pool_size = max_pool_size
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.in_use = self.peak_in_use = 0
+            self.waiting = self.peak_waiting = 0
+            self.sessions = self.errors = 0
+            self.wait_s_total = self.wait_s_max = 0.0
+
+    def start_wait(self):
+        with self._lock:
+            self.waiting += 1
+            self.peak_waiting = max(self.peak_waiting, self.waiting)
+
+    def end_wait(self, waited_s: float):
+        with self._lock:
+            self.waiting -= 1
+            self.wait_s_total += waited_s
+            self.wait_s_max = max(self.wait_s_max, waited_s)
+
+    def acquired(self):
+        with self._lock:
+            self.in_use += 1
+            self.sessions += 1
+            self.peak_in_use = max(self.peak_in_use, self.in_use)
+
+    def released(self, failed: bool):
+        with self._lock:
+            self.in_use -= 1
+            self.errors += failed
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "max_pool_size": self.max_pool_size,
+                "in_use": self.in_use,
+                "peak_in_use": self.peak_in_use,
+                "utilization": round(self.in_use / self.max_pool_size, 3) if self.max_pool_size else 0.0,
+                "waiting": self.waiting,
+                "peak_waiting": self.peak_waiting,
+                "sessions": self.sessions,
+                "errors": self.errors,
+                "wait_ms_total": round(self.wait_s_total * 1000, 3),
+                "wait_ms_max": round(self.wait_s_max * 1000, 3),
+            }
+
+
+metrics = PoolMetrics()
+
+
+def pool_metrics() -> dict:
+    return metrics.snapshot()
+
+
+@contextlib.asynccontextmanager
+async def _session(db):
+    metrics.acquired()
+    failed = True
+    try:
+        async with (db or async_driver).session() as session:
+            yield session
+        failed = False
+    finally:
+        metrics.released(failed)
+
+
+async def run_write(query, parameters=None, db=None):
+    async def work(tx):
+        result = await tx.run(query, parameters or {})
+        return await result.consume()
+
+    async with _session(db) as session:
+        return await session.execute_write(work)
+
+
+async def run_read(query, parameters=None, db=None) -> list[dict]:
+    async def work(tx):
+        result = await tx.run(query, parameters or {})
+        return await result.data()
+
+    async with _session(db) as session:
+        return await session.execute_read(work)
+
+
+# -----------------------------
+# Single-record operations
+# -----------------------------
+async def add_trapper(trapper_id, platform, username, db=None):
+    await run_write(operations.ADD_TRAPPER_QUERY, {"id": trapper_id, "username": username, "platform": platform}, db)
+    return trapper_id
+
+
+async def add_victim(victim_id, platform, db=None):
+    await run_write(operations.ADD_VICTIM_QUERY, {"id": victim_id, "platform": platform}, db)
+    return victim_id
+
+
+async def log_victim_metadata(victim_id, age_group, gender, location, platform, profession, db=None):
+    await run_write(operations.LOG_VICTIM_METADATA_QUERY, {
+        "victim_id": victim_id, "age_group": age_group, "gender": gender,
+        "location": location, "platform": platform, "profession": profession,
+    }, db)
+
+
+async def connect_trapper_to_victim(trapper_id, victim_id, db=None):
+    await run_write(operations.CONNECT_TRAPPER_TO_VICTIM_QUERY, {"trapper_id": trapper_id, "victim_id": victim_id}, db)
+
+
+async def add_red_team_report(report_id, victim_id, severity, db=None):
+    await run_write(operations.ADD_RED_TEAM_REPORT_QUERY,
+                    {"victim_id": victim_id, "report_id": report_id, "severity": severity}, db)
+    return report_id
+
+
+async def link_threat_type(trapper_id, threat_type, db=None):
+    await run_write(operations.LINK_THREAT_TYPE_QUERY, {"trapper_id": trapper_id, "threat_type": threat_type}, db)
+
+
+async def link_target_group(trapper_id, group_name, db=None):
+    await run_write(operations.LINK_TARGET_GROUP_QUERY, {"trapper_id": trapper_id, "group_name": group_name}, db)
+
+
+async def add_threat_type(report_id, trapper_id, threat_name, confidence, db=None):
+    await run_write(operations.CREATE_THREAT_TYPE_QUERY, {
+        "report_id": report_id, "trapper_id": trapper_id, "threat_name": threat_name, "confidence": confidence,
+    }, db)
+
+
+# -----------------------------
+# Concurrent fan-out
+# -----------------------------
+async def fan_out(coroutines, concurrency: int | None = None) -> list:
+    """
+    Awaits `coroutines` with at most `concurrency` (default and cap: the pool
+    size) running at once; returns their results in order. The first error is
+    raised once the rest have finished.
+    """
+    limit = max(1, min(concurrency or metrics.max_pool_size, metrics.max_pool_size))
+    gate = asyncio.Semaphore(limit)
+
+    async def gated(coroutine):
+        if gate.locked():
+            metrics.start_wait()
+            start = time.perf_counter()
+            try:
+                await gate.acquire()
+            finally:
+                metrics.end_wait(time.perf_counter() - start)
+        else:
+            await gate.acquire()
+        try:
+            return await coroutine
+        finally:
+            gate.release()
+
+    results = await asyncio.gather(*(gated(c) for c in coroutines), return_exceptions=True)
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+    return results
+
+
+async def fan_out_writes(query, parameter_sets, concurrency: int | None = None, db=None) -> int:
+    """Runs `query` once per parameter set, each in its own transaction; returns how many ran."""
+    return len(await fan_out((run_write(query, parameters, db) for parameters in parameter_sets), concurrency))
+
+
+async def fan_out_reads(query, parameter_sets, concurrency: int | None = None, db=None) -> list[list[dict]]:
+    """Runs `query` once per parameter set; returns each one's rows, in order."""
+    return await fan_out((run_read(query, parameters, db) for parameters in parameter_sets), concurrency)
+
+
+# --- Benchmark: sequential vs fan-out against a stand-in async driver ---
+if __name__ == "__main__":
+    import argparse
+
+    from .stand_in import StandInAsyncDriver
+
+    parser = argparse.ArgumentParser(description="Compare sequential and fanned-out async writes.")
+    parser.add_argument("--writes", type=int, default=2000)
+    parser.add_argument("--rtt-ms", type=float, default=2.0, help="Simulated round trip per RUN and per COMMIT.")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32, 100])
+    args = parser.parse_args()
+
+    async def main():
+        edges = [{"trapper_id": f"t{i % 100}", "victim_id": f"v{i}"} for i in range(args.writes)]
+        print(f"{args.writes} connect_trapper_to_victim writes, {args.rtt_ms} ms round trip, "
+              f"pool of {metrics.max_pool_size}")
+        db = StandInAsyncDriver(pool_size=metrics.max_pool_size, rtt_s=args.rtt_ms / 1000)
+
+        start = time.perf_counter()
+        for edge in edges[:200]:
+            await connect_trapper_to_victim(edge["trapper_id"], edge["victim_id"], db=db)
+        print(f"  sequential awaits        {200 / (time.perf_counter() - start):>9,.0f} writes/s")
+
+        for concurrency in args.concurrency:
+            metrics.reset()
+            start = time.perf_counter()
+            await fan_out_writes(operations.CONNECT_TRAPPER_TO_VICTIM_QUERY, edges, concurrency, db=db)
+            rate = args.writes / (time.perf_counter() - start)
+            snapshot = pool_metrics()
+            print(f"  fan-out, concurrency {concurrency:<4} {rate:>9,.0f} writes/s  "
+                  f"peak in use {snapshot['peak_in_use']}, max wait {snapshot['wait_ms_max']:.0f} ms")
+
+    asyncio.run(main())
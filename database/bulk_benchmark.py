@@ -0,0 +1,76 @@
+# bulk_benchmark.py
+# Throughput of the bulk ingestion API: loads 1M trapper->victim edges.
+#
+#   python -m database.bulk_benchmark                # against the database in .env
+#   python -m database.bulk_benchmark --stand-in     # no Neo4j: a driver stand-in that
+#                                                    # charges a round trip per RUN/COMMIT
+#                                                    # and a fixed server cost per row
+#
+# Against a real database the nodes and edges are left behind (ids prefixed "bench-").
+
+import argparse
+import random
+import time
+
+from . import operations
+from .stand_in import StandInDriver
+
+parser = argparse.ArgumentParser(description="Bulk ingestion throughput benchmark.")
+parser.add_argument("--edges", type=int, default=1_000_000)
+parser.add_argument("--trappers", type=int, default=10_000)
+parser.add_argument("--victims", type=int, default=200_000)
+parser.add_argument("--chunk-size", type=int, default=10_000)
+parser.add_argument("--workers", type=int, nargs="+", default=[1, 4])
+parser.add_argument("--before-sample", type=int, default=2_000,
+                    help="Edges written with the one-session-per-edge helper, to extrapolate from.")
+parser.add_argument("--stand-in", action="store_true")
+parser.add_argument("--rtt-ms", type=float, default=1.0, help="Stand-in network round trip.")
+parser.add_argument("--row-us", type=float, default=5.0, help="Stand-in server time per row.")
+args = parser.parse_args()
+
+
+def _edges(n):
+    rng = random.Random(7)
+    for _ in range(n):
+        yield {"trapper_id": f"bench-t{rng.randrange(args.trappers)}",
+               "victim_id": f"bench-v{rng.randrange(args.victims)}"}
+
+
+def main():
+    db = StandInDriver(rtt_s=args.rtt_ms / 1000, row_s=args.row_us / 1e6) if args.stand_in else operations.driver
+    print(f"{'stand-in' if args.stand_in else 'Neo4j'}: {args.edges} edges between {args.trappers} trappers "
+          f"and {args.victims} victims, chunks of {args.chunk_size}")
+
+    start = time.perf_counter()
+    operations.add_trappers(({"trapper_id": f"bench-t{i}", "platform": "Instagram", "username": f"bench_{i}"}
+                             for i in range(args.trappers)), args.chunk_size, db=db)
+    operations.add_victims(({"victim_id": f"bench-v{i}", "platform": "Instagram"} for i in range(args.victims)),
+                           args.chunk_size, db=db)
+    print(f"nodes: {(args.trappers + args.victims) / (time.perf_counter() - start):,.0f} nodes/s")
+
+    # Before: one session and statement per edge (connect_trapper_to_victim)
+    saved_driver, operations.driver = operations.driver, db
+    try:
+        trips_before = getattr(db, "round_trips", 0)
+        start = time.perf_counter()
+        for edge in _edges(args.before_sample):
+            operations.connect_trapper_to_victim(edge["trapper_id"], edge["victim_id"])
+        rate = args.before_sample / (time.perf_counter() - start)
+    finally:
+        operations.driver = saved_driver
+    trips = (getattr(db, "round_trips", 0) - trips_before) / args.before_sample if args.stand_in else None
+    print(f"before, edge per session   {rate:>10,.0f} edges/s  (1M edges in ~{1e6 / rate / 60:,.0f} min)"
+          + (f"  {trips:.3f} round trips/edge" if trips is not None else ""))
+
+    for workers in args.workers:
+        trips_before = getattr(db, "round_trips", 0)
+        start = time.perf_counter()
+        written = operations.connect_trappers_to_victims(_edges(args.edges), args.chunk_size, workers, db=db)
+        elapsed = time.perf_counter() - start
+        trips = (getattr(db, "round_trips", 0) - trips_before) / written if args.stand_in else None
+        print(f"bulk, {workers} writer(s)        {written / elapsed:>10,.0f} edges/s  ({written:,} in {elapsed:.1f}s)"
+              + (f"  {trips:.4f} round trips/edge" if trips is not None else ""))
+
+
+if __name__ == "__main__":
+    main()
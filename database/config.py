@@ -7,3 +7,17 @@ load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '..', '.env'))
 NEO4J_URI = os.getenv("URI")
 NEO4J_USER = os.getenv("NEO4J_USER")
 NEO4J_PASSWORD = os.getenv("NEO4J_PASSWORD")
+
+# Storage backend for database.storage.get_storage: "neo4j" or "sqlite" (embedded, no server needed)
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "neo4j")
+SQLITE_PATH = os.getenv("SQLITE_PATH", os.path.join(os.path.dirname(__file__), '..', 'data', 'graph.sqlite3'))
+
+# Connection pool of the Neo4j drivers (sync and async)
+NEO4J_MAX_POOL_SIZE = int(os.getenv("NEO4J_MAX_POOL_SIZE", "100"))
+# Seconds to wait for a free pooled connection before failing
+NEO4J_ACQUISITION_TIMEOUT_S = float(os.getenv("NEO4J_ACQUISITION_TIMEOUT_S", "60"))
+# TCP keep-alive on pooled connections, and the idle time after which a pooled
+# connection is checked before reuse (unset: never checked)
+NEO4J_KEEP_ALIVE = os.getenv("NEO4J_KEEP_ALIVE", "1") != "0"
+NEO4J_LIVENESS_CHECK_S = float(os.environ["NEO4J_LIVENESS_CHECK_S"]) if os.getenv("NEO4J_LIVENESS_CHECK_S") else None
+NEO4J_MAX_CONNECTION_LIFETIME_S = float(os.getenv("NEO4J_MAX_CONNECTION_LIFETIME_S", "3600"))
@@ -1,9 +1,80 @@
 #driver.py
-from neo4j import GraphDatabase
-from .config import NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD
+import threading
 
-driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD))
+from neo4j import AsyncGraphDatabase, GraphDatabase
+from .config import (
+    NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD,
+    NEO4J_MAX_POOL_SIZE, NEO4J_ACQUISITION_TIMEOUT_S, NEO4J_KEEP_ALIVE,
+    NEO4J_LIVENESS_CHECK_S, NEO4J_MAX_CONNECTION_LIFETIME_S,
+)
+
+# Pool settings shared by the sync and async drivers
+POOL_CONFIG = {
+    "max_connection_pool_size": NEO4J_MAX_POOL_SIZE,
+    "connection_acquisition_timeout": NEO4J_ACQUISITION_TIMEOUT_S,
+    "keep_alive": NEO4J_KEEP_ALIVE,
+    "liveness_check_timeout": NEO4J_LIVENESS_CHECK_S,
+    "max_connection_lifetime": NEO4J_MAX_CONNECTION_LIFETIME_S,
+}
+
+
+class LazyDriver:
+    """
+    The shared Neo4j driver, created on first use instead of at import, so the
+    database package can be imported (and run on the SQLite backend) without a
+    configured Neo4j. Attribute access is forwarded to the real driver.
+    """
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._driver = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        if self._driver is None:
+            with self._lock:
+                if self._driver is None:
+                    self._driver = self._factory()
+        return self._driver
+
+    def __getattr__(self, name):
+        return getattr(self.get(), name)
+
+    def _take(self):
+        with self._lock:
+            created, self._driver = self._driver, None
+        return created
+
+    def close(self):
+        created = self._take()
+        if created is not None:
+            created.close()
+
+
+class LazyAsyncDriver(LazyDriver):
+    """LazyDriver for an AsyncDriver; close it (await) before its event loop ends."""
+
+    async def close(self):
+        created = self._take()
+        if created is not None:
+            await created.close()
+
+
+def _create_driver():
+    return GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD), **POOL_CONFIG)
+
+
+def _create_async_driver():
+    return AsyncGraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD), **POOL_CONFIG)
+
+
+driver = LazyDriver(_create_driver)
+async_driver = LazyAsyncDriver(_create_async_driver)
 
 def close_driver():
     print("close driver function")
     driver.close()
+
+
+async def close_async_driver():
+    await async_driver.close()
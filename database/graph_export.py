@@ -0,0 +1,261 @@
+# graph_export.py
+# Pulls the Trapper/Victim/ThreatType/TargetGroup/Scammer/Tactic/User graph out
+# of Neo4j into compact integer-keyed arrays for graph_analytics.py.
+#
+# - Every node gets a dense int32 ID; edges are parallel (src, dst, type,
+#   created_at, score) arrays, and `adjacency()` is the undirected CSR matrix.
+# - `refresh()` pulls only the relationships whose `created_at` is newer than
+#   the snapshot's watermark (less REFRESH_OVERLAP_MS for late commits; the
+#   overlap's duplicate edges collapse in the binary adjacency).
+# - A snapshot can be saved to / loaded from a .npz file between runs.
+# - Trappers and reported Scammers with the same username are joined by a
+#   synthetic SAME_HANDLE edge; a refresh only joins the Scammers reported and
+#   the Trappers created since the watermark.
+
+import numpy as np
+import scipy.sparse as sp
+
+NODE_LABELS = ("Trapper", "Victim", "ThreatType", "TargetGroup", "RedTeamReport", "Scammer", "Tactic", "User")
+
+# Relationship type -> (source label, target label, source key, target key)
+EDGE_SPECS = {
+    "TARGETED": ("Trapper", "Victim", "a.id", "b.id"),
+    "CLASSIFIED_AS": ("Trapper", "ThreatType", "a.id", "coalesce(b.name, b.type)"),
+    "TARGETS_GROUP": ("Trapper", "TargetGroup", "a.id", "b.name"),
+    "SUBJECT_OF": ("Victim", "RedTeamReport", "a.id", "b.id"),
+    "DETECTED": ("RedTeamReport", "ThreatType", "a.id", "coalesce(b.name, b.type)"),
+    "USED_TACTIC": ("Scammer", "Tactic", "a.username", "b.name"),
+    "REPORTED": ("User", "Scammer", "a.id", "b.username"),
+}
+EDGE_TYPES = tuple(EDGE_SPECS) + ("SAME_HANDLE",)
+
+SAME_HANDLE_QUERY = """
+MATCH (s:Scammer)
+MATCH (t:Trapper {username: s.username})
+RETURN t.id AS src, s.username AS dst
+"""
+
+# SAME_HANDLE_QUERY for the handles that can have gained a pair since $since:
+# Scammers with a new REPORTED edge and newly created Trappers
+SAME_HANDLE_SINCE_QUERY = """
+CALL {
+    MATCH (:User)-[r:REPORTED]->(s:Scammer) WHERE r.created_at > $since
+    MATCH (t:Trapper {username: s.username})
+    RETURN t, s
+  UNION
+    MATCH (t:Trapper) WHERE t.created_at > $since
+    MATCH (s:Scammer {username: t.username})
+    RETURN t, s
+}
+RETURN t.id AS src, s.username AS dst
+"""
+
+# Re-read this much before the watermark, for edges committed after the last refresh read
+REFRESH_OVERLAP_MS = 60_000
+# Rows fetched per round trip while streaming an export
+FETCH_SIZE = 10_000
+
+# Indexes the export relies on (applied by schema_setup.apply_schema)
+UNIQUE_KEYS = []
+INDEXES = [("Trapper", "username"), ("Trapper", "created_at")]
+RELATIONSHIP_INDEXES = [(rel, "created_at") for rel in EDGE_SPECS]
+
+
+def edge_query(rel: str, incremental: bool) -> str:
+    src_label, dst_label, src_key, dst_key = EDGE_SPECS[rel]
+    where = "WHERE r.created_at > $since " if incremental else ""
+    score = "r.final_verdict_score" if rel == "REPORTED" else "null"
+    return (f"MATCH (a:{src_label})-[r:{rel}]->(b:{dst_label}) {where}"
+            f"RETURN {src_key} AS src, {dst_key} AS dst, r.created_at AS created_at, {score} AS score")
+
+
+# The incremental reads must seek the created_at indexes (checked by schema_setup);
+# a full export scans by design and is not listed.
+QUERIES = {f"{rel}_SINCE_QUERY": edge_query(rel, incremental=True) for rel in EDGE_SPECS}
+QUERIES["SAME_HANDLE_SINCE_QUERY"] = SAME_HANDLE_SINCE_QUERY
+
+
+class GraphSnapshot:
+    """Integer-keyed nodes and edge arrays of the graph, growable by refreshes."""
+
+    def __init__(self):
+        self.watermark = None  # newest created_at seen (epoch ms); None before the first export
+        self._ids = {}
+        self._labels = []
+        self._keys = []
+        self._edge_chunks = []
+        self._edges = None
+        self._same_handle = set()
+        self._adjacency = {}
+
+    # --- nodes ---
+    @property
+    def num_nodes(self) -> int:
+        return len(self._keys)
+
+    @property
+    def labels(self) -> np.ndarray:
+        """Label code (index into NODE_LABELS) of every node."""
+        return np.asarray(self._labels, dtype=np.int8)
+
+    def add_nodes(self, label: str, keys) -> np.ndarray:
+        """IDs of the (label, key) nodes, adding the new ones."""
+        code = NODE_LABELS.index(label)
+        ids = self._ids
+        out = []
+        for key in keys:
+            node = ids.get((code, key))
+            if node is None:
+                node = ids[(code, key)] = len(self._keys)
+                self._keys.append(key)
+                self._labels.append(code)
+            out.append(node)
+        return np.asarray(out, dtype=np.int32)
+
+    def node_id(self, label: str, key) -> int | None:
+        return self._ids.get((NODE_LABELS.index(label), key))
+
+    def node_key(self, node: int) -> tuple[str, str]:
+        return NODE_LABELS[self._labels[node]], self._keys[node]
+
+    def nodes_of(self, label: str) -> np.ndarray:
+        return np.flatnonzero(self.labels == NODE_LABELS.index(label)).astype(np.int32)
+
+    # --- edges ---
+    def add_edges(self, edge_type: str, src, dst, created_at=None, score=None):
+        """Appends edges given as node-ID arrays."""
+        src = np.asarray(src, dtype=np.int32)
+        n = len(src)
+        if not n:
+            return
+        chunk = {
+            "src": src,
+            "dst": np.asarray(dst, dtype=np.int32),
+            "type": np.full(n, EDGE_TYPES.index(edge_type), dtype=np.int8),
+            "created_at": np.zeros(n, dtype=np.int64) if created_at is None else np.asarray(created_at, dtype=np.int64),
+            "score": np.full(n, np.nan, dtype=np.float32) if score is None else np.asarray(score, dtype=np.float32),
+        }
+        self._edge_chunks.append(chunk)
+        self._edges = None
+        self._adjacency.clear()
+        if created_at is not None:
+            newest = int(chunk["created_at"].max())
+            self.watermark = newest if self.watermark is None else max(self.watermark, newest)
+
+    @property
+    def edges(self) -> dict:
+        """All edges as parallel arrays: src, dst, type (index into EDGE_TYPES), created_at, score."""
+        if self._edges is None:
+            if not self._edge_chunks:
+                self._edges = {"src": np.zeros(0, np.int32), "dst": np.zeros(0, np.int32), "type": np.zeros(0, np.int8),
+                               "created_at": np.zeros(0, np.int64), "score": np.zeros(0, np.float32)}
+            else:
+                self._edges = {name: np.concatenate([c[name] for c in self._edge_chunks]) for name in self._edge_chunks[0]}
+                self._edge_chunks = [self._edges]
+        return self._edges
+
+    @property
+    def num_edges(self) -> int:
+        return len(self.edges["src"])
+
+    def adjacency(self, edge_types=None) -> sp.csr_matrix:
+        """Undirected, unweighted CSR adjacency over the given edge types (default: all)."""
+        cache_key = tuple(edge_types) if edge_types else None
+        if cache_key not in self._adjacency:
+            edges = self.edges
+            src, dst = edges["src"], edges["dst"]
+            if edge_types:
+                keep = np.isin(edges["type"], [EDGE_TYPES.index(t) for t in edge_types])
+                src, dst = src[keep], dst[keep]
+            n = self.num_nodes
+            matrix = sp.coo_matrix((np.ones(2 * len(src), dtype=np.float32),
+                                    (np.concatenate([src, dst]), np.concatenate([dst, src]))), shape=(n, n)).tocsr()
+            matrix.data[:] = 1.0  # duplicate edges collapse
+            self._adjacency[cache_key] = matrix
+        return self._adjacency[cache_key]
+
+    def edges_between(self, src_label: str, edge_type: str, dst_label: str) -> sp.csr_matrix:
+        """Binary (src_label nodes x dst_label nodes) incidence matrix of one edge type, in nodes_of() order."""
+        edges = self.edges
+        keep = edges["type"] == EDGE_TYPES.index(edge_type)
+        src_nodes, dst_nodes = self.nodes_of(src_label), self.nodes_of(dst_label)
+        position = np.full(self.num_nodes, -1, dtype=np.int64)
+        position[src_nodes] = np.arange(len(src_nodes))
+        rows = position[edges["src"][keep]]
+        position[:] = -1
+        position[dst_nodes] = np.arange(len(dst_nodes))
+        cols = position[edges["dst"][keep]]
+        matrix = sp.coo_matrix((np.ones(len(rows), dtype=np.float32), (rows, cols)),
+                               shape=(len(src_nodes), len(dst_nodes))).tocsr()
+        matrix.data[:] = 1.0
+        return matrix
+
+    # --- persistence ---
+    def save(self, path: str):
+        np.savez(path, labels=self.labels, keys=np.asarray(self._keys, dtype=str),
+                 watermark=np.int64(-1 if self.watermark is None else self.watermark), **self.edges)
+
+    @classmethod
+    def load(cls, path: str) -> "GraphSnapshot":
+        snapshot = cls()
+        with np.load(path) as data:
+            snapshot._labels = data["labels"].tolist()
+            snapshot._keys = data["keys"].tolist()
+            snapshot._ids = {(code, key): i for i, (code, key) in enumerate(zip(snapshot._labels, snapshot._keys))}
+            snapshot._edge_chunks = [{name: data[name] for name in ("src", "dst", "type", "created_at", "score")}]
+            watermark = int(data["watermark"])
+            snapshot.watermark = None if watermark < 0 else watermark
+        edges = snapshot.edges
+        same_handle = edges["type"] == EDGE_TYPES.index("SAME_HANDLE")
+        snapshot._same_handle = set(zip(edges["src"][same_handle].tolist(), edges["dst"][same_handle].tolist()))
+        return snapshot
+
+
+def _read_edges(session, snapshot: GraphSnapshot, rel: str, since: int | None) -> int:
+    src_label, dst_label, _, _ = EDGE_SPECS[rel]
+    result = session.run(edge_query(rel, incremental=since is not None), since=since)
+    src_keys, dst_keys, created, scores = [], [], [], []
+    for record in result:
+        src_keys.append(record["src"])
+        dst_keys.append(record["dst"])
+        created.append(record["created_at"] or 0)
+        scores.append(np.nan if record["score"] is None else record["score"])
+    snapshot.add_edges(rel, snapshot.add_nodes(src_label, src_keys), snapshot.add_nodes(dst_label, dst_keys),
+                       created, scores)
+    return len(src_keys)
+
+
+def _read_same_handles(session, snapshot: GraphSnapshot, since: int | None) -> int:
+    if since is None:
+        result = session.run(SAME_HANDLE_QUERY)
+    else:
+        result = session.run(SAME_HANDLE_SINCE_QUERY, since=since)
+    pairs = [(record["src"], record["dst"]) for record in result]
+    src = snapshot.add_nodes("Trapper", [p[0] for p in pairs])
+    dst = snapshot.add_nodes("Scammer", [p[1] for p in pairs])
+    new = [(s, d) for s, d in zip(src.tolist(), dst.tolist()) if (s, d) not in snapshot._same_handle]
+    snapshot._same_handle.update(new)
+    snapshot.add_edges("SAME_HANDLE", [s for s, _ in new], [d for _, d in new])
+    return len(new)
+
+
+def refresh(snapshot: GraphSnapshot | None = None, db=None) -> tuple[GraphSnapshot, dict]:
+    """
+    Exports the whole graph (no snapshot) or the edges added since `snapshot`'s
+    watermark. Returns the snapshot and the number of edges read per type.
+    """
+    snapshot = snapshot if snapshot is not None else GraphSnapshot()
+    since = None if snapshot.watermark is None else snapshot.watermark - REFRESH_OVERLAP_MS
+    if db is None:
+        from .driver import driver as db  # saved snapshots are analyzed without a database
+    counts = {}
+    with db.session(fetch_size=FETCH_SIZE) as session:
+        for rel in EDGE_SPECS:
+            counts[rel] = _read_edges(session, snapshot, rel, since)
+        counts["SAME_HANDLE"] = _read_same_handles(session, snapshot, since)
+    return snapshot, counts
+
+
+def export_graph(db=None) -> GraphSnapshot:
+    """A full export of the graph."""
+    return refresh(None, db)[0]
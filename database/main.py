@@ -1,22 +1,22 @@
 from .schema_setup import setup_constraints
 from .operations import (
-    add_trapper,
-    add_victim,
-    connect_trapper_to_victim,
+    add_trappers,
+    add_victims,
+    connect_trappers_to_victims,
     add_red_team_report,
-    link_threat_type,
-    link_target_group
+    link_threat_types,
+    link_target_groups
 )
 
 def insert_batch_scenario():
     # Create trapper
-    trapper_id = add_trapper("BlackWidow", "widow_hunterx", "Instagram")
+    trapper_id = "BlackWidow"
+    add_trappers([{"trapper_id": trapper_id, "platform": "Instagram", "username": "widow_hunterx"}])
 
-    # Add 5 army officer victims
-    for i in range(1, 6):
-        victim_name = f"army_officer_{i}"
-        victim_id = add_victim(victim_name, "Instagram")
-        connect_trapper_to_victim(trapper_id, victim_id)
+    # Add 5 army officer victims and their edges, one statement each
+    victim_ids = [f"army_officer_{i}" for i in range(1, 6)]
+    add_victims({"victim_id": victim_id, "platform": "Instagram"} for victim_id in victim_ids)
+    connect_trappers_to_victims({"trapper_id": trapper_id, "victim_id": victim_id} for victim_id in victim_ids)
 
     # Add red team report
     add_red_team_report(
@@ -26,10 +26,10 @@ def insert_batch_scenario():
     )
 
     # Classify as phishing
-    link_threat_type(trapper_id, "Phishing")
+    link_threat_types([{"trapper_id": trapper_id, "threat_type": "Phishing"}])
 
     # Tag target group
-    link_target_group(trapper_id, "Defense Personnel")
+    link_target_groups([{"trapper_id": trapper_id, "group_name": "Defense Personnel"}])
 
     print("✅ Scenario inserted: 1 trapper → 5 army officers (phishing).")
 if __name__ == "__main__":
@@ -1,6 +1,8 @@
 # operations.py (FULLY CORRECTED AND VERIFIED VERSION)
 
 from .driver import driver
+import queue
+import threading
 import uuid
 
 # -----------------------------
@@ -9,49 +11,68 @@ import uuid
 def generate_id():
     return str(uuid.uuid4())
 
+# -----------------------------
+# Schema the queries below rely on
+# -----------------------------
+# Every (label, property) a query in this module MERGEs or MATCHes a node on.
+# schema_setup.apply_schema gives each a uniqueness constraint (and with it an
+# index), and schema_setup.check_query_plans EXPLAINs QUERIES to make sure none
+# of them falls back to a label scan.
+UNIQUE_KEYS = [
+    ("Trapper", "id"),
+    ("Victim", "id"),
+    ("RedTeamReport", "id"),
+    ("ThreatType", "name"),
+    ("ThreatType", "type"),
+    ("TargetGroup", "name"),
+]
+# Relationships (and Trappers) get `created_at` (epoch ms) when first created, so
+# that graph_export.refresh can pull only the edges added since its last snapshot.
+
 # -----------------------------
 # Add a trapper node
 # -----------------------------
+ADD_TRAPPER_QUERY = """
+MERGE (t:Trapper {id: $id})
+ON CREATE SET t.username = $username,
+              t.platform = $platform,
+              t.created_at = timestamp()
+"""
+
 def add_trapper(trapper_id, platform, username):
     with driver.session() as session:
-        session.run(
-            """
-            MERGE (t:Trapper {id: $id})
-            ON CREATE SET t.username = $username,
-                          t.platform = $platform
-            """,
-            id=trapper_id, username=username, platform=platform
-        )
+        session.run(ADD_TRAPPER_QUERY, id=trapper_id, username=username, platform=platform)
     return trapper_id
 
 # -----------------------------
 # Add a victim node
 # -----------------------------
+ADD_VICTIM_QUERY = """
+MERGE (v:Victim {id: $id})
+ON CREATE SET v.platform = $platform
+"""
+
 def add_victim(victim_id, platform):
     with driver.session() as session:
-        session.run(
-            """
-            MERGE (v:Victim {id: $id})
-            ON CREATE SET v.platform = $platform
-            """,
-            id=victim_id, platform=platform
-        )
+        session.run(ADD_VICTIM_QUERY, id=victim_id, platform=platform)
     return victim_id
 
 #--------------
 # Log victim metadata
 #--------------
+LOG_VICTIM_METADATA_QUERY = """
+MATCH (v:Victim {id: $victim_id})
+SET v.age_group = $age_group,
+    v.gender = $gender,
+    v.location = $location,
+    v.platform = $platform,
+    v.profession = $profession
+"""
+
 def log_victim_metadata(victim_id, age_group, gender, location, platform, profession):
     with driver.session() as session:
         session.run(
-            """
-            MATCH (v:Victim {id: $victim_id})
-            SET v.age_group = $age_group,
-                v.gender = $gender,
-                v.location = $location,
-                v.platform = $platform,
-                v.profession = $profession
-            """,
+            LOG_VICTIM_METADATA_QUERY,
             {
                 "victim_id": victim_id,
                 "age_group": age_group,
@@ -65,79 +86,81 @@ def log_victim_metadata(victim_id, age_group, gender, location, platform, profes
 # -----------------------------
 # Connect trapper to victim
 # -----------------------------
+CONNECT_TRAPPER_TO_VICTIM_QUERY = """
+MATCH (t:Trapper {id: $trapper_id})
+MATCH (v:Victim {id: $victim_id})
+MERGE (t)-[targeted:TARGETED]->(v)
+ON CREATE SET targeted.created_at = timestamp()
+"""
+
 def connect_trapper_to_victim(trapper_id, victim_id):
     with driver.session() as session:
-        session.run(
-            """
-            MATCH (t:Trapper {id: $trapper_id})
-            MATCH (v:Victim {id: $victim_id})
-            MERGE (t)-[:TARGETED]->(v)
-            """,
-            trapper_id=trapper_id, victim_id=victim_id
-        )
+        session.run(CONNECT_TRAPPER_TO_VICTIM_QUERY, trapper_id=trapper_id, victim_id=victim_id)
 
 # -----------------------------
 # Add Red Team Report
 # -----------------------------
+ADD_RED_TEAM_REPORT_QUERY = """
+MATCH (v:Victim {id: $victim_id})
+MERGE (r:RedTeamReport {id: $report_id})
+SET r.severity = $severity,
+    r.timestamp = datetime()
+MERGE (v)-[subject_of:SUBJECT_OF]->(r)
+ON CREATE SET subject_of.created_at = timestamp()
+"""
+
 def add_red_team_report(report_id, victim_id, severity):
     with driver.session() as session:
-        session.run(
-            """
-            MATCH (v:Victim {id: $victim_id})
-            MERGE (r:RedTeamReport {id: $report_id})
-            SET r.severity = $severity,
-                r.timestamp = datetime()
-            MERGE (v)-[:SUBJECT_OF]->(r)
-            """,
-            victim_id=victim_id,
-            report_id=report_id,
-            severity=severity
-        )
+        session.run(ADD_RED_TEAM_REPORT_QUERY, victim_id=victim_id, report_id=report_id, severity=severity)
     return report_id
 
 # -----------------------------
 # Link Trapper to Threat Type
 # -----------------------------
+LINK_THREAT_TYPE_QUERY = """
+MATCH (t:Trapper {id: $trapper_id})
+MERGE (threat:ThreatType {name: $threat_type})
+MERGE (t)-[classified_as:CLASSIFIED_AS]->(threat)
+ON CREATE SET classified_as.created_at = timestamp()
+"""
+
 def link_threat_type(trapper_id, threat_type):
     with driver.session() as session:
-        session.run(
-            """
-            MATCH (t:Trapper {id: $trapper_id})
-            MERGE (threat:ThreatType {name: $threat_type})
-            MERGE (t)-[:CLASSIFIED_AS]->(threat)
-            """,
-            trapper_id=trapper_id, threat_type=threat_type
-        )
+        session.run(LINK_THREAT_TYPE_QUERY, trapper_id=trapper_id, threat_type=threat_type)
 
 # -----------------------------
 # Link Trapper to Target Group
 # -----------------------------
+LINK_TARGET_GROUP_QUERY = """
+MATCH (t:Trapper {id: $trapper_id})
+MERGE (g:TargetGroup {name: $group_name})
+MERGE (t)-[targets_group:TARGETS_GROUP]->(g)
+ON CREATE SET targets_group.created_at = timestamp()
+"""
+
 def link_target_group(trapper_id, group_name):
     with driver.session() as session:
-        session.run(
-            """
-            MATCH (t:Trapper {id: $trapper_id})
-            MERGE (g:TargetGroup {name: $group_name})
-            MERGE (t)-[:TARGETS_GROUP]->(g)
-            """,
-            trapper_id=trapper_id, group_name=group_name
-        )
+        session.run(LINK_TARGET_GROUP_QUERY, trapper_id=trapper_id, group_name=group_name)
 
 # -----------------------------
 # The function that caused the error - NOW FIXED
 # -----------------------------
+# This query is restructured to do all MATCHing first, which resolves the syntax error.
+# It also uses the correct property key 'id' to find the nodes.
+CREATE_THREAT_TYPE_QUERY = """
+MATCH (r:RedTeamReport {id: $report_id})
+MATCH (t:Trapper {id: $trapper_id})
+MERGE (tt:ThreatType {type: $threat_name})
+ON CREATE SET tt.confidence = $confidence
+ON MATCH SET tt.confidence = $confidence
+MERGE (r)-[detected:DETECTED]->(tt)
+ON CREATE SET detected.created_at = timestamp()
+MERGE (t)-[classified_as:CLASSIFIED_AS]->(tt)
+ON CREATE SET classified_as.created_at = timestamp()
+"""
+
 def create_threat_type(tx, report_id, trapper_id, threat_name, confidence):
-    # This query is restructured to do all MATCHing first, which resolves the syntax error.
-    # It also uses the correct property key 'id' to find the nodes.
-    tx.run("""
-        MATCH (r:RedTeamReport {id: $report_id})
-        MATCH (t:Trapper {id: $trapper_id})
-        MERGE (tt:ThreatType {type: $threat_name})
-        ON CREATE SET tt.confidence = $confidence
-        ON MATCH SET tt.confidence = $confidence
-        MERGE (r)-[:DETECTED]->(tt)
-        MERGE (t)-[:CLASSIFIED_AS]->(tt)
-    """,
+    tx.run(CREATE_THREAT_TYPE_QUERY,
     threat_name=threat_name,
     confidence=confidence,
     report_id=report_id,
@@ -145,4 +168,193 @@ def create_threat_type(tx, report_id, trapper_id, threat_name, confidence):
 
 def add_threat_type(report_id, trapper_id, threat_name, confidence):
     with driver.session() as session:
-        session.write_transaction(create_threat_type, report_id, trapper_id, threat_name, confidence)
\ No newline at end of file
+        session.write_transaction(create_threat_type, report_id, trapper_id, threat_name, confidence)
+
+
+# =============================
+# Bulk ingestion
+# =============================
+# Each bulk helper takes an iterable of records (dicts keyed like the arguments
+# of its single-record counterpart above), writes them in chunks of
+# `chunk_size` with one UNWIND statement per chunk, one transaction per chunk,
+# and returns the number of records written.
+#
+# With `workers` > 1 the records are partitioned by node key (hash of the key
+# field) across that many writer threads, each with its own session. All writes
+# touching one trapper then go through one writer, so concurrent transactions
+# do not queue on the same node locks; transient deadlocks that remain are
+# retried by execute_write.
+
+BULK_CHUNK_SIZE = 10_000
+# Chunks buffered per writer thread before the reader waits.
+WRITER_QUEUE_CHUNKS = 2
+
+ADD_TRAPPERS_QUERY = """
+UNWIND $rows AS row
+MERGE (t:Trapper {id: row.trapper_id})
+ON CREATE SET t.username = row.username,
+              t.platform = row.platform,
+              t.created_at = timestamp()
+"""
+
+ADD_VICTIMS_QUERY = """
+UNWIND $rows AS row
+MERGE (v:Victim {id: row.victim_id})
+ON CREATE SET v.platform = row.platform
+"""
+
+LOG_VICTIMS_METADATA_QUERY = """
+UNWIND $rows AS row
+MATCH (v:Victim {id: row.victim_id})
+SET v.age_group = row.age_group,
+    v.gender = row.gender,
+    v.location = row.location,
+    v.platform = row.platform,
+    v.profession = row.profession
+"""
+
+CONNECT_TRAPPERS_TO_VICTIMS_QUERY = """
+UNWIND $rows AS row
+MATCH (t:Trapper {id: row.trapper_id})
+MATCH (v:Victim {id: row.victim_id})
+MERGE (t)-[targeted:TARGETED]->(v)
+ON CREATE SET targeted.created_at = timestamp()
+"""
+
+ADD_RED_TEAM_REPORTS_QUERY = """
+UNWIND $rows AS row
+MATCH (v:Victim {id: row.victim_id})
+MERGE (r:RedTeamReport {id: row.report_id})
+SET r.severity = row.severity,
+    r.timestamp = datetime()
+MERGE (v)-[subject_of:SUBJECT_OF]->(r)
+ON CREATE SET subject_of.created_at = timestamp()
+"""
+
+LINK_THREAT_TYPES_QUERY = """
+UNWIND $rows AS row
+MATCH (t:Trapper {id: row.trapper_id})
+MERGE (threat:ThreatType {name: row.threat_type})
+MERGE (t)-[classified_as:CLASSIFIED_AS]->(threat)
+ON CREATE SET classified_as.created_at = timestamp()
+"""
+
+LINK_TARGET_GROUPS_QUERY = """
+UNWIND $rows AS row
+MATCH (t:Trapper {id: row.trapper_id})
+MERGE (g:TargetGroup {name: row.group_name})
+MERGE (t)-[targets_group:TARGETS_GROUP]->(g)
+ON CREATE SET targets_group.created_at = timestamp()
+"""
+
+
+def _chunked(records, size):
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _write_chunk(session, query, chunk):
+    session.execute_write(lambda tx: tx.run(query, rows=chunk).consume())
+
+
+def _partitioned_write(db, query, records, chunk_size, workers, partition_key):
+    queues = [queue.Queue(maxsize=WRITER_QUEUE_CHUNKS) for _ in range(workers)]
+    written = [0] * workers
+    errors = []
+
+    def writer(i):
+        with db.session() as session:
+            while (chunk := queues[i].get()) is not None:
+                if errors:
+                    continue  # drain, so the reader never blocks on a dead writer
+                try:
+                    _write_chunk(session, query, chunk)
+                    written[i] += len(chunk)
+                except Exception as e:
+                    errors.append(e)
+
+    threads = [threading.Thread(target=writer, args=(i,), name=f"bulk-writer-{i}", daemon=True)
+               for i in range(workers)]
+    for thread in threads:
+        thread.start()
+    buffers = [[] for _ in range(workers)]
+    try:
+        for record in records:
+            i = hash(record[partition_key]) % workers
+            buffers[i].append(record)
+            if len(buffers[i]) == chunk_size:
+                queues[i].put(buffers[i])
+                buffers[i] = []
+        for i, buffer in enumerate(buffers):
+            if buffer:
+                queues[i].put(buffer)
+    finally:
+        for q in queues:
+            q.put(None)
+        for thread in threads:
+            thread.join()
+    if errors:
+        raise errors[0]
+    return sum(written)
+
+
+def bulk_write(query, records, chunk_size=BULK_CHUNK_SIZE, workers=1, partition_key=None, db=None):
+    """
+    Writes `records` with an UNWIND `query` (reading them as `$rows`), one
+    transaction per chunk. `partition_key` is the record field that spreads the
+    records over `workers` writer threads; `db` defaults to the shared driver.
+    """
+    db = db or driver
+    if workers > 1 and partition_key:
+        return _partitioned_write(db, query, records, chunk_size, workers, partition_key)
+    written = 0
+    with db.session() as session:
+        for chunk in _chunked(records, chunk_size):
+            _write_chunk(session, query, chunk)
+            written += len(chunk)
+    return written
+
+
+def add_trappers(records, chunk_size=BULK_CHUNK_SIZE, workers=1, db=None):
+    """Records: {"trapper_id", "platform", "username"}."""
+    return bulk_write(ADD_TRAPPERS_QUERY, records, chunk_size, workers, "trapper_id", db)
+
+
+def add_victims(records, chunk_size=BULK_CHUNK_SIZE, workers=1, db=None):
+    """Records: {"victim_id", "platform"}."""
+    return bulk_write(ADD_VICTIMS_QUERY, records, chunk_size, workers, "victim_id", db)
+
+
+def log_victims_metadata(records, chunk_size=BULK_CHUNK_SIZE, workers=1, db=None):
+    """Records: {"victim_id", "age_group", "gender", "location", "platform", "profession"}."""
+    return bulk_write(LOG_VICTIMS_METADATA_QUERY, records, chunk_size, workers, "victim_id", db)
+
+
+def connect_trappers_to_victims(records, chunk_size=BULK_CHUNK_SIZE, workers=1, db=None):
+    """Records: {"trapper_id", "victim_id"}; partitioned by trapper."""
+    return bulk_write(CONNECT_TRAPPERS_TO_VICTIMS_QUERY, records, chunk_size, workers, "trapper_id", db)
+
+
+def add_red_team_reports(records, chunk_size=BULK_CHUNK_SIZE, workers=1, db=None):
+    """Records: {"report_id", "victim_id", "severity"}; partitioned by victim."""
+    return bulk_write(ADD_RED_TEAM_REPORTS_QUERY, records, chunk_size, workers, "victim_id", db)
+
+
+def link_threat_types(records, chunk_size=BULK_CHUNK_SIZE, workers=1, db=None):
+    """Records: {"trapper_id", "threat_type"}."""
+    return bulk_write(LINK_THREAT_TYPES_QUERY, records, chunk_size, workers, "trapper_id", db)
+
+
+def link_target_groups(records, chunk_size=BULK_CHUNK_SIZE, workers=1, db=None):
+    """Records: {"trapper_id", "group_name"}."""
+    return bulk_write(LINK_TARGET_GROUPS_QUERY, records, chunk_size, workers, "trapper_id", db)
+
+
+# Every statement in this module, for schema_setup.check_query_plans
+QUERIES = {name: query for name, query in globals().items() if name.endswith("_QUERY")}
@@ -0,0 +1,96 @@
+# reports.py
+# The scammer report part of the graph: the Cypher red/db_connector.py writes
+# and reads reports with, and the node keys it relies on. Kept in this package
+# so schema_setup.py and storage.py use it without importing the red app.
+
+import time
+
+from .operations import generate_id
+
+# Reports written per transaction by submit_reports.
+REPORT_BATCH_SIZE = 500
+
+# Node keys WRITE_REPORTS_QUERY MERGEs on; schema_setup.py gives each a
+# uniqueness constraint and EXPLAINs QUERIES to make sure none needs a label scan.
+UNIQUE_KEYS = [
+    ("User", "id"),
+    ("Scammer", "username"),
+    ("Tactic", "name"),
+]
+
+# Writes a list of reports in one round trip: the reporting User, the Scammer
+# (counting the report), the REPORTED relationship and the tactics used, all
+# through bound variables instead of re-MATCHing nodes by property.
+# REPORTED is MERGEd on the report's report_id idempotency key: a batch that is
+# written again (the report spool retrying after a lost acknowledgement) neither
+# duplicates the relationship nor counts the report twice.
+# Reports are dated by their enqueued_at (when the analyst submitted them), so a
+# report the spool writes late, or after a newer one, keeps its own date.
+# REPORTED.created_at stays the write time: graph_export.refresh reads new
+# edges by it, and a late write must still count as new there.
+WRITE_REPORTS_QUERY = """
+UNWIND $reports AS report
+MERGE (u:User {id: report.session_id})
+MERGE (s:Scammer {username: report.username})
+WITH u, s, report, coalesce(report.enqueued_at, timestamp()) AS reported_at,
+     EXISTS { (s)<-[:REPORTED {report_id: report.report_id}]-(:User) } AS replayed
+SET s.followers = report.followers, s.following = report.following, s.bio = report.bio,
+    s.is_private = report.is_private, s.is_verified = report.is_verified
+FOREACH (_ IN CASE WHEN replayed THEN [] ELSE [1] END |
+    SET s.report_count = coalesce(s.report_count, 0) + 1,
+        s.first_reported_on = CASE WHEN s.first_reported_on < reported_at THEN s.first_reported_on
+                                   ELSE reported_at END,
+        s.last_reported_on = CASE WHEN s.last_reported_on > reported_at THEN s.last_reported_on
+                                  ELSE reported_at END)
+MERGE (u)-[r:REPORTED {report_id: report.report_id}]->(s)
+ON CREATE SET r.timestamp = reported_at, r.created_at = timestamp(), r.final_verdict_score = report.score
+WITH s, report
+UNWIND report.tactics AS tactic_name
+MERGE (t:Tactic {name: tactic_name})
+MERGE (s)-[used_tactic:USED_TACTIC]->(t)
+ON CREATE SET used_tactic.created_at = timestamp()
+"""
+
+
+# What earlier reports say about one username (red/scammer_history.py caches it)
+SCAMMER_HISTORY_QUERY = """
+MATCH (s:Scammer {username: $username})
+OPTIONAL MATCH (s)-[:USED_TACTIC]->(t:Tactic)
+WITH s, t.name AS tactic ORDER BY tactic
+RETURN s.username AS username, s.report_count AS report_count, s.first_reported_on AS first_reported_on,
+       s.last_reported_on AS last_reported_on, collect(tactic) AS tactics
+"""
+
+
+# Every reported username, streamed to build the alias index (red/alias_index.py).
+# A full Scammer label scan by design, so it is not in QUERIES.
+SCAMMER_USERNAMES_QUERY = "MATCH (s:Scammer) RETURN s.username AS username"
+
+
+QUERIES = {"WRITE_REPORTS_QUERY": WRITE_REPORTS_QUERY, "SCAMMER_HISTORY_QUERY": SCAMMER_HISTORY_QUERY}
+
+
+def report_params(user_session_id, profile, analysis, final_verdict, report_id=None) -> dict:
+    """
+    The WRITE_REPORTS_QUERY parameters of one report (with a new report_id
+    unless one is given), dated now by `enqueued_at` (epoch ms).
+    """
+    psych_analysis = analysis.get('psychological_analysis', {})
+    return {
+        "report_id": report_id or generate_id(),
+        "enqueued_at": int(time.time() * 1000),
+        "session_id": user_session_id,
+        "username": profile['username'],
+        "followers": profile.get('followers'),
+        "following": profile.get('following'),
+        "bio": profile.get('bio'),
+        "is_private": profile.get('is_private'),
+        "is_verified": profile.get('is_verified'),
+        "score": final_verdict,
+        "tactics": [tactic for tactic, details in psych_analysis.items()
+                    if tactic != 'total_risk_score' and details.get('score', 0) > 0],
+    }
+
+
+def write_reports_tx(tx, reports):
+    tx.run(WRITE_REPORTS_QUERY, reports=reports)
@@ -1,9 +1,141 @@
+# schema_setup.py
+# Schema manager: the uniqueness constraints and indexes the app's queries rely
+# on, applied idempotently, and an EXPLAIN check that no query plan scans a whole label.
+#
+# They are declared next to the queries that use them (UNIQUE_KEYS, and optionally
+# INDEXES / RELATIONSHIP_INDEXES, in operations.py, graph_export.py, storage.py
+# and reports.py); this module applies and checks them.
+#
+#   python -m database.schema_setup          # apply the constraints
+#   python -m database.schema_setup --check  # ...then check every query's plan
+
+import re
+
 from .driver import driver
+from . import graph_export, operations, reports, storage
+
+# Modules whose UNIQUE_KEYS and QUERIES make up the schema
+SCHEMA_SOURCES = {"operations": operations, "graph_export": graph_export, "storage": storage, "reports": reports}
+# Plan operators that read every node of a label (or of the graph)
+SCAN_OPERATORS = {"NodeByLabelScan", "AllNodesScan"}
+# Seconds to wait for new constraint indexes to come online
+INDEX_ONLINE_TIMEOUT_S = 300
+
+# "(alias:Label {property:" in a MERGE or MATCH pattern
+_NODE_KEY_PATTERN = re.compile(r"\(\s*\w*\s*:\s*(\w+)\s*\{\s*(\w+)\s*:")
+_PARAMETER_PATTERN = re.compile(r"\$(\w+)")
+
+
+class SchemaCheckError(Exception):
+    """A query looks nodes up by a key without a constraint, or its plan scans a label."""
+
+
+def declared_unique_keys() -> list[tuple[str, str]]:
+    return sorted({key for module in SCHEMA_SOURCES.values() for key in module.UNIQUE_KEYS})
+
+
+def declared_indexes() -> list[tuple[str, str]]:
+    """Non-unique node indexes, as (label, property)."""
+    return sorted({key for module in SCHEMA_SOURCES.values() for key in getattr(module, "INDEXES", [])})
+
+
+def declared_relationship_indexes() -> list[tuple[str, str]]:
+    """Relationship property indexes, as (relationship type, property)."""
+    return sorted({key for module in SCHEMA_SOURCES.values() for key in getattr(module, "RELATIONSHIP_INDEXES", [])})
+
+
+def all_queries() -> dict[str, str]:
+    return {f"{source}.{name}": query
+            for source, module in SCHEMA_SOURCES.items() for name, query in module.QUERIES.items()}
+
+
+def constraint_statement(label: str, prop: str) -> str:
+    name = f"{label.lower()}_{prop.lower()}_unique"
+    return f"CREATE CONSTRAINT {name} IF NOT EXISTS FOR (n:{label}) REQUIRE n.{prop} IS UNIQUE"
+
+
+def index_statement(label: str, prop: str) -> str:
+    return f"CREATE INDEX {label.lower()}_{prop.lower()} IF NOT EXISTS FOR (n:{label}) ON (n.{prop})"
+
+
+def relationship_index_statement(rel_type: str, prop: str) -> str:
+    return f"CREATE INDEX {rel_type.lower()}_{prop.lower()} IF NOT EXISTS FOR ()-[r:{rel_type}]-() ON (r.{prop})"
+
+
+def apply_schema(db=None) -> list[str]:
+    """Creates the declared constraints and indexes (existing ones are left as they are) and waits for them."""
+    statements = ([constraint_statement(label, prop) for label, prop in declared_unique_keys()]
+                  + [index_statement(label, prop) for label, prop in declared_indexes()]
+                  + [relationship_index_statement(rel, prop) for rel, prop in declared_relationship_indexes()])
+    with (db or driver).session() as session:
+        for statement in statements:
+            session.run(statement).consume()
+        session.run("CALL db.awaitIndexes($timeout)", timeout=INDEX_ONLINE_TIMEOUT_S).consume()
+    return statements
+
 
 def setup_constraints():
-    with driver.session() as session:
-        session.run("CREATE CONSTRAINT IF NOT EXISTS FOR (u:User) REQUIRE u.user_id IS UNIQUE")
-        session.run("CREATE CONSTRAINT IF NOT EXISTS FOR (t:ThreatType) REQUIRE t.type IS UNIQUE")
-        session.run("CREATE CONSTRAINT IF NOT EXISTS FOR (g:TargetGroup) REQUIRE g.name IS UNIQUE")
-        session.run("CREATE CONSTRAINT IF NOT EXISTS FOR (i:Incident) REQUIRE i.incident_id IS UNIQUE")
-        session.run("CREATE CONSTRAINT IF NOT EXISTS FOR (r:RedTeamReport) REQUIRE r.report_id IS UNIQUE")
+    apply_schema()
+    print(f"✅ Schema applied: {len(declared_unique_keys())} uniqueness constraints, "
+          f"{len(declared_indexes()) + len(declared_relationship_indexes())} indexes.")
+
+
+def check_declared_keys() -> dict[str, list[tuple[str, str]]]:
+    """
+    Static check: every (label, property) a query looks a node up by must be a
+    declared unique key or index. Returns the offenders by query name (empty when fine).
+    """
+    declared = set(declared_unique_keys()) | set(declared_indexes())
+    missing = {}
+    for name, query in all_queries().items():
+        keys = sorted(set(_NODE_KEY_PATTERN.findall(query)) - declared)
+        if keys:
+            missing[name] = keys
+    return missing
+
+
+def _plan_operators(plan: dict):
+    yield plan["operatorType"].split("@")[0]
+    for child in plan.get("children", []):
+        yield from _plan_operators(child)
+
+
+def explain(session, query: str) -> dict:
+    """The planner's plan for `query`, without running it (parameters are bound to null)."""
+    parameters = {name: None for name in _PARAMETER_PATTERN.findall(query)}
+    return session.run(f"EXPLAIN {query}", parameters).consume().plan
+
+
+def check_query_plans(db=None) -> dict[str, list[str]]:
+    """
+    EXPLAINs every query in SCHEMA_SOURCES and raises SchemaCheckError if any plan
+    uses a label or all-nodes scan. Returns each query's plan operators.
+    """
+    operators = {}
+    failures = []
+    with (db or driver).session() as session:
+        for name, query in all_queries().items():
+            operators[name] = sorted(set(_plan_operators(explain(session, query))))
+            scans = SCAN_OPERATORS.intersection(operators[name])
+            if scans:
+                failures.append(f"{name}: {', '.join(sorted(scans))}")
+    if failures:
+        raise SchemaCheckError("Query plans scan whole labels:\n  " + "\n  ".join(failures))
+    return operators
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Apply the graph schema and check the query plans.")
+    parser.add_argument("--check", action="store_true", help="EXPLAIN every query after applying the schema.")
+    args = parser.parse_args()
+
+    missing = check_declared_keys()
+    if missing:
+        raise SchemaCheckError(f"Undeclared node keys: {missing}")
+    setup_constraints()
+    if args.check:
+        for name, ops in check_query_plans().items():
+            print(f"  {name}: {', '.join(ops)}")
+        print("✅ No query plan scans a whole label.")
@@ -0,0 +1,200 @@
+# stand_in.py
+# Neo4j driver stand-ins for the tests and the --stand-in benchmarks: the part
+# of the driver API this repo uses (sessions, run, execute_write/execute_read,
+# results and their summary), with every statement recorded and no server.
+#
+# One configurable driver replaces a hand-rolled fake per module:
+# - rows(query, parameters) -> the records a statement returns (default none)
+# - plan(query) -> the plan dict an EXPLAIN's summary carries
+# - fail_on(query, parameters) -> True to fail that statement with RuntimeError
+# - rtt_s / row_s: simulated cost of each RUN and COMMIT round trip, plus per
+#   row of the statement's UNWIND list
+#
+# StandInDriver is synchronous; StandInAsyncDriver serves the async sessions
+# of async_operations.py, optionally through a pool of `pool_size` connections.
+
+import asyncio
+import threading
+import time
+from collections import namedtuple
+
+# One statement as it was run: query text, its parameters and the writing thread's name
+Statement = namedtuple("Statement", ["query", "parameters", "thread"])
+
+
+class StandInRecord(dict):
+    def data(self) -> dict:
+        return dict(self)
+
+
+class StandInSummary:
+    def __init__(self, plan=None):
+        self.plan = plan
+
+
+class StandInResult:
+    def __init__(self, rows=(), plan=None):
+        self._records = [StandInRecord(row) for row in rows]
+        self._plan = plan
+
+    def __iter__(self):
+        return iter(self._records)
+
+    def data(self) -> list[dict]:
+        return [record.data() for record in self._records]
+
+    def single(self):
+        return self._records[0] if self._records else None
+
+    def consume(self) -> StandInSummary:
+        return StandInSummary(self._plan)
+
+
+class _Recorder:
+    def __init__(self, rows=None, plan=None, fail_on=None, rtt_s: float = 0.0, row_s: float = 0.0):
+        self.rows = rows
+        self.plan = plan
+        self.fail_on = fail_on
+        self.rtt_s = rtt_s
+        self.row_s = row_s
+        self.statements = []
+        # Statements per execute_write / execute_read transaction
+        self.transactions = []
+        self.round_trips = 0
+        self.open = self.peak_open = 0
+        self._lock = threading.Lock()
+
+    def _cost(self, parameters=None) -> float:
+        """Counts a round trip and returns its simulated duration (a COMMIT, without parameters, has no rows)."""
+        with self._lock:
+            self.round_trips += 1
+        rows = 0
+        if parameters is not None:
+            rows = max((len(v) for v in parameters.values() if isinstance(v, list)), default=1)
+        return self.rtt_s + rows * self.row_s
+
+    def _record(self, query, parameters, transaction) -> StandInResult:
+        if self.fail_on and self.fail_on(query, parameters):
+            raise RuntimeError("write failed")
+        statement = Statement(query, parameters, threading.current_thread().name)
+        with self._lock:
+            self.statements.append(statement)
+            if transaction is not None:
+                transaction.append(statement)
+        return StandInResult(self.rows(query, parameters) if self.rows else (),
+                             self.plan(query) if self.plan else None)
+
+    def _begin(self) -> list:
+        with self._lock:
+            self.transactions.append([])
+            return self.transactions[-1]
+
+    def _opened(self, change):
+        with self._lock:
+            self.open += change
+            self.peak_open = max(self.peak_open, self.open)
+
+    def close(self):
+        pass
+
+
+class StandInDriver(_Recorder):
+    """Synchronous stand-in for neo4j.Driver (see the module comment for the options)."""
+
+    def session(self, **kwargs):
+        return _Session(self)
+
+
+class _Session:
+    def __init__(self, db):
+        self.db = db
+        self._transaction = None
+
+    def __enter__(self):
+        self.db._opened(1)
+        return self
+
+    def __exit__(self, *exc):
+        self.db._opened(-1)
+        return False
+
+    def run(self, query, parameters=None, **kwargs):
+        parameters = {**(parameters or {}), **kwargs}
+        cost = self.db._cost(parameters)
+        if cost:
+            time.sleep(cost)
+        return self.db._record(query, parameters, self._transaction)
+
+    def _execute(self, work, *args, **kwargs):
+        self._transaction = self.db._begin()
+        try:
+            result = work(self, *args, **kwargs)
+        finally:
+            self._transaction = None
+        cost = self.db._cost()  # COMMIT
+        if cost:
+            time.sleep(cost)
+        return result
+
+    execute_write = execute_read = _execute
+
+
+class StandInAsyncDriver(_Recorder):
+    """
+    Stand-in for neo4j.AsyncDriver. With `pool_size`, at most that many
+    sessions are open at once and the rest wait for one to close.
+    """
+
+    def __init__(self, pool_size: int | None = None, **kwargs):
+        super().__init__(**kwargs)
+        self.pool = asyncio.Semaphore(pool_size) if pool_size else None
+
+    def session(self, **kwargs):
+        return _AsyncSession(self)
+
+
+class _AsyncResult:
+    def __init__(self, result: StandInResult):
+        self._result = result
+
+    async def data(self) -> list[dict]:
+        return self._result.data()
+
+    async def single(self):
+        return self._result.single()
+
+    async def consume(self) -> StandInSummary:
+        return self._result.consume()
+
+
+class _AsyncSession:
+    def __init__(self, db):
+        self.db = db
+        self._transaction = None
+
+    async def __aenter__(self):
+        if self.db.pool is not None:
+            await self.db.pool.acquire()
+        self.db._opened(1)
+        return self
+
+    async def __aexit__(self, *exc):
+        self.db._opened(-1)
+        if self.db.pool is not None:
+            self.db.pool.release()
+
+    async def run(self, query, parameters=None, **kwargs):
+        parameters = {**(parameters or {}), **kwargs}
+        await asyncio.sleep(self.db._cost(parameters))
+        return _AsyncResult(self.db._record(query, parameters, self._transaction))
+
+    async def _execute(self, work, *args, **kwargs):
+        self._transaction = self.db._begin()
+        try:
+            result = await work(self, *args, **kwargs)
+        finally:
+            self._transaction = None
+        await asyncio.sleep(self.db._cost())  # COMMIT
+        return result
+
+    execute_write = execute_read = _execute
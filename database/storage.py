@@ -0,0 +1,529 @@
+# storage.py
+# One storage interface for the threat graph, with two backends:
+#
+# - Neo4jStorage: the existing Cypher writes (operations.py bulk helpers and
+#   reports.WRITE_REPORTS_QUERY) against the shared or a given driver.
+# - SQLiteStorage: an embedded SQLite file (WAL mode, one transaction and one
+#   executemany per chunk of records) with the same semantics, for local runs,
+#   tests and benchmarks without a Neo4j server.
+#
+# The backend is chosen by STORAGE_BACKEND ("neo4j" or "sqlite", see config.py);
+# get_storage() returns the configured one. Writes take the same records as the
+# bulk helpers in operations.py; reports are reports.report_params dicts.
+#
+#   python -m database.storage_benchmark --backend sqlite
+
+import abc
+import functools
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+
+from . import operations, reports
+from .config import SQLITE_PATH, STORAGE_BACKEND
+from .driver import driver
+
+BACKENDS = ("neo4j", "sqlite")
+
+
+class Storage(abc.ABC):
+    """
+    Writes and point reads of the threat graph. Every write takes an iterable of
+    records and returns how many it wrote; reads return plain dicts/lists (None
+    when the node does not exist). Subclasses implement all of them.
+    """
+
+    def __init__(self):
+        self._report_listeners = []
+
+    # --- writes (records as in operations.py) ---
+    @abc.abstractmethod
+    def add_trappers(self, records) -> int:
+        """Records: {"trapper_id", "platform", "username"}; existing trappers are left as they are."""
+        ...
+
+    @abc.abstractmethod
+    def add_victims(self, records) -> int:
+        """Records: {"victim_id", "platform"}; existing victims are left as they are."""
+        ...
+
+    @abc.abstractmethod
+    def log_victims_metadata(self, records) -> int:
+        """Records: {"victim_id", "age_group", "gender", "location", "platform", "profession"}; unknown victims are skipped."""
+        ...
+
+    @abc.abstractmethod
+    def connect_trappers_to_victims(self, records) -> int:
+        """Records: {"trapper_id", "victim_id"}; both must exist."""
+        ...
+
+    @abc.abstractmethod
+    def add_red_team_reports(self, records) -> int:
+        """Records: {"report_id", "victim_id", "severity"}; the victim must exist."""
+        ...
+
+    @abc.abstractmethod
+    def link_threat_types(self, records) -> int:
+        """Records: {"trapper_id", "threat_type"}; the trapper must exist."""
+        ...
+
+    @abc.abstractmethod
+    def link_target_groups(self, records) -> int:
+        """Records: {"trapper_id", "group_name"}; the trapper must exist."""
+        ...
+
+    @abc.abstractmethod
+    def add_reports(self, records) -> int:
+        """Scammer reports, as reports.report_params dicts; a report_id already written is skipped."""
+        ...
+
+    # --- reads ---
+    @abc.abstractmethod
+    def get_trapper(self, trapper_id) -> dict | None:
+        ...
+
+    @abc.abstractmethod
+    def get_victim(self, victim_id) -> dict | None:
+        ...
+
+    @abc.abstractmethod
+    def victims_of(self, trapper_id) -> list[str]:
+        ...
+
+    @abc.abstractmethod
+    def threat_types_of(self, trapper_id) -> list[str]:
+        ...
+
+    @abc.abstractmethod
+    def target_groups_of(self, trapper_id) -> list[str]:
+        ...
+
+    @abc.abstractmethod
+    def reports_on(self, victim_id) -> list[dict]:
+        """The victim's red team reports: [{"id", "severity"}] by id."""
+        ...
+
+    @abc.abstractmethod
+    def get_scammer(self, username) -> dict | None:
+        """The scammer's profile fields, report_count and the sorted names of its tactics."""
+        ...
+
+    @abc.abstractmethod
+    def get_scammer_history(self, username) -> dict | None:
+        """As red/db_connector.Neo4jConnection.get_scammer_history."""
+        ...
+
+    @abc.abstractmethod
+    def scammer_usernames(self):
+        """Iterates over every reported username (to build alias_index.AliasIndex)."""
+        ...
+
+    def close(self):
+        pass
+
+    # --- red/db_connector.Neo4jConnection compatible report API ---
+    def add_report_listener(self, listener):
+        """Calls listener(username) for every username a submit_report(s) call has written."""
+        self._report_listeners.append(listener)
+
+    def _reported(self, records):
+        for username in dict.fromkeys(record["username"] for record in records):
+            for listener in self._report_listeners:
+                listener(username)
+
+    def submit_report(self, user_session_id, profile_data, chat_analysis, final_verdict) -> bool:
+        params = reports.report_params(user_session_id, profile_data, chat_analysis, final_verdict)
+        if self.add_reports([params]) != 1:
+            return False
+        self._reported([params])
+        return True
+
+    def submit_reports(self, batch, batch_size: int = reports.REPORT_BATCH_SIZE) -> int:
+        written = 0
+        for chunk in operations._chunked((reports.report_params(*report) for report in batch), batch_size):
+            written += self.add_reports(chunk)
+            self._reported(chunk)
+        return written
+
+
+# =============================
+# Neo4j
+# =============================
+GET_TRAPPER_QUERY = """
+MATCH (t:Trapper {id: $id})
+RETURN t.id AS id, t.username AS username, t.platform AS platform
+"""
+
+GET_VICTIM_QUERY = """
+MATCH (v:Victim {id: $id})
+RETURN v.id AS id, v.platform AS platform, v.age_group AS age_group, v.gender AS gender,
+       v.location AS location, v.profession AS profession
+"""
+
+VICTIMS_OF_QUERY = """
+MATCH (:Trapper {id: $id})-[:TARGETED]->(v:Victim)
+RETURN v.id AS name ORDER BY name
+"""
+
+THREAT_TYPES_OF_QUERY = """
+MATCH (:Trapper {id: $id})-[:CLASSIFIED_AS]->(tt:ThreatType)
+RETURN coalesce(tt.name, tt.type) AS name ORDER BY name
+"""
+
+TARGET_GROUPS_OF_QUERY = """
+MATCH (:Trapper {id: $id})-[:TARGETS_GROUP]->(g:TargetGroup)
+RETURN g.name AS name ORDER BY name
+"""
+
+REPORTS_ON_QUERY = """
+MATCH (:Victim {id: $id})-[:SUBJECT_OF]->(r:RedTeamReport)
+RETURN r.id AS id, r.severity AS severity ORDER BY id
+"""
+
+GET_SCAMMER_QUERY = """
+MATCH (s:Scammer {username: $id})
+OPTIONAL MATCH (s)-[:USED_TACTIC]->(t:Tactic)
+WITH s, t.name AS tactic ORDER BY tactic
+RETURN s.username AS username, s.followers AS followers, s.following AS following, s.bio AS bio,
+       s.is_private AS is_private, s.is_verified AS is_verified, s.report_count AS report_count,
+       collect(tactic) AS tactics
+"""
+
+# Schema for schema_setup: the reads look nodes up by keys declared elsewhere
+UNIQUE_KEYS = []
+QUERIES = {name: query for name, query in globals().items() if name.endswith("_QUERY")}
+
+
+class Neo4jStorage(Storage):
+    """
+    Args:
+        db: Driver to use (default: the shared, lazily created one).
+        chunk_size: Records per transaction.
+        workers: Writer threads for the bulk writes (see operations.bulk_write).
+    """
+
+    def __init__(self, db=None, chunk_size: int = operations.BULK_CHUNK_SIZE, workers: int = 1):
+        super().__init__()
+        self.db = db or driver
+        self.chunk_size = chunk_size
+        self.workers = workers
+
+    def _bulk(self, write, records):
+        return write(records, self.chunk_size, self.workers, db=self.db)
+
+    def add_trappers(self, records):
+        return self._bulk(operations.add_trappers, records)
+
+    def add_victims(self, records):
+        return self._bulk(operations.add_victims, records)
+
+    def log_victims_metadata(self, records):
+        return self._bulk(operations.log_victims_metadata, records)
+
+    def connect_trappers_to_victims(self, records):
+        return self._bulk(operations.connect_trappers_to_victims, records)
+
+    def add_red_team_reports(self, records):
+        return self._bulk(operations.add_red_team_reports, records)
+
+    def link_threat_types(self, records):
+        return self._bulk(operations.link_threat_types, records)
+
+    def link_target_groups(self, records):
+        return self._bulk(operations.link_target_groups, records)
+
+    def add_reports(self, records):
+        written = 0
+        with self.db.session() as session:
+            for chunk in operations._chunked(records, reports.REPORT_BATCH_SIZE):
+                session.execute_write(reports.write_reports_tx, chunk)
+                written += len(chunk)
+        return written
+
+    def _read(self, query, key) -> list[dict]:
+        with self.db.session() as session:
+            return [record.data() for record in session.run(query, id=key)]
+
+    def _one(self, query, key):
+        rows = self._read(query, key)
+        return rows[0] if rows else None
+
+    def get_trapper(self, trapper_id):
+        return self._one(GET_TRAPPER_QUERY, trapper_id)
+
+    def get_victim(self, victim_id):
+        return self._one(GET_VICTIM_QUERY, victim_id)
+
+    def victims_of(self, trapper_id):
+        return [row["name"] for row in self._read(VICTIMS_OF_QUERY, trapper_id)]
+
+    def threat_types_of(self, trapper_id):
+        return [row["name"] for row in self._read(THREAT_TYPES_OF_QUERY, trapper_id)]
+
+    def target_groups_of(self, trapper_id):
+        return [row["name"] for row in self._read(TARGET_GROUPS_OF_QUERY, trapper_id)]
+
+    def reports_on(self, victim_id):
+        return self._read(REPORTS_ON_QUERY, victim_id)
+
+    def get_scammer(self, username):
+        return self._one(GET_SCAMMER_QUERY, username)
+
+    def get_scammer_history(self, username):
+        with self.db.session() as session:
+            record = session.run(reports.SCAMMER_HISTORY_QUERY, username=username).single()
+        return record.data() if record is not None else None
+
+    def scammer_usernames(self):
+        with self.db.session() as session:
+            for record in session.run(reports.SCAMMER_USERNAMES_QUERY):
+                yield record["username"]
+
+    def close(self):
+        if self.db is not driver:
+            self.db.close()
+
+
+# =============================
+# SQLite
+# =============================
+# Nodes are tables keyed like their Neo4j uniqueness constraints; relationships
+# are (source key, target key) tables, so re-linking is a no-op like MERGE.
+# REPORTED keeps one row per report_id, like the MERGE in WRITE_REPORTS_QUERY.
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS trappers (id TEXT PRIMARY KEY, username TEXT, platform TEXT);
+CREATE INDEX IF NOT EXISTS trappers_username ON trappers (username);
+CREATE TABLE IF NOT EXISTS victims (
+    id TEXT PRIMARY KEY, platform TEXT, age_group TEXT, gender TEXT, location TEXT, profession TEXT);
+CREATE TABLE IF NOT EXISTS red_team_reports (id TEXT PRIMARY KEY, severity TEXT, timestamp TEXT);
+CREATE TABLE IF NOT EXISTS threat_types (name TEXT PRIMARY KEY);
+CREATE TABLE IF NOT EXISTS target_groups (name TEXT PRIMARY KEY);
+CREATE TABLE IF NOT EXISTS users (id TEXT PRIMARY KEY);
+CREATE TABLE IF NOT EXISTS scammers (
+    username TEXT PRIMARY KEY, followers INTEGER, following INTEGER, bio TEXT, is_private INTEGER,
+    is_verified INTEGER, report_count INTEGER NOT NULL, first_reported_on INTEGER, last_reported_on INTEGER);
+CREATE TABLE IF NOT EXISTS tactics (name TEXT PRIMARY KEY);
+
+CREATE TABLE IF NOT EXISTS targeted (
+    trapper_id TEXT NOT NULL, victim_id TEXT NOT NULL, created_at INTEGER NOT NULL,
+    PRIMARY KEY (trapper_id, victim_id)) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS subject_of (
+    victim_id TEXT NOT NULL, report_id TEXT NOT NULL, created_at INTEGER NOT NULL,
+    PRIMARY KEY (victim_id, report_id)) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS classified_as (
+    trapper_id TEXT NOT NULL, threat_type TEXT NOT NULL, created_at INTEGER NOT NULL,
+    PRIMARY KEY (trapper_id, threat_type)) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS targets_group (
+    trapper_id TEXT NOT NULL, group_name TEXT NOT NULL, created_at INTEGER NOT NULL,
+    PRIMARY KEY (trapper_id, group_name)) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS reported (
+    id INTEGER PRIMARY KEY, report_id TEXT NOT NULL UNIQUE, user_id TEXT NOT NULL, username TEXT NOT NULL,
+    final_verdict_score REAL, created_at INTEGER NOT NULL);
+CREATE INDEX IF NOT EXISTS reported_username ON reported (username);
+CREATE TABLE IF NOT EXISTS used_tactic (
+    username TEXT NOT NULL, tactic TEXT NOT NULL, created_at INTEGER NOT NULL,
+    PRIMARY KEY (username, tactic)) WITHOUT ROWID;
+"""
+
+# Statements per write, each run with executemany over a chunk of records
+# (named parameters are the record fields, plus :now in epoch ms).
+SQLITE_WRITES = {
+    "add_trappers": [
+        "INSERT OR IGNORE INTO trappers (id, username, platform) VALUES (:trapper_id, :username, :platform)",
+    ],
+    "add_victims": [
+        "INSERT OR IGNORE INTO victims (id, platform) VALUES (:victim_id, :platform)",
+    ],
+    "log_victims_metadata": [
+        """UPDATE victims SET age_group = :age_group, gender = :gender, location = :location,
+               platform = :platform, profession = :profession WHERE id = :victim_id""",
+    ],
+    "connect_trappers_to_victims": [
+        """INSERT OR IGNORE INTO targeted (trapper_id, victim_id, created_at)
+           SELECT t.id, v.id, :now FROM trappers t, victims v WHERE t.id = :trapper_id AND v.id = :victim_id""",
+    ],
+    "add_red_team_reports": [
+        """INSERT INTO red_team_reports (id, severity, timestamp)
+           SELECT :report_id, :severity, :timestamp WHERE EXISTS (SELECT 1 FROM victims WHERE id = :victim_id)
+           ON CONFLICT (id) DO UPDATE SET severity = excluded.severity, timestamp = excluded.timestamp""",
+        """INSERT OR IGNORE INTO subject_of (victim_id, report_id, created_at)
+           SELECT id, :report_id, :now FROM victims WHERE id = :victim_id""",
+    ],
+    "link_threat_types": [
+        """INSERT OR IGNORE INTO threat_types (name)
+           SELECT :threat_type WHERE EXISTS (SELECT 1 FROM trappers WHERE id = :trapper_id)""",
+        """INSERT OR IGNORE INTO classified_as (trapper_id, threat_type, created_at)
+           SELECT id, :threat_type, :now FROM trappers WHERE id = :trapper_id""",
+    ],
+    "link_target_groups": [
+        """INSERT OR IGNORE INTO target_groups (name)
+           SELECT :group_name WHERE EXISTS (SELECT 1 FROM trappers WHERE id = :trapper_id)""",
+        """INSERT OR IGNORE INTO targets_group (trapper_id, group_name, created_at)
+           SELECT id, :group_name, :now FROM trappers WHERE id = :trapper_id""",
+    ],
+    "add_reports": [
+        "INSERT OR IGNORE INTO users (id) VALUES (:session_id)",
+        """INSERT INTO scammers (username, followers, following, bio, is_private, is_verified,
+                                 report_count, first_reported_on, last_reported_on)
+           VALUES (:username, :followers, :following, :bio, :is_private, :is_verified, 1, :reported_at, :reported_at)
+           ON CONFLICT (username) DO UPDATE SET
+               followers = excluded.followers, following = excluded.following, bio = excluded.bio,
+               is_private = excluded.is_private, is_verified = excluded.is_verified,
+               report_count = report_count + NOT EXISTS (SELECT 1 FROM reported WHERE report_id = :report_id),
+               first_reported_on = CASE WHEN EXISTS (SELECT 1 FROM reported WHERE report_id = :report_id)
+                                        THEN first_reported_on
+                                        ELSE min(coalesce(first_reported_on, :reported_at), :reported_at) END,
+               last_reported_on = CASE WHEN EXISTS (SELECT 1 FROM reported WHERE report_id = :report_id)
+                                       THEN last_reported_on
+                                       ELSE max(coalesce(last_reported_on, :reported_at), :reported_at) END""",
+        """INSERT OR IGNORE INTO reported (report_id, user_id, username, final_verdict_score, created_at)
+           VALUES (:report_id, :session_id, :username, :score, :now)""",
+    ],
+}
+# Per (report, tactic) pair
+SQLITE_REPORT_TACTIC_WRITES = [
+    "INSERT OR IGNORE INTO tactics (name) VALUES (:tactic)",
+    "INSERT OR IGNORE INTO used_tactic (username, tactic, created_at) VALUES (:username, :tactic, :now)",
+]
+
+
+class SQLiteStorage(Storage):
+    """
+    Args:
+        db_path: SQLite file (":memory:" for a throwaway store).
+        chunk_size: Records per transaction.
+    """
+
+    def __init__(self, db_path: str = SQLITE_PATH, chunk_size: int = operations.BULK_CHUNK_SIZE):
+        super().__init__()
+        if db_path != ":memory:":
+            os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self.chunk_size = chunk_size
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        if db_path != ":memory:":
+            self._db.execute("PRAGMA journal_mode=WAL")
+            # WAL keeps committed transactions consistent without an fsync per commit
+            self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SQLITE_SCHEMA)
+        self._db.commit()
+
+    def _write(self, name, records, per_record=None) -> int:
+        written = 0
+        for chunk in operations._chunked(records, self.chunk_size):
+            now = int(time.time() * 1000)
+            rows = [{**record, "now": now} for record in chunk]
+            with self._lock, self._db:  # one transaction per chunk
+                for statement in SQLITE_WRITES[name]:
+                    self._db.executemany(statement, rows)
+                if per_record:
+                    per_record(rows)
+            written += len(chunk)
+        return written
+
+    def add_trappers(self, records):
+        return self._write("add_trappers", records)
+
+    def add_victims(self, records):
+        return self._write("add_victims", records)
+
+    def log_victims_metadata(self, records):
+        return self._write("log_victims_metadata", records)
+
+    def connect_trappers_to_victims(self, records):
+        return self._write("connect_trappers_to_victims", records)
+
+    def add_red_team_reports(self, records):
+        timestamp = datetime.now(timezone.utc).isoformat()
+        return self._write("add_red_team_reports", ({**record, "timestamp": timestamp} for record in records))
+
+    def link_threat_types(self, records):
+        return self._write("link_threat_types", records)
+
+    def link_target_groups(self, records):
+        return self._write("link_target_groups", records)
+
+    def add_reports(self, records):
+        def write_tactics(rows):
+            pairs = [{"username": row["username"], "tactic": tactic, "now": row["now"]}
+                     for row in rows for tactic in row["tactics"]]
+            for statement in SQLITE_REPORT_TACTIC_WRITES:
+                self._db.executemany(statement, pairs)
+
+        # Dated by enqueued_at, as WRITE_REPORTS_QUERY (the write time for reports without one)
+        now = int(time.time() * 1000)
+        return self._write("add_reports", ({**record, "reported_at": record.get("enqueued_at") or now}
+                                           for record in records), write_tactics)
+
+    def _rows(self, query, *params) -> list[sqlite3.Row]:
+        with self._lock:
+            return self._db.execute(query, params).fetchall()
+
+    def _one(self, query, key):
+        rows = self._rows(query, key)
+        return dict(rows[0]) if rows else None
+
+    def get_trapper(self, trapper_id):
+        return self._one("SELECT id, username, platform FROM trappers WHERE id = ?", trapper_id)
+
+    def get_victim(self, victim_id):
+        return self._one("SELECT id, platform, age_group, gender, location, profession FROM victims WHERE id = ?",
+                         victim_id)
+
+    def victims_of(self, trapper_id):
+        return [row[0] for row in self._rows(
+            "SELECT victim_id FROM targeted WHERE trapper_id = ? ORDER BY victim_id", trapper_id)]
+
+    def threat_types_of(self, trapper_id):
+        return [row[0] for row in self._rows(
+            "SELECT threat_type FROM classified_as WHERE trapper_id = ? ORDER BY threat_type", trapper_id)]
+
+    def target_groups_of(self, trapper_id):
+        return [row[0] for row in self._rows(
+            "SELECT group_name FROM targets_group WHERE trapper_id = ? ORDER BY group_name", trapper_id)]
+
+    def reports_on(self, victim_id):
+        return [dict(row) for row in self._rows(
+            """SELECT r.id, r.severity FROM subject_of s JOIN red_team_reports r ON r.id = s.report_id
+               WHERE s.victim_id = ? ORDER BY r.id""", victim_id)]
+
+    def get_scammer(self, username):
+        scammer = self._one(
+            """SELECT username, followers, following, bio, is_private, is_verified, report_count
+               FROM scammers WHERE username = ?""", username)
+        if scammer is None:
+            return None
+        for flag in ("is_private", "is_verified"):
+            if scammer[flag] is not None:
+                scammer[flag] = bool(scammer[flag])
+        scammer["tactics"] = [row[0] for row in self._rows(
+            "SELECT tactic FROM used_tactic WHERE username = ? ORDER BY tactic", username)]
+        return scammer
+
+    def get_scammer_history(self, username):
+        history = self._one("""SELECT username, report_count, first_reported_on, last_reported_on
+                               FROM scammers WHERE username = ?""", username)
+        if history is not None:
+            history["tactics"] = [row[0] for row in self._rows(
+                "SELECT tactic FROM used_tactic WHERE username = ? ORDER BY tactic", username)]
+        return history
+
+    def scammer_usernames(self):
+        return [row[0] for row in self._rows("SELECT username FROM scammers")]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+@functools.lru_cache(maxsize=None)
+def get_storage(backend: str = STORAGE_BACKEND) -> Storage:
+    """The process-wide storage of `backend` (default: STORAGE_BACKEND)."""
+    if backend == "neo4j":
+        return Neo4jStorage()
+    if backend == "sqlite":
+        return SQLiteStorage()
+    raise ValueError(f"Unknown storage backend {backend!r}; expected one of {BACKENDS}")
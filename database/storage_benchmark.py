@@ -0,0 +1,85 @@
+# storage_benchmark.py
+# Write throughput and point-read latency of the storage backends, on the same
+# synthetic workload (trappers, victims, trapper->victim edges and scammer reports).
+#
+#   python -m database.storage_benchmark                        # SQLite in a temp dir
+#   python -m database.storage_benchmark --backend sqlite neo4j # also the Neo4j in .env
+#
+# Against Neo4j the nodes are left behind (ids prefixed "bench-").
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from .storage import BACKENDS, Neo4jStorage, SQLiteStorage
+
+parser = argparse.ArgumentParser(description="Storage backend benchmark.")
+parser.add_argument("--backend", nargs="+", choices=BACKENDS, default=["sqlite"])
+parser.add_argument("--trappers", type=int, default=10_000)
+parser.add_argument("--victims", type=int, default=100_000)
+parser.add_argument("--edges", type=int, default=500_000)
+parser.add_argument("--reports", type=int, default=20_000)
+parser.add_argument("--reads", type=int, default=2_000)
+parser.add_argument("--chunk-size", type=int, default=10_000)
+parser.add_argument("--sqlite-path", help="SQLite file to write (default: a fresh one in a temp dir).")
+
+
+def _reports(n, scammers):
+    analysis = {"psychological_analysis": {"total_risk_score": 60, "Love Bombing": {"score": 40},
+                                           "Urgency": {"score": 20}}}
+    for i in range(n):
+        yield (f"bench-analyst-{i % 50}", {"username": f"bench-scammer-{i % scammers}", "followers": i,
+                                           "following": 900, "bio": "crypto mentor", "is_private": False,
+                                           "is_verified": False}, analysis, 75.0)
+
+
+def run(name, store, args):
+    rng = random.Random(7)
+
+    def timed(label, count, unit, write):
+        start = time.perf_counter()
+        write()
+        elapsed = time.perf_counter() - start
+        print(f"  {label:<22} {count / elapsed:>12,.0f} {unit}/s  ({count:,} in {elapsed:.2f}s)")
+
+    print(f"{name}:")
+    timed("trappers + victims", args.trappers + args.victims, "nodes", lambda: (
+        store.add_trappers({"trapper_id": f"bench-t{i}", "platform": "Instagram", "username": f"bench_{i}"}
+                           for i in range(args.trappers)),
+        store.add_victims({"victim_id": f"bench-v{i}", "platform": "Instagram"} for i in range(args.victims))))
+    timed("trapper->victim edges", args.edges, "edges", lambda: store.connect_trappers_to_victims(
+        {"trapper_id": f"bench-t{rng.randrange(args.trappers)}", "victim_id": f"bench-v{rng.randrange(args.victims)}"}
+        for _ in range(args.edges)))
+    timed("scammer reports", args.reports, "reports",
+          lambda: store.submit_reports(_reports(args.reports, max(args.reports // 10, 1)), args.chunk_size))
+
+    latencies = []
+    for _ in range(args.reads):
+        start = time.perf_counter()
+        store.victims_of(f"bench-t{rng.randrange(args.trappers)}")
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+    print(f"  victims_of read        p50 {statistics.median(latencies):.3f} ms  "
+          f"p99 {latencies[int(len(latencies) * 0.99) - 1]:.3f} ms")
+
+
+def main():
+    args = parser.parse_args()
+    print(f"{args.trappers:,} trappers, {args.victims:,} victims, {args.edges:,} edges, {args.reports:,} reports; "
+          f"chunks of {args.chunk_size:,}")
+    for backend in args.backend:
+        if backend == "sqlite":
+            with tempfile.TemporaryDirectory() as tmp:
+                store = SQLiteStorage(args.sqlite_path or os.path.join(tmp, "graph.sqlite3"), args.chunk_size)
+                run("sqlite (WAL)", store, args)
+                store.close()
+        else:
+            store = Neo4jStorage(chunk_size=args.chunk_size)
+            run("neo4j", store, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+# test_async_operations.py
+
+import asyncio
+
+import pytest
+
+from database import async_operations, driver as driver_module, operations
+from database.stand_in import StandInAsyncDriver
+
+
+def async_driver(fail_on=None):
+    """Async stand-in answering reads with the `id` they asked for; fails statements with `fail_on` among their parameters."""
+    return StandInAsyncDriver(rows=lambda query, parameters: [{"id": parameters.get("id")}], rtt_s=0.001,
+                              fail_on=fail_on and (lambda query, parameters: fail_on in parameters.values()))
+
+
+@pytest.fixture(autouse=True)
+def fresh_metrics():
+    async_operations.metrics.reset()
+
+
+def test_fan_out_is_bounded_and_keeps_order():
+    db = async_driver()
+    rows = asyncio.run(async_operations.fan_out_reads(
+        "MATCH (t:Trapper {id: $id}) RETURN t.id AS id", ({"id": f"t{i}"} for i in range(50)), concurrency=8, db=db))
+    assert rows == [[{"id": f"t{i}"}] for i in range(50)]
+    assert db.peak_open == 8
+
+    snapshot = async_operations.pool_metrics()
+    assert snapshot["sessions"] == 50 and snapshot["peak_in_use"] == 8 and snapshot["in_use"] == 0
+    # The first 8 got a connection straight away
+    assert snapshot["peak_waiting"] == 42 and snapshot["waiting"] == 0 and snapshot["wait_ms_max"] > 0
+
+
+def test_single_record_helpers_use_the_sync_queries():
+    db = async_driver()
+
+    async def scenario():
+        await async_operations.add_trapper("BlackWidow", "Instagram", "widow_hunterx", db=db)
+        return await async_operations.fan_out(
+            (async_operations.connect_trapper_to_victim("BlackWidow", f"v{i}", db=db) for i in range(5)))
+
+    asyncio.run(scenario())
+    assert db.statements[0][:2] == (operations.ADD_TRAPPER_QUERY,
+                                    {"id": "BlackWidow", "username": "widow_hunterx", "platform": "Instagram"})
+    assert sorted(s.parameters["victim_id"] for s in db.statements[1:]) == [f"v{i}" for i in range(5)]
+
+
+def test_failed_write_is_raised_after_the_rest_finish():
+    db = async_driver(fail_on="v3")
+    with pytest.raises(RuntimeError):
+        asyncio.run(async_operations.fan_out_writes(
+            operations.CONNECT_TRAPPER_TO_VICTIM_QUERY, ({"trapper_id": "t", "victim_id": f"v{i}"} for i in range(10)),
+            concurrency=4, db=db))
+    assert len(db.statements) == 9
+    assert async_operations.pool_metrics()["errors"] == 1
+
+
+def test_async_driver_is_created_lazily_with_the_pool_config(monkeypatch):
+    created = []
+
+    class FakeAsyncGraphDatabase:
+        @staticmethod
+        def driver(uri, auth, **config):
+            created.append(config)
+            return async_driver()
+
+    monkeypatch.setattr(driver_module, "AsyncGraphDatabase", FakeAsyncGraphDatabase)
+    lazy = driver_module.LazyAsyncDriver(driver_module._create_async_driver)
+    assert created == []
+    lazy.session()
+    lazy.session()
+    assert created == [driver_module.POOL_CONFIG]
+    assert set(created[0]) >= {"max_connection_pool_size", "connection_acquisition_timeout", "keep_alive"}
@@ -0,0 +1,42 @@
+# test_bulk_operations.py
+
+import pytest
+
+from database import operations
+from database.stand_in import StandInDriver
+
+
+def _rows_written(db):
+    """(writer thread, query, rows) of each UNWIND statement."""
+    return [(s.thread, s.query, s.parameters["rows"]) for s in db.statements]
+
+
+def _edges(n):
+    return ({"trapper_id": f"t{i % 7}", "victim_id": f"v{i}"} for i in range(n))
+
+
+def test_bulk_write_chunks_one_statement_per_transaction():
+    db = StandInDriver()
+    assert operations.add_victims(({"victim_id": f"v{i}", "platform": "Instagram"} for i in range(25)),
+                                  chunk_size=10, db=db) == 25
+    assert [len(tx) for tx in db.transactions] == [1, 1, 1]
+    assert [len(rows) for _, _, rows in _rows_written(db)] == [10, 10, 5]
+    assert {query for _, query, _ in _rows_written(db)} == {operations.ADD_VICTIMS_QUERY}
+
+
+def test_partitioned_writers_keep_each_trapper_on_one_writer():
+    db = StandInDriver()
+    assert operations.connect_trappers_to_victims(_edges(1000), chunk_size=16, workers=3, db=db) == 1000
+
+    writers_by_trapper = {}
+    for writer, _, rows in _rows_written(db):
+        for row in rows:
+            writers_by_trapper.setdefault(row["trapper_id"], set()).add(writer)
+    assert all(len(writers) == 1 for writers in writers_by_trapper.values())
+    assert sorted(row["victim_id"] for _, _, rows in _rows_written(db) for row in rows) == sorted(f"v{i}" for i in range(1000))
+
+
+def test_writer_error_is_raised_to_the_caller():
+    db = StandInDriver(fail_on=lambda query, parameters: any(row["trapper_id"] == "t3" for row in parameters["rows"]))
+    with pytest.raises(RuntimeError):
+        operations.connect_trappers_to_victims(_edges(1000), chunk_size=8, workers=2, db=db)
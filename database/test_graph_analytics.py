@@ -0,0 +1,93 @@
+# test_graph_analytics.py
+
+import numpy as np
+
+from database import graph_analytics
+from database.graph_export import REFRESH_OVERLAP_MS, SAME_HANDLE_QUERY, SAME_HANDLE_SINCE_QUERY, GraphSnapshot, refresh
+from database.stand_in import StandInDriver
+
+
+def graph_driver(edges, same_handles=()):
+    """Serves export queries from in-memory rows: {rel type: [(src, dst, created_at, score)]}."""
+    def rows(query, parameters):
+        if "(s:Scammer)" in query:
+            return [{"src": t, "dst": s} for t, s in same_handles]
+        rel = query.split("[r:")[1].split("]")[0]
+        since = parameters.get("since")
+        return [{"src": src, "dst": dst, "created_at": created, "score": score}
+                for src, dst, created, score in edges.get(rel, []) if since is None or created > since]
+    return StandInDriver(rows=rows)
+
+
+def _since(db):
+    """The watermark each edge export query was run with."""
+    return [s.parameters.get("since") for s in db.statements if "[r:" in s.query]
+
+
+def _campaign_edges():
+    # Ring 1: t1, t2, t3 share victims; t1's handle was reported as a scammer.
+    # Ring 2: t4, t5 share a victim. t6 targets alone. Everyone targets group "defence" (a hub).
+    # The report is the newest relationship; everything else was created well before it.
+    targeted = [("t1", "v1", 500_000, None), ("t2", "v1", 500_000, None), ("t2", "v2", 500_000, None),
+                ("t3", "v2", 500_000, None), ("t4", "v9", 500_000, None), ("t5", "v9", 500_000, None),
+                ("t6", "v7", 500_000, None)]
+    groups = [(f"t{i}", "defence", 500_000, None) for i in range(1, 7)]
+    return {
+        "TARGETED": targeted,
+        "TARGETS_GROUP": groups,
+        "USED_TACTIC": [("t1", "Love Bombing", 500_000, None)],
+        "REPORTED": [("analyst-1", "t1", 1_000_000, 92.0)],
+    }
+
+
+def _campaign_graph(edges=None):
+    return graph_driver(edges or _campaign_edges(), same_handles=[("t1", "t1")])
+
+
+def test_full_then_incremental_refresh_and_save(tmp_path):
+    edges = _campaign_edges()
+    db = _campaign_graph(edges)
+    snapshot, counts = refresh(db=db)
+    assert counts["TARGETED"] == 7 and counts["SAME_HANDLE"] == 1
+    assert snapshot.watermark == 1_000_000 and set(_since(db)) == {None}
+
+    edges["TARGETED"].append(("t6", "v9", 2_000_000, None))
+    snapshot, counts = refresh(snapshot, db)
+    # Only edges newer than the watermark less the overlap are read (the report again, inside
+    # the overlap window); the same-handle edge is not duplicated
+    assert _since(db)[-1] == 1_000_000 - REFRESH_OVERLAP_MS
+    assert counts["TARGETED"] == 1 and counts["REPORTED"] == 1 and counts["SAME_HANDLE"] == 0
+    # ... and the handles are only joined for what was reported or created since then
+    assert [(s.query, s.parameters.get("since")) for s in db.statements if "Trapper {username" in s.query] == [
+        (SAME_HANDLE_QUERY, None), (SAME_HANDLE_SINCE_QUERY, 1_000_000 - REFRESH_OVERLAP_MS)]
+    assert snapshot.watermark == 2_000_000
+
+    snapshot.save(tmp_path / "graph.npz")
+    loaded = GraphSnapshot.load(tmp_path / "graph.npz")
+    assert loaded.num_edges == snapshot.num_edges and loaded.watermark == 2_000_000
+    assert loaded.node_id("Trapper", "t6") == snapshot.node_id("Trapper", "t6")
+    assert (loaded.adjacency() != snapshot.adjacency()).nnz == 0
+
+
+def test_rings_ignore_hub_groups():
+    snapshot, _ = refresh(db=_campaign_graph())
+    rings = graph_analytics.campaign_rings(snapshot, max_hub_degree=5)
+    assert [sorted(r["trappers"]) for r in rings] == [["t1", "t2", "t3"], ["t4", "t5"]]
+    assert rings[0]["scammers"] == ["t1"]
+
+    # Without the hub cutoff the shared target group joins everyone
+    assert len(graph_analytics.campaign_rings(snapshot, max_hub_degree=None)) == 1
+
+
+def test_co_targeting_and_risk_propagation():
+    snapshot, _ = refresh(db=_campaign_graph())
+    pairs = graph_analytics.co_targeting(snapshot, max_feature_degree=5)
+    assert pairs[0] == {"trapper_a": "t4", "trapper_b": "t5", "shared": 1, "jaccard": 1.0}
+    assert {(p["trapper_a"], p["trapper_b"]) for p in pairs} == {("t4", "t5"), ("t1", "t2"), ("t2", "t3")}
+
+    seeds = graph_analytics.confirmed_scammer_seeds(snapshot)
+    assert seeds[snapshot.node_id("Scammer", "t1")] == np.float64(np.float32(92.0)) / 100
+    risk, iterations = graph_analytics.propagate_risk(snapshot, edge_types=("TARGETED", "SAME_HANDLE", "USED_TACTIC"))
+    assert 0 < iterations < 100 and risk.max() <= 1
+    ranked = [key for key, _ in graph_analytics.top_risks(snapshot, risk)]
+    assert ranked[:3] == ["t1", "t2", "t3"] and "t4" not in ranked
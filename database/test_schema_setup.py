@@ -0,0 +1,39 @@
+# test_schema_setup.py
+
+import pytest
+
+from database import schema_setup
+from database.stand_in import StandInDriver
+
+
+def explaining_driver(scanned_label=None):
+    """Answers EXPLAIN with a canned plan: a label scan for queries on `scanned_label`, index seeks otherwise."""
+    def plan(statement):
+        leaf = "NodeByLabelScan@neo4j" if f":{scanned_label} " in statement else "NodeUniqueIndexSeek@neo4j"
+        return {"operatorType": "ProduceResults@neo4j",
+                "children": [{"operatorType": "Merge@neo4j", "children": [{"operatorType": leaf}]}]}
+    return StandInDriver(plan=plan)
+
+
+def test_every_looked_up_node_key_is_declared():
+    assert schema_setup.check_declared_keys() == {}
+    assert ("Scammer", "username") in schema_setup.declared_unique_keys()
+    assert ("Trapper", "id") in schema_setup.declared_unique_keys()
+
+
+def test_apply_schema_is_idempotent_ddl():
+    db = explaining_driver()
+    statements = schema_setup.apply_schema(db)
+    assert all("IF NOT EXISTS" in s for s in statements)
+    assert "CREATE CONSTRAINT tactic_name_unique IF NOT EXISTS FOR (n:Tactic) REQUIRE n.name IS UNIQUE" in statements
+
+
+def test_plan_check_fails_on_label_scans():
+    db = explaining_driver()
+    operators = schema_setup.check_query_plans(db)
+    assert operators["reports.WRITE_REPORTS_QUERY"] == ["Merge", "NodeUniqueIndexSeek", "ProduceResults"]
+    statement, parameters, _ = db.statements[0]
+    assert statement.startswith("EXPLAIN") and all(v is None for v in parameters.values())
+
+    with pytest.raises(schema_setup.SchemaCheckError, match="operations.CONNECT_TRAPPER_TO_VICTIM_QUERY"):
+        schema_setup.check_query_plans(explaining_driver(scanned_label="Victim"))
@@ -0,0 +1,143 @@
+# test_storage.py
+# Conformance suite run against every storage backend. SQLite always runs; the
+# Neo4j backend runs when NEO4J_TEST_URI (and NEO4J_TEST_USER/NEO4J_TEST_PASSWORD)
+# point at a scratch database. Node keys are prefixed per test so runs do not collide.
+
+import os
+import uuid
+
+import pytest
+
+from database.reports import report_params
+from database.storage import Neo4jStorage, SQLiteStorage, Storage
+
+
+@pytest.fixture(params=["sqlite", "neo4j"])
+def store(request, tmp_path):
+    if request.param == "sqlite":
+        storage = SQLiteStorage(str(tmp_path / "graph.sqlite3"), chunk_size=3)
+    else:
+        uri = os.getenv("NEO4J_TEST_URI")
+        if not uri:
+            pytest.skip("NEO4J_TEST_URI is not set")
+        from neo4j import GraphDatabase
+        storage = Neo4jStorage(GraphDatabase.driver(uri, auth=(os.getenv("NEO4J_TEST_USER", "neo4j"),
+                                                               os.getenv("NEO4J_TEST_PASSWORD"))), chunk_size=3)
+    yield storage
+    storage.close()
+
+
+@pytest.fixture
+def key():
+    prefix = uuid.uuid4().hex[:8]
+    return lambda name: f"{prefix}-{name}"
+
+
+def _profile(username, followers):
+    return {"username": username, "followers": followers, "following": 10, "bio": "crypto mentor",
+            "is_private": False, "is_verified": False}
+
+
+def _analysis(*tactics):
+    return {"psychological_analysis": {"total_risk_score": 50, "Secrecy": {"score": 0},
+                                       **{tactic: {"score": 25} for tactic in tactics}}}
+
+
+def test_nodes_are_merged_on_their_keys(store, key):
+    assert store.add_trappers([{"trapper_id": key("t1"), "platform": "Instagram", "username": "widow"},
+                               {"trapper_id": key("t1"), "platform": "Telegram", "username": "other"}]) == 2
+    assert store.get_trapper(key("t1")) == {"id": key("t1"), "username": "widow", "platform": "Instagram"}
+    assert store.get_trapper(key("missing")) is None
+
+    store.add_victims({"victim_id": key(f"v{i}"), "platform": "Instagram"} for i in range(5))
+    store.log_victims_metadata([{"victim_id": key("v1"), "age_group": "25-34", "gender": "M", "location": "Pune",
+                                 "platform": "WhatsApp", "profession": "Army"},
+                                {"victim_id": key("ghost"), "age_group": None, "gender": None, "location": None,
+                                 "platform": None, "profession": None}])
+    assert store.get_victim(key("v1")) == {"id": key("v1"), "platform": "WhatsApp", "age_group": "25-34",
+                                           "gender": "M", "location": "Pune", "profession": "Army"}
+    assert store.get_victim(key("v0"))["age_group"] is None
+    assert store.get_victim(key("ghost")) is None
+
+
+def test_relationships_need_both_ends_and_are_not_duplicated(store, key):
+    store.add_trappers([{"trapper_id": key("t1"), "platform": "Instagram", "username": "widow"}])
+    store.add_victims({"victim_id": key(f"v{i}"), "platform": "Instagram"} for i in range(3))
+    edges = [{"trapper_id": key("t1"), "victim_id": key(f"v{i}")} for i in (2, 0, 1, 0)]
+    store.connect_trappers_to_victims(edges + [{"trapper_id": key("t1"), "victim_id": key("ghost")},
+                                               {"trapper_id": key("ghost"), "victim_id": key("v0")}])
+    assert store.victims_of(key("t1")) == [key("v0"), key("v1"), key("v2")]
+    assert store.victims_of(key("ghost")) == []
+
+    store.link_threat_types([{"trapper_id": key("t1"), "threat_type": "Phishing"},
+                             {"trapper_id": key("t1"), "threat_type": "Honeytrap"},
+                             {"trapper_id": key("t1"), "threat_type": "Phishing"}])
+    store.link_target_groups([{"trapper_id": key("t1"), "group_name": "Defense Personnel"},
+                              {"trapper_id": key("ghost"), "group_name": "Nobody"}])
+    assert store.threat_types_of(key("t1")) == ["Honeytrap", "Phishing"]
+    assert store.target_groups_of(key("t1")) == ["Defense Personnel"]
+    assert store.target_groups_of(key("ghost")) == []
+
+    store.add_red_team_reports([{"report_id": key("r1"), "victim_id": key("v0"), "severity": "Low"},
+                                {"report_id": key("r1"), "victim_id": key("v0"), "severity": "High"},
+                                {"report_id": key("r2"), "victim_id": key("ghost"), "severity": "High"}])
+    assert store.reports_on(key("v0")) == [{"id": key("r1"), "severity": "High"}]
+    assert store.reports_on(key("ghost")) == []
+
+
+def test_reports_count_every_report_and_merge_tactics(store, key):
+    scammer = key("scammer")
+    assert store.submit_report("analyst-1", _profile(scammer, 100), _analysis("Love Bombing"), 80.0)
+    assert store.submit_reports([("analyst-2", _profile(scammer, 150), _analysis("Urgency", "Love Bombing"), 65.0),
+                                 ("analyst-1", _profile(scammer, 175), _analysis(), 70.0)], batch_size=1) == 2
+    assert store.get_scammer(scammer) == {
+        "username": scammer, "followers": 175, "following": 10, "bio": "crypto mentor", "is_private": False,
+        "is_verified": False, "report_count": 3, "tactics": ["Love Bombing", "Urgency"]}
+    assert store.get_scammer(key("nobody")) is None
+
+    history = store.get_scammer_history(scammer)
+    assert history["report_count"] == 3 and history["tactics"] == ["Love Bombing", "Urgency"]
+    assert history["first_reported_on"] <= history["last_reported_on"]
+    assert store.get_scammer_history(key("nobody")) is None
+    assert scammer in set(store.scammer_usernames())
+
+
+def test_replayed_reports_are_not_counted_twice(store, key):
+    scammer = key("scammer")
+    reports = [report_params("analyst-1", _profile(scammer, 100), _analysis("Urgency"), 80.0, report_id=key(f"r{i}"))
+               for i in range(2)]
+    store.add_reports(reports)
+    # The same batch again, as after a lost acknowledgement, plus one new report
+    store.add_reports(reports + [report_params("analyst-2", _profile(scammer, 120), _analysis(), 60.0)])
+    assert store.get_scammer(scammer)["report_count"] == 3
+
+
+def test_reports_are_dated_by_their_enqueue_time(store, key):
+    scammer = key("scammer")
+    new, old = (report_params("analyst-1", _profile(scammer, 100), _analysis(), 80.0) for _ in range(2))
+    new["enqueued_at"], old["enqueued_at"] = 2_000_000, 1_000_000
+    # The older report is written last, as by a spool that retried it
+    store.add_reports([new])
+    store.add_reports([old])
+    history = store.get_scammer_history(scammer)
+    assert (history["first_reported_on"], history["last_reported_on"]) == (1_000_000, 2_000_000)
+
+
+def test_sqlite_store_persists_across_connections(tmp_path):
+    path = str(tmp_path / "graph.sqlite3")
+    store = SQLiteStorage(path)
+    store.add_trappers([{"trapper_id": "t1", "platform": "Instagram", "username": "widow"}])
+    store.close()
+    reopened = SQLiteStorage(path)
+    assert reopened.get_trapper("t1")["username"] == "widow"
+    assert reopened._db.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    reopened.close()
+
+
+def test_backends_must_implement_the_whole_interface():
+    class WritesOnly(Storage):
+        def add_trappers(self, records):
+            return 0
+
+    with pytest.raises(TypeError, match="abstract"):
+        WritesOnly()
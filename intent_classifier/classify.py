@@ -8,6 +8,13 @@ import logging
 from datetime import datetime
 import pandas as pd
 
+# CPU/memory profiling hooks (red/profiler_hooks.py) when running inside the app
+try:
+    from profiler_hooks import profiled
+except ImportError:
+    def profiled(name):
+        return lambda fn: fn
+
 # === Logging Setup ===
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
@@ -22,6 +29,7 @@ handler.setFormatter(formatter)
 logger.addHandler(handler)
 
 # === Message Classification ===
+@profiled("classify_message_window")
 def classify_message_window(messages):
     logger.info("Classifying message window...")
     try:
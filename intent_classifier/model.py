@@ -1,14 +1,31 @@
 # model.py
 
-from sentence_transformers import SentenceTransformer
 from sklearn.linear_model import LogisticRegression
 import numpy as np
 import os
 import joblib
 from config import SENTENCE_BERT_MODEL
 
-# Load embedding model
-embedding_model = SentenceTransformer(SENTENCE_BERT_MODEL)
+# Stage timing spans (red/telemetry.py) when running inside the app; no-ops otherwise
+try:
+    from telemetry import span
+except ImportError:
+    from contextlib import nullcontext as span
+
+# Embedding model, loaded on first use. red/model_registry.py replaces
+# get_embedding_model so the model is shared, measured and evictable.
+_embedding_model = None
+
+def load_embedding_model():
+    with span("model_load.sentence_transformer"):
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer(SENTENCE_BERT_MODEL)
+
+def get_embedding_model():
+    global _embedding_model
+    if _embedding_model is None:
+        _embedding_model = load_embedding_model()
+    return _embedding_model
 
 # Load classifier (or use dummy one if not trained yet)
 MODEL_PATH = os.path.join(os.path.dirname(__file__), "intent_classifier_model.pkl")
@@ -26,7 +43,9 @@ else:
 # Corrected version in model.py
 def embed_text(text):
     """Encodes a single string of text into a 2D numerical embedding."""
-    return embedding_model.encode([text], convert_to_numpy=True)
+    model = get_embedding_model()
+    with span("embedding"):
+        return model.encode([text], convert_to_numpy=True)
 
 # Corrected version in model.py
 def predict_intent(text):
@@ -1,13 +1,32 @@
 # utils.py
 
-import spacy
 from config import TECH_KEYWORDS
 
-# Load spaCy NER model
-nlp = spacy.load("en_core_web_sm")
+# Stage timing spans (red/telemetry.py) when running inside the app; no-ops otherwise
+try:
+    from telemetry import span
+except ImportError:
+    from contextlib import nullcontext as span
+
+# spaCy NER model, loaded on first use. red/model_registry.py replaces
+# get_nlp so the model is shared, measured and evictable.
+_nlp = None
+
+def load_nlp():
+    with span("model_load.spacy_ner"):
+        import spacy
+        return spacy.load("en_core_web_sm")
+
+def get_nlp():
+    global _nlp
+    if _nlp is None:
+        _nlp = load_nlp()
+    return _nlp
 
 def extract_named_entities(text):
-    doc = nlp(text)
+    nlp = get_nlp()
+    with span("ner"):
+        doc = nlp(text)
     return [ent.text for ent in doc.ents]
 
 def contains_tech_keywords(text):
@@ -0,0 +1,60 @@
+# bio_features.py
+# How the risk model sees a profile's bio. Shared by training (profile_risk.py)
+# and scoring (predict_risk_score.py) so both build the same columns.
+#
+# - "sentiment": one DistilBERT POSITIVE/NEGATIVE flag (bio_sentiment_score),
+#   computed before the pipeline by bio_sentiment.BioSentimentFeaturizer.
+# - "tfidf": TF-IDF over the bio's words (max_features=300, as vectorizer.py),
+#   fitted inside the model pipeline.
+# - "hashing": hashed word counts, stateless, so nothing is fitted or stored
+#   for the bio and unseen words cost no vocabulary growth.
+#
+# The two vectorizer modes need no transformer model at all.
+
+import os
+
+from sklearn.compose import ColumnTransformer
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfVectorizer
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+BIO_FEATURE_MODES = ("sentiment", "tfidf", "hashing")
+# The mode profile_risk.py trains with (environment overridable).
+BIO_FEATURES = os.getenv("RISK_MODEL_BIO_FEATURES", "sentiment")
+TFIDF_MAX_FEATURES = 300
+HASHING_N_FEATURES = 2 ** 10
+
+PROFILE_FEATURES = ['followers', 'following', 'account_age_days', 'is_private', 'is_verified', 'photo_source']
+NUMERIC_FEATURES = ['followers', 'following', 'account_age_days']
+CATEGORICAL_FEATURES = ['is_private', 'is_verified', 'photo_source']
+
+
+def _check(mode):
+    if mode not in BIO_FEATURE_MODES:
+        raise ValueError(f"Unknown bio feature mode '{mode}', expected one of {BIO_FEATURE_MODES}.")
+
+
+def feature_order(mode=BIO_FEATURES):
+    """The model's input columns for `mode`, in order."""
+    _check(mode)
+    return PROFILE_FEATURES + ['bio_sentiment_score' if mode == "sentiment" else 'bio']
+
+
+def known_feature_orders():
+    """Every input column order a risk model may be trained with (tfidf and hashing share one)."""
+    return [feature_order(mode) for mode in ("sentiment", "tfidf")]
+
+
+def build_preprocessor(mode=BIO_FEATURES):
+    """The ColumnTransformer in front of the classifier for `mode`."""
+    _check(mode)
+    transformers = [('cat', OneHotEncoder(handle_unknown='ignore'), CATEGORICAL_FEATURES)]
+    if mode == "sentiment":
+        transformers.insert(0, ('num', StandardScaler(), NUMERIC_FEATURES + ['bio_sentiment_score']))
+        return ColumnTransformer(transformers=transformers)
+    transformers.insert(0, ('num', StandardScaler(), NUMERIC_FEATURES))
+    # The column name as a string (not a list) gives the vectorizer one document per row
+    if mode == "tfidf":
+        transformers.append(('bio', TfidfVectorizer(max_features=TFIDF_MAX_FEATURES), 'bio'))
+    else:
+        transformers.append(('bio', HashingVectorizer(n_features=HASHING_N_FEATURES, alternate_sign=False), 'bio'))
+    return ColumnTransformer(transformers=transformers)
@@ -0,0 +1,136 @@
+# bio_sentiment.py
+# The bio_sentiment_score feature (1 = POSITIVE bio, 0 otherwise) for training
+# (profile_risk.py) and scoring (predict_risk_score.py).
+#
+# - Bios are deduplicated before they reach the model, and the unique ones run
+#   through the HuggingFace pipeline in batches of BIO_SENTIMENT_BATCH_SIZE,
+#   truncated to the model's maximum length.
+# - Results are cached on disk (SQLite) by a hash of the bio, so retraining and
+#   re-scoring skip every bio seen before; a fully cached run never loads the model.
+# - `stats` reports the last run's throughput in bios/sec.
+
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+# -----------------------------------------------
+# ⚙️ Configuration (environment overridable)
+# -----------------------------------------------
+SENTIMENT_MODEL_NAME = "distilbert-base-uncased-finetuned-sst-2-english"
+BATCH_SIZE = int(os.getenv("BIO_SENTIMENT_BATCH_SIZE", "32"))
+# ":memory:" keeps the cache for the process only.
+CACHE_PATH = os.getenv("BIO_SENTIMENT_CACHE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "bio_sentiment_cache.sqlite3"))
+
+logger = logging.getLogger(__name__)
+
+
+def bio_key(bio: str, model_name: str = SENTIMENT_MODEL_NAME) -> str:
+    return hashlib.sha256(f"{model_name}\0{bio}".encode("utf-8")).hexdigest()
+
+
+class BioSentimentFeaturizer:
+    """
+    Batched, deduplicated and disk-cached bio sentiment.
+
+    Args:
+        get_model: f() -> HuggingFace text-classification pipeline (or None if it
+                   cannot be loaded). Only called when a bio is not cached.
+        cache_path: SQLite cache file.
+        batch_size: Bios per model call.
+        model_name: Part of the cache key, so another model never reuses these labels.
+    """
+
+    def __init__(self, get_model, cache_path: str = CACHE_PATH, batch_size: int = BATCH_SIZE,
+                 model_name: str = SENTIMENT_MODEL_NAME):
+        if cache_path != ":memory:":
+            os.makedirs(os.path.dirname(cache_path) or ".", exist_ok=True)
+        self.get_model = get_model
+        self.batch_size = batch_size
+        self.model_name = model_name
+        self.stats = {}
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(cache_path, check_same_thread=False)
+        if cache_path != ":memory:":
+            self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS bio_sentiment (bio_key TEXT PRIMARY KEY, positive INTEGER NOT NULL)")
+        self._db.commit()
+
+    def _cached(self, keys: list[str]) -> dict:
+        found = {}
+        with self._lock:
+            for start in range(0, len(keys), 500):  # stay under SQLite's bound-parameter limit
+                chunk = keys[start:start + 500]
+                found.update(self._db.execute(
+                    f"SELECT bio_key, positive FROM bio_sentiment WHERE bio_key IN ({','.join('?' * len(chunk))})",
+                    chunk).fetchall())
+        return found
+
+    def _classify(self, model, bios: list[str]) -> list[int]:
+        labels = []
+        for start in range(0, len(bios), self.batch_size):
+            batch = bios[start:start + self.batch_size]
+            results = model(batch, batch_size=self.batch_size, truncation=True)
+            labels.extend(1 if result["label"] == "POSITIVE" else 0 for result in results)
+        return labels
+
+    def score(self, bios) -> np.ndarray | None:
+        """
+        1/0 sentiment per bio (missing bios count as ""), in input order.
+        Returns None if some bio is not cached and the model is unavailable.
+        """
+        start = time.perf_counter()
+        bios = [bio if isinstance(bio, str) else "" for bio in bios]
+        unique = list(dict.fromkeys(bios))
+        keys = {bio: bio_key(bio, self.model_name) for bio in unique}
+        labels = self._cached(list(keys.values()))
+        missing = [bio for bio in unique if keys[bio] not in labels]
+        if missing:
+            model = self.get_model()
+            if model is None:
+                return None
+            new_labels = self._classify(model, missing)
+            rows = [(keys[bio], label) for bio, label in zip(missing, new_labels)]
+            with self._lock:
+                self._db.executemany("INSERT OR REPLACE INTO bio_sentiment (bio_key, positive) VALUES (?, ?)", rows)
+                self._db.commit()
+            labels.update(rows)
+
+        elapsed = time.perf_counter() - start
+        self.stats = {
+            "bios": len(bios),
+            "unique": len(unique),
+            "cache_hits": len(unique) - len(missing),
+            "model_bios": len(missing),
+            "seconds": round(elapsed, 3),
+            "bios_per_s": round(len(bios) / elapsed, 1) if elapsed > 0 else float("inf"),
+        }
+        logger.info(f"Bio sentiment: {len(bios)} bios ({len(unique)} unique, {len(missing)} through the model) "
+                    f"in {elapsed:.2f}s, {self.stats['bios_per_s']} bios/sec.")
+        return np.array([labels[keys[bio]] for bio in bios], dtype=np.int64)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+# -----------------------------------------------
+# 🚀 Throughput check: python bio_sentiment.py [csv_path]
+# -----------------------------------------------
+if __name__ == "__main__":
+    import sys
+
+    import pandas as pd
+    from transformers import pipeline as hf_pipeline
+
+    csv_path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(os.path.abspath(__file__)), "simulated_instagram_profiles.csv")
+    bios = pd.read_csv(csv_path)["bio"].tolist()
+    featurizer = BioSentimentFeaturizer(lambda: hf_pipeline("text-classification", model=SENTIMENT_MODEL_NAME),
+                                        cache_path=":memory:")
+    for run in ("cold", "cached"):
+        featurizer.score(bios)
+        print(f"{run}: {featurizer.stats}")
@@ -0,0 +1,95 @@
+# compare_bio_features.py
+# Accuracy / latency / memory of the risk model with each bio feature mode
+# (bio_features.py): DistilBERT sentiment against the TF-IDF and hashing fast paths.
+#
+#   python compare_bio_features.py [--csv simulated_instagram_profiles.csv] [--modes tfidf hashing sentiment]
+#
+# - accuracy / macro F1 on the same held-out 20% train_model uses.
+# - latency: one profile scored end to end (featurize + predict_proba) with an
+#   empty sentiment cache, i.e. what a never-seen bio costs; and batch throughput.
+# - memory: resident memory added by loading the bio model (the DistilBERT
+#   pipeline; nothing for the vectorizers) and the pickled model size.
+
+import argparse
+import os
+import pickle
+import time
+import warnings
+
+import numpy as np
+from sklearn.metrics import f1_score
+
+import predict_risk_score
+import profile_risk
+from bio_features import BIO_FEATURE_MODES
+from bio_sentiment import BioSentimentFeaturizer
+from profile_risk import get_sentiment_model, load_data, preprocess_data, train_model
+
+warnings.filterwarnings("ignore")
+
+
+def rss_mb():
+    # As red/model_registry.process_rss_mb: 0.0 where /proc is not available
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, IndexError, ValueError, AttributeError):
+        return 0.0
+
+
+def compare(csv_path, mode, profiles, repeats=50):
+    rss_before = rss_mb()
+    if mode == "sentiment":
+        get_sentiment_model()
+    model_rss = rss_mb() - rss_before
+
+    df = preprocess_data(load_data(csv_path), featurizer=BioSentimentFeaturizer(get_sentiment_model, cache_path=":memory:"),
+                         bio_features=mode)
+    model, X_test, y_test = train_model(df, bio_features=mode)
+    y_pred = model.predict(X_test)
+    features = list(model.feature_names_in_)
+
+    # A fresh in-memory cache per call, so every bio goes through the sentiment model
+    def score(batch):
+        predict_risk_score._bio_featurizer = BioSentimentFeaturizer(get_sentiment_model, cache_path=":memory:")
+        return model.predict_proba(predict_risk_score.preprocess_profiles(batch, features))
+
+    latencies = []
+    for profile in profiles[:repeats]:
+        start = time.perf_counter()
+        score([profile])
+        latencies.append((time.perf_counter() - start) * 1000)
+    start = time.perf_counter()
+    score(profiles)
+    batch_s = time.perf_counter() - start
+
+    return {
+        "mode": mode,
+        "accuracy": round(float((y_pred == y_test).mean()), 3),
+        "macro_f1": round(f1_score(y_test, y_pred, average="macro"), 3),
+        "p50_ms": round(float(np.median(latencies)), 2),
+        "profiles_per_s": round(len(profiles) / batch_s, 1),
+        "bio_model_rss_mb": round(model_rss, 1),
+        "model_pickle_kb": round(len(pickle.dumps(model)) / 1024, 1),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the risk model's bio feature modes.")
+    parser.add_argument("--csv", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "simulated_instagram_profiles.csv"))
+    parser.add_argument("--modes", nargs="+", choices=BIO_FEATURE_MODES, default=["tfidf", "hashing", "sentiment"])
+    args = parser.parse_args()
+
+    predict_risk_score.log = lambda msg, level=None: None  # keep the per-call logging out of the timings
+    profiles = load_data(args.csv).to_dict("records")
+    rows = []
+    for mode in args.modes:  # vectorizers first: loading DistilBERT does not distort their memory figures
+        if mode == "sentiment" and profile_risk.hf_pipeline is None:
+            print("Skipping 'sentiment': transformers is not installed.")
+            continue
+        rows.append(compare(args.csv, mode, profiles))
+
+    columns = list(rows[0]) if rows else []
+    print("\n" + " | ".join(columns))
+    for row in rows:
+        print(" | ".join(str(row[c]) for c in columns))
@@ -1,9 +1,35 @@
 # predict_risk_score.py
 
+import os
+import threading
+import time
+
 import pandas as pd
 import joblib
 import logging
-from transformers import pipeline as hf_pipeline
+
+from bio_features import feature_order, known_feature_orders
+from bio_sentiment import SENTIMENT_MODEL_NAME, BioSentimentFeaturizer
+
+# Stage timing spans (red/telemetry.py) when running inside the app; no-ops otherwise
+try:
+    from telemetry import span
+except ImportError:
+    from contextlib import nullcontext as span
+
+# -----------------------------------------------
+# ⚙️ Configuration (environment overridable)
+# -----------------------------------------------
+MODEL_PATH = os.getenv("RISK_MODEL_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "risk_model.pkl"))
+# After the sentiment model fails to load, it is not tried again for this long.
+SENTIMENT_RETRY_S = float(os.getenv("SENTIMENT_MODEL_RETRY_S", "300"))
+# How often RiskModelService looks for a changed model file.
+RELOAD_CHECK_S = float(os.getenv("RISK_MODEL_RELOAD_CHECK_S", "5"))
+# The DistilBERT-sentiment model's input columns, in the order profile_risk.train_model
+# selects them. Models trained on tfidf/hashing bio features take the raw 'bio' instead
+# (bio_features.feature_order).
+FEATURE_ORDER = feature_order("sentiment")
+HIGH_RISK_LABEL = 1
 
 # -----------------------------------------------
 # 📜 Setup Logging (Optional, for this script)
@@ -45,14 +71,86 @@ def load_trained_model(model_path):
 # -----------------------------------------------
 # ⚙️ Preprocess New Data for Prediction
 # -----------------------------------------------
-# Initialize sentiment model once globally to avoid re-loading for each prediction
-try:
-    log("Initializing sentiment analysis model (this may take a moment)...")
-    sentiment_model = hf_pipeline("text-classification", model="distilbert-base-uncased-finetuned-sst-2-english")
-    log("Sentiment analysis model initialized.")
-except Exception as e:
-    log(f"Could not load sentiment analysis model: {e}. Predictions involving 'bio' might fail.", level=logging.ERROR)
-    sentiment_model = None # Set to None if loading fails
+# The sentiment model is loaded once, on first use, and kept for later predictions.
+# red/model_registry.py replaces get_sentiment_model so the model is shared,
+# measured and evictable.
+_sentiment_model = None
+_sentiment_failed_at = None
+
+def load_sentiment_model():
+    with span("model_load.distilbert_sentiment"):
+        from transformers import pipeline as hf_pipeline
+        return hf_pipeline("text-classification", model=SENTIMENT_MODEL_NAME)
+
+def get_sentiment_model():
+    global _sentiment_model, _sentiment_failed_at
+    if _sentiment_model is None:
+        # A failed load is remembered for SENTIMENT_RETRY_S instead of being retried on every call
+        if _sentiment_failed_at is not None and time.monotonic() - _sentiment_failed_at < SENTIMENT_RETRY_S:
+            return None
+        try:
+            log("Initializing sentiment analysis model (this may take a moment)...")
+            _sentiment_model = load_sentiment_model()
+            _sentiment_failed_at = None
+            log("Sentiment analysis model initialized.")
+        except Exception as e:
+            _sentiment_failed_at = time.monotonic()
+            log(f"Could not load sentiment analysis model: {e}. Predictions involving 'bio' might fail; "
+                f"retrying in {SENTIMENT_RETRY_S:.0f}s.", level=logging.ERROR)
+            return None
+    return _sentiment_model
+
+# Bios are scored through the shared disk cache; get_sentiment_model is looked up
+# at call time, so the registry's replacement is used.
+_bio_featurizer = None
+
+def get_bio_featurizer():
+    global _bio_featurizer
+    if _bio_featurizer is None:
+        _bio_featurizer = BioSentimentFeaturizer(lambda: get_sentiment_model())
+    return _bio_featurizer
+
+def preprocess_profiles(profiles, features=FEATURE_ORDER):
+    """
+    Preprocesses a batch of profiles to match the model's expected input format:
+    type coercion, bio sentiment (one batched featurizer call for all bios, only
+    if the model takes 'bio_sentiment_score') and the `features` columns.
+
+    Args:
+        profiles (list[dict]): Profiles with the keys shown in `preprocess_new_profile`.
+        features (list[str]): The model's input columns (`model.feature_names_in_`).
+    Returns:
+        pd.DataFrame: One row per profile, ready for prediction.
+                      Returns None if sentiment model fails.
+    """
+    df = pd.DataFrame(list(profiles))
+
+    # Any feature missing from every profile becomes an empty column.
+    # For numeric features NaN is often handled by StandardScaler; categorical ones need a value.
+    for feature in ['bio'] + [f for f in features if f != 'bio_sentiment_score']:
+        if feature not in df.columns:
+            df[feature] = None
+
+    # Coerce types (as done in training)
+    df['is_private'] = df['is_private'].astype(str)
+    df['is_verified'] = df['is_verified'].astype(str)
+    df['photo_source'] = df['photo_source'].astype(str)
+
+    if 'bio_sentiment_score' in features:
+        # Add sentiment score for bio (as done in training); a cached bio needs no model
+        log(f"Running sentiment analysis on {len(df)} profile bio(s)...")
+        sentiment = get_bio_featurizer().score(df['bio'])
+        if sentiment is None:
+            log("Sentiment model not available. Cannot process 'bio_sentiment_score'.", level=logging.ERROR)
+            return None # Or handle this case based on your model's tolerance for missing features
+        df['bio_sentiment_score'] = sentiment
+    else:
+        # The pipeline vectorizes the bio text itself
+        df['bio'] = df['bio'].fillna('').astype(str)
+
+    # Ensure column order matches the training features (dropping 'bio' unless it is one).
+    # This is crucial for ColumnTransformer in the pipeline.
+    return df[list(features)]
 
 def preprocess_new_profile(profile_data):
     """
@@ -74,56 +172,109 @@ def preprocess_new_profile(profile_data):
         pd.DataFrame: A DataFrame with the preprocessed features, ready for prediction.
                       Returns None if sentiment model fails.
     """
-    # Convert the single profile dictionary to a pandas DataFrame
-    df = pd.DataFrame([profile_data])
+    df = preprocess_profiles([profile_data])
+    if df is not None:
+        log("New profile data preprocessed.")
+    return df
 
-    # Coerce types (as done in training)
-    df['is_private'] = df['is_private'].astype(str)
-    df['is_verified'] = df['is_verified'].astype(str)
-    df['photo_source'] = df['photo_source'].astype(str)
+# -----------------------------------------------
+# 🛰️ Risk Model Service
+# -----------------------------------------------
+class RiskModelSchemaError(ValueError):
+    """The model file does not take a known feature order or cannot give a high-risk probability."""
 
-    # Add sentiment score for bio (as done in training)
-    if sentiment_model:
-        log("Running sentiment analysis on new profile bio...")
-        df['bio_sentiment_score'] = df['bio'].apply(lambda text: 1 if sentiment_model(text)[0]['label'] == 'POSITIVE' else 0)
-    else:
-        log("Sentiment model not available. Cannot process 'bio_sentiment_score'.", level=logging.ERROR)
-        return None # Or handle this case based on your model's tolerance for missing features
+def validate_model_schema(model):
+    """Raises RiskModelSchemaError unless `model` is a fitted pipeline over a known feature order with a high-risk class."""
+    features = list(getattr(model, 'feature_names_in_', []))
+    if features not in known_feature_orders():
+        raise RiskModelSchemaError(f"Model was trained on features {features}, expected one of {known_feature_orders()}.")
+    if not hasattr(model, 'predict_proba'):
+        raise RiskModelSchemaError("Model has no predict_proba.")
+    if HIGH_RISK_LABEL not in list(model.classes_):
+        raise RiskModelSchemaError(f"Model classes {list(model.classes_)} do not include {HIGH_RISK_LABEL}.")
 
-    # Drop the original 'bio' column as it's not a feature for the model pipeline
-    df = df.drop(columns=['bio'])
+class RiskModelService:
+    """
+    Keeps the risk model loaded and scores profiles in batches.
 
-    # Ensure column order matches the training features.
-    # This is crucial for ColumnTransformer in the pipeline.
-    # The order must be exactly as in your `train_model` function:
-    # ['followers', 'following', 'account_age_days', 'is_private', 'is_verified', 'photo_source', 'bio_sentiment_score']
-    expected_features_order = [
-        'followers', 'following', 'account_age_days',
-        'is_private', 'is_verified', 'photo_source', 'bio_sentiment_score'
-    ]
-    
-    # Reorder columns to match the training data's feature order
-    # This will also add any missing columns (e.g., if a feature was not provided in profile_data)
-    # and fill them with NaN, which the preprocessor might handle or raise an error for.
-    # It's better to ensure all expected features are present in profile_data.
-    for feature in expected_features_order:
-        if feature not in df.columns:
-            # This should ideally not happen if profile_data is complete.
-            # For categorical features, you might need a default value.
-            # For numeric, NaN is often handled by StandardScaler.
-            df[feature] = None # Or a suitable default based on your data
-
-    df = df[expected_features_order]
-    
-    log("New profile data preprocessed.")
-    return df
+    The model file's modification time is checked at most every
+    `reload_check_s` seconds; when it changes the new model is loaded,
+    validated and swapped in. A new file that fails to load or validate is
+    logged and the previous model keeps serving.
+
+    Args:
+        model_path (str): joblib file written by profile_risk.save_model.
+        reload_check_s (float): How often to look for a changed model file (0 checks on every call).
+    """
+
+    def __init__(self, model_path=MODEL_PATH, reload_check_s=RELOAD_CHECK_S):
+        self.model_path = model_path
+        self.reload_check_s = reload_check_s
+        self.model = None
+        self.loaded_mtime = None
+        self.loads = 0
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+        self.reload()
+
+    def reload(self):
+        """Loads and validates the model file; raises (keeping the current model) if it cannot be used."""
+        with self._lock:
+            mtime = os.path.getmtime(self.model_path)
+            model = joblib.load(self.model_path)
+            validate_model_schema(model)
+            self.model, self.loaded_mtime = model, mtime
+            self.loads += 1
+            self._next_check = time.monotonic() + self.reload_check_s
+        log(f"Risk model loaded from {self.model_path}.")
+
+    def _maybe_reload(self):
+        if time.monotonic() < self._next_check:
+            return
+        self._next_check = time.monotonic() + self.reload_check_s
+        try:
+            if os.path.getmtime(self.model_path) != self.loaded_mtime:
+                self.reload()
+        except Exception as e:
+            log(f"Risk model reload failed, keeping the loaded model: {e}", level=logging.ERROR)
+
+    def predict_risk_batch(self, profiles):
+        """
+        Scores many profiles in one model call.
+
+        Returns:
+            dict | None: 'probabilities' (high-risk probability per profile) and
+                         'labels' (the predicted label per profile, as `model.predict` gives),
+                         both NumPy arrays in input order. None if preprocessing fails.
+        """
+        self._maybe_reload()
+        model = self.model
+        X = preprocess_profiles(profiles, list(model.feature_names_in_))
+        if X is None:
+            return None
+        with span("risk_model.predict_batch"):
+            proba = model.predict_proba(X)
+        return {
+            'probabilities': proba[:, list(model.classes_).index(HIGH_RISK_LABEL)],
+            'labels': model.classes_[proba.argmax(axis=1)],
+        }
+
+_services = {}
+_services_lock = threading.Lock()
+
+def get_risk_model_service(model_path=MODEL_PATH):
+    """One shared RiskModelService per model file."""
+    with _services_lock:
+        if model_path not in _services:
+            _services[model_path] = RiskModelService(model_path)
+        return _services[model_path]
 
 # -----------------------------------------------
 # 🚀 Main Prediction Logic
 # -----------------------------------------------
-def predict_risk(profile_data, model_path="D:/honeytrap/risk_model.pkl"):
+def predict_risk(profile_data, model_path=MODEL_PATH):
     """
-    Loads the model and predicts the risk label for a given profile.
+    Predicts the risk label for a given profile with the shared, already loaded model.
 
     Args:
         profile_data (dict): A dictionary containing the features of a new profile.
@@ -133,23 +284,19 @@ def predict_risk(profile_data, model_path="D:/honeytrap/risk_model.pkl"):
         int or None: The predicted risk label (0 for low risk, 1 for high risk),
                      or None if prediction fails.
     """
-    model = load_trained_model(model_path)
-    if model is None:
-        return None
-
-    processed_data = preprocess_new_profile(profile_data)
-    if processed_data is None:
+    try:
+        service = get_risk_model_service(model_path)
+    except Exception as e:
+        log(f"Error loading model: {e}", level=logging.ERROR)
         return None
 
     try:
         log("Making prediction...")
-        prediction = model.predict(processed_data)
-        # If your model also provides probabilities, you can get them using predict_proba
-        # probabilities = model.predict_proba(processed_data)
-        # log(f"Prediction probabilities: {probabilities}")
-
-        risk_label = int(prediction[0]) # Convert numpy.int64 to standard int
-        log(f"Prediction successful. Risk Label: {risk_label}")
+        result = service.predict_risk_batch([profile_data])
+        if result is None:
+            return None
+        risk_label = int(result['labels'][0]) # Convert numpy.int64 to standard int
+        log(f"Prediction successful. Risk Label: {risk_label} (p={result['probabilities'][0]:.2f})")
         return risk_label
     except Exception as e:
         log(f"Error during prediction: {e}", level=logging.ERROR)
@@ -196,4 +343,13 @@ if __name__ == "__main__":
         risk_status = "HIGH RISK" if predicted_risk_low == 1 else "LOW RISK"
         log(f"Predicted Risk Status: {risk_status}")
 
+    # Score the bundled dataset in one call with the already loaded model
+    log("\n--- Batch scoring the bundled dataset ---")
+    profiles = pd.read_csv(os.path.join(os.path.dirname(os.path.abspath(__file__)), "simulated_instagram_profiles.csv")).to_dict("records")
+    start = time.perf_counter()
+    result = get_risk_model_service().predict_risk_batch(profiles)
+    if result is not None:
+        log(f"Scored {len(profiles)} profiles in {time.perf_counter() - start:.3f}s; "
+            f"{int((result['labels'] == HIGH_RISK_LABEL).sum())} high risk.")
+
     log("\n==== Risk Prediction Script Completed ====")
@@ -1,21 +1,27 @@
 # profile_risk.py
 
+import os
+
 import pandas as pd
 import joblib
 import logging
 from sklearn.model_selection import train_test_split
 from sklearn.pipeline import Pipeline
-from sklearn.compose import ColumnTransformer
-from sklearn.preprocessing import OneHotEncoder, StandardScaler
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.metrics import classification_report, confusion_matrix
-from transformers import pipeline as hf_pipeline
+try:
+    from transformers import pipeline as hf_pipeline
+except ImportError:  # the tfidf/hashing bio features need no transformer model
+    hf_pipeline = None
+
+from bio_features import BIO_FEATURES, build_preprocessor, feature_order
+from bio_sentiment import SENTIMENT_MODEL_NAME, BioSentimentFeaturizer
 
 # -----------------------------------------------
 # 📜 Setup Logging
 # -----------------------------------------------
 logging.basicConfig(
-    filename='D:/honeytrap/risk_model_training.log',
+    filename=os.getenv("RISK_MODEL_TRAINING_LOG", os.path.join(os.path.dirname(os.path.abspath(__file__)), "risk_model_training.log")),
     level=logging.INFO,
     format='%(asctime)s - %(levelname)s - %(message)s'
 )
@@ -41,7 +47,23 @@ def load_data(csv_path):
     log(f"Data loaded: {df.shape[0]} records, {df.shape[1]} columns.")
     return df
 
-def preprocess_data(df):
+# The sentiment model is built once, and only if some bio is not in the featurizer's disk cache
+_sentiment_model = None
+_bio_featurizer = None
+
+def get_sentiment_model():
+    global _sentiment_model
+    if _sentiment_model is None:
+        _sentiment_model = hf_pipeline("text-classification", model=SENTIMENT_MODEL_NAME)
+    return _sentiment_model
+
+def get_bio_featurizer():
+    global _bio_featurizer
+    if _bio_featurizer is None:
+        _bio_featurizer = BioSentimentFeaturizer(get_sentiment_model)
+    return _bio_featurizer
+
+def preprocess_data(df, featurizer=None, bio_features=BIO_FEATURES):
     log("Preprocessing data...")
 
     # Coerce types
@@ -49,10 +71,17 @@ def preprocess_data(df):
     df['is_verified'] = df['is_verified'].astype(str)
     df['photo_source'] = df['photo_source'].astype(str)
 
-    # Add sentiment score for bio
-    log("Running sentiment analysis on bios...")
-    sentiment_model = hf_pipeline("text-classification", model="distilbert-base-uncased-finetuned-sst-2-english")
-    df['bio_sentiment_score'] = df['bio'].apply(lambda text: 1 if sentiment_model(text)[0]['label'] == 'POSITIVE' else 0)
+    if bio_features == "sentiment":
+        # Add sentiment score for bio
+        # (deduplicated, batched and cached by bio_sentiment.BioSentimentFeaturizer)
+        log("Running sentiment analysis on bios...")
+        featurizer = featurizer or get_bio_featurizer()
+        df['bio_sentiment_score'] = featurizer.score(df['bio'])
+        log(f"Bio sentiment throughput: {featurizer.stats['bios_per_s']} bios/sec "
+            f"({featurizer.stats['unique']} unique, {featurizer.stats['cache_hits']} cached).")
+    else:
+        # The bio text itself is vectorized inside the model pipeline (bio_features.py)
+        df['bio'] = df['bio'].fillna('').astype(str)
     
     # FIX: Map string risk labels to numerical values
     # Assuming 'low_risk' maps to 0 and 'high_risk'/'suspicious' maps to 1
@@ -78,10 +107,10 @@ def preprocess_data(df):
 # -----------------------------------------------
 # 🧠 Train Model
 # -----------------------------------------------
-def train_model(df):
-    log("Training model...")
+def train_model(df, bio_features=BIO_FEATURES):
+    log(f"Training model ({bio_features} bio features)...")
 
-    features = ['followers', 'following', 'account_age_days', 'is_private', 'is_verified', 'photo_source', 'bio_sentiment_score']
+    features = feature_order(bio_features)
     target = 'risk_label'
 
     X = df[features]
@@ -89,14 +118,8 @@ def train_model(df):
 
     X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
 
-    numeric_features = ['followers', 'following', 'account_age_days', 'bio_sentiment_score']
-    categorical_features = ['is_private', 'is_verified', 'photo_source']
-
-    preprocessor = ColumnTransformer(transformers=[
-        ('num', StandardScaler(), numeric_features),
-        # FIX: Add handle_unknown='ignore' to OneHotEncoder
-        ('cat', OneHotEncoder(handle_unknown='ignore'), categorical_features) 
-    ])
+    # Scaled numeric features, one-hot categoricals (handle_unknown='ignore') and the bio features
+    preprocessor = build_preprocessor(bio_features)
 
     clf_pipeline = Pipeline(steps=[
         ('preprocessor', preprocessor),
@@ -134,12 +157,15 @@ def save_model(model, path):
 def main():
     log("==== Risk Model Training Started ====")
 
-    csv_path = "D:/honeytrap/simulated_instagram_profiles.csv"
-    model_path = "D:/honeytrap/risk_model.pkl"
+    # Trains onto the model predict_risk_score.py serves (RISK_MODEL_PATH)
+    from predict_risk_score import MODEL_PATH
+
+    csv_path = os.getenv("RISK_MODEL_TRAINING_CSV", os.path.join(os.path.dirname(os.path.abspath(__file__)), "simulated_instagram_profiles.csv"))
+    model_path = MODEL_PATH
 
     df = load_data(csv_path)
-    df = preprocess_data(df)
-    model, X_test, y_test = train_model(df)
+    df = preprocess_data(df, bio_features=BIO_FEATURES)
+    model, X_test, y_test = train_model(df, bio_features=BIO_FEATURES)
     evaluate_model(model, X_test, y_test)
     save_model(model, model_path)
 
@@ -0,0 +1,44 @@
+# test_bio_sentiment.py
+
+import numpy as np
+import pytest
+
+from bio_sentiment import BioSentimentFeaturizer
+
+
+class FakeSentimentModel:
+    """Stands in for the HuggingFace pipeline: bios containing 'sad' are NEGATIVE."""
+
+    def __init__(self):
+        self.batches = []
+
+    def __call__(self, texts, batch_size=None, truncation=False):
+        self.batches.append(list(texts))
+        return [{'label': 'NEGATIVE' if 'sad' in text else 'POSITIVE', 'score': 0.9} for text in texts]
+
+
+@pytest.fixture
+def model():
+    return FakeSentimentModel()
+
+
+def test_bios_are_deduplicated_and_batched(model):
+    featurizer = BioSentimentFeaturizer(lambda: model, cache_path=":memory:", batch_size=2)
+    scores = featurizer.score(["happy", "sad", "happy", None, "so sad", "fun"])
+    np.testing.assert_array_equal(scores, [1, 0, 1, 1, 0, 1])
+    assert model.batches == [["happy", "sad"], ["", "so sad"], ["fun"]]
+    assert featurizer.stats["bios"] == 6 and featurizer.stats["unique"] == 5 and featurizer.stats["model_bios"] == 5
+
+
+def test_cache_survives_restarts_and_skips_the_model(model, tmp_path):
+    path = str(tmp_path / "cache" / "bio_sentiment.sqlite3")
+    first = BioSentimentFeaturizer(lambda: model, cache_path=path)
+    first.score(["happy", "sad"])
+    first.close()
+
+    # A cached run never loads the model; a new bio needs it
+    second = BioSentimentFeaturizer(lambda: None, cache_path=path)
+    np.testing.assert_array_equal(second.score(["sad", "happy", "sad"]), [0, 1, 0])
+    assert second.stats["cache_hits"] == 2 and second.stats["model_bios"] == 0
+    assert second.score(["brand new bio"]) is None
+    second.close()
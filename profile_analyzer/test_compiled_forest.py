@@ -0,0 +1,91 @@
+# test_compiled_forest.py
+
+import os
+import warnings
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+
+from bio_sentiment import BioSentimentFeaturizer
+from compiled_forest import CompiledRiskModel, columns_from_profiles, validate
+from profile_risk import load_data, preprocess_data, train_model
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CSV_PATH = os.path.join(HERE, "simulated_instagram_profiles.csv")
+
+# -----------------------------------------------
+# 🧪 Fixtures
+# -----------------------------------------------
+def fake_sentiment_model(texts, **kwargs):
+    return [{'label': 'POSITIVE' if len(text) % 2 else 'NEGATIVE', 'score': 0.9} for text in texts]
+
+@pytest.fixture(scope="module")
+def bundled_dataset():
+    """The bundled profiles, preprocessed with a stand-in sentiment model."""
+    featurizer = BioSentimentFeaturizer(lambda: fake_sentiment_model, cache_path=":memory:")
+    return preprocess_data(load_data(CSV_PATH), featurizer=featurizer, bio_features="sentiment")
+
+@pytest.fixture(scope="module")
+def trained(bundled_dataset):
+    model, _, _ = train_model(bundled_dataset, bio_features="sentiment")
+    return model
+
+def feature_columns(X):
+    return {feature: X[feature].to_numpy() for feature in X.columns}
+
+# -----------------------------------------------
+# 🧪 Test Functions
+# -----------------------------------------------
+def test_matches_predict_proba_exactly_on_the_bundled_dataset(trained, bundled_dataset):
+    X = bundled_dataset[list(trained.feature_names_in_)]
+    assert validate(trained, X) == 0.0
+
+    compiled = CompiledRiskModel.from_pipeline(trained)
+    np.testing.assert_array_equal(compiled.predict(feature_columns(X)), trained.predict(X))
+    # Chunking does not change the result
+    np.testing.assert_array_equal(compiled.predict_proba(feature_columns(X), chunk_size=7), trained.predict_proba(X))
+
+
+def test_bundled_model_file_compiles_exactly(bundled_dataset):
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")  # pickled with an older scikit-learn
+        pipeline = joblib.load(os.path.join(HERE, "risk_model.pkl"))
+    X = bundled_dataset[list(pipeline.feature_names_in_)].copy()
+    for sentiment in (0, 1):
+        X['bio_sentiment_score'] = sentiment
+        validate(pipeline, X)
+
+
+def test_single_profiles_unknown_categories_and_round_trip(trained, bundled_dataset, tmp_path):
+    compiled = CompiledRiskModel.from_pipeline(trained)
+    path = str(tmp_path / "risk_model.npz")
+    compiled.save(path)
+    loaded = CompiledRiskModel.load(path)
+
+    profile = {'followers': 12, 'following': 900, 'account_age_days': 10, 'is_private': 'True',
+               'is_verified': 'False', 'photo_source': 'never_seen', 'bio_sentiment_score': 1}
+    X = pd.DataFrame([profile])[list(trained.feature_names_in_)]
+    np.testing.assert_array_equal(loaded.predict_proba_one(profile), trained.predict_proba(X)[0])
+    many = columns_from_profiles([profile] * 3, loaded.feature_names_in_)
+    np.testing.assert_array_equal(loaded.predict_proba(many), trained.predict_proba(pd.concat([X] * 3)))
+
+
+def test_missing_numeric_values_follow_the_trees_missing_branch(trained, bundled_dataset, tmp_path):
+    X = bundled_dataset[list(trained.feature_names_in_)].copy()
+    X = X.astype({feature: float for feature in ('followers', 'following', 'account_age_days')})
+    X.iloc[::3, X.columns.get_loc('followers')] = np.nan
+    X.iloc[::5, X.columns.get_loc('account_age_days')] = np.nan
+    assert validate(trained, X) == 0.0
+
+    path = str(tmp_path / "risk_model.npz")
+    CompiledRiskModel.from_pipeline(trained).save(path)
+    np.testing.assert_array_equal(CompiledRiskModel.load(path).predict_proba(feature_columns(X)), trained.predict_proba(X))
+
+
+def test_text_bio_features_are_not_compiled(bundled_dataset):
+    df = load_data(CSV_PATH)
+    model, _, _ = train_model(preprocess_data(df, bio_features="tfidf"), bio_features="tfidf")
+    with pytest.raises(ValueError):
+        CompiledRiskModel.from_pipeline(model)
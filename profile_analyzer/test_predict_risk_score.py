@@ -0,0 +1,115 @@
+# test_predict_risk_score.py
+
+import os
+from unittest.mock import patch
+
+import joblib
+import numpy as np
+import pytest
+from sklearn.compose import ColumnTransformer
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+from bio_sentiment import BioSentimentFeaturizer
+import predict_risk_score
+from predict_risk_score import FEATURE_ORDER, RiskModelSchemaError, RiskModelService, preprocess_profiles
+
+# -----------------------------------------------
+# 🧪 Fixtures
+# -----------------------------------------------
+def make_profiles(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return [{
+        'followers': int(rng.integers(0, 5000)),
+        'following': int(rng.integers(0, 2000)),
+        'account_age_days': int(rng.integers(1, 2000)),
+        'is_private': bool(rng.integers(0, 2)),
+        'is_verified': bool(rng.integers(0, 2)),
+        'photo_source': str(rng.choice(['user_selfie', 'stock', 'ai'])),
+        'bio': str(rng.choice(['Love to travel!', 'sad and lonely', 'DM for crypto tips'])),
+    } for _ in range(n)]
+
+def fit_model(features=FEATURE_ORDER, flip=False):
+    """The train_model pipeline, fitted on random profiles labeled high risk when followers < following."""
+    X = preprocess_profiles(make_profiles(200, seed=1))
+    y = ((X['followers'] < X['following']) ^ flip).astype(int)
+    preprocessor = ColumnTransformer(transformers=[
+        ('num', StandardScaler(), [f for f in ['followers', 'following', 'account_age_days', 'bio_sentiment_score'] if f in features]),
+        ('cat', OneHotEncoder(handle_unknown='ignore'), ['is_private', 'is_verified', 'photo_source'])
+    ])
+    model = Pipeline(steps=[('preprocessor', preprocessor),
+                            ('classifier', RandomForestClassifier(n_estimators=10, random_state=42))])
+    return model.fit(X[features], y)
+
+@pytest.fixture(autouse=True)
+def in_memory_sentiment():
+    """Sentiment from a stand-in model (no DistilBERT download), cached in memory only."""
+    def fake_model(texts, **kwargs):
+        return [{'label': 'NEGATIVE' if 'sad' in text else 'POSITIVE', 'score': 0.9} for text in texts]
+    with patch('predict_risk_score._bio_featurizer', BioSentimentFeaturizer(lambda: fake_model, cache_path=":memory:")):
+        yield
+
+@pytest.fixture
+def model_path(tmp_path):
+    path = str(tmp_path / "risk_model.pkl")
+    joblib.dump(fit_model(), path)
+    return path
+
+# -----------------------------------------------
+# 🧪 Test Functions
+# -----------------------------------------------
+def test_predict_risk_batch_matches_the_pipeline(model_path):
+    service = RiskModelService(model_path)
+    profiles = make_profiles(2000)
+    result = service.predict_risk_batch(profiles)
+
+    X = preprocess_profiles(profiles)
+    assert result['probabilities'].shape == result['labels'].shape == (2000,)
+    np.testing.assert_array_equal(result['probabilities'], service.model.predict_proba(X)[:, 1])
+    np.testing.assert_array_equal(result['labels'], service.model.predict(X))
+    # The model is loaded once, not per call
+    service.predict_risk_batch(profiles[:1])
+    assert service.loads == 1
+
+
+def test_changed_model_file_is_hot_reloaded(model_path):
+    service = RiskModelService(model_path, reload_check_s=0)
+    profiles = make_profiles(50)
+    before = service.predict_risk_batch(profiles)['labels']
+
+    joblib.dump(fit_model(flip=True), model_path)
+    os.utime(model_path, (os.path.getatime(model_path), service.loaded_mtime + 10))
+    after = service.predict_risk_batch(profiles)['labels']
+    assert service.loads == 2
+    assert (before != after).mean() > 0.8
+
+
+def test_model_with_another_feature_order_is_rejected(model_path, tmp_path):
+    wrong_order = FEATURE_ORDER[::-1]
+    bad_path = str(tmp_path / "bad_model.pkl")
+    joblib.dump(fit_model(features=wrong_order), bad_path)
+    with pytest.raises(RiskModelSchemaError):
+        RiskModelService(bad_path)
+
+    # A bad replacement is not swapped in; the loaded model keeps serving
+    service = RiskModelService(model_path, reload_check_s=0)
+    joblib.dump(fit_model(features=wrong_order), model_path)
+    os.utime(model_path, (os.path.getatime(model_path), service.loaded_mtime + 10))
+    assert service.predict_risk_batch(make_profiles(5)) is not None
+    assert service.loads == 1 and list(service.model.feature_names_in_) == FEATURE_ORDER
+
+
+def test_failed_sentiment_model_load_is_not_retried_on_every_call():
+    attempts = []
+    def broken_load():
+        attempts.append(1)
+        raise OSError("model download failed")
+    with patch('predict_risk_score.load_sentiment_model', broken_load), \
+            patch('predict_risk_score._sentiment_model', None), patch('predict_risk_score._sentiment_failed_at', None):
+        assert predict_risk_score.get_sentiment_model() is None
+        assert predict_risk_score.get_sentiment_model() is None
+        assert len(attempts) == 1
+        with patch('predict_risk_score.SENTIMENT_RETRY_S', 0):
+            assert predict_risk_score.get_sentiment_model() is None
+        assert len(attempts) == 2
@@ -11,7 +11,8 @@ import numpy as np # Import numpy
 
 # Import the functions from your training script
 # Assuming profile_risk.py is in the same directory or accessible via PYTHONPATH
-from profile_analyzer.profile_risk import load_data, preprocess_data, train_model, evaluate_model, save_model, log
+from profile_risk import load_data, preprocess_data, train_model, evaluate_model, save_model, log, get_sentiment_model
+from bio_sentiment import BioSentimentFeaturizer
 
 # -----------------------------------------------
 # 🧪 Mock Data for Testing
@@ -48,16 +49,27 @@ def mock_hf_pipeline_sentiment():
     with patch('profile_risk.hf_pipeline') as mock_pipeline:
         # Configure the mock pipeline to return a predictable sentiment
         # For simplicity, let's make it always return 'POSITIVE' unless specific text is given
-        def mock_sentiment_return(text):
-            if "down" in text.lower() or "sad" in text.lower():
-                return [{'label': 'NEGATIVE', 'score': 0.9}]
-            return [{'label': 'POSITIVE', 'score': 0.9}]
+        # (the featurizer passes a batch of bios; a single string gets a one-item list)
+        def mock_sentiment_return(texts, **kwargs):
+            texts = [texts] if isinstance(texts, str) else texts
+            return [{'label': 'NEGATIVE', 'score': 0.9} if "down" in text.lower() or "sad" in text.lower()
+                    else {'label': 'POSITIVE', 'score': 0.9} for text in texts]
 
         mock_instance = MagicMock()
         mock_instance.side_effect = mock_sentiment_return
         mock_pipeline.return_value = mock_instance
         yield mock_pipeline
 
+@pytest.fixture(autouse=True)
+def fresh_bio_featurizer(mock_hf_pipeline_sentiment):
+    """
+    Fixture to give every test its own in-memory sentiment cache (and model),
+    so no test reads labels cached on disk or by another test.
+    """
+    featurizer = BioSentimentFeaturizer(get_sentiment_model, cache_path=":memory:")
+    with patch('profile_risk._sentiment_model', None), patch('profile_risk._bio_featurizer', featurizer):
+        yield featurizer
+
 @pytest.fixture(autouse=True)
 def mock_joblib_dump():
     """
@@ -114,6 +126,25 @@ def test_preprocess_data(mock_dataframe):
     log("test_preprocess_data passed.")
 
 
+def test_preprocess_data_runs_each_new_bio_through_the_model_once(mock_dataframe, mock_hf_pipeline_sentiment, fresh_bio_featurizer):
+    """
+    Tests that repeated bios are classified once, in one batch, and that a
+    second preprocessing run is served from the cache without the model.
+    """
+    df = pd.concat([mock_dataframe, mock_dataframe], ignore_index=True)
+    first = preprocess_data(df.copy())
+    sentiment_model = mock_hf_pipeline_sentiment.return_value
+    assert sentiment_model.call_count == 1
+    assert len(sentiment_model.call_args.args[0]) == 5
+    assert fresh_bio_featurizer.stats['unique'] == 5 and fresh_bio_featurizer.stats['bios_per_s'] > 0
+
+    second = preprocess_data(df.copy())
+    assert sentiment_model.call_count == 1
+    assert fresh_bio_featurizer.stats['cache_hits'] == 5
+    pd.testing.assert_series_equal(first['bio_sentiment_score'], second['bio_sentiment_score'])
+    log("test_preprocess_data_runs_each_new_bio_through_the_model_once passed.")
+
+
 def test_train_model(mock_dataframe):
     """
     Tests the train_model function, ensuring:
@@ -131,6 +162,22 @@ def test_train_model(mock_dataframe):
     log("test_train_model passed.")
 
 
+@pytest.mark.parametrize("bio_features", ["tfidf", "hashing"])
+def test_train_model_on_text_bio_features(mock_dataframe, mock_hf_pipeline_sentiment, bio_features):
+    """
+    Tests that the lightweight bio features train without the sentiment model
+    and that the pipeline takes the raw bio text.
+    """
+    df_processed = preprocess_data(mock_dataframe.copy(), bio_features=bio_features)
+    assert 'bio_sentiment_score' not in df_processed.columns
+    mock_hf_pipeline_sentiment.assert_not_called()
+
+    model, X_test, _ = train_model(df_processed, bio_features=bio_features)
+    assert list(model.feature_names_in_) == ['followers', 'following', 'account_age_days', 'is_private', 'is_verified', 'photo_source', 'bio']
+    assert model.predict_proba(X_test).shape == (X_test.shape[0], len(model.classes_))
+    log(f"test_train_model_on_text_bio_features[{bio_features}] passed.")
+
+
 def test_evaluate_model(mock_dataframe, capsys):
     """
     Tests the evaluate_model function.
@@ -165,6 +212,19 @@ def test_save_model(mock_dataframe, mock_joblib_dump):
         log("test_save_model passed.")
 
 
+def test_main_trains_the_served_model_from_the_bundled_csv(mock_dataframe):
+    """main() reads the CSV next to profile_risk.py and saves to predict_risk_score.MODEL_PATH."""
+    import predict_risk_score
+    from profile_risk import main
+
+    with patch('profile_risk.load_data', return_value=mock_dataframe.copy()) as mock_load, \
+            patch('profile_risk.save_model') as mock_save:
+        main()
+    assert mock_load.call_args.args[0] == os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                       "simulated_instagram_profiles.csv")
+    assert mock_save.call_args.args[1] == predict_risk_score.MODEL_PATH
+
+
 def test_end_to_end_prediction(mock_dataframe):
     """
     Tests the entire pipeline from loading data to making a prediction
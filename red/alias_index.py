@@ -0,0 +1,203 @@
+# --- alias_index.py ---
+# Fuzzy index of known scammer usernames, for linking rotated handles such as
+# priya_babe42 -> priya.babe_43 that an exact MERGE on Scammer.username never joins.
+#
+# - Every username is reduced to a skeleton: lowercased, separators and the
+#   trailing number dropped, look-alike characters folded (0->o, 1->i, 3->e, ...)
+#   and repeated letters collapsed. Rotations of one handle share a skeleton.
+# - Skeletons are indexed by character trigram in an inverted index of compact
+#   uint32 posting arrays. A lookup gathers the candidates sharing the query's
+#   rarer trigrams with NumPy, then scores the best few exactly (trigram
+#   Jaccard of the skeletons).
+# - `add()` inserts incrementally; `similar_many()` / `alias_columns()` serve the
+#   bulk triage path.
+#
+#   python alias_index.py --usernames 1000000   # build and lookup benchmark
+
+import os
+import re
+import threading
+from array import array
+
+import numpy as np
+
+# --- Configuration (environment overridable) ---
+# Set to 1 to list known scammer handles similar to the analyzed username in the app.
+ALIAS_INDEX_ENABLED = os.getenv("ALIAS_INDEX_ENABLED", "0") == "1"
+# Trigrams shared by more skeletons than this only count in the exact re-scoring.
+MAX_POSTING = 20_000
+# Candidates re-scored exactly per result asked for.
+RESCORE_PER_RESULT = 10
+DEFAULT_MIN_SCORE = 0.5
+
+_SEPARATORS = re.compile(r"[\s._\-]+")
+_TRAILING_DIGITS = re.compile(r"\d+$")
+_REPEATS = re.compile(r"(.)\1+")
+_NON_ALNUM = re.compile(r"[^a-z0-9]")
+_LOOKALIKES = str.maketrans({"0": "o", "1": "i", "3": "e", "4": "a", "5": "s", "7": "t", "8": "b",
+                             "@": "a", "$": "s", "!": "i", "|": "l"})
+
+
+def skeleton(username: str) -> str:
+    """The normalized form rotations of a handle share: 'Priya.Babe_43' -> 'priyababe'."""
+    name = _SEPARATORS.sub("", username.strip().lower().lstrip("@"))
+    name = _TRAILING_DIGITS.sub("", name) or name
+    name = _NON_ALNUM.sub("", name.translate(_LOOKALIKES))
+    return _REPEATS.sub(r"\1", name)
+
+
+def trigrams(name: str) -> set[str]:
+    padded = f"^{name}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _jaccard(a: set, b: set) -> float:
+    return len(a & b) / len(a | b) if a or b else 0.0
+
+
+class AliasIndex:
+    """
+    Trigram index over username skeletons.
+
+    Args:
+        max_posting: Trigrams in more skeletons than this are not used to
+                     gather candidates (they still count in the final score).
+    """
+
+    def __init__(self, max_posting: int = MAX_POSTING):
+        self.max_posting = max_posting
+        self._skeleton_ids = {}
+        self._skeletons = []
+        self._usernames = []  # per skeleton
+        self._postings = {}
+        self._count = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_usernames(cls, usernames, **kwargs) -> "AliasIndex":
+        index = cls(**kwargs)
+        index.add_many(usernames)
+        return index
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __contains__(self, username: str) -> bool:
+        node = self._skeleton_ids.get(skeleton(username))
+        return node is not None and username in self._usernames[node]
+
+    def add(self, username: str) -> bool:
+        """Indexes `username`; False if it was already known."""
+        key = skeleton(username)
+        with self._lock:
+            node = self._skeleton_ids.get(key)
+            if node is None:
+                node = self._skeleton_ids[key] = len(self._skeletons)
+                self._skeletons.append(key)
+                self._usernames.append([])
+                for gram in trigrams(key):
+                    posting = self._postings.get(gram)
+                    if posting is None:
+                        posting = self._postings[gram] = array("I")
+                    posting.append(node)
+            elif username in self._usernames[node]:
+                return False
+            self._usernames[node].append(username)
+            self._count += 1
+        return True
+
+    def add_many(self, usernames) -> int:
+        return sum(self.add(username) for username in usernames)
+
+    def _candidates(self, grams: set[str], limit: int) -> np.ndarray:
+        """Skeleton IDs sharing the most of the query's (rarer) trigrams, best first."""
+        with self._lock:
+            postings = sorted((self._postings[g] for g in grams if g in self._postings), key=len)
+            if not postings:
+                return np.zeros(0, dtype=np.uint32)
+            rare = [p for p in postings if len(p) <= self.max_posting] or postings[:1]
+            ids = np.concatenate([np.frombuffer(p, dtype=np.uint32) for p in rare])
+        nodes, shared = np.unique(ids, return_counts=True)
+        if len(nodes) > limit:
+            best = np.argpartition(-shared, limit)[:limit]
+            nodes, shared = nodes[best], shared[best]
+        return nodes[np.argsort(-shared, kind="stable")]
+
+    def similar(self, username: str, k: int = 5, min_score: float = DEFAULT_MIN_SCORE) -> list[tuple[str, float]]:
+        """
+        Up to `k` other known usernames most similar to `username` (trigram
+        Jaccard of the skeletons, 1.0 for the same skeleton), best first.
+        """
+        key = skeleton(username)
+        grams = trigrams(key)
+        scored = []
+        for node in self._candidates(grams, max(k * RESCORE_PER_RESULT, 50)).tolist():
+            score = _jaccard(grams, trigrams(self._skeletons[node]))
+            if score >= min_score:
+                scored.extend((round(score, 4), other) for other in list(self._usernames[node]) if other != username)
+        scored.sort(key=lambda item: (-item[0], item[1]))
+        return [(other, score) for score, other in scored[:k]]
+
+    def similar_many(self, usernames, k: int = 5, min_score: float = DEFAULT_MIN_SCORE) -> list[list[tuple[str, float]]]:
+        return [self.similar(username, k, min_score) for username in usernames]
+
+
+def alias_columns(index: AliasIndex, usernames, min_score: float = DEFAULT_MIN_SCORE) -> dict:
+    """
+    Bulk triage columns: the closest known alias of each username ("" if none)
+    and its score (0.0 if none), as NumPy arrays to add to a
+    verdict_engine.analyses_to_frame frame (`frame.update(alias_columns(...))`).
+    """
+    matches = index.similar_many(usernames, k=1, min_score=min_score)
+    return {
+        "alias_of": np.array([m[0][0] if m else "" for m in matches], dtype=object),
+        "alias_score": np.array([m[0][1] if m else 0.0 for m in matches], dtype=np.float64),
+    }
+
+
+# --- Benchmark: build and lookup latency on synthetic handles ---
+if __name__ == "__main__":
+    import argparse
+    import random
+    import time
+
+    parser = argparse.ArgumentParser(description="Alias index build and lookup benchmark.")
+    parser.add_argument("--usernames", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=2_000)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    syllables = ["pri", "ya", "ba", "be", "cu", "tie", "hot", "mo", "del", "dm", "fun", "tech", "dai", "ly", "bot",
+                 "user", "free", "fol", "low", "an", "ka", "ri", "sha", "neh", "raj", "vi", "kas", "ro", "se", "li"]
+
+    def handle():
+        base = "".join(rng.choice(syllables) for _ in range(rng.randint(2, 4)))
+        if rng.random() < 0.5:
+            cut = rng.randint(1, len(base) - 1)
+            base = base[:cut] + rng.choice("._") + base[cut:]
+        return base + (str(rng.randint(1, 999)) if rng.random() < 0.8 else "")
+
+    def rotate(name):
+        # What a scammer does next: another number, a different separator, a look-alike letter
+        name = re.sub(r"\d+$", "", name).replace("_", rng.choice([".", "_", ""]))
+        if rng.random() < 0.3:
+            name = name.replace("o", "0", 1).replace("i", "1", 1)
+        return name + str(rng.randint(1, 99))
+
+    names = [handle() for _ in range(args.usernames)]
+    start = time.perf_counter()
+    index = AliasIndex.from_usernames(names)
+    print(f"indexed {len(index):,} usernames ({len(index._skeletons):,} skeletons) in {time.perf_counter() - start:.1f}s")
+
+    queries = [rotate(rng.choice(names)) for _ in range(args.queries)]
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        index.similar(query, k=5)
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+    print(f"similar(k=5): p50 {latencies[len(latencies) // 2]:.2f} ms, p99 {latencies[int(len(latencies) * 0.99)]:.2f} ms")
+
+    start = time.perf_counter()
+    index.add_many(queries)
+    print(f"incremental add: {len(queries) / (time.perf_counter() - start):,.0f} usernames/s")
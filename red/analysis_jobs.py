@@ -0,0 +1,223 @@
+# --- analysis_jobs.py ---
+# Runs app analyses (profile risk -> chat analysis -> final verdict) as
+# background jobs on a shared worker pool, so a large upload does not block the
+# Streamlit script run and several analysts can analyze in parallel.
+#
+# - Every job has an ID and reports the stage it is in; the app polls it.
+# - A new submission from the same owner cancels the owner's previous job:
+#   a queued job never starts, a running one stops at its next stage.
+# - The timing spans recorded while a job runs are kept on it (`job.spans`).
+
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from alias_index import AliasIndex
+from chat_analyzer import analyze_chat_history
+from logger_config import get_logger
+from profile_analyzer import calculate_profile_risk
+from scammer_history import ScammerHistoryCache
+from telemetry import span, trace
+from verdict_engine import calculate_final_verdict
+
+logger = get_logger(__name__)
+
+# --- Configuration (environment overridable) ---
+ANALYSIS_WORKERS = int(os.getenv("ANALYSIS_WORKERS", "4"))
+# Finished jobs are forgotten after this long.
+JOB_RETENTION_SECONDS = 3600
+
+# Stages in the order run_analysis reports them (chat analysis reports its own steps).
+STAGES = [
+    "Profile risk",
+    "Keyword scan",
+    "Intent classifier",
+    "Psychological analysis",
+    "IOC lookup",
+    "Scoring",
+    "Final verdict",
+]
+
+
+def connection_extras(connection, prior_reports: bool = False, aliases: bool = False) -> dict:
+    """
+    run_analysis keyword arguments read from `connection` (a db_connector.Neo4jConnection
+    or database.storage.Storage): with `prior_reports` a ScammerHistoryCache, with
+    `aliases` an AliasIndex of every reported username. Both follow the reports
+    submitted through the connection afterwards (see add_report_listener).
+    """
+    extras = {}
+    if prior_reports:
+        extras["history"] = ScammerHistoryCache(connection.get_scammer_history)
+        # A newly reported username must not keep its cached (older) history
+        connection.add_report_listener(extras["history"].invalidate)
+    if aliases:
+        try:
+            extras["aliases"] = AliasIndex.from_usernames(connection.scammer_usernames())
+            logger.info(f"Alias index built over {len(extras['aliases'])} reported usernames.")
+        except Exception as e:
+            logger.warning(f"Could not build the alias index: {e}")
+        else:
+            connection.add_report_listener(extras["aliases"].add)
+    return extras
+
+
+class JobCancelled(Exception):
+    """Raised at a stage boundary when the job has been cancelled."""
+
+
+def run_analysis(profile_data: dict, messages: list, progress=None, history=None, aliases=None) -> dict:
+    """
+    The full app analysis. `progress(stage)` is called as each stage in STAGES starts.
+    With `history` (a scammer_history.ScammerHistoryCache) the username's prior
+    reports are looked up while the chat is analyzed and feed the final verdict.
+    With `aliases` (an alias_index.AliasIndex) the profile step also lists known
+    scammer handles similar to the username.
+    Returns profile_risk, profile_reasons, username_aliases, chat_analysis,
+    scammer_history and final_verdict.
+    """
+    progress = progress or (lambda stage: None)
+    username = profile_data.get("username")
+    pending_history = history.prefetch(username) if history is not None and username else None
+    progress("Profile risk")
+    profile_risk, profile_reasons = calculate_profile_risk(profile_data)
+    username_aliases = []
+    if aliases is not None and username:
+        with span("alias_index.similar"):
+            username_aliases = aliases.similar(username)
+    chat_analysis = analyze_chat_history(messages, progress=progress)
+    progress("Final verdict")
+    prior_reports = scammer_history = None
+    if pending_history is not None:
+        with span("scammer_history.wait"):
+            scammer_history = history.wait(pending_history)
+        prior_reports = scammer_history["report_count"] if scammer_history else 0
+    final_verdict = calculate_final_verdict(profile_risk, chat_analysis, prior_reports=prior_reports)
+    return {
+        "profile_risk": profile_risk,
+        "profile_reasons": profile_reasons,
+        "username_aliases": username_aliases,
+        "chat_analysis": chat_analysis,
+        "scammer_history": scammer_history,
+        "final_verdict": final_verdict,
+    }
+
+
+class AnalysisJob:
+    """One submitted analysis. Read `status`, `stage`, `progress`, `result`, `error` and `spans`."""
+
+    def __init__(self, owner: str):
+        self.id = uuid.uuid4().hex[:12]
+        self.owner = owner
+        self.status = "queued"  # queued -> running -> done | failed | cancelled
+        self.stage = None
+        self.stages_done = 0
+        self.result = None
+        self.error = None
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.stage_times = {}
+        self.spans = []
+        self._stage_started = None
+        self._cancel = threading.Event()
+        self._future = None
+
+    @property
+    def progress(self) -> float:
+        if self.status == "done":
+            return 1.0
+        return self.stages_done / len(STAGES)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "failed", "cancelled")
+
+    def cancel(self):
+        self._cancel.set()
+        if self._future is not None and self._future.cancel():
+            self._finish("cancelled")
+
+    def _enter_stage(self, stage: str):
+        if self._cancel.is_set():
+            raise JobCancelled(self.id)
+        now = time.perf_counter()
+        if self.stage is not None:
+            self.stage_times[self.stage] = round(now - self._stage_started, 3)
+            self.stages_done += 1
+        self.stage = stage
+        self._stage_started = now
+
+    def _finish(self, status: str):
+        if self.stage is not None and self.stage not in self.stage_times and status == "done":
+            self.stage_times[self.stage] = round(time.perf_counter() - self._stage_started, 3)
+        self.status = status
+        self.finished_at = time.time()
+
+
+class AnalysisJobRunner:
+    """
+    Worker pool for analysis jobs, shared by all sessions of the app.
+
+    Args:
+        max_workers: Analyses that run at the same time.
+        pipeline: f(profile_data, messages, progress) -> result (default: run_analysis).
+    """
+
+    def __init__(self, max_workers: int = ANALYSIS_WORKERS, pipeline=run_analysis):
+        self.pipeline = pipeline
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="analysis")
+        self._jobs = {}
+        self._latest_by_owner = {}
+        self._lock = threading.Lock()
+
+    def submit(self, owner: str, profile_data: dict, messages: list) -> AnalysisJob:
+        """Queues an analysis for `owner`, cancelling the owner's previous job."""
+        job = AnalysisJob(owner)
+        with self._lock:
+            self._prune()
+            previous = self._jobs.get(self._latest_by_owner.get(owner))
+            if previous is not None and not previous.finished:
+                logger.info(f"Cancelling stale analysis job {previous.id} for '{owner}'.")
+                previous.cancel()
+            self._jobs[job.id] = job
+            self._latest_by_owner[owner] = job.id
+            job._future = self._pool.submit(self._run, job, profile_data, messages)
+        logger.info(f"Submitted analysis job {job.id} for '{owner}' ({len(messages)} messages).")
+        return job
+
+    def get(self, job_id: str | None) -> AnalysisJob | None:
+        return self._jobs.get(job_id) if job_id else None
+
+    def cancel(self, job_id: str | None):
+        job = self.get(job_id)
+        if job is not None and not job.finished:
+            job.cancel()
+
+    def _run(self, job: AnalysisJob, profile_data: dict, messages: list):
+        if job._cancel.is_set():
+            job._finish("cancelled")
+            return
+        job.status = "running"
+        job.started_at = time.time()
+        try:
+            with trace() as job.spans, span("analysis"):
+                job.result = self.pipeline(profile_data, messages, job._enter_stage)
+            job._finish("done")
+            logger.info(f"Analysis job {job.id} finished in {job.finished_at - job.started_at:.2f}s: {job.stage_times}")
+        except JobCancelled:
+            job._finish("cancelled")
+            logger.info(f"Analysis job {job.id} cancelled during '{job.stage}'.")
+        except Exception as e:
+            job.error = str(e)
+            job._finish("failed")
+            logger.error(f"Analysis job {job.id} failed: {e}", exc_info=True)
+
+    def _prune(self):
+        cutoff = time.time() - JOB_RETENTION_SECONDS
+        for job_id in [j.id for j in self._jobs.values() if j.finished and j.finished_at < cutoff]:
+            job = self._jobs.pop(job_id)
+            if self._latest_by_owner.get(job.owner) == job_id:
+                del self._latest_by_owner[job.owner]
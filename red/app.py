@@ -1,15 +1,23 @@
 # --- app.py (Final Integrated Version with Auto-Concluding Bot) ---
 import streamlit as st
+import functools
 import os
 import logging
 from datetime import datetime
 import time
+import uuid
 
 # Import our backend modules
 from profile_analyzer import calculate_profile_risk
-from chat_analyzer import analyze_chat_history
-from verdict_engine import calculate_final_verdict
-from bot import get_gemini_reply, system_prompt # Use capital SYSTEM_PROMPT from bot.py
+from analysis_jobs import AnalysisJobRunner, connection_extras, run_analysis
+from db_connector import get_db_connection
+from scammer_history import PRIOR_REPORTS_ENABLED
+from alias_index import ALIAS_INDEX_ENABLED
+from chat_parser import read_chat_messages
+from bot import system_prompt # Use capital SYSTEM_PROMPT from bot.py
+from session_manager import AsyncSessionManager, new_engagement_id
+from model_registry import WARM_UP, get_registry, process_rss_mb
+from telemetry import telemetry
 
 # --- Logger Initialization ---
 logger = logging.getLogger(__name__)
@@ -30,17 +38,48 @@ if not logger.handlers:
 st.set_page_config(page_title="Project Sentinel", layout="wide")
 logger.info("Application session started.")
 
+# Heavy NLP models are loaded once per process; start loading the chat-analysis
+# models in the background so the first analysis does not wait for them.
+model_registry = get_registry()
+if WARM_UP:
+    model_registry.warm_up(["sentence_transformer", "spacy_ner"])
+# Stage latency histograms go to TELEMETRY_EXPORT_PATH (if set) for Prometheus
+telemetry.start_exporter()
+
+# One analysis worker pool per server, shared by all analysts' sessions.
+# With PRIOR_REPORTS_ENABLED=1 earlier reports of the username raise its verdict;
+# with ALIAS_INDEX_ENABLED=1 similar reported handles are listed. Both follow
+# the reports submitted through the shared connection.
+@st.cache_resource
+def get_job_runner():
+    connection = get_db_connection() if PRIOR_REPORTS_ENABLED or ALIAS_INDEX_ENABLED else None
+    if connection is None:
+        return AnalysisJobRunner()
+    extras = connection_extras(connection, prior_reports=PRIOR_REPORTS_ENABLED, aliases=ALIAS_INDEX_ENABLED)
+    return AnalysisJobRunner(pipeline=functools.partial(run_analysis, **extras))
+
+# One session manager per server: it rate-limits all analysts' bot turns against
+# the shared Gemini quota and keeps each engagement's turns in order.
+@st.cache_resource
+def get_session_manager():
+    return AsyncSessionManager()
+
 # --- Helper Functions ---
-def read_chat_from_file(uploaded_file):
+def read_chat_from_file(uploaded_file, suspect=None, victim=None):
+    """
+    Streams a WhatsApp/Instagram/Telegram export or plain-text log and returns
+    only the suspect's messages (see chat_parser.read_chat_messages).
+    """
     logger.info("Function entered: read_chat_from_file")
     try:
-        string_data = uploaded_file.getvalue().decode("utf-8")
-        messages = [line.strip() for line in string_data.split('\n') if line.strip()]
-        logger.info(f"Successfully read {len(messages)} messages from file.")
+        uploaded_file.seek(0)
+        messages, summary = read_chat_messages(uploaded_file, suspect=suspect, victim=victim)
+        logger.info(f"Successfully read {summary['total_messages']} messages from file; analyzing {len(messages)}.")
+        st.session_state.chat_summary = summary
         return messages
     except Exception as e:
         logger.error(f"Error reading uploaded file: {e}", exc_info=True)
-        st.error("Could not read the file. Please ensure it's a valid .txt file and try again.")
+        st.error("Could not read the file. Please upload a WhatsApp .txt, Instagram/Telegram .json or plain .txt chat export.")
         return None
 
 # --- Main App UI ---
@@ -55,6 +94,11 @@ if 'display_messages' not in st.session_state:
     st.session_state.display_messages = []
 if 'investigation_concluded' not in st.session_state:
     st.session_state.investigation_concluded = False
+# Each browser session is one analyst; each bot engagement gets its own chat history
+if 'analyst_id' not in st.session_state:
+    st.session_state.analyst_id = uuid.uuid4().hex[:12]
+if 'engagement_id' not in st.session_state:
+    st.session_state.engagement_id = new_engagement_id()
 
 
 # --- Sidebar for Inputs ---
@@ -71,9 +115,14 @@ with st.sidebar:
         is_verified = st.selectbox("Is Account Verified?", (True, False))
 
         st.header("2. Upload Chat Log")
-        uploaded_file = st.file_uploader("Upload chat history (.txt)", type="txt")
+        uploaded_file = st.file_uploader("Upload chat history (WhatsApp .txt, Instagram/Telegram .json)", type=["txt", "json"])
+        victim_name = st.text_input("Your name in the chat export (optional)")
         submit_button = st.form_submit_button("Analyze")
 
+    with st.expander("🧠 Loaded Models"):
+        st.caption(f"Process memory: {process_rss_mb():.0f} MB")
+        st.dataframe(model_registry.report(), hide_index=True)
+
 # --- Main Panel for Outputs ---
 if submit_button:
     logger.info("="*20 + " NEW ANALYSIS STARTED " + "="*20)
@@ -83,7 +132,8 @@ if submit_button:
     st.session_state.red_team_mode = False
     st.session_state.investigation_concluded = False
     st.session_state.display_messages = []
-
+    get_job_runner().cancel(st.session_state.get("analysis_job_id"))
+    st.session_state.analysis_job_id = None
 
     profile_data = {
         'username': username, 'bio': bio, 'followers': followers,
@@ -92,32 +142,56 @@ if submit_button:
         'is_verified': is_verified
     }
     
-    logger.info("Calculating profile risk...")
-    st.session_state.profile_risk, st.session_state.profile_reasons = calculate_profile_risk(profile_data)
-    logger.info(f"Profile risk score is {st.session_state.profile_risk}.")
-    
     if uploaded_file is not None:
-        all_messages = read_chat_from_file(uploaded_file)
+        # Only the suspect's own messages are scored; the profile username picks them out
+        all_messages = read_chat_from_file(uploaded_file, suspect=username or None, victim=victim_name or None)
         if all_messages:
-            logger.info("Starting tiered hybrid chat analysis...")
-            st.session_state.chat_analysis = analyze_chat_history(all_messages)
-            logger.info("Tiered hybrid chat analysis finished.")
-
-            logger.info("Calculating final verdict...")
-            st.session_state.final_verdict = calculate_final_verdict(
-                st.session_state.profile_risk,
-                st.session_state.chat_analysis
-            )
-            logger.info(f"Final verdict score is {st.session_state.final_verdict:.2f}.")
-
-            st.session_state.analysis_complete = True
+            # Profile risk, chat analysis and verdict run as a background job; the
+            # progress fragment below polls it. Resubmitting cancels the stale job.
+            job = get_job_runner().submit(st.session_state.analyst_id, profile_data, all_messages)
+            logger.info(f"Submitted analysis job {job.id}.")
+            st.session_state.analysis_job_id = job.id
             st.session_state.initial_chat = all_messages
+            st.session_state.analysis_started_at = start_time
     else:
+        logger.info("Calculating profile risk...")
+        st.session_state.profile_risk, st.session_state.profile_reasons = calculate_profile_risk(profile_data)
+        logger.info(f"Profile risk score is {st.session_state.profile_risk}.")
         st.warning("Please upload a chat file to get a full analysis.")
         logger.warning("Analysis submitted without a chat file.")
 
-    end_time = time.time()
-    logger.info(f"--- Total analysis duration: {end_time - start_time:.2f} seconds ---")
+
+# --- Background analysis progress (polled without rerunning the whole app) ---
+@st.fragment(run_every=0.5)
+def show_analysis_progress():
+    job = get_job_runner().get(st.session_state.get("analysis_job_id"))
+    if job is None:
+        return
+    if not job.finished:
+        st.progress(job.progress, text=f"Analyzing: {job.stage or 'queued'}...")
+        return
+
+    st.session_state.analysis_job_id = None
+    if job.status == "done":
+        result = job.result
+        st.session_state.profile_risk = result["profile_risk"]
+        st.session_state.profile_reasons = result["profile_reasons"]
+        st.session_state.chat_analysis = result["chat_analysis"]
+        st.session_state.final_verdict = result["final_verdict"]
+        st.session_state.scammer_history = result.get("scammer_history")
+        st.session_state.username_aliases = result.get("username_aliases", [])
+        st.session_state.analysis_spans = job.spans
+        st.session_state.analysis_complete = True
+        logger.info(f"Final verdict score is {st.session_state.final_verdict:.2f}.")
+        logger.info(f"--- Total analysis duration: {time.time() - st.session_state.analysis_started_at:.2f} seconds ---")
+    elif job.status == "failed":
+        st.session_state.analysis_error = job.error
+    st.rerun()
+
+if st.session_state.get("analysis_job_id"):
+    show_analysis_progress()
+if st.session_state.get("analysis_error"):
+    st.error(f"Analysis failed: {st.session_state.pop('analysis_error')}")
 
 
 # --- Display Results if Analysis is Complete ---
@@ -132,9 +206,30 @@ if 'analysis_complete' in st.session_state and st.session_state.analysis_complet
                  delta_color="off" if st.session_state.final_verdict < 60 else "inverse")
 
     with st.expander("Show Detailed Analysis"):
+        chat_summary = st.session_state.get("chat_summary")
+        if chat_summary:
+            st.subheader("Chat Export:")
+            analyzed_from = ", ".join(chat_summary["analyzed_senders"]) or "all senders"
+            st.write(f"- {chat_summary['format'].title()} export, {chat_summary['total_messages']} messages; "
+                     f"analyzed {chat_summary['analyzed_messages']} from **{analyzed_from}**")
+
         st.subheader("Profile Risk Factors:")
         for reason in st.session_state.profile_reasons:
             st.write(f"- {reason}")
+
+        scammer_history = st.session_state.get("scammer_history")
+        if scammer_history:
+            st.subheader("📁 Previously Reported:")
+            last_reported = datetime.fromtimestamp(scammer_history["last_reported_on"] / 1000).strftime('%Y-%m-%d %H:%M')
+            st.write(f"- Reported **{scammer_history['report_count']}** time(s) before, last on {last_reported}")
+            if scammer_history["tactics"]:
+                st.write(f"- Known tactics: {', '.join(scammer_history['tactics'])}")
+
+        username_aliases = st.session_state.get("username_aliases")
+        if username_aliases:
+            st.subheader("🔗 Similar Reported Handles:")
+            for alias, score in username_aliases:
+                st.write(f"- **{alias}** ({score:.0%} similar)")
         
         st.subheader("Chat Analysis Confidence:")
         st.write(f"- **Sextortion/Blackmail:** {analysis.get('sextortion_confidence_score', 0):.0f}%")
@@ -153,6 +248,28 @@ if 'analysis_complete' in st.session_state and st.session_state.analysis_complet
                     for evidence_line in details['evidence']:
                         st.text(f'  - "{evidence_line}"')
 
+        ioc_hits = analysis.get('ioc_hits', [])
+        if ioc_hits:
+            st.subheader("☠️ Known-Bad Indicators:")
+            for hit in ioc_hits:
+                st.error(f"`{hit['indicator']}` is listed in the **{hit['source']}** feed.")
+
+        if telemetry.enabled:
+            st.subheader("⏱️ Stage Timings:")
+            server_stats = telemetry.snapshot()
+            st.dataframe([{
+                "stage": s["stage"],
+                "this analysis (ms)": round(s["seconds"] * 1000, 1),
+                "p50 (ms)": round(server_stats.get(s["stage"], {}).get("p50_s", 0) * 1000, 1),
+                "p95 (ms)": round(server_stats.get(s["stage"], {}).get("p95_s", 0) * 1000, 1),
+                "runs": server_stats.get(s["stage"], {}).get("count", 0),
+            } for s in st.session_state.get("analysis_spans", [])], hide_index=True)
+            col_prom, col_json = st.columns(2)
+            col_prom.download_button("Export metrics (Prometheus)", telemetry.to_prometheus(),
+                                     file_name="sentinel_metrics.prom", mime="text/plain")
+            col_json.download_button("Export metrics (JSON)", telemetry.to_json(),
+                                     file_name="sentinel_metrics.json", mime="application/json")
+
     # --- Threat-specific action nudges ---
     primary_threat = analysis.get('primary_intent')
     if primary_threat == 'Sextortion/Blackmail':
@@ -179,6 +296,7 @@ if 'analysis_complete' in st.session_state and st.session_state.analysis_complet
                 st.session_state.red_team_mode = True
                 st.session_state.display_messages = []
                 st.session_state.investigation_concluded = False # Reset for new session
+                st.session_state.engagement_id = new_engagement_id()
 
 
 # --- Red Teaming Bot Chat Interface (UPGRADED) ---
@@ -204,42 +322,51 @@ if st.session_state.red_team_mode:
         # We append the user message right away so it appears instantly
         st.session_state.display_messages.append({"role": "user", "content": prompt})
 
-        with st.spinner("Alex is thinking and analyzing..."):
-            logger.info("Sending request to Gemini bot...")
-            
-            # This now returns a richer dictionary
-            bot_response_dict = get_gemini_reply(prompt)
-            reply = bot_response_dict.get("reply", "Sorry, an error occurred.")
-            status = bot_response_dict.get("status", "engaging")
-            
-            # --- FEATURES 1 & 2 ADDITION: Check for new flags from the bot ---
-            ai_detected = bot_response_dict.get("ai_detected", False)
-            mimicking_detected = bot_response_dict.get("mimicking_detected", False)
-
-            if ai_detected:
-                logger.warning("AI-like response pattern detected from user.")
-                st.session_state.display_messages.append({
-                    "role": "system_warning",
-                    "content": "⚠️ **AI DETECTED:** The message pattern suggests you may be interacting with an automated bot, not a human."
-                })
-            
-            if mimicking_detected:
-                logger.warning("Deep behavioral mimicking detected from user.")
-                st.session_state.display_messages.append({
-                    "role": "system_warning",
-                    "content": "🚨 **DEEP MIMICKING DETECTED:** The user is closely mirroring the language and style of your previous messages. This is a common manipulation tactic to build false rapport."
-                })
-            
-            logger.info(f"Received reply from bot with status: {status}")
-            
-            # Append the bot's actual reply
-            st.session_state.display_messages.append({"role": "assistant", "content": reply})
-            
-            # --- FEATURE 3 RE-CHECK: Logic for conclusion ---
-            if status == "concluded":
-                st.session_state.investigation_concluded = True
-            
-            st.rerun()
+        with st.chat_message(name="Scammer"):
+            st.markdown(prompt)
+
+        logger.info("Streaming reply from Gemini bot...")
+        # Tokens are rendered as they arrive; the trigger, AI and mimicry
+        # detectors run concurrently with the stream.
+        reply_stream = get_session_manager().stream_reply(
+            st.session_state.analyst_id, st.session_state.engagement_id, prompt)
+        with st.chat_message(name="You (Alex)"):
+            st.write_stream(reply_stream)
+
+        # This now returns a richer dictionary
+        bot_response_dict = reply_stream.result or {}
+        reply = bot_response_dict.get("reply", "Sorry, an error occurred.")
+        status = bot_response_dict.get("status", "engaging")
+        logger.info(f"Time to first token: {reply_stream.time_to_first_token_s}")
+
+        # --- FEATURES 1 & 2 ADDITION: Check for new flags from the bot ---
+        ai_detected = bot_response_dict.get("ai_detected", False)
+        mimicking_detected = bot_response_dict.get("mimicking_detected", False)
+
+        if ai_detected:
+            logger.warning("AI-like response pattern detected from user.")
+            st.session_state.display_messages.append({
+                "role": "system_warning",
+                "content": "⚠️ **AI DETECTED:** The message pattern suggests you may be interacting with an automated bot, not a human."
+            })
+        
+        if mimicking_detected:
+            logger.warning("Deep behavioral mimicking detected from user.")
+            st.session_state.display_messages.append({
+                "role": "system_warning",
+                "content": "🚨 **DEEP MIMICKING DETECTED:** The user is closely mirroring the language and style of your previous messages. This is a common manipulation tactic to build false rapport."
+            })
+        
+        logger.info(f"Received reply from bot with status: {status}")
+        
+        # Append the bot's actual reply
+        st.session_state.display_messages.append({"role": "assistant", "content": reply})
+        
+        # --- FEATURE 3 RE-CHECK: Logic for conclusion ---
+        if status == "concluded":
+            st.session_state.investigation_concluded = True
+        
+        st.rerun()
 
     # --- FEATURE 3 RE-CHECK: Enhanced conclusion display with balloons ---
     if st.session_state.get("investigation_concluded", False):
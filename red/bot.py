@@ -1,13 +1,23 @@
 # --- bot.py (LangChain Version - Restructured and Fixed) ---
 from trigger_analyzer import analyze_for_triggers
-from langchain_google_genai import ChatGoogleGenerativeAI
-import os
-from dotenv import load_dotenv
+import asyncio
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 
+from langchain_core.runnables import RunnableLambda, RunnablePassthrough
 from langchain_core.runnables.history import RunnableWithMessageHistory
-from langchain_core.chat_history import BaseChatMessageHistory
-from langchain_community.chat_message_histories import ChatMessageHistory
+from langchain_core.chat_history import BaseChatMessageHistory, InMemoryChatMessageHistory
 from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.messages import AIMessage, HumanMessage
+
+from llm_client import get_llm
+from logger_config import get_logger
+from session_store import SessionStore, approx_token_count, make_llm_summarizer
+
+logger = get_logger(__name__)
 
 # --- These definitions are safe to run at the top level ---
 # They don't execute complex code, they just define variables.
@@ -53,10 +63,21 @@ prompt = ChatPromptTemplate.from_messages(
     ]
 )
 
-# This dictionary will store chat histories for different sessions
-store = {}
+# Session used by callers that do not pass one (a single shared conversation)
+DEFAULT_SESSION_ID = "default_streamlit_session"
+
+# Chat histories for different sessions: an LRU of idle-evicted sessions persisted
+# to SQLite, with a token-budgeted window of recent turns plus a rolling summary.
+# Created on first use (get_store), so importing bot opens no database.
+_store = None
+_store_lock = threading.Lock()
+# Per-turn prompt size and reply latency, for comparing windowed vs. full history
+# (set BOT_HISTORY_TOKEN_BUDGET=0 to send the full history).
+TURN_METRICS = deque(maxlen=1000)
+_last_prompt_tokens = {}
 # This global variable will hold our initialized bot chain so we only create it once
 _conversation_chain = None
+_reply_chain = None
 
 # --- These are function DEFINITIONS, which are also safe ---
 
@@ -108,27 +129,41 @@ def detect_behavioral_mimicking(user_input: str, history: BaseChatMessageHistory
         
     return False
 
+def get_store() -> SessionStore:
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = SessionStore()
+        return _store
+
 def get_session_history(session_id: str) -> BaseChatMessageHistory:
-    """Retrieves or creates a ChatMessageHistory for a given session ID."""
-    if session_id not in store:
-        store[session_id] = ChatMessageHistory()
-    return store[session_id]
+    """Retrieves or creates the persistent chat history for a given session ID."""
+    return get_store().get(session_id)
+
+def _windowed_history(inputs: dict, config) -> list:
+    """Trims the session history to the token budget before it reaches the prompt."""
+    session_id = config["configurable"]["session_id"]
+    windowed = get_store().window(session_id, inputs.get("history", []))
+    _last_prompt_tokens[session_id] = (
+        approx_token_count(system_prompt + inputs.get("input", ""))
+        + sum(approx_token_count(str(m.content)) for m in windowed)
+    )
+    return windowed
 
 def setup_bot_chain():
     """
     This function handles the actual setup. It's only called when needed.
+    The model comes from llm_client (BOT_LLM_BACKEND=fake for the offline model).
     """
-    load_dotenv()
-    GOOGLE_API_KEY = os.getenv("GEMINI_KEY")
-
-    if not GOOGLE_API_KEY:
-        raise ValueError("GEMINI_KEY not found. Ensure it's in a .env file in the same directory as app.py.")
+    llm = get_llm(temperature=0.8)
+    get_store().summarizer = make_llm_summarizer(llm)
 
-    # --- THIS LINE HAS BEEN CORRECTED ---
-    llm = ChatGoogleGenerativeAI(model="models/gemini-2.5-flash-lite", temperature=0.8, google_api_key=GOOGLE_API_KEY)
+    # The bare reply chain is also streamed directly by aget_gemini_reply
+    global _reply_chain
+    _reply_chain = RunnablePassthrough.assign(history=RunnableLambda(_windowed_history)) | prompt | llm
     
     conversation_chain = RunnableWithMessageHistory(
-        prompt | llm,
+        _reply_chain,
         get_session_history,
         input_messages_key="input",
         history_messages_key="history",
@@ -136,31 +171,61 @@ def setup_bot_chain():
     return conversation_chain
 
 
+def _get_conversation_chain():
+    global _conversation_chain
+    if _conversation_chain is None:
+        _conversation_chain = setup_bot_chain()
+    return _conversation_chain
+
+
+def _record_turn_metrics(session_id: str, response, latency_s: float, time_to_first_token_s: float | None = None):
+    """Logs the prompt size, reply latency and (for streamed replies) time to first token of one bot turn."""
+    usage = getattr(response, "usage_metadata", None) or {}
+    # Prefer the model's own count; fall back to the estimate made when windowing
+    # (always taken out, so the estimates do not pile up one per session)
+    estimate = _last_prompt_tokens.pop(session_id, None)
+    prompt_tokens = usage.get("input_tokens") or estimate
+    metrics = {
+        "session_id": session_id,
+        "prompt_tokens": prompt_tokens,
+        "reply_latency_s": round(latency_s, 3),
+        "time_to_first_token_s": round(time_to_first_token_s, 3) if time_to_first_token_s is not None else None,
+        "history_token_budget": get_store().token_budget,
+    }
+    TURN_METRICS.append(metrics)
+    logger.info(f"Bot turn metrics: {metrics}")
+
+
+def _conclusion_result(trigger: dict) -> dict:
+    """The reply returned instead of an LLM answer once a conclusion trigger is found."""
+    reply = f"CONFIRMED THREAT. The user provided a potential **{trigger['type']}**: `{trigger['value']}`. This is a definitive honeytrap indicator."
+    if trigger.get("reputation"):
+        reply += f" It is listed as known-bad in the **{trigger['reputation']['source']}** feed."
+    return {
+        "reply": reply,
+        "status": "concluded",
+        "trigger_info": trigger,
+        "ai_detected": False, # Not relevant if concluded
+        "mimicking_detected": False, # Not relevant if concluded
+    }
+
 # --- This is the MAIN function that Streamlit will call ---
 # It now handles the setup logic internally.
-def get_gemini_reply(user_input: str) -> dict:
+def get_gemini_reply(user_input: str, session_id: str = DEFAULT_SESSION_ID) -> dict:
     """
     Gets a reply AND analyzes the scammer's input for triggers.
     Returns a dictionary containing the reply and the session status.
+    `session_id` keys the chat history (see session_manager.session_key).
     """
-    global _conversation_chain
-    if _conversation_chain is None:
-        _conversation_chain = setup_bot_chain()
+    conversation_chain = _get_conversation_chain()
 
-    session_id = "default_streamlit_session"
     history = get_session_history(session_id)
 
     # --- FEATURE 3 (EXISTING): Analyze for conclusion triggers BEFORE replying ---
     trigger = analyze_for_triggers(user_input)
     if trigger:
         # If a trigger is found, we can conclude the investigation!
-        return {
-            "reply": f"CONFIRMED THREAT. The user provided a potential **{trigger['type']}**: `{trigger['value']}`. This is a definitive honeytrap indicator.",
-            "status": "concluded",
-            "trigger_info": trigger,
-            "ai_detected": False, # Not relevant if concluded
-            "mimicking_detected": False, # Not relevant if concluded
-        }
+        return _conclusion_result(trigger)
     
     # --- FEATURES 1 & 2 (NEW): Run our new detectors on the user's input ---
     ai_detected = detect_ai_patterns(user_input)
@@ -168,10 +233,12 @@ def get_gemini_reply(user_input: str) -> dict:
 
 
     # If no trigger, proceed with the normal conversation
-    response = _conversation_chain.invoke(
+    start_time = time.perf_counter()
+    response = conversation_chain.invoke(
         {"input": user_input},
         config={"configurable": {"session_id": session_id}}
     )
+    _record_turn_metrics(session_id, response, time.perf_counter() - start_time)
     
     return {
         "reply": response.content.strip(),
@@ -179,4 +246,137 @@ def get_gemini_reply(user_input: str) -> dict:
         "trigger_info": None,
         "ai_detected": ai_detected,
         "mimicking_detected": mimicking_detected
-    }
\ No newline at end of file
+    }
+
+
+# --- Async variant (used by session_manager to drive many sessions at once) ---
+# The detectors run on this pool, concurrently with the LLM call.
+_detector_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="bot-detectors")
+
+
+async def aget_gemini_reply(user_input: str, session_id: str = DEFAULT_SESSION_ID, on_token=None) -> dict:
+    """
+    Async counterpart of `get_gemini_reply`; returns the same dictionary.
+
+    With `on_token`, the reply is streamed: every text chunk is passed to
+    on_token(chunk) as it arrives, and the detectors run while the first tokens
+    are on their way. If a conclusion trigger is found, the LLM stream is
+    abandoned and the conclusion message is sent instead.
+    Turns of one session must not overlap; session_manager queues them.
+    """
+    conversation_chain = _get_conversation_chain()
+    loop = asyncio.get_running_loop()
+    history = await loop.run_in_executor(None, get_session_history, session_id)
+    messages = await history.aget_messages()
+    trigger_future = loop.run_in_executor(_detector_pool, analyze_for_triggers, user_input)
+    ai_future = loop.run_in_executor(_detector_pool, detect_ai_patterns, user_input)
+    mimicking_future = loop.run_in_executor(
+        _detector_pool, detect_behavioral_mimicking, user_input, InMemoryChatMessageHistory(messages=messages))
+    start_time = time.perf_counter()
+
+    if on_token is None:
+        trigger = await trigger_future
+        if trigger:
+            return _conclusion_result(trigger)
+        response = await conversation_chain.ainvoke(
+            {"input": user_input},
+            config={"configurable": {"session_id": session_id}}
+        )
+        _record_turn_metrics(session_id, response, time.perf_counter() - start_time)
+        reply = response.content.strip()
+    else:
+        time_to_first_token_s = None
+        full_message = None
+        chunks = _reply_chain.astream(
+            {"input": user_input, "history": messages},
+            config={"configurable": {"session_id": session_id}}
+        )
+        try:
+            async for chunk in chunks:
+                if full_message is None:
+                    # First token is here; the detectors ran in the meantime
+                    time_to_first_token_s = time.perf_counter() - start_time
+                    trigger = await trigger_future
+                    if trigger:
+                        result = _conclusion_result(trigger)
+                        on_token(result["reply"])
+                        return result
+                full_message = chunk if full_message is None else full_message + chunk
+                if chunk.content:
+                    on_token(chunk.content)
+        finally:
+            await chunks.aclose()
+
+        if full_message is None:
+            trigger = await trigger_future
+            if trigger:
+                result = _conclusion_result(trigger)
+                on_token(result["reply"])
+                return result
+
+        reply = (full_message.content if full_message is not None else "").strip()
+        await history.aadd_messages([HumanMessage(content=user_input), AIMessage(content=reply)])
+        _record_turn_metrics(session_id, full_message, time.perf_counter() - start_time, time_to_first_token_s)
+
+    return {
+        "reply": reply,
+        "status": "engaging",
+        "trigger_info": None,
+        "ai_detected": await ai_future,
+        "mimicking_detected": await mimicking_future,
+    }
+
+
+# --- Streaming variant (token-by-token replies for st.write_stream) ---
+# Without a session manager, streamed turns run on this module's own event loop.
+_loop = None
+_loop_lock = threading.Lock()
+
+
+def _submit_turn(user_input: str, session_id: str, on_token) -> Future:
+    """Schedules `aget_gemini_reply` on the background event loop."""
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="bot-event-loop", daemon=True).start()
+    return asyncio.run_coroutine_threadsafe(aget_gemini_reply(user_input, session_id, on_token), _loop)
+
+
+class ReplyStream:
+    """
+    Iterable of reply text chunks for one bot turn, for a synchronous caller
+    such as st.write_stream.
+
+    The turn itself runs as `aget_gemini_reply` on an event loop; `submit`
+    schedules it (default: this module's background loop, or a
+    session_manager.AsyncSessionManager to rate-limit and order the turns).
+    After iteration, `result` holds the same dictionary `get_gemini_reply` returns.
+    """
+
+    _END = object()
+
+    def __init__(self, user_input: str, session_id: str, submit=None):
+        self.user_input = user_input
+        self.session_id = session_id
+        self.result = None
+        self.time_to_first_token_s = None
+        self._start_time = time.perf_counter()
+        self._chunks = queue.Queue()
+        self._future = (submit or _submit_turn)(user_input, session_id, self._chunks.put)
+        self._future.add_done_callback(lambda _: self._chunks.put(self._END))
+
+    def __iter__(self):
+        while (chunk := self._chunks.get()) is not self._END:
+            if self.time_to_first_token_s is None:
+                self.time_to_first_token_s = time.perf_counter() - self._start_time
+            yield chunk
+        self.result = self._future.result()
+
+
+def stream_gemini_reply(user_input: str, session_id: str = DEFAULT_SESSION_ID) -> ReplyStream:
+    """
+    Streaming counterpart of `get_gemini_reply`: returns a ReplyStream to pass to
+    st.write_stream; read `.result` once it has been consumed.
+    """
+    return ReplyStream(user_input, session_id)
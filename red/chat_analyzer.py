@@ -13,7 +13,10 @@ if classifier_path not in sys.path:
 # --- Import your custom classifier, logger, and psychological analyzer ---
 from classify import classify_message_window
 from logger_config import get_logger
+from profiler_hooks import profiled
 from psychological_analyzer import analyze_psychological_patterns
+from telemetry import span
+from trigger_analyzer import find_known_bad_indicators
 
 logger = get_logger(__name__)
 
@@ -38,11 +41,15 @@ TECH_HONEYTRAP_KEYWORDS = {
 }
 
 
-def analyze_chat_history(message_history: list):
+@profiled("analyze_chat_history")
+def analyze_chat_history(message_history: list, progress=None):
     """
     Analyzes chat history using a hybrid approach with a threat hierarchy.
     Now includes a psychological profiling layer.
+    `progress(stage)` is called as each step starts (see analysis_jobs.py); it may
+    raise to abort the analysis.
     """
+    progress = progress or (lambda stage: None)
     # --- THIS IS THE CORRECTED BLOCK ---
     if not message_history:
         logger.warning("analyze_chat_history called with empty message_history. Returning default.")
@@ -54,6 +61,7 @@ def analyze_chat_history(message_history: list):
             "primary_intent": "N/A",
             "keywords_found": {"spam": [], "sextortion": [], "tech": []},
             "psychological_analysis": {"total_risk_score": 0},
+            "ioc_hits": [],
             "raw_classifier_output": None
         }
     # --- END OF CORRECTION ---
@@ -61,25 +69,41 @@ def analyze_chat_history(message_history: list):
     logger.info("Starting tiered hybrid chat analysis.")
 
     # --- Step 1 & 2 (Unchanged) ---
+    progress("Keyword scan")
     full_text = " ".join(message_history).lower()
-    found_spam_keywords = {kw for kw in SPAM_KEYWORDS if kw in full_text}
-    found_sextortion_keywords = {kw for kw in SEXTORTION_KEYWORDS if kw in full_text}
-    found_tech_keywords = {kw for kw in TECH_HONEYTRAP_KEYWORDS if kw in full_text}
+    with span("keywords.spam"):
+        found_spam_keywords = {kw for kw in SPAM_KEYWORDS if kw in full_text}
+    with span("keywords.sextortion"):
+        found_sextortion_keywords = {kw for kw in SEXTORTION_KEYWORDS if kw in full_text}
+    with span("keywords.tech"):
+        found_tech_keywords = {kw for kw in TECH_HONEYTRAP_KEYWORDS if kw in full_text}
     
+    progress("Intent classifier")
     try:
-        raw_analysis = classify_message_window(message_history)
+        with span("intent_classifier"):
+            raw_analysis = classify_message_window(message_history)
         logger.info(f"Custom classifier returned: {raw_analysis}")
     except Exception as e:
         logger.error(f"Error calling classify_message_window: {e}", exc_info=True)
         raw_analysis = None
         
     # --- Step 3 - Perform Psychological Analysis ---
+    progress("Psychological analysis")
     logger.info("Performing psychological pattern analysis...")
-    psych_analysis = analyze_psychological_patterns(message_history)
+    with span("psychological_analysis"):
+        psych_analysis = analyze_psychological_patterns(message_history)
     psych_total_score = psych_analysis.get('total_risk_score', 0)
     logger.info(f"Psychological analysis returned total risk score: {psych_total_score}")
 
+    # --- Step 3b - Check extracted URLs/wallets/emails against the offline IOC store ---
+    progress("IOC lookup")
+    with span("ioc_lookup"):
+        ioc_hits = find_known_bad_indicators(message_history)
+    if ioc_hits:
+        logger.warning(f"Known-bad indicators found in chat: {ioc_hits}")
+
     # --- Step 4: Combine results and calculate confidence scores (MODIFIED) ---
+    progress("Scoring")
     spam_score_from_classifier = 0
     if raw_analysis and raw_analysis.get("anomaly"):
         spam_score_from_classifier = raw_analysis.get("confidence", 0) * 100
@@ -117,6 +141,7 @@ def analyze_chat_history(message_history: list):
             "tech": list(found_tech_keywords)
         },
         "psychological_analysis": psych_analysis,
+        "ioc_hits": ioc_hits,
         "raw_classifier_output": raw_analysis
     }
     
@@ -0,0 +1,330 @@
+# --- chat_parser.py ---
+# Streaming parser for chat exports: WhatsApp (.txt, Android and iOS layouts),
+# Instagram (message_N.json), Telegram Desktop (result.json) and plain text.
+#
+# Exports are read in fixed-size chunks and messages are yielded one at a time,
+# so a multi-hundred-MB export is never decoded into memory in one piece.
+# JSON exports are walked object by object with JSONDecoder.raw_decode.
+# WhatsApp continuation lines are joined to the message they belong to.
+#
+# `read_chat_messages` keeps only the suspected scammer's messages, so the
+# analyzers neither spend time on, nor get keyword hits from, the victim's words.
+
+import io
+import json
+import re
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Iterator, NamedTuple
+
+from logger_config import get_logger
+
+logger = get_logger(__name__)
+
+CHUNK_SIZE = 1 << 16
+FORMATS = ("whatsapp", "instagram", "telegram", "text")
+
+# WhatsApp media and deletion placeholders carry no text worth scoring
+WHATSAPP_PLACEHOLDERS = {"<media omitted>", "this message was deleted", "you deleted this message", "null"}
+
+# "12/31/23, 10:15 PM - Name: text" (Android) and "[31/12/2023, 22:15:03] Name: text" (iOS)
+_WHATSAPP_ANDROID = re.compile(
+    r"^(\d{1,2})[/.-](\d{1,2})[/.-](\d{2,4}),? (\d{1,2}):(\d{2})(?::(\d{2}))?\s?([APap]\.?[Mm]\.?)? - (.*)$")
+_WHATSAPP_IOS = re.compile(
+    r"^\[(\d{1,2})[/.-](\d{1,2})[/.-](\d{2,4}),? (\d{1,2}):(\d{2})(?::(\d{2}))?\s?([APap]\.?[Mm]\.?)?\] (.*)$")
+_WHATSAPP_SENDER = re.compile(r"^([^:]{1,80}): (.*)$", re.DOTALL)
+# Direction marks WhatsApp puts in front of iOS lines and attachment names
+_BIDI_MARKS = "\u200e\u200f\ufeff"
+
+
+class ChatMessage(NamedTuple):
+    sender: str | None
+    timestamp: datetime | None
+    text: str
+
+
+# --- Reading ---
+def _open_text(source):
+    """Path, binary file object (e.g. a Streamlit upload) or text file object -> text stream."""
+    if isinstance(source, str):
+        return open(source, "r", encoding="utf-8", errors="replace", newline="")
+    if isinstance(source.read(0), bytes):
+        return io.TextIOWrapper(source, encoding="utf-8", errors="replace", newline="")
+    return source
+
+
+def _chunks(head: str, stream, chunk_size: int, close: bool) -> Iterator[str]:
+    try:
+        if head:
+            yield head
+        while chunk := stream.read(chunk_size):
+            yield chunk
+    finally:
+        if close:
+            stream.close()
+
+
+def _lines(chunks: Iterator[str]) -> Iterator[str]:
+    tail = ""
+    for chunk in chunks:
+        lines = (tail + chunk).split("\n")
+        tail = lines.pop()
+        for line in lines:
+            yield line.rstrip("\r")
+    if tail:
+        yield tail.rstrip("\r")
+
+
+def detect_format(head: str) -> str:
+    """Guesses the export format from the first chunk of the file."""
+    stripped = head.lstrip(_BIDI_MARKS + " \t\r\n")
+    if stripped.startswith("{"):
+        if '"sender_name"' in head or '"participants"' in head:
+            return "instagram"
+        return "telegram"
+    for line in head.split("\n")[:20]:
+        line = line.lstrip(_BIDI_MARKS)
+        if _WHATSAPP_ANDROID.match(line) or _WHATSAPP_IOS.match(line):
+            return "whatsapp"
+    return "text"
+
+
+# --- WhatsApp ---
+class _WhatsAppDates:
+    """Parses WhatsApp dates, switching to day-first once a day above 12 shows it must be."""
+
+    def __init__(self):
+        self.day_first = False
+
+    def parse(self, a, b, year, hour, minute, second, meridiem) -> datetime | None:
+        a, b, year, hour = int(a), int(b), int(year), int(hour)
+        if a > 12:
+            self.day_first = True
+        day, month = (a, b) if self.day_first and b <= 12 else (b, a)
+        if year < 100:
+            year += 2000
+        if meridiem:
+            meridiem = meridiem.replace(".", "").lower()
+            hour = hour % 12 + (12 if meridiem == "pm" else 0)
+        try:
+            return datetime(year, month, day, hour, int(minute), int(second or 0))
+        except ValueError:
+            return None
+
+
+def _parse_whatsapp(chunks: Iterator[str]) -> Iterator[ChatMessage]:
+    dates = _WhatsAppDates()
+    layouts = [_WHATSAPP_ANDROID, _WHATSAPP_IOS]
+    last_stamp, last_timestamp = None, None
+    current = None  # [sender, timestamp, [lines]]
+    for line in _lines(chunks):
+        clean = line.lstrip(_BIDI_MARKS)
+        match = layouts[0].match(clean)
+        if match is None:
+            match = layouts[1].match(clean)
+            if match is not None:
+                layouts.reverse()  # try this file's layout first from now on
+        if match is None:
+            # A continuation line of a multi-line message
+            if current is not None:
+                current[2].append(line)
+            continue
+        if current is not None:
+            message = _whatsapp_message(*current)
+            if message is not None:
+                yield message
+        stamp = match.groups()[:7]
+        if stamp != last_stamp:
+            # Consecutive messages often share the minute; parse each stamp once
+            last_stamp, last_timestamp = stamp, dates.parse(*stamp)
+        body = match.group(8).lstrip(_BIDI_MARKS)
+        sender_match = _WHATSAPP_SENDER.match(body)
+        if sender_match:
+            current = [sender_match.group(1).strip(), last_timestamp, [sender_match.group(2)]]
+        else:
+            current = [None, last_timestamp, [body]]  # system notice ("X added Y", encryption notice)
+    if current is not None:
+        message = _whatsapp_message(*current)
+        if message is not None:
+            yield message
+
+
+def _whatsapp_message(sender, timestamp, lines) -> ChatMessage | None:
+    text = (lines[0] if len(lines) == 1 else "\n".join(lines)).strip()
+    if sender is None or not text or text.lower().strip(_BIDI_MARKS) in WHATSAPP_PLACEHOLDERS:
+        return None
+    return ChatMessage(sender, timestamp, text)
+
+
+# --- JSON exports ---
+_decoder = json.JSONDecoder()
+
+
+def _iter_json_array(chunks: Iterator[str], key: str, chunk_size: int) -> Iterator[dict]:
+    """Yields the items of the top-level array `key` one by one, reading only as far as needed."""
+    opener = re.compile(r'"%s"\s*:\s*\[' % re.escape(key))
+    buffer, pos = "", 0
+    for chunk in chunks:
+        buffer += chunk
+        match = opener.search(buffer)
+        if match:
+            pos = match.end()
+            break
+    else:
+        raise ValueError(f"No '{key}' array found in the export.")
+
+    while True:
+        while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+            pos += 1
+        if pos < len(buffer) and buffer[pos] == "]":
+            return
+        try:
+            if pos >= len(buffer):
+                raise json.JSONDecodeError("Need more data", buffer, pos)
+            item, pos = _decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            chunk = next(chunks, None)
+            if chunk is None:
+                raise ValueError(f"The export ends inside the '{key}' array (truncated file?).")
+            buffer, pos = buffer[pos:] + chunk, 0
+            continue
+        yield item
+        if pos > chunk_size:
+            buffer, pos = buffer[pos:], 0
+
+
+def _fix_instagram_text(text: str) -> str:
+    # Instagram writes UTF-8 bytes as \u00XX escapes, one per byte
+    try:
+        return text.encode("latin-1").decode("utf-8")
+    except (UnicodeEncodeError, UnicodeDecodeError):
+        return text
+
+
+def _parse_instagram(chunks: Iterator[str], chunk_size: int) -> Iterator[ChatMessage]:
+    for item in _iter_json_array(chunks, "messages", chunk_size):
+        content = item.get("content")
+        if not content:
+            continue  # photos, reactions, shares without text
+        timestamp_ms = item.get("timestamp_ms")
+        timestamp = datetime.fromtimestamp(timestamp_ms / 1000, tz=timezone.utc) if timestamp_ms else None
+        sender = item.get("sender_name")
+        yield ChatMessage(_fix_instagram_text(sender) if sender else None, timestamp, _fix_instagram_text(content))
+
+
+def _telegram_text(text) -> str:
+    if isinstance(text, list):
+        return "".join(part if isinstance(part, str) else part.get("text", "") for part in text)
+    return text or ""
+
+
+def _parse_telegram(chunks: Iterator[str], chunk_size: int) -> Iterator[ChatMessage]:
+    for item in _iter_json_array(chunks, "messages", chunk_size):
+        if item.get("type", "message") != "message":
+            continue  # service messages (joins, calls, pins)
+        text = _telegram_text(item.get("text")).strip()
+        if not text:
+            continue
+        try:
+            timestamp = datetime.fromisoformat(item["date"]) if item.get("date") else None
+        except ValueError:
+            timestamp = None
+        yield ChatMessage(item.get("from"), timestamp, text)
+
+
+def _parse_text(chunks: Iterator[str]) -> Iterator[ChatMessage]:
+    # One anonymous message per non-empty line
+    for line in _lines(chunks):
+        line = line.strip()
+        if line:
+            yield ChatMessage(None, None, line)
+
+
+def _open_export(source, fmt: str | None, chunk_size: int) -> tuple[str, Iterator[ChatMessage]]:
+    stream = _open_text(source)
+    head = stream.read(chunk_size)
+    fmt = fmt or detect_format(head)
+    chunks = _chunks(head, stream, chunk_size, close=isinstance(source, str))
+    if fmt == "whatsapp":
+        return fmt, _parse_whatsapp(chunks)
+    if fmt == "instagram":
+        return fmt, _parse_instagram(chunks, chunk_size)
+    if fmt == "telegram":
+        return fmt, _parse_telegram(chunks, chunk_size)
+    if fmt == "text":
+        return fmt, _parse_text(chunks)
+    raise ValueError(f"Unknown chat export format '{fmt}'; expected one of {FORMATS}.")
+
+
+def iter_messages(source, fmt: str | None = None, chunk_size: int = CHUNK_SIZE) -> Iterator[ChatMessage]:
+    """
+    Yields the ChatMessages of an export one by one.
+
+    Args:
+        source: File path, or a binary/text file object.
+        fmt: One of FORMATS; detected from the first chunk when None.
+        chunk_size: Characters read at a time.
+    """
+    return _open_export(source, fmt, chunk_size)[1]
+
+
+# --- Picking the scammer's messages ---
+def _normalize_name(name: str) -> str:
+    return re.sub(r"[^0-9a-z]", "", name.lower().lstrip("@"))
+
+
+def read_chat_messages(source, suspect: str | None = None, victim: str | None = None,
+                       fmt: str | None = None, chunk_size: int = CHUNK_SIZE) -> tuple[list[str], dict]:
+    """
+    Reads an export and returns (messages to analyze, summary).
+
+    Only the suspect's messages are kept: those from `suspect` (matched ignoring
+    case, '@' and punctuation); failing that, those from anyone but `victim`;
+    failing that, every message. Messages come back in chronological order.
+    The summary holds the format, the number of messages, the message count per
+    sender and the senders that were analyzed.
+    """
+    fmt, messages = _open_export(source, fmt, chunk_size)
+    suspect_key = _normalize_name(suspect) if suspect else None
+    senders = Counter()
+    names = {}  # sender -> (shared name string, is the named suspect)
+    parsed = []
+    suspect_seen = False
+    total = 0
+    first_ts = last_ts = None
+    for message in messages:
+        total += 1
+        entry = names.get(message.sender)
+        if entry is None:
+            is_named = bool(message.sender and suspect_key) and _normalize_name(message.sender) == suspect_key
+            entry = names[message.sender] = (message.sender, is_named)
+            if is_named and not suspect_seen:
+                # The named suspect is in this chat: nobody else's messages are needed
+                suspect_seen = True
+                parsed = [(sender, text) for sender, text in parsed if names[sender][1]]
+        sender, is_named = entry
+        senders[sender] += 1
+        if is_named or not suspect_seen:
+            parsed.append((sender, message.text))
+        first_ts = first_ts or message.timestamp
+        last_ts = message.timestamp or last_ts
+
+    analyzed = {sender for sender, is_named in names.values() if is_named}
+    if not analyzed and victim:
+        analyzed = {s for s in senders if s and _normalize_name(s) != _normalize_name(victim)}
+    if not analyzed and (suspect or victim):
+        logger.warning(f"No sender matched suspect={suspect!r} victim={victim!r}; analyzing all messages.")
+    selected = [text for sender, text in parsed if not analyzed or sender in analyzed]
+    if fmt == "instagram" and first_ts and last_ts and first_ts > last_ts:
+        selected.reverse()  # Instagram exports are newest first
+
+    summary = {
+        "format": fmt,
+        "total_messages": total,
+        "senders": {str(sender): count for sender, count in senders.most_common()},
+        "analyzed_senders": sorted(analyzed),
+        "analyzed_messages": len(selected),
+    }
+    logger.info(f"Parsed {fmt} chat export: {summary['total_messages']} messages, "
+                f"analyzing {len(selected)} from {summary['analyzed_senders'] or 'all senders'}.")
+    return selected, summary
@@ -1,100 +1,314 @@
 # --- db_connector.py ---
 
 from neo4j import GraphDatabase
-import streamlit as st
+from neo4j.exceptions import AuthError, DriverError, TransientError
+import functools
 import logging
+import os
+import sys
+import threading
+import time
+
+# The report Cypher and node keys live with the rest of the graph schema in
+# database/reports.py (repo root on the path, as model_registry.py does for its packages)
+_repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _repo_root not in sys.path:
+    sys.path.append(_repo_root)
+
+from database.reports import (QUERIES, REPORT_BATCH_SIZE, SCAMMER_HISTORY_QUERY, SCAMMER_USERNAMES_QUERY,  # noqa: E402,F401
+                              UNIQUE_KEYS, WRITE_REPORTS_QUERY, report_params, write_reports_tx)
+from report_spool import RETRYABLE_ERRORS, SPOOL_DB_PATH, SPOOL_ENABLED, ReportSpool  # noqa: E402
+from telemetry import span  # noqa: E402
 
 log = logging.getLogger(__name__)
 
+# Write failures that are not the reports' fault (Aura unreachable, a dropped
+# connection, bad credentials, a transient server error): the spool backs off
+# and retries them as they are instead of splitting the batch or dead-lettering.
+RETRYABLE_WRITE_ERRORS = RETRYABLE_ERRORS + (DriverError, AuthError, TransientError)
+
+# Seconds after a failed connection attempt before the next one: reads and
+# writes in between fail at once instead of each waiting out the driver's
+# connection timeout while Aura is unreachable.
+RECONNECT_INTERVAL_S = float(os.getenv("NEO4J_RECONNECT_INTERVAL_S", "30"))
+
+try:
+    import streamlit as st
+    _cache_resource = st.cache_resource
+except ImportError:  # bulk loaders and benchmarks run without Streamlit
+    st = None
+    _cache_resource = functools.lru_cache(maxsize=None)
+
+
+def _chunked(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
 class Neo4jConnection:
     
-    def __init__(self, uri, user, password):
+    def __init__(self, uri, user, password, driver=None, spool_path=None):
+        # `driver`: an already-built driver (or a stand-in) to use instead of connecting
+        # `spool_path`: spool reports there (report_spool.ReportSpool) and write them in the background
+        self._uri = uri
+        self._auth = (user, password)
+        self._driver = driver
+        self._connect_failed_at = float("-inf")
+        self._connecting = threading.Lock()
+        self._report_listeners = []
+        self.spool = None
+        if spool_path:
+            self.spool = ReportSpool(self.write_reports, spool_path, retryable_errors=RETRYABLE_WRITE_ERRORS)
+            self.spool.start()
+        if driver is not None:
+            return
         try:
-            self._driver = GraphDatabase.driver(uri, auth=(user, password))
-            # Verify that the connection is valid
-            self._driver.verify_connectivity()
-            log.info("Successfully connected to Neo4j Aura.")
+            self._connect()
         except Exception as e:
             log.error(f"Failed to create Neo4j driver: {e}")
             self._driver = None
+            self._connect_failed_at = time.monotonic()
+
+    def _connect(self):
+        driver = GraphDatabase.driver(self._uri, auth=self._auth)
+        # Verify that the connection is valid; a driver that cannot connect is
+        # closed, or every retry while Aura is down would leak its pool
+        try:
+            driver.verify_connectivity()
+        except Exception:
+            driver.close()
+            raise
+        self._driver = driver
+        log.info("Successfully connected to Neo4j Aura.")
+
+    def _connected_driver(self):
+        """
+        The driver, connecting first if there is none. Raises ConnectionError
+        without trying while another thread connects, or within
+        RECONNECT_INTERVAL_S of a failed attempt.
+        """
+        if self._driver is not None:
+            return self._driver
+        if time.monotonic() - self._connect_failed_at < RECONNECT_INTERVAL_S:
+            raise ConnectionError("Neo4j is unreachable; waiting before reconnecting.")
+        if not self._connecting.acquire(blocking=False):
+            raise ConnectionError("Neo4j is unreachable; a reconnect is in progress.")
+        try:
+            if self._driver is None:
+                self._connect()
+        except Exception:
+            self._connect_failed_at = time.monotonic()
+            raise
+        finally:
+            self._connecting.release()
+        return self._driver
 
     def close(self):
+        if self.spool is not None:
+            self.spool.close()
         if self._driver is not None:
             self._driver.close()
 
+    def add_report_listener(self, listener):
+        """
+        Calls listener(username) for every reported username once its report is
+        submitted, and again once a spooled report is written to Neo4j, e.g.
+        scammer_history.ScammerHistoryCache.invalidate. A lookup made before the
+        spool flushes still sees the old history; the second call drops it.
+        """
+        self._report_listeners.append(listener)
+
+    def _reported(self, reports):
+        for username in dict.fromkeys(report["username"] for report in reports):
+            for listener in self._report_listeners:
+                try:
+                    listener(username)
+                except Exception as e:
+                    log.error(f"Report listener failed for '{username}': {e}", exc_info=True)
+
     def submit_report(self, user_session_id, profile_data, chat_analysis, final_verdict):
         """
         Submits a full analysis report to the Neo4j database.
         Creates nodes and relationships based on our data model.
+        With a spool, the report is spooled locally and written in the background.
         """
+        params = report_params(user_session_id, profile_data, chat_analysis, final_verdict)
+        if self.spool is not None:
+            self.spool.append(params)
+            log.info(f"Spooled report {params['report_id']} for scammer: {profile_data['username']}")
+            self._reported([params])
+            return True
+
         if self._driver is None:
             log.error("Cannot submit report, Neo4j driver not available.")
             return False
             
         with self._driver.session(database="neo4j") as session:
             try:
-                # Use a single transaction to ensure all or nothing is written
-                session.execute_write(self._create_report_tx, user_session_id, profile_data, chat_analysis, final_verdict)
+                # One statement in one transaction: all or nothing is written
+                with span("neo4j_write"):
+                    session.execute_write(self._write_reports_tx, [params])
                 log.info(f"Successfully submitted report for scammer: {profile_data['username']}")
-                return True
             except Exception as e:
                 log.error(f"Failed to write report to Neo4j: {e}", exc_info=True)
                 return False
+        self._reported([params])
+        return True
 
-    @staticmethod
-    def _create_report_tx(tx, user_session_id, profile, analysis, final_verdict):
-        # 1. Create or Merge the User node (the person reporting)
-        tx.run("MERGE (u:User {id: $session_id})", session_id=user_session_id)
+    def write_reports(self, reports):
+        """
+        Writes report_params dicts in one transaction, (re)connecting first if
+        needed; raises on failure. The spool flusher drains through this.
+        """
+        with self._connected_driver().session(database="neo4j") as session:
+            with span("neo4j_write"):
+                session.execute_write(self._write_reports_tx, reports)
+        self._reported(reports)
 
-        # 2. Create or Merge the Scammer node
-        scammer_query = """
-        MERGE (s:Scammer {username: $username})
-        ON CREATE SET 
-            s.followers = $followers, s.following = $following, s.bio = $bio, 
-            s.is_private = $is_private, s.is_verified = $is_verified, 
-            s.report_count = 1, s.first_reported_on = timestamp(), s.last_reported_on = timestamp()
-        ON MATCH SET 
-            s.followers = $followers, s.following = $following, s.bio = $bio, 
-            s.is_private = $is_private, s.is_verified = $is_verified, 
-            s.report_count = s.report_count + 1, s.last_reported_on = timestamp()
+    def submit_reports(self, batch, batch_size: int = REPORT_BATCH_SIZE) -> int:
         """
-        tx.run(scammer_query, 
-               username=profile['username'], followers=profile.get('followers'),
-               following=profile.get('following'), bio=profile.get('bio'),
-               is_private=profile.get('is_private'), is_verified=profile.get('is_verified'))
-
-        # 3. Create the REPORTED relationship
-        tx.run("""
-        MATCH (u:User {id: $session_id})
-        MATCH (s:Scammer {username: $username})
-        MERGE (u)-[r:REPORTED {timestamp: timestamp()}]->(s)
-        SET r.final_verdict_score = $score
-        """, session_id=user_session_id, username=profile['username'], score=final_verdict)
-
-        # 4. Create Tactic nodes and relationships
-        psych_analysis = analysis.get('psychological_analysis', {})
-        for tactic, details in psych_analysis.items():
-            if tactic != 'total_risk_score' and details.get('score', 0) > 0:
-                tx.run("""
-                MATCH (s:Scammer {username: $username})
-                MERGE (t:Tactic {name: $tactic_name})
-                MERGE (s)-[:USED_TACTIC]->(t)
-                """, username=profile['username'], tactic_name=tactic)
+        Bulk version of `submit_report`: `batch` is an iterable of
+        (user_session_id, profile_data, chat_analysis, final_verdict) tuples.
+        Writes `batch_size` reports per transaction (one statement each) and
+        returns how many were written; a failed transaction is logged and skipped.
+        """
+        if self._driver is None:
+            log.error("Cannot submit reports, Neo4j driver not available.")
+            return 0
+
+        written = 0
+        with self._driver.session(database="neo4j") as session:
+            for chunk in _chunked((report_params(*report) for report in batch), batch_size):
+                try:
+                    with span("neo4j_write"):
+                        session.execute_write(self._write_reports_tx, chunk)
+                    written += len(chunk)
+                    self._reported(chunk)
+                except Exception as e:
+                    log.error(f"Failed to write {len(chunk)} reports to Neo4j: {e}", exc_info=True)
+        log.info(f"Submitted {written} reports in batches of {batch_size}.")
+        return written
+
+    def get_scammer_history(self, username) -> dict | None:
+        """
+        Prior reports of `username`: report_count, first/last_reported_on (epoch
+        ms) and the sorted tactics seen; None if it was never reported. Raises
+        if Neo4j cannot be reached (at once between reconnect attempts).
+        """
+        with self._connected_driver().session(database="neo4j") as session:
+            with span("scammer_history"):
+                record = session.execute_read(lambda tx: tx.run(SCAMMER_HISTORY_QUERY, username=username).single())
+        return record.data() if record is not None else None
+
+    def scammer_usernames(self):
+        """Streams every reported username; raises if Neo4j cannot be reached."""
+        with self._connected_driver().session(database="neo4j") as session:
+            for record in session.run(SCAMMER_USERNAMES_QUERY):
+                yield record["username"]
+
+    _write_reports_tx = staticmethod(write_reports_tx)
 
 # A helper function to easily get a connection instance
 # @st.cache_resource is a decorator that tells Streamlit to run this function only once
 # and cache the result. This prevents creating a new database connection on every rerun.
-@st.cache_resource
+@_cache_resource
 def get_db_connection():
-    """Gets a cached Neo4j connection using Streamlit secrets."""
+    """
+    Gets a cached Neo4j connection using Streamlit secrets, or database/config.py
+    (the .env / environment) without Streamlit, spooling reports unless
+    REPORT_SPOOL_ENABLED=0; or the embedded SQLite store (same submit_report
+    API) when STORAGE_BACKEND=sqlite.
+    """
     log.info("Attempting to get DB connection...")
+    if os.getenv("STORAGE_BACKEND") == "sqlite":
+        from database.storage import get_storage
+        return get_storage("sqlite")
+    if st is None:
+        from database import config
+        missing = [name for name, value in (("URI", config.NEO4J_URI), ("NEO4J_USER", config.NEO4J_USER),
+                                            ("NEO4J_PASSWORD", config.NEO4J_PASSWORD)) if not value]
+        if missing:
+            log.error(f"Neo4j credentials {missing} not set in the environment or .env.")
+            return None
+        return Neo4jConnection(config.NEO4J_URI, config.NEO4J_USER, config.NEO4J_PASSWORD,
+                               spool_path=SPOOL_DB_PATH if SPOOL_ENABLED else None)
     try:
         uri = st.secrets["NEO4J_URI"]
         user = st.secrets["NEO4J_USERNAME"]
         password = st.secrets["NEO4J_PASSWORD"]
-        return Neo4jConnection(uri, user, password)
+        return Neo4jConnection(uri, user, password, spool_path=SPOOL_DB_PATH if SPOOL_ENABLED else None)
     except KeyError as e:
         # This error is helpful if you forget a key in your secrets.toml file
         st.error(f"Neo4j credential '{e.args[0]}' not found in secrets.toml. Please add it.")
         log.error(f"Neo4j credential '{e.args[0]}' not found in secrets.toml.")
-        return None
\ No newline at end of file
+        return None
+
+
+# --- Benchmark: report writes against a stand-in driver that counts round trips ---
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    from database.stand_in import StandInDriver
+
+    parser = argparse.ArgumentParser(description="Compare per-statement and batched report writes.")
+    parser.add_argument("--reports", type=int, default=2000)
+    parser.add_argument("--rtt-ms", type=float, default=1.0, help="Simulated network round trip.")
+    parser.add_argument("--batch-size", type=int, default=REPORT_BATCH_SIZE)
+    parser.add_argument("--uri", help="Write to this Neo4j instead (with --user/--password); rows are left behind.")
+    parser.add_argument("--user", default="neo4j")
+    parser.add_argument("--password")
+    args = parser.parse_args()
+
+    def legacy_report_tx(tx, user_session_id, profile, analysis, final_verdict):
+        # The statement sequence submit_report used before: 3 + one per tactic
+        tx.run("MERGE (u:User {id: $session_id})", session_id=user_session_id)
+        tx.run("MERGE (s:Scammer {username: $username}) ...", username=profile['username'])
+        tx.run("MATCH (u:User ...) MATCH (s:Scammer ...) MERGE (u)-[r:REPORTED ...]->(s) ...")
+        for tactic, details in analysis.get('psychological_analysis', {}).items():
+            if tactic != 'total_risk_score' and details.get('score', 0) > 0:
+                tx.run("MATCH (s:Scammer ...) MERGE (t:Tactic ...) MERGE (s)-[:USED_TACTIC]->(t)")
+
+    analysis = {"psychological_analysis": {"total_risk_score": 70, "Love Bombing": {"score": 40, "evidence": []},
+                                           "Urgency": {"score": 30, "evidence": []},
+                                           "Secrecy": {"score": 0, "evidence": []}}}
+    reports = [(f"analyst-{i % 50}", {"username": f"scammer_{i % 400}", "followers": i, "following": 900,
+                                     "bio": "crypto mentor", "is_private": False, "is_verified": False},
+                analysis, 80.0) for i in range(args.reports)]
+
+    if args.uri:
+        connection = Neo4jConnection(args.uri, args.user, args.password)
+        start = time.perf_counter()
+        written = connection.submit_reports(reports, args.batch_size)
+        print(f"submit_reports against {args.uri}: {written / (time.perf_counter() - start):.0f} reports/s")
+        connection.close()
+        raise SystemExit
+
+    def measure(label, write):
+        driver = StandInDriver(rtt_s=args.rtt_ms / 1000)
+        start = time.perf_counter()
+        write(driver)
+        elapsed = time.perf_counter() - start
+        print(f"{label:<34} {args.reports / elapsed:>9.0f} reports/s  {driver.round_trips / args.reports:6.3f} round trips/report")
+
+    def legacy(driver):
+        with driver.session() as session:
+            for report in reports:
+                session.execute_write(legacy_report_tx, *report)
+
+    def single(driver):
+        connection = Neo4jConnection(None, None, None, driver=driver)
+        for report in reports:
+            connection.submit_report(*report)
+
+    print(f"{args.reports} reports, {args.rtt_ms} ms simulated round trip (server execution time not modelled)")
+    measure("before: statement per node/edge", legacy)
+    measure("submit_report: one UNWIND statement", single)
+    measure(f"submit_reports: batches of {args.batch_size}",
+            lambda driver: Neo4jConnection(None, None, None, driver=driver).submit_reports(reports, args.batch_size))
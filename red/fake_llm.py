@@ -0,0 +1,104 @@
+# --- fake_llm.py ---
+# A local, deterministic stand-in for the Gemini chat model.
+# Streams canned "Alex" replies word by word with configurable latency so the
+# bot's streaming, concurrency and metrics paths can be tested and benchmarked
+# offline. Select it in the app with BOT_LLM_BACKEND=fake (see llm_client.py).
+
+import asyncio
+import time
+import zlib
+from typing import Any, AsyncIterator, Iterator
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pydantic import PrivateAttr
+
+from llm_client import QuotaExceededError
+
+DEFAULT_REPLIES = [
+    "haha no way, thats actually kinda cool. what made u get into that?",
+    "lol ok ok, ur making me curious now. where r u based these days?",
+    "omg same, work has been crazy for me too. what do u do exactly?",
+    "hmm idk, i dont usually click links from ppl i just met tbh. whats it for?",
+    "aww thats sweet of u. do u use any other apps? this one lags so much for me",
+]
+
+
+def _approx_tokens(text: str) -> int:
+    return len(text) // 4 + 1
+
+
+class FakeStreamingChatModel(BaseChatModel):
+    """
+    Chat model that answers from `replies` without any network access.
+
+    The reply is picked from a hash of the last message, so the same input
+    always gets the same answer. `first_token_delay` simulates time to first
+    token and `token_delay` the gap between streamed words. The first
+    `quota_errors` calls raise QuotaExceededError, to exercise the client's backoff.
+    """
+
+    replies: list[str] = DEFAULT_REPLIES
+    first_token_delay: float = 0.3
+    token_delay: float = 0.02
+    quota_errors: int = 0
+    _calls: int = PrivateAttr(default=0)
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-streaming-chat"
+
+    def _pick_reply(self, messages: list[BaseMessage]) -> str:
+        self._calls += 1
+        if self._calls <= self.quota_errors:
+            raise QuotaExceededError(f"429 Resource has been exhausted (simulated, call {self._calls})")
+        last = str(messages[-1].content) if messages else ""
+        return self.replies[zlib.crc32(last.encode("utf-8")) % len(self.replies)]
+
+    def _usage(self, messages: list[BaseMessage], reply: str) -> dict:
+        input_tokens = sum(_approx_tokens(str(m.content)) for m in messages)
+        output_tokens = _approx_tokens(reply)
+        return {"input_tokens": input_tokens, "output_tokens": output_tokens, "total_tokens": input_tokens + output_tokens}
+
+    def _words(self, reply: str) -> list[str]:
+        words = reply.split(" ")
+        return [word if i == len(words) - 1 else word + " " for i, word in enumerate(words)]
+
+    def _generate(self, messages: list[BaseMessage], stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        reply = self._pick_reply(messages)
+        time.sleep(self.first_token_delay + self.token_delay * len(self._words(reply)))
+        message = AIMessage(content=reply, usage_metadata=self._usage(messages, reply))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(self, messages: list[BaseMessage], stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        reply = self._pick_reply(messages)
+        await asyncio.sleep(self.first_token_delay + self.token_delay * len(self._words(reply)))
+        message = AIMessage(content=reply, usage_metadata=self._usage(messages, reply))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(self, messages: list[BaseMessage], stop=None, run_manager=None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        reply = self._pick_reply(messages)
+        time.sleep(self.first_token_delay)
+        words = self._words(reply)
+        for i, word in enumerate(words):
+            if i:
+                time.sleep(self.token_delay)
+            usage = self._usage(messages, reply) if i == len(words) - 1 else None
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=word, usage_metadata=usage))
+            if run_manager:
+                run_manager.on_llm_new_token(word, chunk=chunk)
+            yield chunk
+
+    async def _astream(self, messages: list[BaseMessage], stop=None, run_manager=None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        reply = self._pick_reply(messages)
+        await asyncio.sleep(self.first_token_delay)
+        words = self._words(reply)
+        for i, word in enumerate(words):
+            if i:
+                await asyncio.sleep(self.token_delay)
+            usage = self._usage(messages, reply) if i == len(words) - 1 else None
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=word, usage_metadata=usage))
+            if run_manager:
+                await run_manager.on_llm_new_token(word, chunk=chunk)
+            yield chunk
@@ -0,0 +1,372 @@
+# --- ioc_reputation.py ---
+# Offline reputation lookup for indicators of compromise (URLs, domains,
+# crypto wallets and emails) extracted from scammer messages.
+#
+# A store is a directory built once from CSV/TXT threat feeds:
+#   bloom.bin   - Bloom filter bits, answers most negative lookups in a few probes
+#   keys_hi.bin - sorted high 64 bits of each indicator's 128-bit digest
+#   keys_lo.bin - low 64 bits, in the same order (exact-match tie breaker)
+#   sources.bin - uint16 feed index for each key
+#   meta.json   - sizes, hash count and the list of feed names
+# All .bin files are memory-mapped, so opening a store with tens of millions
+# of indicators costs no heap memory and a lookup is a few microseconds.
+
+import argparse
+import bisect
+import csv
+import hashlib
+import json
+import math
+import mmap
+import os
+import re
+import time
+from array import array
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+
+from logger_config import get_logger
+
+logger = get_logger(__name__)
+
+STORE_FORMAT_VERSION = 1
+DEFAULT_FALSE_POSITIVE_RATE = 0.001
+
+# Column names recognised in CSV feeds, in order of preference.
+CSV_INDICATOR_COLUMNS = ("indicator", "ioc", "value", "url", "domain", "address", "wallet", "email")
+
+_MASK64 = 0xFFFFFFFFFFFFFFFF
+_blake2b = hashlib.blake2b
+
+_ETH_RE = re.compile(r"^0x[a-fA-F0-9]{40}$")
+_BTC_BASE58_RE = re.compile(r"^[13][a-km-zA-HJ-NP-Z1-9]{25,39}$")
+
+
+# --- Normalisation & Hashing ---
+def normalize_indicator(value: str) -> str:
+    """
+    Puts an indicator into the canonical form used for both building and lookups.
+    Case-insensitive indicators (URLs hosts, domains, emails, ETH/bech32 wallets)
+    are lower-cased; base58 BTC addresses are case-sensitive and kept as-is.
+    """
+    value = value.strip().strip("<>\"'").rstrip(".,;)")
+    if not value:
+        return ""
+    if _BTC_BASE58_RE.match(value):
+        return value
+    if _ETH_RE.match(value) or ("@" in value and "://" not in value):
+        return value.lower()
+
+    lowered = value.lower()
+    if lowered.startswith(("http://", "https://")):
+        parts = urlsplit(value)
+        host = (parts.hostname or "").rstrip(".")
+        path = parts.path.rstrip("/")
+        query = f"?{parts.query}" if parts.query else ""
+        return f"{parts.scheme.lower()}://{host}{path}{query}"
+
+    # Bare domain (or anything else) - domains are case-insensitive
+    lowered = lowered.rstrip(".")
+    if lowered.startswith("www."):
+        lowered = lowered[4:]
+    return lowered
+
+
+def _digest(normalized: str) -> tuple[int, int]:
+    """Returns the (high, low) 64-bit halves of a 128-bit BLAKE2b digest."""
+    value = int.from_bytes(_blake2b(normalized.encode("utf-8"), digest_size=16).digest(), "little")
+    return value & _MASK64, value >> 64
+
+
+def lookup_candidates(indicator: str) -> list[str]:
+    """
+    Expands one extracted indicator into the normalised keys worth checking.
+    A URL is checked as-is, then by host and by each parent domain, because most
+    feeds list bad domains rather than full URLs.
+    """
+    normalized = normalize_indicator(indicator)
+    if not normalized:
+        return []
+    candidates = [normalized]
+    scheme_end = normalized.find("://")
+    if scheme_end != -1 and normalized.startswith("http"):
+        host = normalized[scheme_end + 3:].split("/", 1)[0].split("?", 1)[0].rsplit("@", 1)[-1].split(":", 1)[0]
+        if host.startswith("www."):
+            host = host[4:]
+        labels = host.split(".")
+        for i in range(len(labels) - 1):
+            candidates.append(".".join(labels[i:]))
+    return candidates
+
+
+# --- Reputation Store (read side) ---
+class IOCReputationStore:
+    """
+    Read-only view of an IOC store directory built by `build_store`.
+    Lookups probe the Bloom filter first and only binary-search the
+    memory-mapped key file when every probe bit is set.
+    """
+
+    def __init__(self, store_dir: str):
+        self.store_dir = store_dir
+        with open(os.path.join(store_dir, "meta.json"), "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        if self.meta.get("version") != STORE_FORMAT_VERSION:
+            raise ValueError(f"Unsupported IOC store version {self.meta.get('version')} in {store_dir}")
+
+        self.count = self.meta["count"]
+        self.sources = self.meta["sources"]
+        self._bloom_bits = self.meta["bloom_bits"]
+        self._bloom_hashes = self.meta["bloom_hashes"]
+        self._files = []
+        self._maps = []
+        self._bloom = self._map("bloom.bin")
+        self._hi = self._map("keys_hi.bin", "Q")
+        self._lo = self._map("keys_lo.bin", "Q")
+        self._src = self._map("sources.bin", "H")
+        logger.info(f"Opened IOC store at {store_dir} with {self.count} indicators.")
+
+    def _map(self, name, fmt=None):
+        path = os.path.join(self.store_dir, name)
+        if os.path.getsize(path) == 0:
+            return memoryview(b"").cast(fmt) if fmt else b""
+        f = open(path, "rb")
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._files.append(f)
+        self._maps.append(mm)
+        view = memoryview(mm)
+        return view.cast(fmt) if fmt else view
+
+    def close(self):
+        """Releases the memory maps and file handles."""
+        for view in (self._bloom, self._hi, self._lo, self._src):
+            if isinstance(view, memoryview):
+                view.release()
+        for mm in self._maps:
+            mm.close()
+        for f in self._files:
+            f.close()
+        self._maps, self._files = [], []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.count
+
+    def _might_contain(self, hi: int, lo: int) -> bool:
+        bloom, m = self._bloom, self._bloom_bits
+        for i in range(self._bloom_hashes):
+            bit = ((hi + i * lo) & _MASK64) % m
+            if not bloom[bit >> 3] & (1 << (bit & 7)):
+                return False
+        return True
+
+    def _find(self, normalized: str):
+        hi, lo = _digest(normalized)
+        if not self.count or not self._might_contain(hi, lo):
+            return None
+        keys_hi, keys_lo = self._hi, self._lo
+        i = bisect.bisect_left(keys_hi, hi)
+        while i < self.count and keys_hi[i] == hi:
+            if keys_lo[i] == lo:
+                return i
+            i += 1
+        return None
+
+    def lookup(self, indicator: str) -> dict | None:
+        """
+        Checks an indicator against the store.
+        Returns a dict with the matched key and its feed name, or None if unknown.
+        """
+        for candidate in lookup_candidates(indicator):
+            index = self._find(candidate)
+            if index is not None:
+                return {"indicator": indicator, "matched": candidate, "source": self.sources[self._src[index]]}
+        return None
+
+    def __contains__(self, indicator: str) -> bool:
+        return self.lookup(indicator) is not None
+
+
+# --- Store Builder (write side) ---
+def _iter_feed_indicators(path: str):
+    """Yields raw indicator strings from a CSV or plain-text feed."""
+    with open(path, "r", encoding="utf-8", errors="replace", newline="") as f:
+        if path.lower().endswith(".csv"):
+            reader = csv.reader(f)
+            header = next(reader, None)
+            if header is None:
+                return
+            lowered = [h.strip().lower() for h in header]
+            column = next((lowered.index(c) for c in CSV_INDICATOR_COLUMNS if c in lowered), None)
+            if column is None:
+                # No recognised header: treat the first row as data, first column as indicator
+                column = 0
+                if header and header[0].strip():
+                    yield header[0]
+            for row in reader:
+                if len(row) > column and row[column].strip() and not row[column].lstrip().startswith("#"):
+                    yield row[column]
+        else:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith("#"):
+                    yield line
+
+
+def _bloom_size(n: int, fp_rate: float) -> tuple[int, int]:
+    """Optimal Bloom filter bit count and hash count for n items at fp_rate."""
+    n = max(n, 1)
+    bits = max(64, int(math.ceil(-n * math.log(fp_rate) / (math.log(2) ** 2))))
+    bits = (bits + 7) // 8 * 8
+    hashes = max(1, int(round(bits / n * math.log(2))))
+    return bits, hashes
+
+
+def build_store(feed_paths: list[str], store_dir: str, fp_rate: float = DEFAULT_FALSE_POSITIVE_RATE) -> dict:
+    """
+    Builds an IOC store from one or more CSV/TXT feeds.
+
+    Args:
+        feed_paths: Paths to feed files. CSV feeds use the first recognised
+                    indicator column (see CSV_INDICATOR_COLUMNS); TXT feeds hold
+                    one indicator per line with '#' comments.
+        store_dir: Output directory (created if needed, files overwritten).
+        fp_rate: Target false-positive rate of the Bloom filter.
+
+    Returns:
+        The metadata dictionary written to meta.json.
+    """
+    import numpy as np
+
+    start = time.perf_counter()
+    sources = [os.path.basename(p) for p in feed_paths]
+    if len(sources) > 0xFFFF:
+        raise ValueError("An IOC store supports at most 65535 feeds.")
+
+    his, los, srcs = array("Q"), array("Q"), array("H")
+    for source_id, path in enumerate(feed_paths):
+        before = len(his)
+        for raw in _iter_feed_indicators(path):
+            normalized = normalize_indicator(raw)
+            if not normalized:
+                continue
+            hi, lo = _digest(normalized)
+            his.append(hi)
+            los.append(lo)
+            srcs.append(source_id)
+        logger.info(f"Ingested {len(his) - before} indicators from {path}.")
+
+    hi = np.frombuffer(his, dtype=np.uint64) if len(his) else np.zeros(0, dtype=np.uint64)
+    lo = np.frombuffer(los, dtype=np.uint64) if len(los) else np.zeros(0, dtype=np.uint64)
+    src = np.frombuffer(srcs, dtype=np.uint16) if len(srcs) else np.zeros(0, dtype=np.uint16)
+
+    # Sort by (hi, lo); a stable sort keeps the first feed for duplicate indicators
+    order = np.lexsort((lo, hi))
+    hi, lo, src = hi[order], lo[order], src[order]
+    if len(hi):
+        keep = np.ones(len(hi), dtype=bool)
+        keep[1:] = (hi[1:] != hi[:-1]) | (lo[1:] != lo[:-1])
+        hi, lo, src = hi[keep], lo[keep], src[keep]
+
+    count = int(len(hi))
+    bloom_bits, bloom_hashes = _bloom_size(count, fp_rate)
+    bit_flags = np.zeros(bloom_bits, dtype=bool)
+    with np.errstate(over="ignore"):
+        for i in range(bloom_hashes):
+            bit_flags[(hi + np.uint64(i) * lo) % np.uint64(bloom_bits)] = True
+    bloom = np.packbits(bit_flags, bitorder="little")
+
+    os.makedirs(store_dir, exist_ok=True)
+    bloom.tofile(os.path.join(store_dir, "bloom.bin"))
+    hi.astype("<u8").tofile(os.path.join(store_dir, "keys_hi.bin"))
+    lo.astype("<u8").tofile(os.path.join(store_dir, "keys_lo.bin"))
+    src.astype("<u2").tofile(os.path.join(store_dir, "sources.bin"))
+
+    meta = {
+        "version": STORE_FORMAT_VERSION,
+        "count": count,
+        "bloom_bits": bloom_bits,
+        "bloom_hashes": bloom_hashes,
+        "false_positive_rate": fp_rate,
+        "sources": sources,
+        "built_at": datetime.now(timezone.utc).isoformat(),
+    }
+    with open(os.path.join(store_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+
+    logger.info(f"Built IOC store at {store_dir}: {count} unique indicators in {time.perf_counter() - start:.2f}s.")
+    return meta
+
+
+# --- Default Store ---
+# The app and the red-team bot share one store, configured by the IOC_STORE_PATH
+# environment variable. Without it, reputation checks are skipped entirely.
+_default_store = None
+_default_store_loaded = False
+
+
+def get_default_store() -> IOCReputationStore | None:
+    """Returns the store at $IOC_STORE_PATH (opened once), or None if not configured."""
+    global _default_store, _default_store_loaded
+    if not _default_store_loaded:
+        _default_store_loaded = True
+        store_dir = os.getenv("IOC_STORE_PATH")
+        if store_dir:
+            try:
+                _default_store = IOCReputationStore(store_dir)
+            except (OSError, ValueError, KeyError) as e:
+                logger.error(f"Could not open IOC store at {store_dir}: {e}")
+    return _default_store
+
+
+def check_reputation(indicator: str, store: IOCReputationStore | None = None) -> dict | None:
+    """Looks up one indicator in the given store, or the default store if none is given."""
+    store = store or get_default_store()
+    if store is None:
+        return None
+    return store.lookup(indicator)
+
+
+# --- Command Line ---
+def _benchmark(store: IOCReputationStore, rounds: int):
+    """Times negative lookups, the common case for every scanned message."""
+    probes = [f"https://unknown-{i}.example.org/login" for i in range(rounds)]
+    start = time.perf_counter()
+    for probe in probes:
+        store.lookup(probe)
+    per_lookup_us = (time.perf_counter() - start) / rounds * 1e6
+    print(f"{rounds} negative lookups against {len(store)} indicators: {per_lookup_us:.2f} us/lookup")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or query an offline IOC reputation store.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    build_cmd = sub.add_parser("build", help="Build a store from CSV/TXT feeds.")
+    build_cmd.add_argument("feeds", nargs="+")
+    build_cmd.add_argument("-o", "--out", required=True, help="Output store directory.")
+    build_cmd.add_argument("--fp-rate", type=float, default=DEFAULT_FALSE_POSITIVE_RATE)
+
+    lookup_cmd = sub.add_parser("lookup", help="Look up indicators in a store.")
+    lookup_cmd.add_argument("-s", "--store", required=True)
+    lookup_cmd.add_argument("indicators", nargs="+")
+
+    bench_cmd = sub.add_parser("bench", help="Measure lookup latency of a store.")
+    bench_cmd.add_argument("-s", "--store", required=True)
+    bench_cmd.add_argument("--rounds", type=int, default=100000)
+
+    args = parser.parse_args()
+    if args.command == "build":
+        print(json.dumps(build_store(args.feeds, args.out, args.fp_rate), indent=2))
+    elif args.command == "lookup":
+        with IOCReputationStore(args.store) as store:
+            for indicator in args.indicators:
+                print(indicator, "->", store.lookup(indicator))
+    else:
+        with IOCReputationStore(args.store) as store:
+            _benchmark(store, args.rounds)
@@ -0,0 +1,141 @@
+# --- llm_client.py ---
+# The one chat-model client shared by bot.py and red_teaming_bot.py.
+#
+# - One long-lived model (and HTTP/gRPC connection) per backend, model, key and
+#   temperature, instead of a new client per call.
+# - Per-request timeout; quota and availability errors are retried with
+#   jittered exponential backoff.
+# - Every call's latency, time to first token and token counts go to LLM_CALL_METRICS
+#   (and the latency to the "llm_call" telemetry histogram).
+# - BOT_LLM_BACKEND=fake swaps in the deterministic offline FakeStreamingChatModel.
+
+import functools
+import os
+import time
+from collections import deque
+
+from dotenv import load_dotenv
+from langchain_core.callbacks import BaseCallbackHandler
+
+from logger_config import get_logger
+from telemetry import observe
+
+logger = get_logger(__name__)
+
+# --- Configuration (environment overridable) ---
+GEMINI_MODEL = os.getenv("BOT_GEMINI_MODEL", "models/gemini-2.5-flash-lite")
+REQUEST_TIMEOUT_S = float(os.getenv("BOT_LLM_TIMEOUT", "30"))
+# Attempts per call, including the first one.
+MAX_ATTEMPTS = int(os.getenv("BOT_LLM_MAX_ATTEMPTS", "5"))
+# Backoff: initial wait, cap and random jitter (seconds), doubling on every retry.
+BACKOFF_INITIAL_S = 1.0
+BACKOFF_MAX_S = 30.0
+BACKOFF_JITTER_S = 1.0
+
+# Per-call latency and token counts, newest last.
+LLM_CALL_METRICS = deque(maxlen=1000)
+
+
+class QuotaExceededError(Exception):
+    """Rate-limit error raised by the offline backend, retried like a Gemini 429."""
+
+
+# Errors worth backing off and retrying: quota (429) and temporary unavailability.
+try:
+    from google.api_core.exceptions import ResourceExhausted, ServiceUnavailable, TooManyRequests
+    RETRYABLE_ERRORS = (QuotaExceededError, ResourceExhausted, TooManyRequests, ServiceUnavailable)
+except ImportError:
+    RETRYABLE_ERRORS = (QuotaExceededError,)
+
+
+def get_backend() -> str:
+    return os.getenv("BOT_LLM_BACKEND", "gemini").lower()
+
+
+class LLMMetricsCallback(BaseCallbackHandler):
+    """Records latency, time to first token and token usage of every chat-model call."""
+
+    run_inline = True
+
+    def __init__(self, label: str):
+        self.label = label
+        self._started = {}
+        self._first_token = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._started[run_id] = time.perf_counter()
+
+    def on_llm_new_token(self, token, *, run_id, **kwargs):
+        self._first_token.setdefault(run_id, time.perf_counter())
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        usage = {}
+        generations = response.generations[0] if response.generations else []
+        message = getattr(generations[0], "message", None) if generations else None
+        if message is not None and getattr(message, "usage_metadata", None):
+            usage = message.usage_metadata
+        self._record(run_id, usage=usage)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._record(run_id, error=type(error).__name__)
+
+    def _record(self, run_id, usage=None, error=None):
+        started = self._started.pop(run_id, None)
+        first_token = self._first_token.pop(run_id, None)
+        now = time.perf_counter()
+        usage = usage or {}
+        metrics = {
+            "model": self.label,
+            "latency_s": round(now - started, 3) if started is not None else None,
+            "time_to_first_token_s": round(first_token - started, 3) if started is not None and first_token else None,
+            "input_tokens": usage.get("input_tokens"),
+            "output_tokens": usage.get("output_tokens"),
+            "error": error,
+        }
+        LLM_CALL_METRICS.append(metrics)
+        if started is not None:
+            observe("llm_call", now - started, error=error is not None)
+        logger.info(f"LLM call metrics: {metrics}")
+
+
+@functools.lru_cache(maxsize=8)
+def _build_chat_model(backend: str, model: str, temperature: float, api_key: str | None):
+    if backend == "fake":
+        from fake_llm import FakeStreamingChatModel
+        return FakeStreamingChatModel()
+
+    from langchain_google_genai import ChatGoogleGenerativeAI
+    logger.info(f"Creating Gemini client for {model} (temperature {temperature}).")
+    # Retries are done by `get_llm` so that they back off with jitter
+    return ChatGoogleGenerativeAI(model=model, temperature=temperature, google_api_key=api_key,
+                                  timeout=REQUEST_TIMEOUT_S, max_retries=0)
+
+
+def get_chat_model(temperature: float = 0.8, api_key: str | None = None, model: str = GEMINI_MODEL):
+    """
+    Returns the shared, long-lived chat model for these settings (no retries or
+    metrics attached; see `get_llm`). The Gemini key defaults to GEMINI_KEY from .env.
+    """
+    backend = get_backend()
+    if backend != "fake" and not api_key:
+        load_dotenv()
+        api_key = os.getenv("GEMINI_KEY")
+        if not api_key:
+            raise ValueError("GEMINI_KEY not found. Ensure it's in a .env file in the same directory as app.py.")
+    return _build_chat_model(backend, model, temperature, api_key if backend != "fake" else None)
+
+
+def get_llm(temperature: float = 0.8, api_key: str | None = None, model: str = GEMINI_MODEL):
+    """
+    The shared chat model, with jittered exponential backoff on quota errors and
+    per-call metrics. invoke/ainvoke/batch are retried; a stream is not retried
+    once it has started.
+    """
+    chat_model = get_chat_model(temperature, api_key, model)
+    label = "fake" if get_backend() == "fake" else model
+    return chat_model.with_config(callbacks=[LLMMetricsCallback(label)]).with_retry(
+        retry_if_exception_type=RETRYABLE_ERRORS,
+        wait_exponential_jitter=True,
+        exponential_jitter_params={"initial": BACKOFF_INITIAL_S, "max": BACKOFF_MAX_S, "jitter": BACKOFF_JITTER_S},
+        stop_after_attempt=MAX_ATTEMPTS,
+    )
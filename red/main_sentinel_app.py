@@ -4,18 +4,20 @@
 from profile_analyzer import get_profile_data_from_user, calculate_profile_risk
 from chat_analyzer import analyze_chat_history
 from verdict_engine import calculate_final_verdict
+from chat_parser import read_chat_messages
 import os
 
 def clear_screen():
     os.system('cls' if os.name == 'nt' else 'clear')
 
-def read_chat_from_file(file_path: str):
+def read_chat_from_file(file_path: str, suspect: str = None):
     """
-    Reads a chat log from a .txt file.
-    Assumes each message is on a new line.
+    Reads a chat log: a WhatsApp .txt, Instagram/Telegram .json export or a
+    plain .txt with one message per line. The file is streamed, not loaded whole.
     
     Args:
-        file_path: The full path to the .txt file.
+        file_path: The full path to the chat file.
+        suspect: The suspect's name in the export; only their messages are kept.
         
     Returns:
         A list of strings, where each string is a message.
@@ -23,9 +25,7 @@ def read_chat_from_file(file_path: str):
     """
 
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            # Read all lines, and strip any leading/trailing whitespace (like newlines)
-            messages = [line.strip() for line in f.readlines() if line.strip()]
+        messages, _ = read_chat_messages(file_path, suspect=suspect)
         return messages
     except FileNotFoundError:
         return None
@@ -51,8 +51,8 @@ def run_sentinel():
     # --- STAGE 2: GET AND READ CHAT FILE ---
     all_messages = None
     while all_messages is None:
-        file_path = input("\nEnter the full path to the chat log file (.txt): \n> ")
-        all_messages = read_chat_from_file(file_path)
+        file_path = input("\nEnter the full path to the chat log file (.txt or .json export): \n> ")
+        all_messages = read_chat_from_file(file_path, suspect=profile_data.get("username"))
         if all_messages is None:
             print(f"Error: File not found at '{file_path}'. Please try again.")
 
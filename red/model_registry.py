@@ -0,0 +1,213 @@
+# --- model_registry.py ---
+# Process-wide registry of the heavy NLP models used behind the Streamlit app:
+# SentenceTransformer and spaCy (intent_classifier) and the DistilBERT sentiment
+# pipeline (profile_analyzer/predict_risk_score.py).
+#
+# - Each model is loaded once per process, on first use or by `warm_up()` in a
+#   background thread at startup, and shared by every session (st.cache_resource).
+# - The resident memory each load added is measured from /proc/self/statm.
+# - When the process is over MODEL_MEMORY_BUDGET_MB, models idle for longer than
+#   MODEL_IDLE_SECONDS are evicted (and reloaded on their next use).
+#
+# The model modules expose get_<model>() hooks; the registry replaces them, so
+# models loaded through it are never also cached by the modules themselves.
+
+import functools
+import gc
+import os
+import sys
+import threading
+import time
+
+from logger_config import get_logger
+
+logger = get_logger(__name__)
+
+# --- Configuration (environment overridable) ---
+# Process RSS above which idle models are evicted (0 = never evict).
+MEMORY_BUDGET_MB = float(os.getenv("MODEL_MEMORY_BUDGET_MB", "0"))
+# Only models unused for this long can be evicted.
+IDLE_SECONDS = float(os.getenv("MODEL_IDLE_SECONDS", "900"))
+# Set to 0 to skip the background warm-up at app startup.
+WARM_UP = os.getenv("MODEL_WARM_UP", "1") != "0"
+# The budget is checked at most this often.
+BUDGET_CHECK_INTERVAL_S = 30.0
+# After a failed load, get_or_none returns None for this long before trying again.
+LOAD_RETRY_S = float(os.getenv("MODEL_LOAD_RETRY_S", "300"))
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+_repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for _package in ("intent_classifier", "profile_analyzer"):
+    _package_path = os.path.join(_repo_root, _package)
+    if _package_path not in sys.path:
+        sys.path.append(_package_path)
+
+
+def process_rss_mb() -> float:
+    """Resident memory of this process in MB (0.0 where /proc is not available)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE / (1024 * 1024)
+    except (OSError, IndexError, ValueError):
+        return 0.0
+
+
+class _Entry:
+    def __init__(self, name: str, loader):
+        self.name = name
+        self.loader = loader
+        self.model = None
+        self.rss_mb = None
+        self.load_s = None
+        self.loads = 0
+        self.last_used = 0.0
+        self.failed_at = None
+
+
+class ModelRegistry:
+    """
+    Loads registered models once, tracks their memory, and evicts idle ones
+    when the process is over its memory budget.
+
+    Args:
+        memory_budget_mb: Process RSS that triggers eviction (0 = never evict).
+        idle_seconds: Minimum idle time before a model can be evicted.
+        load_retry_s: How long get_or_none remembers a failed load before retrying it.
+    """
+
+    def __init__(self, memory_budget_mb: float = MEMORY_BUDGET_MB, idle_seconds: float = IDLE_SECONDS,
+                 load_retry_s: float = LOAD_RETRY_S):
+        self.memory_budget_mb = memory_budget_mb
+        self.idle_seconds = idle_seconds
+        self.load_retry_s = load_retry_s
+        self._entries = {}
+        # One lock for all loads, so the RSS measured around a load is that model's
+        self._load_lock = threading.RLock()
+        self._last_budget_check = 0.0
+        self._warm_up_thread = None
+
+    def register(self, name: str, loader):
+        """Registers a model under `name`; `loader()` builds it."""
+        self._entries[name] = _Entry(name, loader)
+
+    def get(self, name: str):
+        """Returns the model, loading it on first use (or after an eviction)."""
+        entry = self._entries[name]
+        model = entry.model
+        if model is None:
+            with self._load_lock:
+                if entry.model is None:
+                    rss_before = process_rss_mb()
+                    start = time.perf_counter()
+                    entry.model = entry.loader()
+                    entry.load_s = time.perf_counter() - start
+                    entry.rss_mb = max(process_rss_mb() - rss_before, 0.0)
+                    entry.loads += 1
+                    logger.info(f"Loaded model '{name}' in {entry.load_s:.1f}s (+{entry.rss_mb:.0f} MB RSS).")
+                model = entry.model
+        entry.last_used = time.monotonic()
+        self._maybe_enforce_budget()
+        return model
+
+    def get_or_none(self, name: str):
+        """
+        Like `get`, but logs a failed load and returns None. The failure is
+        remembered for `load_retry_s`, so callers do not retry a full load on every call.
+        """
+        entry = self._entries[name]
+        if entry.failed_at is not None and time.monotonic() - entry.failed_at < self.load_retry_s:
+            return None
+        try:
+            model = self.get(name)
+        except Exception as e:
+            entry.failed_at = time.monotonic()
+            logger.error(f"Could not load model '{name}': {e}; not retrying for {self.load_retry_s:.0f}s.")
+            return None
+        entry.failed_at = None
+        return model
+
+    def warm_up(self, names=None):
+        """Loads the models (default: all) in a background thread; returns immediately."""
+        if self._warm_up_thread is not None:
+            return self._warm_up_thread
+        names = list(names or self._entries)
+
+        def run():
+            for name in names:
+                self.get_or_none(name)
+        self._warm_up_thread = threading.Thread(target=run, name="model-warm-up", daemon=True)
+        self._warm_up_thread.start()
+        return self._warm_up_thread
+
+    def _maybe_enforce_budget(self):
+        now = time.monotonic()
+        if self.memory_budget_mb > 0 and now - self._last_budget_check >= BUDGET_CHECK_INTERVAL_S:
+            self._last_budget_check = now
+            self.enforce_budget()
+
+    def enforce_budget(self) -> list[str]:
+        """Evicts models idle beyond `idle_seconds`, oldest first, until RSS is under budget."""
+        evicted = []
+        if self.memory_budget_mb <= 0:
+            return evicted
+        with self._load_lock:
+            now = time.monotonic()
+            idle = sorted((e for e in self._entries.values()
+                           if e.model is not None and now - e.last_used > self.idle_seconds),
+                          key=lambda e: e.last_used)
+            for entry in idle:
+                if process_rss_mb() <= self.memory_budget_mb:
+                    break
+                self._evict(entry)
+                evicted.append(entry.name)
+        return evicted
+
+    def _evict(self, entry: _Entry):
+        entry.model = None
+        gc.collect()
+        torch = sys.modules.get("torch")
+        if torch is not None and torch.cuda.is_available():
+            torch.cuda.empty_cache()
+        logger.info(f"Evicted idle model '{entry.name}' (~{entry.rss_mb or 0:.0f} MB); RSS now {process_rss_mb():.0f} MB.")
+
+    def report(self) -> list[dict]:
+        """Per-model load state, resident memory added by its load, load time and idle time."""
+        now = time.monotonic()
+        return [{
+            "name": e.name,
+            "loaded": e.model is not None,
+            "rss_mb": round(e.rss_mb, 1) if e.rss_mb is not None else None,
+            "load_s": round(e.load_s, 2) if e.load_s is not None else None,
+            "loads": e.loads,
+            "idle_s": round(now - e.last_used, 1) if e.last_used else None,
+        } for e in self._entries.values()]
+
+
+def _install_default_models(registry: ModelRegistry):
+    """Registers the app's models and points the modules' get_<model>() hooks at the registry."""
+    import model as intent_model
+    import utils as intent_utils
+    import predict_risk_score
+
+    registry.register("sentence_transformer", intent_model.load_embedding_model)
+    registry.register("spacy_ner", intent_utils.load_nlp)
+    registry.register("distilbert_sentiment", predict_risk_score.load_sentiment_model)
+    intent_model.get_embedding_model = functools.partial(registry.get, "sentence_transformer")
+    intent_utils.get_nlp = functools.partial(registry.get, "spacy_ner")
+    predict_risk_score.get_sentiment_model = functools.partial(registry.get_or_none, "distilbert_sentiment")
+
+
+try:
+    import streamlit as st
+    _cache_resource = st.cache_resource(show_spinner=False)
+except ImportError:
+    _cache_resource = functools.lru_cache(maxsize=None)
+
+
+@_cache_resource
+def get_registry() -> ModelRegistry:
+    """The process-wide registry with the app's models installed."""
+    registry = ModelRegistry()
+    _install_default_models(registry)
+    return registry
@@ -1,6 +1,9 @@
 # --- profile_analyzer.py ---
 # Milestone 1 of Project Sentinel
 
+from profile_rules import DEFAULT_RULE_SET
+from telemetry import timed
+
 def get_profile_data_from_user():
     """
     Interactively prompts the user for the target's profile information.
@@ -42,6 +45,7 @@ def get_profile_data_from_user():
     
     return profile_data
 
+@timed("profile_risk")
 def calculate_profile_risk(profile_data: dict):
     """
     Calculates a risk score from 0-10 based on a set of rules.
@@ -53,50 +57,10 @@ def calculate_profile_risk(profile_data: dict):
         A tuple containing the integer risk score (0-10) and a list of
         reasons (strings) for the score.
     """
-    score = 0
-    risk_factors_found = []
-    
     # --- Rule Engine ---
-
-    # Rule 0: Verified accounts are considered safe. This overrides all other rules.
-    if profile_data['is_verified']:
-        return 0, ["Account is officially verified."]
-
-    # Rule 1: Suspicious Follower/Following Ratio (e.g., following many, few followers)
-    # A high ratio is a classic bot/spam indicator.
-    if profile_data['followers'] < 100 and profile_data['following'] > profile_data['followers'] * 5:
-        score += 3
-        risk_factors_found.append("High following-to-follower ratio (potential bot/spam behavior).")
-
-    # Rule 2: New Account Age
-    if profile_data['account_age_days'] < 30:
-        score += 2
-        risk_factors_found.append("Very new account (less than 30 days old).")
-
-    # Rule 3: Missing Profile Picture
-    if not profile_data['has_profile_picture']:
-        score += 2
-        risk_factors_found.append("No profile picture.")
-
-    # Rule 4: Suspicious Keywords in Bio
-    suspicious_words = ["crypto", "forex", "invest", "trader", "DM for rates", "cashapp"]
-    bio_lower = profile_data['bio'].lower()
-    if any(word in bio_lower for word in suspicious_words):
-        score += 3
-        risk_factors_found.append("Bio contains suspicious keywords (e.g., crypto, invest).")
-
-    # Rule 5: Extremely low follower count
-    if profile_data['followers'] < 15:
-        score += 1
-        risk_factors_found.append("Extremely low follower count.")
-
-    # Cap the final score at 10 to keep it on a consistent scale
-    final_score = min(score, 10)
-    
-    if not risk_factors_found:
-        risk_factors_found.append("No major risk factors detected in profile.")
-
-    return final_score, risk_factors_found
+    # The rules themselves live as data in profile_rules.PROFILE_RULES; use
+    # profile_rules.score_profiles to score a whole table of profiles at once.
+    return DEFAULT_RULE_SET.score_one(profile_data)
 
 def run_profile_analyzer():
     """Main function to run the profile analysis module. """
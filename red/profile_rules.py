@@ -0,0 +1,220 @@
+# --- profile_rules.py ---
+# Declarative rule engine behind calculate_profile_risk.
+#
+# Rules are plain data (so they can also be loaded from JSON) and are compiled
+# once into functions that work both on a single profile dict and on whole
+# columns (a pandas DataFrame or a dict of NumPy arrays).
+#
+# A condition is a nested list/tuple expression:
+#   ["lt", a, b] ["le", a, b] ["gt", a, b] ["ge", a, b] ["eq", a, b]
+#   ["mul", a, b]  ["and", c1, c2, ...]  ["or", c1, c2, ...]  ["not", c]
+#   ["truthy", column]  ["contains_any", column, [word, ...]]
+# where a string operand is a column name and a number is a literal.
+
+import json
+
+import numpy as np
+
+SUSPICIOUS_BIO_WORDS = ["crypto", "forex", "invest", "trader", "DM for rates", "cashapp"]
+
+MAX_PROFILE_SCORE = 10
+NO_RISK_REASON = "No major risk factors detected in profile."
+
+# Order matters: it is the order of the reasons list and of the bits in the hit masks.
+PROFILE_RULES = [
+    # Rule 0: Verified accounts are considered safe. This overrides all other rules.
+    {"name": "verified", "condition": ["truthy", "is_verified"], "points": 0, "override": True,
+     "reason": "Account is officially verified."},
+    # Rule 1: Suspicious Follower/Following Ratio (e.g., following many, few followers)
+    {"name": "follow_ratio", "condition": ["and", ["lt", "followers", 100], ["gt", "following", ["mul", "followers", 5]]],
+     "points": 3, "reason": "High following-to-follower ratio (potential bot/spam behavior)."},
+    # Rule 2: New Account Age
+    {"name": "new_account", "condition": ["lt", "account_age_days", 30],
+     "points": 2, "reason": "Very new account (less than 30 days old)."},
+    # Rule 3: Missing Profile Picture
+    {"name": "no_profile_picture", "condition": ["not", ["truthy", "has_profile_picture"]],
+     "points": 2, "reason": "No profile picture."},
+    # Rule 4: Suspicious Keywords in Bio
+    {"name": "bio_keywords", "condition": ["contains_any", "bio", SUSPICIOUS_BIO_WORDS],
+     "points": 3, "reason": "Bio contains suspicious keywords (e.g., crypto, invest)."},
+    # Rule 5: Extremely low follower count
+    {"name": "low_followers", "condition": ["lt", "followers", 15],
+     "points": 1, "reason": "Extremely low follower count."},
+]
+
+
+# --- Expression Compiler ---
+def _is_array(value):
+    return isinstance(value, np.ndarray)
+
+
+def _compile_operand(operand):
+    if isinstance(operand, str):
+        return lambda columns: columns[operand]
+    if isinstance(operand, (list, tuple)):
+        return _compile_expression(operand)
+    return lambda columns: operand
+
+
+def _contains_any(values, words):
+    if _is_array(values):
+        lowered = np.char.lower(values.astype(str))
+        hits = np.zeros(lowered.shape, dtype=bool)
+        for word in words:
+            hits |= np.char.find(lowered, word) >= 0
+        return hits
+    lowered = values.lower()
+    return any(word in lowered for word in words)
+
+
+def _compile_expression(expression):
+    op, *args = expression
+    if op == "contains_any":
+        column, words = args
+        words = list(words)
+        return lambda columns: _contains_any(columns[column], words)
+    if op == "truthy":
+        column = args[0]
+        return lambda columns: columns[column].astype(bool) if _is_array(columns[column]) else bool(columns[column])
+
+    operands = [_compile_operand(arg) for arg in args]
+    if op in ("lt", "le", "gt", "ge", "eq", "mul"):
+        left, right = operands
+        binary = {
+            "lt": lambda a, b: a < b, "le": lambda a, b: a <= b,
+            "gt": lambda a, b: a > b, "ge": lambda a, b: a >= b,
+            "eq": lambda a, b: a == b, "mul": lambda a, b: a * b,
+        }[op]
+        return lambda columns: binary(left(columns), right(columns))
+    if op == "not":
+        inner = operands[0]
+        return lambda columns: _not(inner(columns))
+    if op in ("and", "or"):
+        return _compile_logical(op, operands)
+    raise ValueError(f"Unknown rule operator '{op}'.")
+
+
+def _not(value):
+    return np.logical_not(value) if _is_array(value) else not value
+
+
+def _compile_logical(op, operands):
+    def evaluate(columns):
+        result = operands[0](columns)
+        for operand in operands[1:]:
+            if not _is_array(result):
+                # Scalar path short-circuits, exactly like the original if-statements
+                if (op == "and" and not result) or (op == "or" and result):
+                    return result
+                result = operand(columns)
+                continue
+            value = operand(columns)
+            result = (result & value) if op == "and" else (result | value)
+        return result
+    return evaluate
+
+
+# --- Compiled Rule Set ---
+class ProfileRuleSet:
+    """
+    A list of rules compiled into vectorized predicates.
+
+    `score(frame)` scores many profiles in one call and returns per-rule hit
+    bitmasks (bit i set when PROFILE_RULES[i] fired); `score_one(profile)` is the
+    scalar path used by calculate_profile_risk.
+    """
+
+    def __init__(self, rules: list[dict], max_score: int = MAX_PROFILE_SCORE):
+        if len(rules) > 32:
+            raise ValueError("A profile rule set supports at most 32 rules.")
+        self.rules = rules
+        self.max_score = max_score
+        self.columns = sorted({c for rule in rules for c in _referenced_columns(rule["condition"])})
+        self._predicates = [_compile_expression(rule["condition"]) for rule in rules]
+        self._overrides = [i for i, rule in enumerate(rules) if rule.get("override")]
+
+    def score_one(self, profile: dict) -> tuple[int, list[str]]:
+        """Scores a single profile dict. Same output as the original hand-written rules."""
+        for i in self._overrides:
+            if self._predicates[i](profile):
+                return self.rules[i].get("points", 0), [self.rules[i]["reason"]]
+
+        score = 0
+        reasons = []
+        for i, (rule, predicate) in enumerate(zip(self.rules, self._predicates)):
+            if i in self._overrides:
+                continue
+            if predicate(profile):
+                score += rule["points"]
+                reasons.append(rule["reason"])
+
+        # Cap the final score to keep it on a consistent scale
+        final_score = min(score, self.max_score)
+        if not reasons:
+            reasons.append(NO_RISK_REASON)
+        return final_score, reasons
+
+    def score(self, frame) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Scores every row of a DataFrame (or dict of equal-length arrays).
+
+        Returns:
+            (scores, masks): int64 risk scores (0-max_score) and uint32 rule hit
+            bitmasks. Use `reasons_from_mask` to turn a mask into the reasons list.
+        """
+        columns = {name: np.asarray(frame[name]) for name in self.columns}
+        n = len(next(iter(columns.values()))) if columns else 0
+        masks = np.zeros(n, dtype=np.uint32)
+        scores = np.zeros(n, dtype=np.int64)
+        overridden = np.zeros(n, dtype=bool)
+        override_score = np.zeros(n, dtype=np.int64)
+
+        for i, (rule, predicate) in enumerate(zip(self.rules, self._predicates)):
+            hits = np.broadcast_to(np.asarray(predicate(columns), dtype=bool), (n,))
+            masks |= hits.astype(np.uint32) << np.uint32(i)
+            if i in self._overrides:
+                newly = hits & ~overridden
+                override_score[newly] = rule.get("points", 0)
+                overridden |= hits
+            else:
+                scores += hits * rule["points"]
+
+        scores = np.minimum(scores, self.max_score)
+        return np.where(overridden, override_score, scores), masks
+
+    def reasons_from_mask(self, mask: int) -> list[str]:
+        """Rebuilds the reasons list for one row from its hit bitmask."""
+        mask = int(mask)
+        for i in self._overrides:
+            if mask >> i & 1:
+                return [self.rules[i]["reason"]]
+        reasons = [rule["reason"] for i, rule in enumerate(self.rules)
+                   if i not in self._overrides and mask >> i & 1]
+        return reasons or [NO_RISK_REASON]
+
+
+def _referenced_columns(expression):
+    op, *args = expression
+    if op in ("contains_any", "truthy"):
+        return {args[0]}
+    columns = set()
+    for arg in args:
+        if isinstance(arg, str):
+            columns.add(arg)
+        elif isinstance(arg, (list, tuple)):
+            columns |= _referenced_columns(arg)
+    return columns
+
+
+def load_rules(path: str) -> list[dict]:
+    """Loads a rule list from a JSON file with the same structure as PROFILE_RULES."""
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+DEFAULT_RULE_SET = ProfileRuleSet(PROFILE_RULES)
+
+
+def score_profiles(frame, rule_set: ProfileRuleSet = DEFAULT_RULE_SET) -> tuple[np.ndarray, np.ndarray]:
+    """Vectorized profile scoring with the default rules. See ProfileRuleSet.score."""
+    return rule_set.score(frame)
@@ -0,0 +1,213 @@
+# --- profiler_hooks.py ---
+# On-demand CPU and memory profiling of the analysis path.
+#
+# Functions decorated with `@profiled(name)` (analyze_chat_history,
+# classify_message_window, calculate_final_verdict) run untouched unless
+# profiling is switched on, by PROFILING_ENABLED=1 or by `configure()` / the CLI
+# below. A profiled call then gets:
+#
+# - a sampling CPU profile of its thread (sys._current_frames every
+#   PROFILING_INTERVAL_MS), dumped as collapsed stacks for flamegraph.pl or
+#   speedscope: <dir>/<time>_<name>_<id>.collapsed
+# - tracemalloc snapshots before and after, dumped as the top allocation sites
+#   and the traced peak: <dir>/<time>_<name>_<id>.alloc.txt
+#
+# PROFILING_SAMPLE_RATE profiles only that fraction of calls, so the switch can
+# stay on in production. A profiled call nested in another one (the classifier
+# inside analyze_chat_history) is covered by the outer profile.
+#
+# CLI: python profiler_hooks.py chat_export.txt [--suspect NAME] [--interval-ms 1]
+
+import functools
+import os
+import random
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import Counter
+from datetime import datetime
+
+from logger_config import get_logger
+
+logger = get_logger(__name__)
+
+# --- Configuration (environment overridable) ---
+ENABLED = os.getenv("PROFILING_ENABLED", "0") == "1"
+# Fraction of calls that are profiled (1.0 = every call).
+SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", "1.0"))
+# Stack sampling interval of the CPU profiler.
+INTERVAL_MS = float(os.getenv("PROFILING_INTERVAL_MS", "5"))
+PROFILE_DIR = os.getenv("PROFILING_DIR", os.path.join("logs", "profiles"))
+# Allocation sites listed in the report, and stack depth tracemalloc records.
+TOP_ALLOCATIONS = int(os.getenv("PROFILING_TOP_ALLOCATIONS", "25"))
+TRACEMALLOC_FRAMES = 1
+
+
+class _Config:
+    def __init__(self):
+        self.enabled = ENABLED
+        self.sample_rate = SAMPLE_RATE
+        self.interval_s = INTERVAL_MS / 1000
+        self.profile_dir = PROFILE_DIR
+
+
+_config = _Config()
+_local = threading.local()
+_tracemalloc_lock = threading.Lock()
+_tracemalloc_users = 0
+_tracemalloc_owned = False
+
+
+def configure(enabled: bool = True, sample_rate: float | None = None, interval_ms: float | None = None,
+              profile_dir: str | None = None):
+    """Switches profiling on or off at runtime (overrides the PROFILING_* variables)."""
+    _config.enabled = enabled
+    if sample_rate is not None:
+        _config.sample_rate = sample_rate
+    if interval_ms is not None:
+        _config.interval_s = interval_ms / 1000
+    if profile_dir is not None:
+        _config.profile_dir = profile_dir
+
+
+def _collapse(frame) -> str:
+    """One stack as 'root;...;leaf', each frame as 'function (file:first line)'."""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class StackSampler:
+    """Samples the stack of one thread every `interval_s` from a background thread."""
+
+    def __init__(self, thread_id: int, interval_s: float):
+        self.thread_id = thread_id
+        self.interval_s = interval_s
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self) -> Counter:
+        self._stop.set()
+        self._thread.join()
+        return self.stacks
+
+    def _run(self):
+        while not self._stop.wait(self.interval_s):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[_collapse(frame)] += 1
+            del frame
+
+
+def _start_tracemalloc():
+    global _tracemalloc_users, _tracemalloc_owned
+    with _tracemalloc_lock:
+        if _tracemalloc_users == 0:
+            _tracemalloc_owned = not tracemalloc.is_tracing()
+            if _tracemalloc_owned:
+                tracemalloc.start(TRACEMALLOC_FRAMES)
+            tracemalloc.reset_peak()
+        _tracemalloc_users += 1
+    return tracemalloc.take_snapshot()
+
+
+def _stop_tracemalloc():
+    global _tracemalloc_users
+    snapshot = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    with _tracemalloc_lock:
+        _tracemalloc_users -= 1
+        if _tracemalloc_users == 0 and _tracemalloc_owned:
+            tracemalloc.stop()
+    return snapshot, peak
+
+
+def _write_reports(name: str, wall_s: float, stacks: Counter, before, after, peak: int, overlapping: bool) -> dict:
+    os.makedirs(_config.profile_dir, exist_ok=True)
+    stem = os.path.join(_config.profile_dir, f"{datetime.now():%Y%m%d_%H%M%S}_{name}_{uuid.uuid4().hex[:6]}")
+
+    with open(f"{stem}.collapsed", "w", encoding="utf-8") as f:
+        for stack, count in stacks.most_common():
+            f.write(f"{stack} {count}\n")
+
+    filters = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+    top = after.filter_traces(filters).compare_to(before.filter_traces(filters), "lineno")[:TOP_ALLOCATIONS]
+    with open(f"{stem}.alloc.txt", "w", encoding="utf-8") as f:
+        f.write(f"{name}: {wall_s * 1000:.1f} ms wall, {sum(stacks.values())} CPU samples, "
+                f"traced peak {peak / 1024 / 1024:.1f} MB\n")
+        if overlapping:
+            f.write("note: other profiled calls ran at the same time; the peak and allocations include theirs\n")
+        f.write(f"\nTop {len(top)} allocation sites (growth during the call):\n")
+        for stat in top:
+            f.write(f"{stat}\n")
+
+    return {"name": name, "wall_s": round(wall_s, 4), "samples": sum(stacks.values()),
+            "peak_mb": round(peak / 1024 / 1024, 2), "collapsed": f"{stem}.collapsed", "allocations": f"{stem}.alloc.txt"}
+
+
+def run_profiled(name: str, fn, *args, **kwargs):
+    """Calls `fn` under the CPU sampler and tracemalloc and writes its reports."""
+    _local.active = True
+    sampler = StackSampler(threading.get_ident(), _config.interval_s).start()
+    before = _start_tracemalloc()
+    overlapping = _tracemalloc_users > 1
+    start = time.perf_counter()
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        wall_s = time.perf_counter() - start
+        stacks = sampler.stop()
+        after, peak = _stop_tracemalloc()
+        _local.active = False
+        try:
+            report = _write_reports(name, wall_s, stacks, before, after, peak, overlapping)
+            logger.info(f"Profiled {name}: {report}")
+        except OSError as e:
+            logger.error(f"Could not write the profile of {name}: {e}")
+
+
+def profiled(name: str):
+    """Decorator: profiles calls of the function while profiling is switched on."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if (not _config.enabled or getattr(_local, "active", False)
+                    or (_config.sample_rate < 1.0 and random.random() >= _config.sample_rate)):
+                return fn(*args, **kwargs)
+            return run_profiled(name, fn, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Profile the chat analysis of one chat export.")
+    parser.add_argument("chat_file", help="WhatsApp .txt, Instagram/Telegram .json or plain-text chat log.")
+    parser.add_argument("--suspect", help="The suspect's name in the export (default: every sender).")
+    parser.add_argument("--interval-ms", type=float, default=1.0)
+    parser.add_argument("--out", default=PROFILE_DIR, help="Directory for the reports.")
+    args = parser.parse_args()
+
+    # The decorated functions use the importable module, not this __main__ copy
+    import profiler_hooks
+    from chat_analyzer import analyze_chat_history
+    from chat_parser import read_chat_messages
+    from verdict_engine import calculate_final_verdict
+
+    messages, summary = read_chat_messages(args.chat_file, suspect=args.suspect)
+    print(f"Read {summary['total_messages']} messages; analyzing {len(messages)}.")
+    profiler_hooks.configure(enabled=True, sample_rate=1.0, interval_ms=args.interval_ms, profile_dir=args.out)
+    analysis = analyze_chat_history(messages)
+    print(f"Final verdict (profile risk 0): {calculate_final_verdict(0, analysis):.2f}")
+    print(f"Reports written to {args.out}")
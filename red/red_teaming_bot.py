@@ -1,7 +1,9 @@
 # --- red_teaming_bot.py ---
 # REFACTORED FOR STREAMLIT
 
-import google.generativeai as genai
+from langchain_core.messages import AIMessage, HumanMessage
+
+from llm_client import get_llm
 
 # The System Prompt is now a constant we can import
 SYSTEM_PROMPT = """
@@ -18,30 +20,58 @@ RULES:
 5.  Show enthusiasm for their "opportunity" to keep them engaged.
 """
 
+def _to_messages(conversation_history: list) -> list:
+    """Converts Gemini-style {'role', 'parts'} dictionaries to LangChain messages."""
+    return [
+        (AIMessage if message["role"] == "model" else HumanMessage)(content="".join(str(p) for p in message["parts"]))
+        for message in conversation_history
+    ]
+
 def get_gemini_reply(api_key: str, conversation_history: list):
     """
     Gets a single reply from the Gemini model based on a conversation history.
+    Uses the shared client from llm_client (reused connection, timeout, backoff on
+    quota errors, per-call metrics; BOT_LLM_BACKEND=fake for the offline model).
 
     Args:
         api_key: Your Google AI API key.
         conversation_history: A list of message dictionaries (role, parts).
+            The last one is the user message to answer.
 
     Returns:
         A string with the bot's reply, or an error message.
     """
     try:
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel(model_name="gemini-pro")
-        
-        # Start the chat with the existing history
-        convo = model.start_chat(history=conversation_history)
-        
-        # We need to send the last message from the user
-        last_user_message = conversation_history[-1]['parts'][0]
-        response = convo.send_message(last_user_message)
-        
-        return response.text
+        llm = get_llm(api_key=api_key)
+        # The history is sent once, ending with the message to answer
+        response = llm.invoke(_to_messages(conversation_history))
+        return response.content
     except Exception as e:
         error_message = f"Error with Gemini API: {e}"
         print(error_message)
-        return error_message
\ No newline at end of file
+        return error_message
+
+
+# --- Offline benchmark of the red-team flow (BOT_LLM_BACKEND=fake) ---
+if __name__ == "__main__":
+    import os
+    import time
+
+    from llm_client import LLM_CALL_METRICS
+
+    os.environ.setdefault("BOT_LLM_BACKEND", "fake")
+    scammer_lines = [
+        "hiii, i saw ur profile, u seem really smart. do u know about crypto?",
+        "my mentor showed me a platform where u double ur usdt in a week",
+        "its easy, u just send to the wallet they give u and watch it grow",
+        "i can send u the link, whats ur whatsapp?",
+    ]
+    history = []
+    start = time.perf_counter()
+    for turn in range(20):
+        history.append({"role": "user", "parts": [scammer_lines[turn % len(scammer_lines)]]})
+        history.append({"role": "model", "parts": [get_gemini_reply("offline", history)]})
+    elapsed = time.perf_counter() - start
+    calls = list(LLM_CALL_METRICS)
+    print(f"20 turns in {elapsed:.2f}s, {sum(c['latency_s'] for c in calls) / len(calls):.3f}s mean call latency")
+    print(f"tokens in/out: {sum(c['input_tokens'] for c in calls)}/{sum(c['output_tokens'] for c in calls)}")
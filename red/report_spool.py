@@ -0,0 +1,256 @@
+# --- report_spool.py ---
+# Durable write-behind spool for scammer reports (db_connector.Neo4jConnection).
+#
+# - `append()` writes the report to a local SQLite file (WAL) and returns at
+#   once, so an analyst never waits on (or loses a report to) a slow or
+#   unreachable Neo4j Aura.
+# - A background flusher drains the spool oldest first, REPORT_SPOOL_BATCH_SIZE
+#   reports per write. A batch that fails on a retryable error (the database is
+#   unreachable) stays spooled and is retried with exponential backoff, capped
+#   at REPORT_SPOOL_MAX_BACKOFF_S.
+# - A batch rejected for any other reason is retried in halves until the
+#   rejected report is written alone; after REPORT_SPOOL_MAX_ATTEMPTS failures
+#   it moves to a dead_letter table, so one bad report cannot block the ones
+#   behind it. `requeue_dead_letters()` spools them again once fixed.
+# - Every report carries a `report_id` idempotency key. WRITE_REPORTS_QUERY
+#   MERGEs REPORTED on it, so a batch replayed after a lost acknowledgement is
+#   neither duplicated nor counted twice.
+# - Every report also carries `enqueued_at` (epoch ms), so it is dated by when
+#   it was reported rather than by when the flusher wrote it.
+# - `metrics()` reports the spool depth, lag (age of the oldest report) and
+#   how many reports were dead-lettered.
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+from logger_config import get_logger
+from telemetry import observe
+
+logger = get_logger(__name__)
+
+# --- Configuration (environment overridable) ---
+# Set to 0 to write reports to Neo4j in the request again.
+SPOOL_ENABLED = os.getenv("REPORT_SPOOL_ENABLED", "1") != "0"
+SPOOL_DB_PATH = os.getenv("REPORT_SPOOL_DB", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "report_spool.sqlite3"))
+BATCH_SIZE = int(os.getenv("REPORT_SPOOL_BATCH_SIZE", "500"))
+# How often the flusher checks the spool when nothing wakes it.
+FLUSH_INTERVAL_S = float(os.getenv("REPORT_SPOOL_FLUSH_INTERVAL_S", "2"))
+MAX_BACKOFF_S = float(os.getenv("REPORT_SPOOL_MAX_BACKOFF_S", "300"))
+# Failed writes of a report on its own before it is dead-lettered.
+MAX_ATTEMPTS = int(os.getenv("REPORT_SPOOL_MAX_ATTEMPTS", "5"))
+# Errors that say nothing about the reports themselves: backed off and retried
+# as they are, never dead-lettered (db_connector adds the Neo4j driver's).
+RETRYABLE_ERRORS = (ConnectionError, TimeoutError)
+
+
+def new_report_id() -> str:
+    return str(uuid.uuid4())
+
+
+class ReportSpool:
+    """
+    Spools reports locally and drains them through `write_batch`.
+
+    Args:
+        write_batch: f(list of report dicts) that writes them all or raises.
+        db_path: SQLite file (":memory:" for a throwaway spool).
+        batch_size: Reports per `write_batch` call.
+        flush_interval_s: Flusher poll interval, and the first retry delay.
+        max_backoff_s: Longest delay between retries of a failing batch.
+        max_attempts: Failed writes of a lone report before it is dead-lettered.
+        retryable_errors: Exception types that never split a batch or dead-letter a report.
+    """
+
+    def __init__(self, write_batch, db_path: str = SPOOL_DB_PATH, batch_size: int = BATCH_SIZE,
+                 flush_interval_s: float = FLUSH_INTERVAL_S, max_backoff_s: float = MAX_BACKOFF_S,
+                 max_attempts: int = MAX_ATTEMPTS, retryable_errors: tuple = RETRYABLE_ERRORS):
+        if db_path != ":memory:":
+            os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self.write_batch = write_batch
+        self.batch_size = batch_size
+        self.flush_interval_s = flush_interval_s
+        self.max_backoff_s = max_backoff_s
+        self.max_attempts = max_attempts
+        self.retryable_errors = retryable_errors
+        # Shrinks while a rejected batch is split, grows back as batches succeed
+        self._batch_limit = batch_size
+        self._lock = threading.Lock()        # the SQLite connection
+        self._flush_lock = threading.Lock()  # one flush at a time
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self.flushed = 0
+        self.failed_batches = 0
+        self.consecutive_failures = 0
+        self.retry_at = 0.0
+        self.last_error = None
+        self.last_flush_at = None
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        if db_path != ":memory:":
+            self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS spool (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT, report_id TEXT NOT NULL UNIQUE,
+                report TEXT NOT NULL, enqueued_at REAL NOT NULL, attempts INTEGER NOT NULL DEFAULT 0);
+            CREATE TABLE IF NOT EXISTS dead_letter (
+                seq INTEGER PRIMARY KEY, report_id TEXT NOT NULL UNIQUE, report TEXT NOT NULL,
+                enqueued_at REAL NOT NULL, attempts INTEGER NOT NULL, error TEXT, dead_at REAL NOT NULL);
+        """)
+        self._db.commit()
+
+    # --- Producer side ---
+    def append(self, report: dict) -> str:
+        """
+        Durably spools `report` (adding a report_id and enqueued_at if it has
+        none) and returns its report_id.
+        """
+        now = time.time()
+        report = {**report, "report_id": report.get("report_id") or new_report_id(),
+                  "enqueued_at": report.get("enqueued_at") or int(now * 1000)}
+        with self._lock:
+            # Committed (and in the WAL) before the caller is acknowledged
+            self._db.execute("INSERT OR IGNORE INTO spool (report_id, report, enqueued_at) VALUES (?, ?, ?)",
+                             (report["report_id"], json.dumps(report), now))
+            self._db.commit()
+        self._wake.set()
+        return report["report_id"]
+
+    # --- Flushing ---
+    def flush_once(self) -> int:
+        """Writes the oldest batch unless backing off; returns how many reports it removed from the spool."""
+        with self._flush_lock:
+            if time.time() < self.retry_at:
+                return 0
+            with self._lock:
+                rows = self._db.execute("SELECT seq, report, attempts FROM spool ORDER BY seq LIMIT ?",
+                                        (self._batch_limit,)).fetchall()
+            if not rows:
+                return 0
+            start = time.perf_counter()
+            try:
+                self.write_batch([json.loads(report) for _, report, _ in rows])
+            except Exception as e:
+                observe("report_spool_flush", time.perf_counter() - start, error=True)
+                self._failed(rows, e)
+                return 0
+            observe("report_spool_flush", time.perf_counter() - start)
+            with self._lock:
+                self._db.executemany("DELETE FROM spool WHERE seq = ?", [(seq,) for seq, _, _ in rows])
+                self._db.commit()
+            self.flushed += len(rows)
+            self.consecutive_failures = 0
+            self.retry_at = 0.0
+            self._batch_limit = min(self.batch_size, self._batch_limit * 2)
+            self.last_flush_at = time.time()
+            return len(rows)
+
+    def _failed(self, rows, error):
+        seqs = [(seq,) for seq, _, _ in rows]
+        self.failed_batches += 1
+        self.last_error = f"{type(error).__name__}: {error}"
+        rejected = not isinstance(error, self.retryable_errors)
+        dead = rejected and len(rows) == 1 and rows[0][2] + 1 >= self.max_attempts
+        with self._lock:
+            self._db.executemany("UPDATE spool SET attempts = attempts + 1 WHERE seq = ?", seqs)
+            if dead:
+                self._db.execute("""INSERT OR REPLACE INTO dead_letter
+                                    SELECT seq, report_id, report, enqueued_at, attempts, ?, ?
+                                    FROM spool WHERE seq = ?""", (self.last_error, time.time(), rows[0][0]))
+                self._db.execute("DELETE FROM spool WHERE seq = ?", seqs[0])
+            self._db.commit()
+
+        if dead:
+            # Nothing to wait for: the reports behind it go next
+            self.consecutive_failures = 0
+            self.retry_at = 0.0
+            logger.error(f"Report spool dead-lettered a report after {self.max_attempts} failed writes "
+                         f"({self.last_error}); {self.depth()} spooled.")
+            return
+        if rejected and len(rows) > 1:
+            # The database answered, so retry in halves without backing off, to isolate the rejected report
+            self._batch_limit = max(1, len(rows) // 2)
+            logger.warning(f"Report spool batch of {len(rows)} reports was rejected ({self.last_error}); "
+                           f"retrying in batches of {self._batch_limit}.")
+            return
+        self.consecutive_failures += 1
+        backoff = min(self.max_backoff_s, self.flush_interval_s * 2 ** (self.consecutive_failures - 1))
+        self.retry_at = time.time() + backoff
+        logger.warning(f"Report spool flush of {len(rows)} reports failed ({self.last_error}); "
+                       f"{self.depth()} spooled, retrying in {backoff:.0f}s.")
+
+    def flush(self) -> int:
+        """Flushes batches until the spool is empty or a write fails; returns how many were written."""
+        total = 0
+        while (written := self.flush_once()):
+            total += written
+        return total
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="report-spool-flusher", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval_s)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Report spool flusher error.")
+
+    def stop(self, drain: bool = True, timeout: float = 10.0):
+        """Stops the flusher; with `drain`, first tries once more to write what is spooled (ignoring the backoff)."""
+        if self._thread is not None:
+            self._stop.set()
+            self._wake.set()
+            self._thread.join(timeout)
+            self._thread = None
+        if drain:
+            self.retry_at = 0.0
+            self.flush()
+
+    def requeue_dead_letters(self) -> int:
+        """Spools every dead-lettered report again (attempts reset); returns how many."""
+        with self._lock:
+            count = self._db.execute("SELECT COUNT(*) FROM dead_letter").fetchone()[0]
+            self._db.execute("""INSERT OR IGNORE INTO spool (report_id, report, enqueued_at)
+                                SELECT report_id, report, enqueued_at FROM dead_letter ORDER BY seq""")
+            self._db.execute("DELETE FROM dead_letter")
+            self._db.commit()
+        self._wake.set()
+        return count
+
+    def close(self):
+        self.stop()
+        with self._lock:
+            self._db.close()
+
+    # --- Metrics ---
+    def depth(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM spool").fetchone()[0]
+
+    def metrics(self) -> dict:
+        with self._lock:
+            depth, oldest, max_attempts = self._db.execute(
+                "SELECT COUNT(*), MIN(enqueued_at), MAX(attempts) FROM spool").fetchone()
+            dead_lettered = self._db.execute("SELECT COUNT(*) FROM dead_letter").fetchone()[0]
+        now = time.time()
+        return {
+            "depth": depth,
+            "lag_s": round(now - oldest, 3) if oldest is not None else 0.0,
+            "max_attempts": max_attempts or 0,
+            "dead_lettered": dead_lettered,
+            "flushed": self.flushed,
+            "failed_batches": self.failed_batches,
+            "consecutive_failures": self.consecutive_failures,
+            "retry_in_s": round(max(0.0, self.retry_at - now), 3),
+            "last_error": self.last_error,
+            "last_flush_at": self.last_flush_at,
+        }
@@ -0,0 +1,120 @@
+# --- scammer_history.py ---
+# Cached lookup of what earlier reports say about a username: how often it was
+# reported, when last, and the manipulation tactics seen (the Scammer nodes and
+# USED_TACTIC edges written by db_connector), for the verdict's prior-reports factor.
+#
+# - Found histories are cached for SCAMMER_HISTORY_TTL_S, unknown usernames
+#   (negative results) for the shorter SCAMMER_HISTORY_NEGATIVE_TTL_S, so a
+#   repeat lookup costs a dictionary access.
+# - `prefetch()` starts a lookup in the background, so a cache miss overlaps
+#   with the chat analysis instead of adding a round trip to it.
+# - A failed lookup is logged and treated as "no history" (and not cached),
+#   and so is one still running after SCAMMER_HISTORY_WAIT_S (`wait()`): the
+#   analysis never fails, or waits longer than that, on the database.
+# - `invalidate()` drops a username once it is reported again; the app
+#   registers it with the connection (Neo4jConnection.add_report_listener),
+#   which calls it at submit and again when a spooled report reaches Neo4j.
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from cachetools import TTLCache
+
+from logger_config import get_logger
+
+logger = get_logger(__name__)
+
+# --- Configuration (environment overridable) ---
+# Set to 1 to feed prior reports into the app's final verdict.
+PRIOR_REPORTS_ENABLED = os.getenv("PRIOR_REPORTS_ENABLED", "0") == "1"
+HISTORY_TTL_S = float(os.getenv("SCAMMER_HISTORY_TTL_S", "300"))
+NEGATIVE_TTL_S = float(os.getenv("SCAMMER_HISTORY_NEGATIVE_TTL_S", "60"))
+HISTORY_CACHE_SIZE = int(os.getenv("SCAMMER_HISTORY_CACHE_SIZE", "10000"))
+# Longest the analysis waits for a prefetched lookup before going on without it.
+HISTORY_WAIT_S = float(os.getenv("SCAMMER_HISTORY_WAIT_S", "0.5"))
+
+
+class ScammerHistoryCache:
+    """
+    TTL cache in front of a scammer-history read.
+
+    Args:
+        fetch: f(username) -> history dict, or None when the username was never
+               reported (e.g. Neo4jConnection.get_scammer_history).
+        ttl_s: How long a found history is reused.
+        negative_ttl_s: How long "never reported" is reused.
+        maxsize: Usernames kept in each cache.
+        wait_s: How long `wait()` waits for a prefetched lookup.
+    """
+
+    def __init__(self, fetch, ttl_s: float = HISTORY_TTL_S, negative_ttl_s: float = NEGATIVE_TTL_S,
+                 maxsize: int = HISTORY_CACHE_SIZE, wait_s: float = HISTORY_WAIT_S):
+        self.fetch = fetch
+        self.wait_s = wait_s
+        self._found = TTLCache(maxsize, ttl_s)
+        self._unknown = TTLCache(maxsize, negative_ttl_s)
+        self._lock = threading.Lock()  # TTLCache is not thread-safe
+        self._pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="scammer-history")
+        self.hits = self.negative_hits = self.misses = self.errors = self.timeouts = 0
+        self.fetch_s_total = 0.0
+
+    def get(self, username: str) -> dict | None:
+        """The username's history, or None if it was never reported (or the lookup failed)."""
+        with self._lock:
+            if username in self._found:
+                self.hits += 1
+                return self._found[username]
+            if username in self._unknown:
+                self.negative_hits += 1
+                return None
+            self.misses += 1
+        start = time.perf_counter()
+        try:
+            history = self.fetch(username)
+        except Exception as e:
+            with self._lock:
+                self.errors += 1
+                self.fetch_s_total += time.perf_counter() - start
+            logger.warning(f"Scammer history lookup for '{username}' failed: {e}")
+            return None
+        with self._lock:
+            self.fetch_s_total += time.perf_counter() - start
+            (self._found if history is not None else self._unknown)[username] = history
+        return history
+
+    def prefetch(self, username: str):
+        """Starts `get(username)` in the background; returns its Future."""
+        return self._pool.submit(self.get, username)
+
+    def wait(self, pending) -> dict | None:
+        """The result of a `prefetch`, or None if it is not done within `wait_s`."""
+        try:
+            return pending.result(timeout=self.wait_s)
+        except TimeoutError:
+            with self._lock:
+                self.timeouts += 1
+            logger.warning(f"Scammer history lookup still running after {self.wait_s}s; going on without it.")
+            return None
+
+    def invalidate(self, username: str):
+        """Forgets a username, e.g. after reporting it, so the next lookup sees the new count."""
+        with self._lock:
+            self._found.pop(username, None)
+            self._unknown.pop(username, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.negative_hits + self.misses
+            return {
+                "lookups": lookups,
+                "hit_rate": round((self.hits + self.negative_hits) / lookups, 3) if lookups else 0.0,
+                "hits": self.hits,
+                "negative_hits": self.negative_hits,
+                "misses": self.misses,
+                "errors": self.errors,
+                "timeouts": self.timeouts,
+                "avg_fetch_ms": round(self.fetch_s_total / self.misses * 1000, 3) if self.misses else 0.0,
+                "cached": len(self._found) + len(self._unknown),
+            }
@@ -0,0 +1,242 @@
+# --- session_manager.py ---
+# Drives many red-team bot sessions concurrently on one asyncio event loop.
+#
+# - Every (analyst, engagement) pair gets its own chat history in bot.get_store().
+# - Turns of one session go through a per-session queue, so they are answered
+#   in order and never overlap; different sessions run concurrently.
+# - All sessions share one token-bucket rate limiter and one concurrency cap,
+#   sized to the Gemini quota.
+#
+# Streamlit threads use `stream_reply` / `submit_threadsafe`; async callers
+# (batch jobs, the load test below) await `submit` directly.
+
+import asyncio
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import Future
+
+from logger_config import get_logger
+
+logger = get_logger(__name__)
+
+# --- Configuration (environment overridable) ---
+# Shared Gemini quota: requests per minute (0 = unlimited) and concurrent calls.
+REQUESTS_PER_MINUTE = float(os.getenv("BOT_REQUESTS_PER_MINUTE", "60"))
+MAX_CONCURRENCY = int(os.getenv("BOT_MAX_CONCURRENCY", "8"))
+# Requests allowed in a burst before the per-minute rate applies.
+RATE_BURST = int(os.getenv("BOT_RATE_BURST", str(MAX_CONCURRENCY)))
+# Per-session workers exit after this long without a turn (restarted on demand).
+WORKER_IDLE_SECONDS = 60.0
+
+
+def session_key(analyst_id: str, engagement_id: str) -> str:
+    """The chat-history session ID for one analyst's engagement."""
+    return f"{analyst_id}/{engagement_id}"
+
+
+def new_engagement_id() -> str:
+    return uuid.uuid4().hex[:12]
+
+
+class TokenBucket:
+    """
+    Async token-bucket rate limiter: refills `rate` tokens per second up to
+    `capacity`. Waiters are served in arrival order. A rate of 0 disables it.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = max(capacity, 1)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, tokens: float = 1.0) -> float:
+        """Waits until `tokens` are available and takes them. Returns the seconds waited."""
+        if self.rate <= 0:
+            return 0.0
+        async with self._lock:
+            self._refill()
+            wait = max(0.0, (tokens - self._tokens) / self.rate)
+            if wait:
+                await asyncio.sleep(wait)
+                self._refill()
+            self._tokens -= tokens
+            return wait
+
+
+class AsyncSessionManager:
+    """
+    Runs bot turns for many sessions concurrently, in order within each session.
+
+    Args:
+        reply_fn: async f(user_input, session_id, on_token) -> result dict
+            (default: bot.aget_gemini_reply).
+        requests_per_minute: Shared rate limit for all sessions (0 = unlimited).
+        max_concurrency: Turns allowed to wait on the LLM at the same time.
+        burst: Token-bucket capacity.
+    """
+
+    def __init__(self, reply_fn=None, requests_per_minute: float = REQUESTS_PER_MINUTE,
+                 max_concurrency: int = MAX_CONCURRENCY, burst: int = RATE_BURST,
+                 worker_idle_seconds: float = WORKER_IDLE_SECONDS):
+        if reply_fn is None:
+            from bot import aget_gemini_reply
+            reply_fn = aget_gemini_reply
+        self.reply_fn = reply_fn
+        self.limiter = TokenBucket(requests_per_minute / 60.0, burst)
+        self.max_concurrency = max_concurrency
+        self.worker_idle_seconds = worker_idle_seconds
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._queues = {}
+        self._workers = {}
+        self._loop = None
+        self._thread_lock = threading.Lock()
+        # Counters for `stats()`
+        self._in_flight = 0
+        self._completed = 0
+        self._failed = 0
+        self._rate_wait_s = 0.0
+        self._latencies = deque(maxlen=1000)
+
+    # --- Async API ---
+    async def submit(self, analyst_id: str, engagement_id: str, user_input: str, on_token=None) -> dict:
+        """Queues one scammer message for an engagement and returns the bot's result dict."""
+        return await self._enqueue(session_key(analyst_id, engagement_id), user_input, on_token)
+
+    async def _enqueue(self, session_id: str, user_input: str, on_token=None) -> dict:
+        future = asyncio.get_running_loop().create_future()
+        queue = self._queues.get(session_id)
+        if queue is None:
+            queue = self._queues[session_id] = asyncio.Queue()
+            self._workers[session_id] = asyncio.create_task(self._worker(session_id, queue))
+        queue.put_nowait((user_input, on_token, future, time.perf_counter()))
+        return await future
+
+    async def _worker(self, session_id: str, queue: asyncio.Queue):
+        while True:
+            try:
+                user_input, on_token, future, queued_at = await asyncio.wait_for(queue.get(), self.worker_idle_seconds)
+            except asyncio.TimeoutError:
+                if queue.empty():
+                    del self._queues[session_id]
+                    del self._workers[session_id]
+                    return
+                continue
+            if future.done():
+                continue
+            try:
+                self._rate_wait_s += await self.limiter.acquire()
+                async with self._semaphore:
+                    self._in_flight += 1
+                    try:
+                        result = await self.reply_fn(user_input, session_id, on_token)
+                    finally:
+                        self._in_flight -= 1
+            except Exception as e:
+                self._failed += 1
+                logger.error(f"Bot turn failed for session '{session_id}': {e}", exc_info=True)
+                if not future.done():
+                    future.set_exception(e)
+            else:
+                self._completed += 1
+                self._latencies.append(time.perf_counter() - queued_at)
+                if not future.done():
+                    future.set_result(result)
+
+    def stats(self) -> dict:
+        """Snapshot of active sessions, queued and in-flight turns, and turn latency."""
+        latencies = sorted(self._latencies)
+        return {
+            "active_sessions": len(self._queues),
+            "queued_turns": sum(q.qsize() for q in self._queues.values()),
+            "in_flight": self._in_flight,
+            "completed": self._completed,
+            "failed": self._failed,
+            "rate_wait_s": round(self._rate_wait_s, 3),
+            "p50_turn_s": round(latencies[len(latencies) // 2], 3) if latencies else None,
+            "p95_turn_s": round(latencies[int(len(latencies) * 0.95)], 3) if latencies else None,
+        }
+
+    async def aclose(self):
+        """Cancels the per-session workers; turns still queued are dropped."""
+        for task in list(self._workers.values()):
+            task.cancel()
+        await asyncio.gather(*self._workers.values(), return_exceptions=True)
+        self._queues.clear()
+        self._workers.clear()
+
+    # --- Thread API (Streamlit) ---
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._thread_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name="session-manager", daemon=True).start()
+            return self._loop
+
+    def _submit_session(self, user_input: str, session_id: str, on_token=None) -> Future:
+        return asyncio.run_coroutine_threadsafe(self._enqueue(session_id, user_input, on_token), self._ensure_loop())
+
+    def submit_threadsafe(self, analyst_id: str, engagement_id: str, user_input: str, on_token=None) -> Future:
+        """Like `submit`, from a non-async thread; returns a concurrent.futures.Future."""
+        return self._submit_session(user_input, session_key(analyst_id, engagement_id), on_token)
+
+    def stream_reply(self, analyst_id: str, engagement_id: str, user_input: str):
+        """Returns a bot.ReplyStream for st.write_stream, rate-limited and ordered by this manager."""
+        from bot import ReplyStream
+        return ReplyStream(user_input, session_key(analyst_id, engagement_id), submit=self._submit_session)
+
+
+# --- Load test: 200 simultaneous engagements against the offline stub model ---
+if __name__ == "__main__":
+    import argparse
+    import tempfile
+
+    parser = argparse.ArgumentParser(description="Load-test the session manager with the fake streaming LLM.")
+    parser.add_argument("--engagements", type=int, default=200)
+    parser.add_argument("--turns", type=int, default=3)
+    parser.add_argument("--rpm", type=float, default=6000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--stream", action="store_true", help="Stream replies token by token")
+    args = parser.parse_args()
+
+    os.environ["BOT_LLM_BACKEND"] = "fake"
+    os.environ.setdefault("BOT_HISTORY_DB", os.path.join(tempfile.mkdtemp(), "load_test.sqlite3"))
+    import bot
+
+    scammer_lines = [
+        "hey cutie, you look like you work somewhere interesting, whats your job?",
+        "i just moved here for work, its so lonely. can we talk on whatsapp instead?",
+        "my cousin does crypto trading, he doubled his money last month, interested?",
+    ]
+
+    async def engagement(manager, analyst_id, engagement_id):
+        # All turns are queued at once; the manager must still answer them in order
+        turns = [f"{scammer_lines[t % len(scammer_lines)]} ({engagement_id} turn {t})" for t in range(args.turns)]
+        on_token = (lambda chunk: None) if args.stream else None
+        await asyncio.gather(*(manager.submit(analyst_id, engagement_id, text, on_token) for text in turns))
+        history = bot.get_session_history(session_key(analyst_id, engagement_id)).messages
+        return [m.content for m in history if m.type == "human"] == turns
+
+    async def main():
+        manager = AsyncSessionManager(requests_per_minute=args.rpm, max_concurrency=args.concurrency)
+        start = time.perf_counter()
+        ordered = await asyncio.gather(*(
+            engagement(manager, f"analyst-{i % 10}", f"eng-{i}") for i in range(args.engagements)))
+        elapsed = time.perf_counter() - start
+        stats = manager.stats()
+        await manager.aclose()
+        turns = args.engagements * args.turns
+        print(f"{args.engagements} engagements x {args.turns} turns in {elapsed:.2f}s ({turns / elapsed:.0f} turns/s)")
+        print(f"ordered & isolated histories: {sum(ordered)}/{len(ordered)}")
+        print(f"manager stats: {stats}")
+
+    asyncio.run(main())
@@ -0,0 +1,244 @@
+# --- session_store.py ---
+# Bounded, persistent chat history store for the red-team bot (bot.py).
+#
+# - Sessions live in an LRU: idle sessions are unloaded from memory, never lost.
+# - Every message is written through to a local SQLite file, so history
+#   survives Streamlit restarts.
+# - `window()` keeps the prompt inside a token budget: recent turns are sent
+#   verbatim and older ones are replaced by a rolling summary that is cached
+#   in SQLite and only extended every few turns.
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from langchain_core.chat_history import BaseChatMessageHistory
+from langchain_core.messages import BaseMessage, SystemMessage, messages_from_dict, message_to_dict
+
+from logger_config import get_logger
+
+logger = get_logger(__name__)
+
+# --- Configuration (environment overridable) ---
+HISTORY_DB_PATH = os.getenv("BOT_HISTORY_DB", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "bot_history.sqlite3"))
+MAX_SESSIONS = int(os.getenv("BOT_MAX_SESSIONS", "256"))
+SESSION_IDLE_SECONDS = int(os.getenv("BOT_SESSION_IDLE_SECONDS", "3600"))
+# Token budget for the history part of the prompt. 0 disables windowing (full history).
+HISTORY_TOKEN_BUDGET = int(os.getenv("BOT_HISTORY_TOKEN_BUDGET", "1500"))
+# Share of the budget reserved for the rolling summary of older turns.
+SUMMARY_TOKEN_SHARE = 0.25
+SUMMARY_PREFIX = "Summary of the earlier conversation: "
+
+
+def approx_token_count(text: str) -> int:
+    """Cheap token estimate (~4 characters per token), good enough for budgeting."""
+    return len(text) // 4 + 1
+
+
+def extractive_summary(previous_summary: str, messages: list[BaseMessage], max_tokens: int) -> str:
+    """
+    Offline fallback summarizer: appends the older turns as short 'speaker: text'
+    lines and keeps only the most recent part that fits in `max_tokens`.
+    """
+    lines = [previous_summary] if previous_summary else []
+    for message in messages:
+        speaker = "Alex" if message.type == "ai" else "Them"
+        lines.append(f"{speaker}: {' '.join(str(message.content).split())[:200]}")
+    summary = " | ".join(lines)
+    max_chars = max_tokens * 4
+    return summary[-max_chars:] if len(summary) > max_chars else summary
+
+
+def make_llm_summarizer(llm):
+    """Builds a summarizer that asks the chat model to fold older turns into the running summary."""
+    def summarize(previous_summary: str, messages: list[BaseMessage], max_tokens: int) -> str:
+        transcript = "\n".join(f"{'Alex' if m.type == 'ai' else 'Them'}: {m.content}" for m in messages)
+        request = (
+            f"Update this running summary of a chat with a suspected scammer. Keep every concrete "
+            f"detail they revealed (names, platforms, locations, links, wallets, requests, tactics). "
+            f"Answer with the summary only, under {max_tokens * 3 // 4} words.\n\n"
+            f"Current summary:\n{previous_summary or '(none)'}\n\nNew messages:\n{transcript}"
+        )
+        try:
+            return str(llm.invoke(request).content).strip()
+        except Exception as e:
+            logger.error(f"LLM summarization failed, using extractive summary: {e}")
+            return extractive_summary(previous_summary, messages, max_tokens)
+    return summarize
+
+
+class PersistentChatMessageHistory(BaseChatMessageHistory):
+    """A chat history held in memory and written through to the SessionStore's SQLite file."""
+
+    def __init__(self, session_id: str, store: "SessionStore", messages: list[BaseMessage]):
+        self.session_id = session_id
+        self._store = store
+        self._messages = messages
+        self.last_used = time.monotonic()
+
+    @property
+    def messages(self) -> list[BaseMessage]:
+        return list(self._messages)
+
+    def add_messages(self, messages) -> None:
+        messages = list(messages)
+        self._store._persist(self.session_id, len(self._messages), messages)
+        self._messages.extend(messages)
+        self.last_used = time.monotonic()
+
+    def clear(self) -> None:
+        self._store._delete(self.session_id)
+        self._messages = []
+
+
+class SessionStore:
+    """
+    LRU of per-session chat histories backed by SQLite.
+
+    Args:
+        db_path: SQLite file (":memory:" for a throwaway store).
+        max_sessions: Histories kept in memory; the least recently used are unloaded.
+        idle_seconds: Histories unused for longer than this are unloaded too.
+        token_budget: History token budget used by `window` (0 = no windowing).
+        summarizer: f(previous_summary, messages, max_tokens) -> str, used by `window`.
+        count_tokens: f(text) -> int token estimate.
+    """
+
+    def __init__(self, db_path: str = HISTORY_DB_PATH, max_sessions: int = MAX_SESSIONS,
+                 idle_seconds: int = SESSION_IDLE_SECONDS, token_budget: int = HISTORY_TOKEN_BUDGET,
+                 summarizer=extractive_summary, count_tokens=approx_token_count):
+        if db_path != ":memory:":
+            os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self.max_sessions = max_sessions
+        self.idle_seconds = idle_seconds
+        self.token_budget = token_budget
+        self.summarizer = summarizer
+        self.count_tokens = count_tokens
+        self._sessions = OrderedDict()
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        if db_path != ":memory:":
+            self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS messages (
+                session_id TEXT NOT NULL, seq INTEGER NOT NULL, message TEXT NOT NULL,
+                created_at REAL NOT NULL, PRIMARY KEY (session_id, seq));
+            CREATE TABLE IF NOT EXISTS summaries (
+                session_id TEXT PRIMARY KEY, upto INTEGER NOT NULL, summary TEXT NOT NULL);
+        """)
+        self._db.commit()
+
+    # --- Session access ---
+    def get(self, session_id: str) -> PersistentChatMessageHistory:
+        """Returns the history for a session, loading it from SQLite if it is not in memory."""
+        with self._lock:
+            history = self._sessions.get(session_id)
+            if history is None:
+                rows = self._db.execute(
+                    "SELECT message FROM messages WHERE session_id = ? ORDER BY seq", (session_id,)).fetchall()
+                history = PersistentChatMessageHistory(
+                    session_id, self, messages_from_dict([json.loads(row[0]) for row in rows]))
+                self._sessions[session_id] = history
+            else:
+                self._sessions.move_to_end(session_id)
+            history.last_used = time.monotonic()
+            self._evict()
+            return history
+
+    def _evict(self):
+        now = time.monotonic()
+        for session_id in list(self._sessions):
+            if len(self._sessions) <= 1:
+                break
+            history = self._sessions[session_id]
+            if len(self._sessions) > self.max_sessions or now - history.last_used > self.idle_seconds:
+                del self._sessions[session_id]
+                logger.info(f"Unloaded idle chat session '{session_id}' from memory.")
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def _persist(self, session_id: str, start_seq: int, messages: list[BaseMessage]):
+        now = time.time()
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO messages (session_id, seq, message, created_at) VALUES (?, ?, ?, ?)",
+                [(session_id, start_seq + i, json.dumps(message_to_dict(m)), now) for i, m in enumerate(messages)])
+            self._db.commit()
+
+    def _delete(self, session_id: str):
+        with self._lock:
+            self._db.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+            self._db.execute("DELETE FROM summaries WHERE session_id = ?", (session_id,))
+            self._db.commit()
+
+    # --- Token-budget window ---
+    def window(self, session_id: str, messages: list[BaseMessage], token_budget: int | None = None) -> list[BaseMessage]:
+        """
+        Returns the messages to send for this turn: a cached rolling summary of older
+        turns followed by the most recent turns verbatim, within `token_budget` tokens.
+        """
+        budget = self.token_budget if token_budget is None else token_budget
+        if budget <= 0 or not messages:
+            return list(messages)
+
+        counts = [self.count_tokens(str(m.content)) for m in messages]
+        if sum(counts) <= budget:
+            return list(messages)
+
+        summary_budget = int(budget * SUMMARY_TOKEN_SHARE)
+        verbatim_budget = budget - summary_budget
+        with self._lock:
+            row = self._db.execute("SELECT upto, summary FROM summaries WHERE session_id = ?", (session_id,)).fetchone()
+        upto, summary = row if row and row[0] <= len(messages) else (0, "")
+
+        if sum(counts[upto:]) > verbatim_budget:
+            # Fold older turns into the summary until the verbatim tail is down to half
+            # the budget, so the summary is only extended every few turns.
+            cut, tail = upto, sum(counts[upto:])
+            while cut < len(messages) - 2 and tail > verbatim_budget // 2:
+                tail -= counts[cut]
+                cut += 1
+            summary = self.summarizer(summary, messages[upto:cut], summary_budget)
+            upto = cut
+            with self._lock:
+                self._db.execute("INSERT OR REPLACE INTO summaries (session_id, upto, summary) VALUES (?, ?, ?)",
+                                 (session_id, upto, summary))
+                self._db.commit()
+
+        windowed = list(messages[upto:])
+        if summary:
+            windowed.insert(0, SystemMessage(content=SUMMARY_PREFIX + summary))
+        return windowed
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+# --- Before/after measurement ---
+if __name__ == "__main__":
+    from langchain_core.messages import AIMessage, HumanMessage
+
+    store = SessionStore(":memory:")
+    scammer_lines = [
+        "hey handsome, saw your profile, you look like someone who works in defence?",
+        "i am priya, just moved to pune for a new job at a consultancy, its so lonely here",
+        "you are so sweet, can we move to whatsapp? this app is so slow for me",
+        "my uncle runs a crypto trading desk, he made me 40% last month, want me to ask him?",
+    ]
+    history = store.get("benchmark")
+    print(f"{'turn':>4} {'full_tokens':>12} {'windowed_tokens':>16} {'window_ms':>10}")
+    for turn in range(1, 201):
+        history.add_messages([HumanMessage(content=scammer_lines[turn % len(scammer_lines)]),
+                              AIMessage(content="lol no way, thats wild. so what do you actually do there? " * 2)])
+        full = sum(approx_token_count(str(m.content)) for m in history.messages)
+        start = time.perf_counter()
+        windowed = store.window("benchmark", history.messages)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        if turn % 20 == 0:
+            windowed_tokens = sum(approx_token_count(str(m.content)) for m in windowed)
+            print(f"{turn:>4} {full:>12} {windowed_tokens:>16} {elapsed_ms:>10.2f}")
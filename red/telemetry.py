@@ -0,0 +1,259 @@
+# --- telemetry.py ---
+# Lightweight timing spans for the analysis pipeline, the bot and the model loads.
+#
+# - `with span("keywords.spam"):` or `@timed("final_verdict")` time a stage.
+# - Every span goes into a per-stage latency histogram (count, sum, buckets,
+#   errors), exported as Prometheus text (`to_prometheus`, e.g. for the
+#   node_exporter textfile collector) or JSON (`to_json`).
+# - `trace()` also collects the spans of one analysis on the current thread, for
+#   the "Show Detailed Analysis" expander.
+# - TELEMETRY_ENABLED=0 turns every span into a shared no-op object.
+#
+# Modules outside red/ import `span` softly and fall back to a null context.
+
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from logger_config import get_logger
+
+logger = get_logger(__name__)
+
+# --- Configuration (environment overridable) ---
+ENABLED = os.getenv("TELEMETRY_ENABLED", "1") != "0"
+# If set, the metrics are written there every EXPORT_INTERVAL_S (.json -> JSON, else Prometheus text).
+EXPORT_PATH = os.getenv("TELEMETRY_EXPORT_PATH", "")
+EXPORT_INTERVAL_S = float(os.getenv("TELEMETRY_EXPORT_INTERVAL", "15"))
+
+# Histogram bucket upper bounds in seconds (+Inf is implicit).
+BUCKETS_S = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+METRIC_PREFIX = "sentinel_stage"
+
+
+class Histogram:
+    """Latency histogram of one stage."""
+
+    __slots__ = ("bounds", "buckets", "count", "sum", "max", "last", "errors")
+
+    def __init__(self, bounds=BUCKETS_S):
+        self.bounds = bounds
+        self.buckets = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self.last = 0.0
+        self.errors = 0
+
+    def observe(self, seconds: float, error: bool = False):
+        i = 0
+        for bound in self.bounds:
+            if seconds <= bound:
+                break
+            i += 1
+        self.buckets[i] += 1
+        self.count += 1
+        self.sum += seconds
+        self.last = seconds
+        if seconds > self.max:
+            self.max = seconds
+        if error:
+            self.errors += 1
+
+    def quantile(self, q: float) -> float:
+        """Estimated q-quantile, interpolated within its bucket like Prometheus' histogram_quantile."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        lower = 0.0
+        for bound, n in zip(self.bounds + (self.max,), self.buckets):
+            if n and seen + n >= rank:
+                upper = min(bound, self.max)
+                return lower + (upper - lower) * (rank - seen) / n
+            seen += n
+            lower = bound
+        return self.max
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("_telemetry", "_name", "_start")
+
+    def __init__(self, telemetry, name: str):
+        self._telemetry = telemetry
+        self._name = name
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._telemetry.observe(self._name, time.perf_counter() - self._start, error=exc_type is not None)
+        return False
+
+
+class Telemetry:
+    """
+    Span recorder and per-stage histograms.
+
+    Args:
+        enabled: When False, spans are no-ops and nothing is recorded.
+        buckets: Histogram bucket upper bounds in seconds.
+    """
+
+    def __init__(self, enabled: bool = ENABLED, buckets=BUCKETS_S):
+        self.enabled = enabled
+        self.buckets = tuple(buckets)
+        self._histograms = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._exporter = None
+
+    def span(self, name: str):
+        """Context manager that times the enclosed block as stage `name`."""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name)
+
+    def timed(self, name: str):
+        """Decorator that times every call of the function as stage `name`."""
+        def decorator(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return fn(*args, **kwargs)
+                with _Span(self, name):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def observe(self, name: str, seconds: float, error: bool = False):
+        """Records a duration measured elsewhere (e.g. by an LLM callback)."""
+        if not self.enabled:
+            return
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram(self.buckets)
+            histogram.observe(seconds, error)
+        spans = getattr(self._local, "spans", None)
+        if spans is not None:
+            spans.append({"stage": name, "seconds": round(seconds, 4), "error": error})
+
+    @contextmanager
+    def trace(self):
+        """Collects the spans recorded on this thread inside the block into the yielded list."""
+        previous = getattr(self._local, "spans", None)
+        spans = self._local.spans = []
+        try:
+            yield spans
+        finally:
+            self._local.spans = previous
+
+    def snapshot(self) -> dict:
+        """Per-stage count, sum, mean/p50/p95/max (seconds), errors and bucket counts."""
+        with self._lock:
+            histograms = {name: (h.count, h.sum, h.max, h.last, h.errors, list(h.buckets), h.quantile(0.5),
+                                 h.quantile(0.95)) for name, h in self._histograms.items()}
+        return {name: {
+            "count": count,
+            "sum_s": round(total, 6),
+            "mean_s": round(total / count, 6) if count else 0.0,
+            "p50_s": round(p50, 6),
+            "p95_s": round(p95, 6),
+            "max_s": round(peak, 6),
+            "last_s": round(last, 6),
+            "errors": errors,
+            "buckets": dict(zip([str(b) for b in self.buckets] + ["+Inf"], buckets)),
+        } for name, (count, total, peak, last, errors, buckets, p50, p95) in sorted(histograms.items())}
+
+    def to_json(self) -> str:
+        return json.dumps({"generated_at": time.time(), "stages": self.snapshot()}, indent=2)
+
+    def to_prometheus(self) -> str:
+        """The histograms in the Prometheus text exposition format (cumulative buckets)."""
+        lines = [
+            f"# HELP {METRIC_PREFIX}_duration_seconds Time spent in each analysis stage.",
+            f"# TYPE {METRIC_PREFIX}_duration_seconds histogram",
+        ]
+        errors = []
+        for name, stats in self.snapshot().items():
+            label = name.replace("\\", "\\\\").replace('"', '\\"')
+            cumulative = 0
+            for bound, n in stats["buckets"].items():
+                cumulative += n
+                lines.append(f'{METRIC_PREFIX}_duration_seconds_bucket{{stage="{label}",le="{bound}"}} {cumulative}')
+            lines.append(f'{METRIC_PREFIX}_duration_seconds_sum{{stage="{label}"}} {stats["sum_s"]}')
+            lines.append(f'{METRIC_PREFIX}_duration_seconds_count{{stage="{label}"}} {stats["count"]}')
+            errors.append(f'{METRIC_PREFIX}_errors_total{{stage="{label}"}} {stats["errors"]}')
+        lines += [
+            f"# HELP {METRIC_PREFIX}_errors_total Stage runs that raised an exception.",
+            f"# TYPE {METRIC_PREFIX}_errors_total counter",
+            *errors,
+        ]
+        return "\n".join(lines) + "\n"
+
+    def export(self, path: str):
+        """Writes the metrics to `path` atomically (.json -> JSON, anything else -> Prometheus text)."""
+        text = self.to_json() if path.endswith(".json") else self.to_prometheus()
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+
+    def start_exporter(self, path: str = EXPORT_PATH, interval_s: float = EXPORT_INTERVAL_S):
+        """Exports to `path` every `interval_s` in a daemon thread (no-op without a path)."""
+        if not path or not self.enabled or self._exporter is not None:
+            return self._exporter
+
+        def run():
+            while True:
+                time.sleep(interval_s)
+                try:
+                    self.export(path)
+                except OSError as e:
+                    logger.error(f"Could not export telemetry to {path}: {e}")
+        self._exporter = threading.Thread(target=run, name="telemetry-export", daemon=True)
+        self._exporter.start()
+        logger.info(f"Exporting stage metrics to {path} every {interval_s:.0f}s.")
+        return self._exporter
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+
+
+# The process-wide recorder and its shortcuts
+telemetry = Telemetry()
+span = telemetry.span
+timed = telemetry.timed
+observe = telemetry.observe
+trace = telemetry.trace
+
+
+if __name__ == "__main__":
+    # Per-span overhead, enabled vs disabled
+    n = 200_000
+    for enabled in (False, True):
+        recorder = Telemetry(enabled=enabled)
+        start = time.perf_counter()
+        for _ in range(n):
+            with recorder.span("bench"):
+                pass
+        per_span_us = (time.perf_counter() - start) / n * 1e6
+        print(f"enabled={enabled}: {per_span_us:.2f} µs per span")
@@ -0,0 +1,46 @@
+# test_alias_index.py
+import numpy as np
+
+from alias_index import AliasIndex, alias_columns, skeleton
+
+
+def test_rotated_handles_share_a_skeleton():
+    assert skeleton("priya_babe42") == skeleton("priya.babe_43") == skeleton("@Priya__Babe7") == "priyababe"
+    assert skeleton("_cutie_7") == skeleton("cut1e.99") == "cutie"
+    assert skeleton("h0tt_m0del") == "hotmodel"
+    # A handle that is only digits keeps them
+    assert skeleton("12345") == "i2eas"
+
+
+def test_similar_ranks_rotations_first_and_skips_the_query():
+    index = AliasIndex.from_usernames(["priya_babe42", "priya.babe_43", "priyanka_babe", "tech_daily", "cutie_7"])
+    assert len(index) == 5 and "priya_babe42" in index and "priya_babe44" not in index
+
+    matches = index.similar("priya_babe42", k=3)
+    assert [name for name, _ in matches[:1]] == ["priya.babe_43"] and matches[0][1] == 1.0
+    assert "priya_babe42" not in [name for name, _ in matches]
+    assert all(score >= 0.5 for _, score in matches)
+    assert index.similar("totally_unrelated") == []
+
+
+def test_incremental_inserts_are_found_and_deduplicated():
+    index = AliasIndex()
+    assert index.add("k4ri.sha_9") and not index.add("k4ri.sha_9")
+    assert index.similar("karisha_10") == [("k4ri.sha_9", 1.0)]
+    index.add("karishaa_11")
+    assert [name for name, _ in index.similar("karisha_10")] == ["k4ri.sha_9", "karishaa_11"]
+    assert len(index) == 2
+
+
+def test_common_trigrams_do_not_hide_candidates():
+    # "^pr" is in every skeleton; with max_posting=1 only the rarer trigrams gather candidates
+    index = AliasIndex.from_usernames([f"pr{i:03d}x_{chr(97 + i % 26)}{chr(97 + i // 26 % 26)}" for i in range(200)]
+                                      + ["priya_babe1"], max_posting=1)
+    assert index.similar("priya.babe2", k=1) == [("priya_babe1", 1.0)]
+
+
+def test_alias_columns_for_bulk_triage():
+    index = AliasIndex.from_usernames(["priya_babe42", "tech_daily"])
+    columns = alias_columns(index, ["priya.babe_7", "nobody_here", "tech.daily1"])
+    assert columns["alias_of"].tolist() == ["priya_babe42", "", "tech_daily"]
+    np.testing.assert_array_equal(columns["alias_score"], [1.0, 0.0, 1.0])
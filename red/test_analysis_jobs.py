@@ -0,0 +1,99 @@
+# test_analysis_jobs.py
+
+import threading
+import time
+
+from analysis_jobs import STAGES, AnalysisJobRunner, run_analysis
+
+
+def _wait(job, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not job.finished and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return job
+
+
+def _gated_pipeline(gate):
+    """A pipeline that walks through STAGES, pausing at the second one until `gate` is set."""
+    def pipeline(profile_data, messages, progress):
+        for i, stage in enumerate(STAGES):
+            progress(stage)
+            if i == 1:
+                gate.wait(5)
+        return {"messages": len(messages)}
+    return pipeline
+
+
+def test_job_reports_stages_and_result():
+    runner = AnalysisJobRunner(max_workers=1)
+    profile = {"username": "priya_x", "bio": "crypto trader, dm me", "followers": 12, "following": 900,
+               "account_age_days": 10, "has_profile_picture": False, "is_private": False, "is_verified": False}
+    messages = ["hi handsome", "invest in my crypto platform, guaranteed profit", "send usdt now or else"]
+
+    job = _wait(runner.submit("analyst-1", profile, messages))
+
+    assert job.status == "done" and job.progress == 1.0
+    assert list(job.stage_times) == STAGES
+    assert job.result == run_analysis(profile, messages)
+    stages = [s["stage"] for s in job.spans]
+    assert stages[0] == "profile_risk" and stages[-2:] == ["final_verdict", "analysis"]
+    assert {"keywords.spam", "keywords.sextortion", "keywords.tech", "psychological_analysis"} <= set(stages)
+
+
+def test_resubmitting_cancels_the_running_job():
+    gate = threading.Event()
+    runner = AnalysisJobRunner(max_workers=2, pipeline=_gated_pipeline(gate))
+
+    stale = runner.submit("analyst-1", {}, ["old"])
+    while stale.stage != STAGES[1]:
+        time.sleep(0.01)
+    fresh = runner.submit("analyst-1", {}, ["new", "upload"])
+    gate.set()
+
+    assert _wait(stale).status == "cancelled"
+    assert _wait(fresh).result == {"messages": 2}
+
+
+def test_owners_run_in_parallel():
+    gate = threading.Event()
+    runner = AnalysisJobRunner(max_workers=2, pipeline=_gated_pipeline(gate))
+
+    first = runner.submit("analyst-1", {}, ["a"])
+    second = runner.submit("analyst-2", {}, ["b"])
+    while not (first.stage == second.stage == STAGES[1]):
+        time.sleep(0.01)
+    # Both are mid-analysis at the same time; neither cancelled the other
+    gate.set()
+    assert _wait(first).status == _wait(second).status == "done"
+
+
+def test_prior_reports_raise_the_verdict():
+    from scammer_history import ScammerHistoryCache
+    from verdict_engine import prior_reports_points
+
+    profile = {"username": "widow_hunterx", "bio": "dm me", "followers": 12, "following": 900,
+               "account_age_days": 10, "has_profile_picture": False, "is_private": False, "is_verified": False}
+    messages = ["invest in my crypto platform, guaranteed profit"]
+    history = ScammerHistoryCache(lambda username: {"username": username, "report_count": 3, "first_reported_on": 1,
+                                                    "last_reported_on": 2, "tactics": []})
+    result = run_analysis(profile, messages, history=history)
+    baseline = run_analysis(profile, messages)
+    assert result["scammer_history"]["report_count"] == 3 and baseline["scammer_history"] is None
+    assert result["final_verdict"] == min(baseline["final_verdict"] + prior_reports_points(3), 100)
+
+
+def test_connection_extras_follow_new_reports():
+    from database.reports import SCAMMER_USERNAMES_QUERY
+    from db_connector import Neo4jConnection
+    from database.stand_in import StandInDriver  # db_connector puts the repo root on the path
+    from analysis_jobs import connection_extras
+
+    driver = StandInDriver(rows=lambda query, parameters: [{"username": "priya_babe42"}]
+                           if query == SCAMMER_USERNAMES_QUERY else [])
+    connection = Neo4jConnection(None, None, None, driver=driver)
+    extras = connection_extras(connection, prior_reports=True, aliases=True)
+    assert extras["aliases"].similar("priya.babe_43") and not extras["aliases"].similar("rotated.handle_7")
+
+    profile = {"username": "rotated_handle8", "followers": 12, "following": 900}
+    connection.submit_report("analyst-1", profile, {"psychological_analysis": {}}, 80)
+    assert [match[0] for match in extras["aliases"].similar("rotated.handle_7")] == ["rotated_handle8"]
@@ -0,0 +1,55 @@
+# test_bot_streaming.py
+# Exercises the streaming reply path offline with the fake streaming LLM.
+
+import importlib
+import os
+
+import pytest
+
+
+@pytest.fixture
+def bot(tmp_path, monkeypatch):
+    monkeypatch.setenv("BOT_LLM_BACKEND", "fake")
+    monkeypatch.setenv("BOT_HISTORY_DB", os.path.join(tmp_path, "history.sqlite3"))
+    import session_store
+    import bot as bot_module
+    importlib.reload(session_store)
+    bot_module = importlib.reload(bot_module)
+    yield bot_module
+    bot_module.get_store().close()
+
+
+def test_importing_bot_opens_no_history_database(bot, tmp_path):
+    assert bot._store is None and not os.path.exists(os.path.join(tmp_path, "history.sqlite3"))
+
+
+def test_stream_yields_tokens_and_records_history(bot):
+    stream = bot.stream_gemini_reply("hey, what do you do for work?")
+    chunks = list(stream)
+
+    assert len(chunks) > 1
+    assert stream.result["status"] == "engaging"
+    assert stream.result["reply"] == "".join(chunks).strip()
+    assert stream.time_to_first_token_s is not None
+    assert bot.TURN_METRICS[-1]["time_to_first_token_s"] is not None
+    assert [m.type for m in bot.get_session_history("default_streamlit_session").messages] == ["human", "ai"]
+
+
+def test_stream_concludes_on_trigger_without_saving_history(bot):
+    stream = bot.stream_gemini_reply("just send it to 0x52908400098527886E0F7030069857D2E4169EE7 babe")
+    chunks = list(stream)
+
+    assert len(chunks) == 1
+    assert stream.result["status"] == "concluded"
+    assert stream.result["trigger_info"]["type"] == "Crypto Wallet"
+    assert bot.get_session_history("default_streamlit_session").messages == []
+
+
+def test_prompt_estimates_are_dropped_when_the_model_reports_usage(bot):
+    class Reply:
+        usage_metadata = {"input_tokens": 321}
+
+    bot._last_prompt_tokens["analyst-1"] = 300
+    bot._record_turn_metrics("analyst-1", Reply(), latency_s=0.1)
+    assert bot.TURN_METRICS[-1]["prompt_tokens"] == 321
+    assert "analyst-1" not in bot._last_prompt_tokens
@@ -0,0 +1,76 @@
+# test_chat_parser.py
+
+import io
+import json
+from datetime import datetime
+
+from chat_parser import detect_format, iter_messages, read_chat_messages
+
+WHATSAPP_ANDROID = """12/30/23, 9:58 PM - Messages and calls are end-to-end encrypted.
+12/30/23, 10:15 PM - Priya: hey handsome, you work in defence right?
+12/30/23, 10:16 PM - Rahul: haha who told you that
+12/30/23, 10:17 PM - Priya: i can tell :)
+my uncle runs a crypto desk
+he made 40% last month
+12/30/23, 10:18 PM - Rahul: <Media omitted>
+"""
+
+WHATSAPP_IOS = "\u200e[31/12/2023, 22:15:03] Priya: send me the usdt today\n[31/12/2023, 22:16:10] Rahul: why\n"
+
+
+def _instagram_export(n):
+    messages = [{"sender_name": "priya.trades" if i % 2 else "Rahul",
+                 "timestamp_ms": 1_700_000_000_000 - i * 60_000,
+                 "content": f"message {i} cafÃ©"} for i in range(n)]
+    messages.insert(3, {"sender_name": "Rahul", "timestamp_ms": 1_600_000_000_000, "photos": [{"uri": "x.jpg"}]})
+    return json.dumps({"participants": [{"name": "priya.trades"}, {"name": "Rahul"}], "messages": messages}, indent=2)
+
+
+def test_whatsapp_joins_continuation_lines_and_skips_system_lines():
+    messages = list(iter_messages(io.StringIO(WHATSAPP_ANDROID)))
+    assert [m.sender for m in messages] == ["Priya", "Rahul", "Priya"]
+    assert messages[2].text == "i can tell :)\nmy uncle runs a crypto desk\nhe made 40% last month"
+    assert messages[0].timestamp == datetime(2023, 12, 30, 22, 15)
+
+    ios = list(iter_messages(io.BytesIO(WHATSAPP_IOS.encode("utf-8"))))
+    assert ios[0] == ("Priya", datetime(2023, 12, 31, 22, 15, 3), "send me the usdt today")
+
+
+def test_instagram_json_streams_across_small_chunks():
+    export = _instagram_export(50)
+    assert detect_format(export[:200]) == "instagram"
+
+    messages = list(iter_messages(io.StringIO(export), chunk_size=97))
+    assert len(messages) == 50  # the photo-only message is skipped
+    assert messages[0].text == "message 0 café"
+    assert messages[1].sender == "priya.trades"
+
+
+def test_telegram_json_flattens_text_entities():
+    export = json.dumps({"name": "Priya", "type": "personal_chat", "id": 1, "messages": [
+        {"id": 1, "type": "service", "date": "2024-01-01T10:00:00", "action": "phone_call"},
+        {"id": 2, "type": "message", "date": "2024-01-01T10:01:00", "from": "Priya",
+         "text": ["join here ", {"type": "link", "text": "https://t.me/fastprofit"}]},
+        {"id": 3, "type": "message", "date": "2024-01-01T10:02:00", "from": "Rahul", "text": "ok"},
+    ]})
+    messages = list(iter_messages(io.StringIO(export), chunk_size=50))
+    assert messages[0] == ("Priya", datetime(2024, 1, 1, 10, 1), "join here https://t.me/fastprofit")
+    assert len(messages) == 2
+
+
+def test_read_chat_messages_keeps_only_the_suspect_in_order():
+    texts, summary = read_chat_messages(io.StringIO(_instagram_export(6)), suspect="@Priya.Trades")
+    # Newest-first export comes back oldest first, suspect messages only
+    assert texts == [f"message {i} café" for i in (5, 3, 1)]
+    assert summary["analyzed_senders"] == ["priya.trades"]
+    assert summary["total_messages"] == 6
+
+    # A handle that is not a WhatsApp contact name falls back to "everyone but the victim"
+    texts, _ = read_chat_messages(io.StringIO(WHATSAPP_ANDROID), suspect="priya_x_99", victim="rahul")
+    assert len(texts) == 2 and all("rahul" not in t.lower() for t in texts)
+
+
+def test_plain_text_and_unmatched_suspect_keep_every_line():
+    texts, summary = read_chat_messages(io.StringIO("hi there\n\nsend money\n"), suspect="nobody")
+    assert texts == ["hi there", "send money"]
+    assert summary["format"] == "text" and summary["analyzed_senders"] == []
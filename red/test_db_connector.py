@@ -0,0 +1,87 @@
+# test_db_connector.py
+
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from db_connector import WRITE_REPORTS_QUERY, Neo4jConnection, get_db_connection
+from database.stand_in import StandInDriver  # db_connector puts the repo root on the path
+
+
+PSYCH = {"total_risk_score": 60, "Love Bombing": {"score": 40, "evidence": ["..."]},
+         "Secrecy": {"score": 0, "evidence": []}}
+
+
+def _report(i):
+    return (f"analyst-{i % 3}", {"username": f"scammer_{i % 5}", "followers": i, "bio": "dm me"},
+            {"psychological_analysis": PSYCH}, 75.0)
+
+
+def test_submit_report_is_one_statement():
+    driver = StandInDriver()
+    assert Neo4jConnection(None, None, None, driver=driver).submit_report(*_report(7))
+
+    [[(query, params, _)]] = driver.transactions
+    assert query == WRITE_REPORTS_QUERY
+    # Every report gets its own idempotency key and is dated when it was submitted
+    assert len(params["reports"][0].pop("report_id")) == 36
+    assert abs(params["reports"][0].pop("enqueued_at") - time.time() * 1000) < 60_000
+    assert params["reports"] == [{
+        "session_id": "analyst-1", "username": "scammer_2", "followers": 7, "following": None, "bio": "dm me",
+        "is_private": None, "is_verified": None, "score": 75.0, "tactics": ["Love Bombing"],
+    }]
+
+
+def test_submit_reports_batches_per_transaction():
+    driver = StandInDriver()
+    written = Neo4jConnection(None, None, None, driver=driver).submit_reports((_report(i) for i in range(1050)),
+                                                                             batch_size=500)
+    assert written == 1050
+    assert [len(tx) for tx in driver.transactions] == [1, 1, 1]
+    assert [len(tx[0].parameters["reports"]) for tx in driver.transactions] == [500, 500, 50]
+
+
+def test_a_driver_that_cannot_connect_is_closed():
+    driver = MagicMock()
+    driver.verify_connectivity.side_effect = ConnectionError("Aura unreachable")
+    with patch("db_connector.GraphDatabase.driver", return_value=driver), patch("db_connector.RECONNECT_INTERVAL_S", 0):
+        connection = Neo4jConnection("neo4j+s://unreachable", "neo4j", "secret")
+        assert connection._driver is None
+        with pytest.raises(ConnectionError):
+            connection.write_reports([])
+    assert driver.close.call_count == 2
+    assert connection._driver is None
+
+
+def test_reconnects_are_rate_limited():
+    driver = MagicMock()
+    driver.verify_connectivity.side_effect = ConnectionError("Aura unreachable")
+    with patch("db_connector.GraphDatabase.driver", return_value=driver) as connect:
+        connection = Neo4jConnection("neo4j+s://unreachable", "neo4j", "secret")
+        for _ in range(3):
+            with pytest.raises(ConnectionError):
+                connection.get_scammer_history("widow_hunterx")
+        assert connect.call_count == 1
+
+        # Once the interval has passed the next read tries again
+        connection._connect_failed_at -= 3600
+        driver.verify_connectivity.side_effect = None
+        connection.get_scammer_history("widow_hunterx")
+        assert connect.call_count == 2 and connection._driver is driver
+
+
+def test_without_streamlit_credentials_come_from_the_environment(monkeypatch):
+    from database import config
+
+    monkeypatch.delenv("STORAGE_BACKEND", raising=False)
+    monkeypatch.setattr("db_connector.st", None)
+    monkeypatch.setattr(config, "NEO4J_URI", None)
+    assert get_db_connection.__wrapped__() is None
+
+    monkeypatch.setattr(config, "NEO4J_URI", "neo4j+s://example")
+    monkeypatch.setattr(config, "NEO4J_USER", "neo4j")
+    monkeypatch.setattr(config, "NEO4J_PASSWORD", "secret")
+    with patch("db_connector.Neo4jConnection") as connection:
+        assert get_db_connection.__wrapped__() is connection.return_value
+    assert connection.call_args.args == ("neo4j+s://example", "neo4j", "secret")
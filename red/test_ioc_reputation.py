@@ -0,0 +1,73 @@
+# test_ioc_reputation.py
+
+import os
+import tempfile
+
+import pytest
+
+from ioc_reputation import IOCReputationStore, build_store, normalize_indicator, lookup_candidates
+
+
+@pytest.fixture
+def store():
+    """Builds a small store from one CSV feed and one TXT feed."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        csv_feed = os.path.join(tmpdir, "phishing.csv")
+        with open(csv_feed, "w", encoding="utf-8") as f:
+            f.write("first_seen,url,tag\n")
+            f.write("2025-01-01,https://Login-Secure.evil-bank.com/verify/,phish\n")
+            f.write("2025-01-02,http://free-army-jobs.in/apply,phish\n")
+        txt_feed = os.path.join(tmpdir, "wallets.txt")
+        with open(txt_feed, "w", encoding="utf-8") as f:
+            f.write("# scam wallets\n")
+            f.write("0x52908400098527886E0F7030069857D2E4169EE7\n")
+            f.write("1BoatSLRHtKNngkdXEeobR76b53LETtpyT\n")
+            f.write("honey.trap@scam-mail.com\n")
+            f.write("malware-drop.net\n")
+
+        store_dir = os.path.join(tmpdir, "store")
+        meta = build_store([csv_feed, txt_feed], store_dir)
+        assert meta["count"] == 6
+        with IOCReputationStore(store_dir) as opened:
+            yield opened
+
+
+def test_normalize_indicator():
+    assert normalize_indicator("https://WWW.Example.com/Path/") == "https://www.example.com/Path"
+    assert normalize_indicator("WWW.Example.COM.") == "example.com"
+    assert normalize_indicator("0xABCDEFabcdefABCDEFabcdefABCDEFabcdefABCD") == "0xabcdefabcdefabcdefabcdefabcdefabcdefabcd"
+    # Base58 BTC addresses are case-sensitive
+    assert normalize_indicator("1BoatSLRHtKNngkdXEeobR76b53LETtpyT") == "1BoatSLRHtKNngkdXEeobR76b53LETtpyT"
+
+
+def test_lookup_candidates_include_parent_domains():
+    assert lookup_candidates("https://a.b.evil.com/x") == ["https://a.b.evil.com/x", "a.b.evil.com", "b.evil.com", "evil.com"]
+
+
+def test_known_indicators_are_found(store):
+    hit = store.lookup("https://login-secure.evil-bank.com/verify")
+    assert hit is not None and hit["source"] == "phishing.csv"
+    assert "0x52908400098527886e0f7030069857d2e4169ee7" in store
+    assert "1BoatSLRHtKNngkdXEeobR76b53LETtpyT" in store
+    assert "Honey.Trap@scam-mail.com" in store
+
+
+def test_url_matches_listed_domain(store):
+    hit = store.lookup("https://cdn.malware-drop.net/payload.apk")
+    assert hit == {"indicator": "https://cdn.malware-drop.net/payload.apk", "matched": "malware-drop.net", "source": "wallets.txt"}
+
+
+def test_unknown_indicators_are_not_found(store):
+    assert store.lookup("https://example.org") is None
+    assert "1boatslrhtknngkdxeeobr76b53lettpyt" not in store
+    assert store.lookup("") is None
+
+
+def test_empty_store():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        feed = os.path.join(tmpdir, "empty.txt")
+        open(feed, "w").close()
+        build_store([feed], os.path.join(tmpdir, "store"))
+        with IOCReputationStore(os.path.join(tmpdir, "store")) as empty:
+            assert len(empty) == 0
+            assert empty.lookup("https://example.org") is None
@@ -0,0 +1,52 @@
+# test_llm_client.py
+# Runs the shared client against the offline backend.
+
+import pytest
+
+import llm_client
+from red_teaming_bot import get_gemini_reply
+
+
+@pytest.fixture(autouse=True)
+def fake_backend(monkeypatch):
+    monkeypatch.setenv("BOT_LLM_BACKEND", "fake")
+    monkeypatch.setattr(llm_client, "BACKOFF_INITIAL_S", 0.01)
+    monkeypatch.setattr(llm_client, "BACKOFF_JITTER_S", 0.01)
+    llm_client._build_chat_model.cache_clear()
+    llm_client.LLM_CALL_METRICS.clear()
+    yield
+    llm_client._build_chat_model.cache_clear()
+
+
+def test_chat_model_is_shared():
+    assert llm_client.get_chat_model() is llm_client.get_chat_model()
+
+
+def test_quota_errors_are_retried_and_metered():
+    chat_model = llm_client.get_chat_model()
+    chat_model.first_token_delay = chat_model.token_delay = 0
+    chat_model.quota_errors = 2
+
+    reply = llm_client.get_llm().invoke("hey there")
+
+    assert reply.content in chat_model.replies
+    metrics = list(llm_client.LLM_CALL_METRICS)
+    assert [m["error"] for m in metrics] == ["QuotaExceededError", "QuotaExceededError", None]
+    assert metrics[-1]["input_tokens"] > 0 and metrics[-1]["output_tokens"] > 0
+    assert metrics[-1]["latency_s"] is not None
+
+
+def test_red_team_reply_sends_history_once():
+    chat_model = llm_client.get_chat_model()
+    chat_model.first_token_delay = chat_model.token_delay = 0
+    history = [
+        {"role": "user", "parts": ["hi, u into crypto?"]},
+        {"role": "model", "parts": ["a bit lol, why?"]},
+        {"role": "user", "parts": ["i can show u how to double ur usdt"]},
+    ]
+    reply = get_gemini_reply("unused-offline", history)
+
+    assert reply in chat_model.replies
+    # 3 messages in, each counted once
+    expected = sum(len(m["parts"][0]) // 4 + 1 for m in history)
+    assert llm_client.LLM_CALL_METRICS[-1]["input_tokens"] == expected
@@ -0,0 +1,72 @@
+# test_model_registry.py
+
+import time
+
+from model_registry import ModelRegistry, process_rss_mb
+
+
+def _registry_with_blobs(**kwargs):
+    registry = ModelRegistry(**kwargs)
+    loads = []
+
+    def loader(name, size_mb):
+        def load():
+            loads.append(name)
+            # Touch every page so the allocation is resident
+            return bytearray(b"\x01" * (size_mb * 1024 * 1024))
+        return load
+
+    registry.register("small", loader("small", 8))
+    registry.register("large", loader("large", 64))
+    return registry, loads
+
+
+def test_models_load_once_and_report_memory():
+    registry, loads = _registry_with_blobs()
+    assert registry.get("large") is registry.get("large")
+    assert loads == ["large"]
+
+    report = {r["name"]: r for r in registry.report()}
+    assert report["large"]["loaded"] and report["large"]["loads"] == 1
+    assert report["large"]["rss_mb"] > 32
+    assert not report["small"]["loaded"]
+
+
+def test_idle_models_are_evicted_over_budget_and_reloaded():
+    registry, loads = _registry_with_blobs(memory_budget_mb=1, idle_seconds=0.05)
+    registry.get("large")
+    registry.get("small")
+    time.sleep(0.1)
+
+    evicted = registry.enforce_budget()
+    assert set(evicted) == {"large", "small"}
+    assert not any(r["loaded"] for r in registry.report())
+
+    registry.get("large")
+    assert loads == ["large", "small", "large"]
+
+
+def test_models_in_use_are_not_evicted():
+    registry, _ = _registry_with_blobs(memory_budget_mb=1, idle_seconds=3600)
+    registry.get("large")
+    assert registry.enforce_budget() == []
+
+
+def test_warm_up_loads_in_background():
+    registry, loads = _registry_with_blobs()
+    registry.warm_up(["small"]).join(timeout=10)
+    assert loads == ["small"]
+    assert process_rss_mb() > 0
+
+
+def test_failed_load_returns_none_and_is_not_retried_at_once():
+    attempts = []
+    registry = ModelRegistry(load_retry_s=3600)
+    registry.register("broken", lambda: attempts.append(1) / 0)
+    assert registry.get_or_none("broken") is None
+    assert registry.get_or_none("broken") is None
+    assert len(attempts) == 1
+
+    registry.load_retry_s = 0
+    assert registry.get_or_none("broken") is None
+    assert len(attempts) == 2
@@ -0,0 +1,85 @@
+# test_profile_rules.py
+
+import random
+
+import numpy as np
+import pytest
+
+from profile_analyzer import calculate_profile_risk
+from profile_rules import DEFAULT_RULE_SET, ProfileRuleSet, PROFILE_RULES, score_profiles
+
+
+def original_calculate_profile_risk(profile_data):
+    """The hand-written rule chain that profile_rules replaced, kept as the reference."""
+    score = 0
+    risk_factors_found = []
+    if profile_data['is_verified']:
+        return 0, ["Account is officially verified."]
+    if profile_data['followers'] < 100 and profile_data['following'] > profile_data['followers'] * 5:
+        score += 3
+        risk_factors_found.append("High following-to-follower ratio (potential bot/spam behavior).")
+    if profile_data['account_age_days'] < 30:
+        score += 2
+        risk_factors_found.append("Very new account (less than 30 days old).")
+    if not profile_data['has_profile_picture']:
+        score += 2
+        risk_factors_found.append("No profile picture.")
+    suspicious_words = ["crypto", "forex", "invest", "trader", "DM for rates", "cashapp"]
+    bio_lower = profile_data['bio'].lower()
+    if any(word in bio_lower for word in suspicious_words):
+        score += 3
+        risk_factors_found.append("Bio contains suspicious keywords (e.g., crypto, invest).")
+    if profile_data['followers'] < 15:
+        score += 1
+        risk_factors_found.append("Extremely low follower count.")
+    final_score = min(score, 10)
+    if not risk_factors_found:
+        risk_factors_found.append("No major risk factors detected in profile.")
+    return final_score, risk_factors_found
+
+
+BIOS = ["", "Crypto trader | DM for rates", "love travel", "Forex signals", "cashApp me", "just vibes", "INVESTOR"]
+
+
+@pytest.fixture
+def profiles():
+    rng = random.Random(11)
+    return [{
+        "username": f"user{i}",
+        "bio": rng.choice(BIOS),
+        "followers": rng.choice([0, 5, 14, 15, 19, 20, 99, 100, 500, 5000]),
+        "following": rng.choice([0, 50, 99, 100, 101, 499, 501, 2000]),
+        "account_age_days": rng.choice([0, 29, 30, 365]),
+        "has_profile_picture": rng.random() < 0.5,
+        "is_private": rng.random() < 0.5,
+        "is_verified": rng.random() < 0.1,
+    } for i in range(3000)]
+
+
+def test_scalar_adapter_matches_original(profiles):
+    for profile in profiles:
+        assert calculate_profile_risk(profile) == original_calculate_profile_risk(profile)
+
+
+def test_verified_profile_needs_no_other_fields():
+    assert calculate_profile_risk({"is_verified": True}) == (0, ["Account is officially verified."])
+
+
+def test_vectorized_scores_and_masks_match_original(profiles):
+    frame = {key: np.array([p[key] for p in profiles]) for key in profiles[0]}
+    scores, masks = score_profiles(frame)
+    for profile, score, mask in zip(profiles, scores, masks):
+        expected = original_calculate_profile_risk(profile)
+        assert (int(score), DEFAULT_RULE_SET.reasons_from_mask(mask)) == expected
+
+
+def test_rules_are_data():
+    rules = [dict(rule) for rule in PROFILE_RULES]
+    rules[2] = dict(rules[2], condition=["lt", "account_age_days", 90])
+    rule_set = ProfileRuleSet(rules)
+    scores, masks = rule_set.score({
+        "is_verified": np.array([False]), "followers": np.array([1000]), "following": np.array([10]),
+        "account_age_days": np.array([60]), "has_profile_picture": np.array([True]), "bio": np.array(["hi"]),
+    })
+    assert scores.tolist() == [2]
+    assert masks.tolist() == [1 << 2]
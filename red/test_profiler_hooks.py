@@ -0,0 +1,50 @@
+# test_profiler_hooks.py
+
+import time
+
+import pytest
+
+import profiler_hooks
+from profiler_hooks import profiled
+
+
+@profiled("inner")
+def _inner():
+    return [bytearray(1024) for _ in range(2000)]
+
+
+@profiled("outer")
+def _slow_outer():
+    deadline = time.perf_counter() + 0.1
+    while time.perf_counter() < deadline:
+        sum(range(1000))
+    return len(_inner())
+
+
+@pytest.fixture
+def profile_dir(tmp_path):
+    profiler_hooks.configure(enabled=True, sample_rate=1.0, interval_ms=1, profile_dir=str(tmp_path))
+    yield tmp_path
+    profiler_hooks.configure(enabled=False, sample_rate=1.0, interval_ms=5, profile_dir=profiler_hooks.PROFILE_DIR)
+
+
+def test_profiled_call_writes_collapsed_stacks_and_allocations(profile_dir):
+    assert _slow_outer() == 2000
+
+    # The nested profiled call is part of the outer profile, not a second one
+    collapsed = list(profile_dir.glob("*_outer_*.collapsed"))
+    assert len(collapsed) == 1 and not list(profile_dir.glob("*_inner_*"))
+    stacks = collapsed[0].read_text().splitlines()
+    assert any("_slow_outer (test_profiler_hooks.py:" in line for line in stacks)
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in stacks)
+
+    report = next(profile_dir.glob("*_outer_*.alloc.txt")).read_text()
+    assert "test_profiler_hooks.py" in report and "traced peak" in report
+
+
+def test_sample_rate_and_switch(profile_dir):
+    profiler_hooks.configure(enabled=True, sample_rate=0.0)
+    _inner()
+    profiler_hooks.configure(enabled=False, sample_rate=1.0)
+    _inner()
+    assert not list(profile_dir.iterdir())
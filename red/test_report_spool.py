@@ -0,0 +1,121 @@
+# test_report_spool.py
+
+import threading
+import time
+
+from db_connector import Neo4jConnection
+from report_spool import ReportSpool
+
+
+class FlakyWriter:
+    """Fails its first `failures` batches, then records each batch."""
+
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.batches = []
+        self.written = threading.Event()
+
+    def __call__(self, reports):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("Aura unavailable")
+        self.batches.append([r["report_id"] for r in reports])
+        self.written.set()
+
+
+def test_failed_batches_stay_spooled_and_are_retried_with_backoff(tmp_path):
+    writer = FlakyWriter(failures=2)
+    spool = ReportSpool(writer, str(tmp_path / "spool.sqlite3"), batch_size=2, flush_interval_s=0.0, max_backoff_s=0.0)
+    ids = [spool.append({"username": f"scammer_{i}"}) for i in range(5)]
+
+    assert spool.flush() == 0 and spool.flush() == 0
+    metrics = spool.metrics()
+    assert metrics["depth"] == 5 and metrics["failed_batches"] == 2 and metrics["max_attempts"] == 2
+    assert metrics["lag_s"] >= 0 and "Aura unavailable" in metrics["last_error"]
+
+    assert spool.flush() == 5
+    assert writer.batches == [ids[:2], ids[2:4], ids[4:]]
+    assert spool.metrics()["depth"] == 0 and spool.metrics()["consecutive_failures"] == 0
+
+
+def test_backoff_doubles_up_to_the_cap():
+    spool = ReportSpool(FlakyWriter(failures=10), ":memory:", flush_interval_s=1.0, max_backoff_s=3.0)
+    spool.append({"username": "scammer"})
+    retry_in = []
+    for _ in range(4):
+        spool.retry_at = 0.0
+        spool.flush_once()
+        retry_in.append(round(spool.metrics()["retry_in_s"]))
+    assert retry_in == [1, 2, 3, 3]
+
+
+def test_spool_survives_a_restart(tmp_path):
+    path = str(tmp_path / "spool.sqlite3")
+    ReportSpool(FlakyWriter(failures=1), path).append({"username": "scammer", "report_id": "r-1"})
+
+    writer = FlakyWriter()
+    ReportSpool(writer, path).flush()
+    assert writer.batches == [["r-1"]]
+
+
+def test_spooled_connection_acknowledges_without_a_database(tmp_path):
+    connection = Neo4jConnection(None, None, None, driver=None, spool_path=str(tmp_path / "spool.sqlite3"))
+    writer = FlakyWriter()
+    connection.spool.write_batch = writer
+    profile = {"username": "scammer_1", "followers": 10, "bio": "dm me"}
+    assert connection.submit_report("analyst-1", profile, {"psychological_analysis": {}}, 80.0)
+    assert writer.written.wait(5)
+    [[report_id]] = writer.batches
+    connection.close()
+    assert len(report_id) == 36
+
+
+class RejectingWriter:
+    """Rejects any batch holding report `bad` (as Neo4j rejects a malformed statement); records the rest."""
+
+    def __init__(self, bad):
+        self.bad = bad
+        self.written = []
+
+    def __call__(self, reports):
+        if any(r["report_id"] == self.bad for r in reports):
+            raise ValueError("Neo.ClientError.Statement.TypeError")
+        self.written.extend(reports)
+
+
+def test_rejected_report_is_isolated_and_dead_lettered(tmp_path):
+    writer = RejectingWriter(bad="r-1")
+    spool = ReportSpool(writer, str(tmp_path / "spool.sqlite3"), batch_size=4, flush_interval_s=0.0,
+                        max_backoff_s=0.0, max_attempts=2)
+    ids = [spool.append({"username": f"scammer_{i}", "report_id": f"r-{i}"}) for i in range(7)]
+    for _ in range(20):
+        spool.flush()
+    # Every other report got past the bad one, in order
+    assert [r["report_id"] for r in writer.written] == [i for i in ids if i != "r-1"]
+    metrics = spool.metrics()
+    assert metrics["depth"] == 0 and metrics["dead_lettered"] == 1 and "TypeError" in metrics["last_error"]
+
+    assert spool.requeue_dead_letters() == 1
+    assert spool.metrics()["depth"] == 1 and spool.metrics()["dead_lettered"] == 0
+
+
+def test_unreachable_database_never_dead_letters():
+    spool = ReportSpool(FlakyWriter(failures=10), ":memory:", flush_interval_s=0.0, max_backoff_s=0.0,
+                        max_attempts=2)
+    spool.append({"username": "scammer"})
+    for _ in range(5):
+        spool.flush_once()
+    metrics = spool.metrics()
+    assert metrics["depth"] == 1 and metrics["max_attempts"] == 5 and metrics["dead_lettered"] == 0
+
+
+def test_reports_are_dated_when_spooled_not_when_written():
+    written = []
+    spool = ReportSpool(written.extend, ":memory:")
+    spool.append({"username": "early", "report_id": "r-early", "enqueued_at": 1_000})
+    spooled_at = int(time.time() * 1000)
+    spool.append({"username": "now", "report_id": "r-now"})
+    time.sleep(0.05)
+    spool.flush()
+    assert written[0]["enqueued_at"] == 1_000
+    assert spooled_at <= written[1]["enqueued_at"] < time.time() * 1000 - 40
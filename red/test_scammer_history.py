@@ -0,0 +1,86 @@
+# test_scammer_history.py
+
+import threading
+import time
+
+from db_connector import Neo4jConnection
+from scammer_history import ScammerHistoryCache
+from database.stand_in import StandInDriver  # db_connector puts the repo root on the path
+
+HISTORY = {"username": "widow_hunterx", "report_count": 50, "first_reported_on": 1, "last_reported_on": 2,
+           "tactics": ["Love Bombing"]}
+
+
+class CountingFetch:
+    def __init__(self, fail=False):
+        self.calls = []
+        self.fail = fail
+
+    def __call__(self, username):
+        self.calls.append(username)
+        if self.fail:
+            raise ConnectionError("Aura unavailable")
+        return HISTORY if username == "widow_hunterx" else None
+
+
+def test_found_and_unknown_usernames_are_cached_for_their_ttls():
+    fetch = CountingFetch()
+    cache = ScammerHistoryCache(fetch, ttl_s=60, negative_ttl_s=0.05)
+    for _ in range(3):
+        assert cache.get("widow_hunterx") == HISTORY
+        assert cache.get("new_account") is None
+    assert fetch.calls == ["widow_hunterx", "new_account"]
+
+    # The negative result expires first
+    time.sleep(0.1)
+    assert cache.get("new_account") is None and cache.get("widow_hunterx") == HISTORY
+    assert fetch.calls == ["widow_hunterx", "new_account", "new_account"]
+    stats = cache.stats()
+    assert stats["hits"] == 3 and stats["negative_hits"] == 2 and stats["misses"] == 3
+
+
+def test_failed_lookups_count_as_no_history_and_are_retried():
+    fetch = CountingFetch(fail=True)
+    cache = ScammerHistoryCache(fetch)
+    assert cache.get("widow_hunterx") is None
+    fetch.fail = False
+    assert cache.prefetch("widow_hunterx").result(5) == HISTORY
+    assert cache.stats()["errors"] == 1
+
+    cache.invalidate("widow_hunterx")
+    cache.get("widow_hunterx")
+    assert fetch.calls == ["widow_hunterx"] * 3
+
+
+def test_reporting_a_username_drops_its_cached_history(tmp_path):
+    fetch = CountingFetch()
+    cache = ScammerHistoryCache(fetch)
+    connection = Neo4jConnection(None, None, None, driver=StandInDriver(), spool_path=str(tmp_path / "spool.sqlite3"))
+    connection.spool.stop(drain=False)  # flush only when the connection closes
+    reported = []
+    connection.add_report_listener(cache.invalidate)
+    connection.add_report_listener(reported.append)
+
+    cache.get("widow_hunterx")
+    assert connection.submit_report("analyst-1", {"username": "widow_hunterx"}, {"psychological_analysis": {}}, 90.0)
+    cache.get("widow_hunterx")
+    # Once at submit, and again when the spool has written the report
+    connection.close()
+    assert reported == ["widow_hunterx", "widow_hunterx"]
+    cache.get("widow_hunterx")
+    assert fetch.calls == ["widow_hunterx"] * 3
+
+
+def test_a_slow_lookup_is_not_waited_for_past_the_budget():
+    release = threading.Event()
+
+    def slow_fetch(username):
+        release.wait(5)
+        return HISTORY
+
+    cache = ScammerHistoryCache(slow_fetch, wait_s=0.05)
+    start = time.perf_counter()
+    assert cache.wait(cache.prefetch("widow_hunterx")) is None
+    assert time.perf_counter() - start < 1 and cache.stats()["timeouts"] == 1
+    release.set()
+    assert cache.wait(cache.prefetch("widow_hunterx")) == HISTORY
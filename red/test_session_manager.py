@@ -0,0 +1,73 @@
+# test_session_manager.py
+
+import asyncio
+import time
+
+from session_manager import AsyncSessionManager, TokenBucket, session_key
+
+
+def _recording_reply_fn(log, delay=0.01):
+    async def reply_fn(user_input, session_id, on_token):
+        log.append((session_id, user_input, "start"))
+        await asyncio.sleep(delay)
+        log.append((session_id, user_input, "end"))
+        if on_token:
+            on_token(user_input.upper())
+        return {"reply": user_input.upper(), "status": "engaging"}
+    return reply_fn
+
+
+def test_turns_stay_ordered_per_session_and_sessions_are_isolated():
+    log = []
+
+    async def run():
+        manager = AsyncSessionManager(_recording_reply_fn(log), requests_per_minute=0, max_concurrency=10)
+        results = await asyncio.gather(*(
+            manager.submit("analyst", f"eng-{e}", f"msg {t}") for e in range(5) for t in range(4)))
+        await manager.aclose()
+        return results
+
+    results = asyncio.run(run())
+    assert [r["reply"] for r in results] == [f"MSG {t}" for e in range(5) for t in range(4)]
+    for e in range(5):
+        session_log = [(text, event) for sid, text, event in log if sid == session_key("analyst", f"eng-{e}")]
+        # Never overlapping and in submission order
+        assert session_log == [(f"msg {t}", event) for t in range(4) for event in ("start", "end")]
+
+
+def test_concurrency_cap_is_shared_across_sessions():
+    active, peak = [0], [0]
+
+    async def reply_fn(user_input, session_id, on_token):
+        active[0] += 1
+        peak[0] = max(peak[0], active[0])
+        await asyncio.sleep(0.01)
+        active[0] -= 1
+        return {}
+
+    async def run():
+        manager = AsyncSessionManager(reply_fn, requests_per_minute=0, max_concurrency=3)
+        await asyncio.gather(*(manager.submit("a", f"eng-{i}", "hi") for i in range(20)))
+        await manager.aclose()
+
+    asyncio.run(run())
+    assert peak[0] == 3
+
+
+def test_token_bucket_limits_rate_after_burst():
+    async def run():
+        bucket = TokenBucket(rate=50, capacity=5)
+        start = time.monotonic()
+        for _ in range(15):
+            await bucket.acquire()
+        return time.monotonic() - start
+
+    # 5 burst tokens are free, the other 10 arrive at 50/s
+    assert 0.18 <= asyncio.run(run()) < 0.5
+
+
+def test_stream_reply_from_a_thread():
+    manager = AsyncSessionManager(_recording_reply_fn([]), requests_per_minute=0)
+    stream = manager.stream_reply("analyst", "eng", "hello")
+    assert list(stream) == ["HELLO"]
+    assert stream.result["reply"] == "HELLO"
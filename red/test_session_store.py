@@ -0,0 +1,65 @@
+# test_session_store.py
+
+import os
+import tempfile
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+from session_store import SessionStore, SUMMARY_PREFIX
+
+
+def _add_turns(history, n, start=0):
+    for i in range(start, start + n):
+        history.add_messages([HumanMessage(content=f"scammer message {i} " * 10),
+                              AIMessage(content=f"alex reply {i} " * 10)])
+
+
+def test_history_survives_restart():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        db_path = os.path.join(tmpdir, "history.sqlite3")
+        store = SessionStore(db_path)
+        _add_turns(store.get("s1"), 3)
+        store.close()
+
+        reopened = SessionStore(db_path)
+        messages = reopened.get("s1").messages
+        assert len(messages) == 6
+        assert messages[0].type == "human" and messages[-1].type == "ai"
+        reopened.close()
+
+
+def test_lru_unloads_but_keeps_sessions():
+    store = SessionStore(":memory:", max_sessions=2)
+    for session_id in ("a", "b", "c"):
+        _add_turns(store.get(session_id), 1)
+    assert len(store) == 2
+    # "a" was evicted from memory but is reloaded from SQLite
+    assert len(store.get("a").messages) == 2
+
+
+def test_window_keeps_recent_turns_within_budget():
+    calls = []
+
+    def summarizer(previous, messages, max_tokens):
+        calls.append(len(messages))
+        return f"{previous} +{len(messages)}".strip()
+
+    store = SessionStore(":memory:", token_budget=200, summarizer=summarizer)
+    history = store.get("s")
+    _add_turns(history, 20)
+
+    windowed = store.window("s", history.messages)
+    assert windowed[0].content.startswith(SUMMARY_PREFIX)
+    assert windowed[-1] == history.messages[-1]
+    assert sum(len(m.content) // 4 + 1 for m in windowed[1:]) <= 200
+
+    # The rolling summary is cached: another window without new turns does not re-summarize
+    store.window("s", history.messages)
+    assert len(calls) == 1
+
+
+def test_window_disabled_returns_full_history():
+    store = SessionStore(":memory:", token_budget=0)
+    history = store.get("s")
+    _add_turns(history, 20)
+    assert store.window("s", history.messages) == history.messages
@@ -0,0 +1,54 @@
+# test_telemetry.py
+
+import json
+import threading
+
+import pytest
+
+from telemetry import Telemetry
+
+
+def test_spans_fill_histograms_and_count_errors():
+    recorder = Telemetry(enabled=True, buckets=(0.01, 0.1))
+    for seconds in (0.005, 0.05, 0.5):
+        recorder.observe("ner", seconds)
+    with pytest.raises(ValueError):
+        with recorder.span("ner"):
+            raise ValueError("boom")
+
+    stats = recorder.snapshot()["ner"]
+    assert stats["count"] == 4 and stats["errors"] == 1
+    assert stats["buckets"]["0.01"] == 2 and stats["buckets"]["0.1"] == 1 and stats["buckets"]["+Inf"] == 1
+    assert stats["max_s"] == 0.5
+
+    prometheus = recorder.to_prometheus()
+    assert 'sentinel_stage_duration_seconds_bucket{stage="ner",le="0.1"} 3' in prometheus
+    assert 'sentinel_stage_duration_seconds_bucket{stage="ner",le="+Inf"} 4' in prometheus
+    assert 'sentinel_stage_errors_total{stage="ner"} 1' in prometheus
+    assert json.loads(recorder.to_json())["stages"]["ner"]["count"] == 4
+
+
+def test_disabled_recorder_records_nothing():
+    recorder = Telemetry(enabled=False)
+
+    @recorder.timed("final_verdict")
+    def verdict(x):
+        return x * 2
+
+    with recorder.trace() as spans:
+        with recorder.span("keywords.spam"):
+            pass
+        assert verdict(21) == 42
+    assert recorder.snapshot() == {} and spans == []
+
+
+def test_trace_only_collects_the_current_threads_spans():
+    recorder = Telemetry(enabled=True)
+    other = threading.Thread(target=lambda: recorder.observe("llm_call", 0.2))
+
+    with recorder.trace() as spans:
+        with recorder.span("profile_risk"):
+            other.start()
+            other.join()
+    assert [s["stage"] for s in spans] == ["profile_risk"]
+    assert recorder.snapshot()["llm_call"]["count"] == 1
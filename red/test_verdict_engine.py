@@ -0,0 +1,75 @@
+# test_verdict_engine.py
+
+import random
+
+import numpy as np
+import pytest
+
+from verdict_engine import (
+    PRIOR_REPORTS_MAX_POINTS, calculate_final_verdict, calculate_final_verdicts, analyses_to_frame,
+    fit_verdict_weights,
+)
+
+INTENTS = ["Sextortion/Blackmail", "Tech Honeytrap/Scam", "Spam/Scam", "Normal Conversation", "anomalous"]
+
+
+def _random_analysis(rng):
+    return {
+        "primary_intent": rng.choice(INTENTS),
+        "sextortion_confidence_score": min(rng.choice([0, 60, 95]) + rng.randint(0, 200) * 0.2, 100),
+        "tech_honeytrap_score": min(rng.choice([0, 50, 85]) + rng.randint(0, 200) * 0.2, 100),
+        "spam_confidence_score": min(rng.random() * 100 + rng.randint(0, 200) * 0.1, 100),
+        "psychological_analysis": {"total_risk_score": rng.choice([0, 15, 20, 35, 95, 150])},
+    }
+
+
+@pytest.fixture
+def rows():
+    rng = random.Random(7)
+    profile_scores = [rng.randint(0, 10) for _ in range(5000)]
+    analyses = [_random_analysis(rng) for _ in range(5000)]
+    return profile_scores, analyses
+
+
+@pytest.mark.parametrize("threat_selection", ["intent", "max"])
+def test_vectorized_matches_scalar_bit_for_bit(rows, threat_selection):
+    profile_scores, analyses = rows
+    expected = np.array([calculate_final_verdict(p, a, threat_selection=threat_selection)
+                         for p, a in zip(profile_scores, analyses)], dtype=np.float64)
+    actual = calculate_final_verdicts(analyses_to_frame(profile_scores, analyses), threat_selection=threat_selection)
+    assert np.array_equal(actual.view(np.uint64), expected.view(np.uint64))
+
+
+def test_prior_reports_factor_is_optional_and_capped(rows):
+    profile_scores, analyses = rows
+    base = [calculate_final_verdict(p, a) for p, a in zip(profile_scores, analyses)]
+    assert [calculate_final_verdict(p, a, prior_reports=None) for p, a in zip(profile_scores, analyses)] == base
+
+    analysis = {"primary_intent": "Spam/Scam", "spam_confidence_score": 40}
+    assert calculate_final_verdict(0, analysis, prior_reports=0) == calculate_final_verdict(0, analysis)
+    assert calculate_final_verdict(0, analysis, prior_reports=2) > calculate_final_verdict(0, analysis, prior_reports=1)
+    assert calculate_final_verdict(0, analysis, prior_reports=50) == calculate_final_verdict(0, analysis) + PRIOR_REPORTS_MAX_POINTS
+
+    priors = [i % 7 for i in range(len(analyses))]
+    expected = np.array([calculate_final_verdict(p, a, prior_reports=n)
+                         for p, a, n in zip(profile_scores, analyses, priors)], dtype=np.float64)
+    actual = calculate_final_verdicts(analyses_to_frame(profile_scores, analyses, priors))
+    assert np.array_equal(actual.view(np.uint64), expected.view(np.uint64))
+
+
+def test_missing_columns_use_scalar_defaults():
+    actual = calculate_final_verdicts({"profile_risk_score": np.array([3, 10])})
+    expected = [calculate_final_verdict(3, {}), calculate_final_verdict(10, {})]
+    assert actual.tolist() == expected
+
+
+def test_fit_recovers_labelling_weights(rows):
+    profile_scores, analyses = rows
+    frame = analyses_to_frame(profile_scores, analyses)
+    true_weights = {"primary_threat": 0.3, "profile": 0.5, "psych": 0.2}
+    labels = calculate_final_verdicts(frame, weights=true_weights, threat_selection="max") > 60
+
+    fitted = fit_verdict_weights(frame, labels)
+    assert fitted["score"] == 1.0
+    refit = calculate_final_verdicts(frame, weights=fitted["weights"], threat_selection=fitted["threat_selection"]) > 60
+    assert np.array_equal(refit, labels)
@@ -1,6 +1,9 @@
 # --- trigger_analyzer.py ---
 import re
 
+from ioc_reputation import check_reputation
+from telemetry import timed
+
 # Regex patterns for common triggers
 URL_REGEX = r"https?://[^\s/$.?#].[^\s]*"
 CRYPTO_REGEX = {
@@ -10,30 +13,57 @@ CRYPTO_REGEX = {
 EMAIL_REGEX = r"\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b"
 FILE_EXTENSION_REGEX = r"\b\w+\.(exe|zip|scr|msi|dmg|apk)\b"
 
+def _with_reputation(trigger: dict) -> dict:
+    """Attaches the offline IOC reputation verdict (None when unknown or no store)."""
+    trigger["reputation"] = check_reputation(trigger["value"])
+    return trigger
+
+@timed("trigger_scan")
 def analyze_for_triggers(text: str) -> dict | None:
     """
     Scans a single message for high-confidence conclusion triggers.
     Returns a dictionary with trigger info if found, otherwise None.
+    The dictionary carries a 'reputation' entry when the indicator is on a known-bad feed.
     """
     # Check for Crypto Wallets
     for coin, pattern in CRYPTO_REGEX.items():
         match = re.search(pattern, text)
         if match:
-            return {"type": "Crypto Wallet", "value": match.group(0), "coin": coin}
+            return _with_reputation({"type": "Crypto Wallet", "value": match.group(0), "coin": coin})
 
     # Check for Malicious File Extensions
     match = re.search(FILE_EXTENSION_REGEX, text, re.IGNORECASE)
     if match:
-        return {"type": "Malicious File Lure", "value": match.group(0)}
+        return _with_reputation({"type": "Malicious File Lure", "value": match.group(0)})
 
     # Check for URLs
     match = re.search(URL_REGEX, text)
     if match:
-        return {"type": "URL / Phishing Link", "value": match.group(0)}
+        return _with_reputation({"type": "URL / Phishing Link", "value": match.group(0)})
 
     # Check for Email Address (less critical, but still useful intelligence)
     match = re.search(EMAIL_REGEX, text)
     if match:
-        return {"type": "Contact Info (Email)", "value": match.group(0)}
+        return _with_reputation({"type": "Contact Info (Email)", "value": match.group(0)})
     
-    return None
\ No newline at end of file
+    return None
+
+def find_known_bad_indicators(messages: list[str]) -> list[dict]:
+    """
+    Extracts every URL, wallet and email from a list of messages and returns the
+    ones found in the offline IOC reputation store (empty if no store is configured).
+    """
+    hits = []
+    seen = set()
+    for message in messages:
+        values = [m.group(0) for pattern in CRYPTO_REGEX.values() for m in re.finditer(pattern, message)]
+        values += [m.group(0) for m in re.finditer(URL_REGEX, message)]
+        values += [m.group(0) for m in re.finditer(EMAIL_REGEX, message)]
+        for value in values:
+            if value in seen:
+                continue
+            seen.add(value)
+            reputation = check_reputation(value)
+            if reputation:
+                hits.append(reputation)
+    return hits
\ No newline at end of file
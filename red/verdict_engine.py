@@ -1,36 +1,238 @@
 # --- verdict_engine.py (Updated for Hybrid Analysis) ---
 
-def calculate_final_verdict(profile_risk_score: int, chat_analysis: dict):
+import numpy as np
+
+from profiler_hooks import profiled
+from telemetry import timed
+
+# Define weights - let's give the primary detected threat the most weight
+PRIMARY_THREAT_WEIGHT = 0.60
+PROFILE_WEIGHT = 0.20
+PSYCH_WEIGHT = 0.20 # The psych score's main job was boosting confidence; it has a smaller direct impact here.
+
+DEFAULT_WEIGHTS = {
+    "primary_threat": PRIMARY_THREAT_WEIGHT,
+    "profile": PROFILE_WEIGHT,
+    "psych": PSYCH_WEIGHT,
+}
+
+# Optional prior-reports factor: points added per earlier report of the same
+# username (scammer_history.py), up to a cap. Off unless a prior count is passed.
+PRIOR_REPORT_POINTS = 5.0
+PRIOR_REPORTS_MAX_POINTS = 20.0
+
+# How the "primary threat" score is picked from the three chat confidences:
+#   'intent' - the confidence matching the detected primary intent (default)
+#   'max'    - the highest of the three confidences, regardless of intent
+THREAT_SELECTIONS = ("intent", "max")
+
+# Columns read by calculate_final_verdicts (missing ones default to 0 / 'Normal Conversation')
+VERDICT_COLUMNS = (
+    "profile_risk_score", "primary_intent", "sextortion_confidence_score",
+    "tech_honeytrap_score", "spam_confidence_score", "psych_risk_score",
+)
+
+
+def prior_reports_points(prior_reports):
+    """Verdict points for a username's earlier reports (works on ints and arrays)."""
+    return np.minimum(np.asarray(prior_reports, dtype=np.float64) * PRIOR_REPORT_POINTS, PRIOR_REPORTS_MAX_POINTS)
+
+
+def _combine(primary_threat_score, profile_score_100, capped_psych_score, weights):
+    """The weighted sum shared by the scalar and vectorized paths (works on floats and arrays)."""
+    return (
+        (primary_threat_score * weights["primary_threat"]) +
+        (profile_score_100 * weights["profile"]) +
+        (capped_psych_score * weights["psych"])
+    )
+
+
+@timed("final_verdict")
+@profiled("calculate_final_verdict")
+def calculate_final_verdict(profile_risk_score: int, chat_analysis: dict, weights: dict | None = None,
+                            threat_selection: str = "intent", prior_reports: int | None = None):
     """
     Calculates a final verdict based on the comprehensive chat analysis dictionary
     which now includes psychological profiling data.
+    `weights` and `threat_selection` default to the hand-tuned values; pass the
+    output of `fit_verdict_weights` to use learned ones.
+    `prior_reports` (how often the username was reported before) adds
+    `prior_reports_points`; when it is None the verdict is unchanged.
     """
+    weights = weights or DEFAULT_WEIGHTS
     profile_score_100 = profile_risk_score * 10
-    
+
     # Extract the psychological risk score from the embedded dictionary
     psych_risk_score = chat_analysis.get('psychological_analysis', {}).get('total_risk_score', 0)
-    
+
     # Get the confidence score of the primary threat (your logic is good here)
     primary_intent = chat_analysis.get('primary_intent', 'Normal Conversation')
-    if primary_intent == 'Sextortion/Blackmail':
+    if threat_selection == 'max':
+        primary_threat_score = max(chat_analysis.get('sextortion_confidence_score', 0),
+                                   chat_analysis.get('tech_honeytrap_score', 0),
+                                   chat_analysis.get('spam_confidence_score', 0))
+    elif primary_intent == 'Sextortion/Blackmail':
         primary_threat_score = chat_analysis.get('sextortion_confidence_score', 0)
     elif primary_intent == 'Tech Honeytrap/Scam':
         primary_threat_score = chat_analysis.get('tech_honeytrap_score', 0)
     else: # General Spam or Normal
         primary_threat_score = chat_analysis.get('spam_confidence_score', 0)
 
-    # Define weights - let's give the primary detected threat the most weight
-    PRIMARY_THREAT_WEIGHT = 0.60
-    PROFILE_WEIGHT = 0.20
-    PSYCH_WEIGHT = 0.20 # The psych score's main job was boosting confidence; it has a smaller direct impact here.
-    
     # Cap the raw psychological score to prevent it from dominating the final verdict
     capped_psych_score = min(psych_risk_score, 100)
-    
-    final_score = (
-        (primary_threat_score * PRIMARY_THREAT_WEIGHT) + 
-        (profile_score_100 * PROFILE_WEIGHT) +
-        (capped_psych_score * PSYCH_WEIGHT)
-    )
-    
-    return min(final_score, 100)
\ No newline at end of file
+
+    final_score = _combine(primary_threat_score, profile_score_100, capped_psych_score, weights)
+    if prior_reports is not None:
+        final_score += float(prior_reports_points(prior_reports))
+
+    return min(final_score, 100)
+
+
+# --- Vectorized (columnar) path for bulk triage ---
+
+def analyses_to_frame(profile_risk_scores: list, chat_analyses: list[dict], prior_report_counts: list | None = None) -> dict:
+    """
+    Flattens (profile score, chat analysis dict) pairs into the columns expected by
+    `calculate_final_verdicts`. Returns a dict of NumPy arrays (wrap it in a
+    pandas DataFrame if you need one). `prior_report_counts` adds the optional
+    "prior_report_count" column.
+    """
+    frame = {
+        "profile_risk_score": np.asarray(profile_risk_scores),
+        "primary_intent": np.array([a.get('primary_intent', 'Normal Conversation') for a in chat_analyses], dtype=object),
+        "sextortion_confidence_score": np.array([a.get('sextortion_confidence_score', 0) for a in chat_analyses], dtype=np.float64),
+        "tech_honeytrap_score": np.array([a.get('tech_honeytrap_score', 0) for a in chat_analyses], dtype=np.float64),
+        "spam_confidence_score": np.array([a.get('spam_confidence_score', 0) for a in chat_analyses], dtype=np.float64),
+        "psych_risk_score": np.array([a.get('psychological_analysis', {}).get('total_risk_score', 0) for a in chat_analyses], dtype=np.float64),
+    }
+    if prior_report_counts is not None:
+        frame["prior_report_count"] = np.asarray(prior_report_counts, dtype=np.float64)
+    return frame
+
+
+def _column(frame, name, n, default):
+    if name in frame:
+        return np.asarray(frame[name])
+    return np.full(n, default, dtype=object if isinstance(default, str) else np.float64)
+
+
+def _verdict_components(frame, threat_selection: str = "intent"):
+    """
+    Returns the (primary threat, profile x10, capped psych) arrays for a frame.
+    `frame` is anything indexable by column name: a pandas DataFrame or a dict of arrays.
+    """
+    if threat_selection not in THREAT_SELECTIONS:
+        raise ValueError(f"Unknown threat_selection '{threat_selection}'. Expected one of {THREAT_SELECTIONS}.")
+
+    profile = np.asarray(frame["profile_risk_score"])
+    n = len(profile)
+    sextortion = _column(frame, "sextortion_confidence_score", n, 0.0).astype(np.float64)
+    tech = _column(frame, "tech_honeytrap_score", n, 0.0).astype(np.float64)
+    spam = _column(frame, "spam_confidence_score", n, 0.0).astype(np.float64)
+    psych = _column(frame, "psych_risk_score", n, 0.0).astype(np.float64)
+
+    if threat_selection == "max":
+        primary = np.maximum(np.maximum(sextortion, tech), spam)
+    else:
+        intent = _column(frame, "primary_intent", n, "Normal Conversation")
+        primary = np.where(intent == 'Sextortion/Blackmail', sextortion,
+                           np.where(intent == 'Tech Honeytrap/Scam', tech, spam))
+
+    profile_score_100 = profile.astype(np.float64) * 10
+    capped_psych = np.minimum(psych, 100)
+    return primary, profile_score_100, capped_psych
+
+
+def calculate_final_verdicts(frame, weights: dict | None = None, threat_selection: str = "intent") -> np.ndarray:
+    """
+    Vectorized `calculate_final_verdict` over many rows at once.
+
+    Args:
+        frame: A DataFrame (or dict of arrays) with the columns in VERDICT_COLUMNS,
+               e.g. built with `analyses_to_frame`, and optionally
+               "prior_report_count" for the prior-reports factor.
+        weights: Optional weights dict (defaults to DEFAULT_WEIGHTS).
+        threat_selection: 'intent' (default) or 'max', see THREAT_SELECTIONS.
+
+    Returns:
+        A float64 array of verdicts, bit-identical to calling the scalar
+        function row by row.
+    """
+    weights = weights or DEFAULT_WEIGHTS
+    primary, profile_score_100, capped_psych = _verdict_components(frame, threat_selection)
+    scores = _combine(primary, profile_score_100, capped_psych, weights)
+    if "prior_report_count" in frame:
+        scores = scores + prior_reports_points(frame["prior_report_count"])
+    return np.minimum(scores, 100)
+
+
+# --- Weight fitting ---
+
+def _weight_grid(step: float) -> np.ndarray:
+    """All (primary, profile, psych) weight triples on a `step` grid that sum to 1."""
+    ticks = int(round(1 / step))
+    grid = [(i / ticks, j / ticks, (ticks - i - j) / ticks)
+            for i in range(ticks + 1) for j in range(ticks + 1 - i)]
+    return np.array(grid, dtype=np.float64)
+
+
+def fit_verdict_weights(frame, labels, threshold: float = 60, step: float = 0.05,
+                        threat_selections=THREAT_SELECTIONS, metric: str = "f1",
+                        chunk_size: int = 65536) -> dict:
+    """
+    Learns verdict weights and the primary-threat selection from labelled outcomes.
+
+    Every weight triple on a simplex grid (weights sum to 1) is scored for every
+    threat selection using the same vectorized formula as `calculate_final_verdicts`;
+    a row is predicted malicious when its verdict exceeds `threshold`.
+
+    Args:
+        frame: Columns as for `calculate_final_verdicts`.
+        labels: Array-like of booleans/0-1, True for confirmed scams.
+        threshold: Verdict above which a row counts as flagged (the app uses 60).
+        step: Grid resolution for the weights.
+        threat_selections: Selections to try (see THREAT_SELECTIONS).
+        metric: 'f1' or 'accuracy'.
+        chunk_size: Rows evaluated at once, to bound memory.
+
+    Returns:
+        A dict with 'weights', 'threat_selection' and the achieved 'score',
+        ready to pass to `calculate_final_verdict(s)`.
+    """
+    if metric not in ("f1", "accuracy"):
+        raise ValueError("metric must be 'f1' or 'accuracy'.")
+    labels = np.asarray(labels).astype(bool)
+    grid = _weight_grid(step)
+    w = {"primary_threat": grid[:, 0], "profile": grid[:, 1], "psych": grid[:, 2]}
+
+    best = None
+    for selection in threat_selections:
+        primary, profile_score_100, capped_psych = _verdict_components(frame, selection)
+        tp = np.zeros(len(grid), dtype=np.int64)
+        fp = np.zeros(len(grid), dtype=np.int64)
+        fn = np.zeros(len(grid), dtype=np.int64)
+        for start in range(0, len(labels), chunk_size):
+            rows = slice(start, start + chunk_size)
+            scores = np.minimum(_combine(primary[rows, None], profile_score_100[rows, None],
+                                         capped_psych[rows, None], w), 100)
+            flagged = scores > threshold
+            truth = labels[rows, None]
+            tp += np.count_nonzero(flagged & truth, axis=0)
+            fp += np.count_nonzero(flagged & ~truth, axis=0)
+            fn += np.count_nonzero(~flagged & truth, axis=0)
+
+        if metric == "f1":
+            denominator = 2 * tp + fp + fn
+            scores = np.divide(2 * tp, denominator, out=np.zeros(len(grid)), where=denominator > 0)
+        else:
+            scores = 1 - (fp + fn) / max(len(labels), 1)
+
+        i = int(np.argmax(scores))
+        if best is None or scores[i] > best["score"]:
+            best = {
+                "weights": {"primary_threat": float(grid[i, 0]), "profile": float(grid[i, 1]), "psych": float(grid[i, 2])},
+                "threat_selection": selection,
+                "score": float(scores[i]),
+                "metric": metric,
+            }
+    return best